@@ -6,15 +6,55 @@ import sys
 import time
 import math
 import os
+import threading
+from collections import deque
 
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    import pigpio
+# Backend de GPIO: 'pigpio' (hardware real), 'gpiod' (dispositivo de caracteres, sin
+# pigpiod: gpio_gpiod.py), 'mcu' (pasos generados por un microcontrolador por puerto
+# serie: gpio_mcu.py) o 'sim' (pigpio simulado para pruebas)
+GPIO_BACKEND = os.environ.get("ORTESIS_GPIO", "pigpio")
+
+if GPIO_BACKEND == "sim":
+    import pigpio_sim as pigpio
+    print("ADVERTENCIA: Usando pigpio SIMULADO (ORTESIS_GPIO=sim).")
+    IS_RASPBERRY_PI = True
+elif GPIO_BACKEND == "gpiod":
+    try:
+        import gpio_gpiod as pigpio
+        print(f"[SISTEMA] GPIO por libgpiod ({pigpio.DEFAULT_CHIP}), sin pigpiod.")
+        IS_RASPBERRY_PI = True
+    except (ImportError, ModuleNotFoundError):
+        print("ADVERTENCIA: 'gpiod' (libgpiod v2) no encontrado. Ejecutando en modo SIMULACIÓN.")
+        IS_RASPBERRY_PI = False
+elif GPIO_BACKEND == "mcu":
+    import gpio_mcu as pigpio
+    print(f"[SISTEMA] Pasos generados por el microcontrolador ({pigpio.DEFAULT_PORT}).")
     IS_RASPBERRY_PI = True
-except (ImportError, ModuleNotFoundError):
-    print("ADVERTENCIA: 'pigpio' no encontrado. Ejecutando en modo SIMULACIÓN.")
-    IS_RASPBERRY_PI = False
+else:
+    try:
+        import pigpio
+        IS_RASPBERRY_PI = True
+    except (ImportError, ModuleNotFoundError):
+        print("ADVERTENCIA: 'pigpio' no encontrado. Ejecutando en modo SIMULACIÓN.")
+        IS_RASPBERRY_PI = False
+
+# Núcleo de movimiento en un proceso separado (motion_process.py) en lugar de un QThread
+MOTOR_EN_PROCESO = os.environ.get("ORTESIS_MOTOR_PROCESO", "0") == "1"
+
+# Modo de tiempo real del ciclo de control (realtime.py)
+TIEMPO_REAL = os.environ.get("ORTESIS_TIEMPO_REAL", "0") == "1"
+
+# Homing de ambos ejes a la vez (ORTESIS_CALIBRACION_PARALELA=0 vuelve al secuencial)
+CALIBRACION_PARALELA = os.environ.get("ORTESIS_CALIBRACION_PARALELA", "1") == "1"
+
+# Monitor de deriva: corregir la posición al medir deriva en un sensor (drift_monitor.py)
+DERIVA_REZERO = os.environ.get("ORTESIS_DERIVA_REZERO", "0") == "1"
+
+# Encoders de cuadratura (encoder.py): ejes que lo tienen, p. ej. ORTESIS_ENCODER=lineal,rotacional
+ENCODER_EJES = [motor for motor in os.environ.get("ORTESIS_ENCODER", "").replace(" ", "").split(",")
+                if motor in ('lineal', 'rotacional')]
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QWidget, 
                              QVBoxLayout, QHBoxLayout, QStackedWidget, QProgressBar,
@@ -23,6 +63,22 @@ from PyQt5.QtCore import (Qt, QSize, QTimer, QObject, pyqtSignal, QThread, pyqtS
 from PyQt5.QtGui import (QPixmap, QIcon, QFont, QMovie)
 
 from styles import STYLESHEET
+from axis_units import AxisUnits
+from characterization import DeviceCharacterization
+from exercises import Exercise, JogArrow
+from jog_speed import JogSpeedProfile
+from drift_monitor import DriftMonitor
+from encoder import QuadratureEncoder
+from latency import LatencyStats, jog_latency_stats
+from motion_watchdog import PigpioWatchdog, Heartbeat
+from control_api import ControlBridge, DEFAULT_SOCKET_PATH
+from wave_session import compile_session, WaveSession
+import mcu_protocol
+from joint_path import plan_segment
+from trajectory import TrajectoryRecorder
+from motion_process import MotionProcessProxy
+from realtime import RealtimeMode, LoopJitter
+from scheduler import ActionScheduler
 
 # --- CONSTANTES DE HARDWARE ---
 ENABLE_ACTIVO = 0   
@@ -37,34 +93,179 @@ LIN_LIMIT_IN_PIN, LIN_LIMIT_OUT_PIN = 8, 25
 
 E_STOP_PIN = 16
 
+# Encoders (opcionales): canales A/B y cuentas por paso del motor
+# (1000 líneas x 4 flancos = 4000 cuentas/vuelta, 6400 micropasos/vuelta)
+ENCODER_PINES = {'lineal': (5, 6), 'rotacional': (20, 21)}
+ENCODER_CUENTAS_POR_PASO = {'lineal': 4000 / 6400, 'rotacional': 4000 / 6400}
+
+# Paro rápido: máscara de ENABLE de ambos drivers para una sola escritura de banco
+HALT_EN_MASK = (1 << ROT_EN_PIN) | (1 << LIN_EN_PIN)
+HALT_LATENCIA_MAX_US = 5000     # Peor caso permitido desde el aviso hasta ENABLE inactivo
+HALT_AUTOPRUEBA_MUESTRAS = 20
+
+# Jog: latencia pulsar -> PWM y soltar -> PWM detenido
+JOG_SOLTAR_MAX_US = 3000        # Objetivo de la ruta rápida al soltar
+DIR_ASENTAMIENTO_JOG_S = 0.002  # Los drivers piden µs entre DIR y el primer pulso
+
+# Watchdog: latidos worker -> pigpiod y GUI -> worker
+WATCHDOG_LATIDO_MS = 100
+WATCHDOG_TIMEOUT_MS = 1000      # Mayor que la espera más larga del worker (0.5 s + 0.1 s)
+WATCHDOG_GUI_LATIDO_MS = 200
+WATCHDOG_GUI_TIMEOUT_MS = 1000
+WATCHDOG_FALLOS_ENLACE = 3      # Latidos fallidos seguidos que cuentan como enlace perdido con pigpiod
+
+# Tiempo real: prioridad SCHED_FIFO y CPU reservada para el ciclo de control
+RT_PRIORIDAD = 50
+RT_CPUS = {3}
+
+# Terapia completa como cadena de ondas DMA (wave_session.py)
+TERAPIA_EN_CADENA_DMA = GPIO_BACKEND != "gpiod"    # libgpiod no tiene ondas DMA: máquina de estados
+TERAPIA_PAUSA_EXTREMO_MS = 2000     # Igual que la máquina de estados (dos esperas de 1 s)
+TERAPIA_PAUSA_FINAL_MS = 1000
+
+# Microcontrolador generador de pasos (gpio_mcu.py): los movimientos por pasos son tramos
+# exactos con rampa; la sesión de terapia va como tramos con la línea de tiempo de la cadena DMA
+TRAMOS_MCU = GPIO_BACKEND == "mcu"
+MCU_RAMPA_S = 0.05      # Rampa hasta la frecuencia del tramo (igual en ambos ejes: siguen sincronizados)
+
+# API de control local
+API_JOG_MAX_MS = 2000           # Jog por API: se detiene solo si el cliente no renueva la orden
+# Ejercicio de dos ejes (flexión + abducción a la vez, joint_path.py)
+TERAPIA_COMBINADA = "Combinado"
+
+# Trayectoria enseñada con el jog (trajectory.py)
+TERAPIA_TRAYECTORIA = "Trayectoria grabada"
+TRAYECTORIA_MUESTREO_MS = 5
+TRAYECTORIA_VELOCIDADES = (0.5, 1.0, 1.5, 2.0)
+
+# Sesión programada: varios ejercicios seguidos sobre el mismo cero de terapia
+SESION_MAX_EJERCICIOS = 8
+SESION_PAUSA_ENTRE_EJERCICIOS_MS = 3000
+
+API_TIPOS_TERAPIA = {
+    "flexion_extension": "Flexión/Extensión",
+    "abduction_adduction": "Abducción/Aducción",
+    "combined": TERAPIA_COMBINADA,
+    "trajectory": TERAPIA_TRAYECTORIA,
+}
+
 # Configuración de Homing (0 o 1 para invertir dirección de búsqueda)
 SENTIDO_HOMING_ROTACIONAL = 0 
 SENTIDO_HOMING_LINEAL = 1     
 
+# Caracterización del equipo (characterize_axes.py): si existe, sustituye los
+# pasos por unidad, las velocidades de terapia/jog y el filtro de glitch
+CARACTERIZACION_ARCHIVO = os.environ.get("ORTESIS_CARACTERIZACION", "caracterizacion.json")
+CARACTERIZACION = DeviceCharacterization.load(CARACTERIZACION_ARCHIVO)
+
+# Distancia entre los puntos de disparo de los sensores de cada eje (medida en el
+# equipo); la caracterización la divide entre los pasos contados
+CARRERA_LINEAL_CM = 20.3125
+CARRERA_ROTACIONAL_GRADOS = 61.875
+
 # Conversión de Unidades
-ROTACIONAL_GRADOS_POR_PASO = 360.0 / 6400.0 / 10
-LINEAL_CM_POR_PASO = 1.0 / 6400.0
+ROTACIONAL_GRADOS_POR_PASO = CARACTERIZACION.get('rotacional', 'units_per_step', 360.0 / 6400.0 / 10)
+LINEAL_CM_POR_PASO = CARACTERIZACION.get('lineal', 'units_per_step', 1.0 / 6400.0)
+
+# Posición de inicio de terapia (queda como cero lógico al volver al inicio)
+POSICION_INICIO_LINEAL_PASOS = int(5.0 / LINEAL_CM_POR_PASO)
+POSICION_INICIO_ROTACIONAL_PASOS = int(1.0 / ROTACIONAL_GRADOS_POR_PASO)
 
-# Velocidades (Hz)
+# Recuperación tras paro por software: error máximo al tocar el sensor de homing
+RECUPERACION_TOLERANCIA_LINEAL_PASOS = int(0.1 / LINEAL_CM_POR_PASO)             # 1 mm
+RECUPERACION_TOLERANCIA_ROTACIONAL_PASOS = int(0.5 / ROTACIONAL_GRADOS_POR_PASO) # 0.5°
+
+# Trayectoria enseñada: error máximo de la compresión RDP
+TRAYECTORIA_TOLERANCIA_LINEAL_PASOS = int(0.05 / LINEAL_CM_POR_PASO)              # 0.5 mm
+TRAYECTORIA_TOLERANCIA_ROTACIONAL_PASOS = int(0.25 / ROTACIONAL_GRADOS_POR_PASO)  # 0.25°
+
+# Velocidades (Hz); terapia y jog toman las máximas seguras medidas si hay caracterización
 VELOCIDAD_HZ_LINEAL_CALIBRATION = 6400
-VELOCIDAD_HZ_LINEAL_TERAPIA = 6400
-VELOCIDAD_HZ_LINEAL_JOG = 6400
+VELOCIDAD_HZ_LINEAL_TERAPIA = CARACTERIZACION.get('lineal', 'therapy_hz', 6400)
+VELOCIDAD_HZ_LINEAL_JOG = VELOCIDAD_HZ_LINEAL_TERAPIA
 
 VELOCIDAD_HZ_ROTACIONAL_CALIBRATION = 800
-VELOCIDAD_HZ_ROTACIONAL_TERAPIA = 800
-VELOCIDAD_HZ_ROTACIONAL_JOG = 800
+VELOCIDAD_HZ_ROTACIONAL_TERAPIA = CARACTERIZACION.get('rotacional', 'therapy_hz', 800)
+VELOCIDAD_HZ_ROTACIONAL_JOG = VELOCIDAD_HZ_ROTACIONAL_TERAPIA
+
+# Jog de velocidad variable (jog_speed.py): tope al mantener y mínimo junto al límite
+VELOCIDAD_HZ_LINEAL_JOG_MAX = CARACTERIZACION.get('lineal', 'jog_max_hz', 12800)
+VELOCIDAD_HZ_LINEAL_JOG_MIN = 800
+VELOCIDAD_HZ_ROTACIONAL_JOG_MAX = CARACTERIZACION.get('rotacional', 'jog_max_hz', 1600)
+VELOCIDAD_HZ_ROTACIONAL_JOG_MIN = 100
+JOG_RAMPA_S = 1.5
+
+# Filtro de glitch de sensores y paro (µs); la caracterización lo ajusta al rebote medido
+FILTRO_GLITCH_US = CARACTERIZACION.glitch_filter_us or 1000
 
 MAX_GRADOS_ABD = 40.0
 
+# Conversión a unidades de pantalla (compartida por todas las páginas)
+UNIDADES_LINEAL = AxisUnits(LINEAL_CM_POR_PASO, 2, " cm", min_units=0.0)
+UNIDADES_ROTACIONAL = AxisUnits(ROTACIONAL_GRADOS_POR_PASO, 1, "°", min_units=0.0, max_units=MAX_GRADOS_ABD)
+
+# Perfiles de jog: zona de aproximación de 5 mm / 3° antes de un límite conocido
+JOG_PERFILES = {
+    'lineal': JogSpeedProfile(VELOCIDAD_HZ_LINEAL_JOG, VELOCIDAD_HZ_LINEAL_JOG_MAX, VELOCIDAD_HZ_LINEAL_JOG_MIN,
+                              JOG_RAMPA_S, UNIDADES_LINEAL.steps_for_units(0.5)),
+    'rotacional': JogSpeedProfile(VELOCIDAD_HZ_ROTACIONAL_JOG, VELOCIDAD_HZ_ROTACIONAL_JOG_MAX, VELOCIDAD_HZ_ROTACIONAL_JOG_MIN,
+                                  JOG_RAMPA_S, UNIDADES_ROTACIONAL.steps_for_units(3.0)),
+}
+MAX_ABD_PASOS = UNIDADES_ROTACIONAL.steps_for_units(MAX_GRADOS_ABD)
+
+# Monitor de deriva: error que se corrige (por encima del ruido de medida) y error
+# a partir del cual no se corrige en silencio sino que se pide recalibrar
+DERIVA_TOLERANCIA_PASOS = {'lineal': UNIDADES_LINEAL.steps_for_units(0.01),
+                           'rotacional': UNIDADES_ROTACIONAL.steps_for_units(0.1)}
+DERIVA_MAX_PASOS = {'lineal': UNIDADES_LINEAL.steps_for_units(0.5),
+                    'rotacional': UNIDADES_ROTACIONAL.steps_for_units(3.0)}
+# Encoder: error de seguimiento (comandado - medido) a partir del cual el eje se da por calado
+ENCODER_ERROR_MAX_PASOS = {'lineal': UNIDADES_LINEAL.steps_for_units(0.2),
+                           'rotacional': UNIDADES_ROTACIONAL.steps_for_units(1.0)}
+SENSOR_EJE = {LIN_LIMIT_IN_PIN: 'lineal', LIN_LIMIT_OUT_PIN: 'lineal',
+              ROT_LIMIT_IN_PIN: 'rotacional', ROT_LIMIT_OUT_PIN: 'rotacional'}
+
+# Modo paso fino: cada toque mueve exactamente 0.01 cm / 0.1°
+JOG_TOQUE_PASOS = {'lineal': UNIDADES_LINEAL.steps_for_units(0.01),
+                   'rotacional': UNIDADES_ROTACIONAL.steps_for_units(0.1)}
+
+# Ejercicios de un eje: una sola página de configuración enlazada al descriptor (exercises.py)
+EJERCICIOS = {
+    "flexion_extension": Exercise(
+        "flexion_extension", "Flexión / Extensión", API_TIPOS_TERAPIA["flexion_extension"],
+        'lineal', UNIDADES_LINEAL, ("extension", "flexion"), ("Extensión", "Flexión"),
+        (JogArrow(1, "Flexión", "icons/arrow_right.png", LIN_LIMIT_IN_PIN),
+         JogArrow(-1, "Extensión", "icons/arrow_left.png", LIN_LIMIT_OUT_PIN)),
+        switch_to="abduction_adduction"),
+    "abduction_adduction": Exercise(
+        "abduction_adduction", "Abducción / Aducción", API_TIPOS_TERAPIA["abduction_adduction"],
+        'rotacional', UNIDADES_ROTACIONAL, ("adduction", "abduction"), ("Aducción", "Abducción"),
+        (JogArrow(-1, "Aducción", "icons/rotate_right.png", ROT_LIMIT_IN_PIN),
+         JogArrow(1, "Abducción", "icons/rotate_left.png", ROT_LIMIT_OUT_PIN)),
+        switch_to="flexion_extension"),
+}
+
 
 class HardwareController(QObject):
     # Señales para comunicar con la Interfaz Gráfica
     progress_updated = pyqtSignal(int)
     calibration_finished = pyqtSignal(bool, str)
+    calibration_axis_homed = pyqtSignal(str)      # Homing paralelo: un eje llegó a su sensor
     physical_estop_activated = pyqtSignal(bool)
     movement_finished = pyqtSignal(bool)
     position_updated = pyqtSignal(str, int)
     limit_status_updated = pyqtSignal(bool, bool)
+    halt_latency_measured = pyqtSignal(str, int)
+    watchdog_tripped = pyqtSignal(str)
+    session_progress = pyqtSignal(int)
+    session_finished = pyqtSignal(bool)
+    motion_paused = pyqtSignal(bool)
+    position_verified = pyqtSignal(str, bool, int)
+    trajectory_recorded = pyqtSignal(int, int, int)
+    jog_latency_measured = pyqtSignal(str, int)
+    drift_measured = pyqtSignal(str, int, bool)   # motor, error (pasos), corregido
+    limit_edge_seen = pyqtSignal()                # Interno: callback de pigpio -> hilo del worker
+    stall_detected = pyqtSignal(str, int)         # motor, error de seguimiento del encoder (pasos)
 
     def __init__(self):
         super().__init__()
@@ -75,12 +276,18 @@ class HardwareController(QObject):
         self.is_jogging = False
         self.is_calibrating = False
         self.is_moving_steps = False
+        self.is_verifying = False
+        
+        # Instante del último paro (la posición estimada se congela ahí)
+        self.halt_time = 0
+        self.halt_perf = 0
         
         # Configuración de límites suaves
         self.jog_enforce_soft_limits = True 
         
         # Variables de Calibración y Posición
         self.calibration_step = "" 
+        self.homing_pending = set()     # Homing paralelo: ejes que aún buscan su sensor
         self.posicion_rotacional = 0
         self.posicion_lineal = 0
         self.cero_terapia_rotacional = 0
@@ -90,6 +297,11 @@ class HardwareController(QObject):
         self.jog_motor = ""
         self.jog_direction = 0
         self.jog_last_update_time = 0
+        self.jog_press_time = 0         # time.time() del arranque (rampa de velocidad)
+        self.jog_speed = 0              # Frecuencia vigente: la integración de pasos usa esta
+        self.jog_pwm_lock = threading.Lock()   # Cambio de frecuencia vs. ruta rápida al soltar
+        self.jog_stop_time = None       # time.time() del corte por la ruta rápida
+        self.jog_release_perf = 0.0     # perf_counter() del último soltar
         
         # Variables para Movimiento por Pasos (Terapia)
         self.move_motor = ""
@@ -97,16 +309,89 @@ class HardwareController(QObject):
         self.move_steps_initial_pos = 0
         self.move_steps_target_pos = 0
         self.move_steps_direction = 0 
+        self.move_steps_start_time = 0
+        self.move_steps_speed = 0
+        self.move_steps_guarded = False     # Ir a posición: los sensores del sentido de avance cortan
+        self.move_steps_on_target = False   # Con encoder: el callback cortó el PWM en el destino
+        self.move_steps_accel = 0           # Rampa del tramo en el microcontrolador (Hz/s, 0 = sin rampa)
+        self.move_segment = None            # Id del tramo en el microcontrolador
+        
+        # Movimiento interpolado de ambos ejes: motor -> {pin, initial, target, start, end, hz, running}
+        # (con el microcontrolador, también 'accel' y 'segment')
+        self.combined_axes = {}
+        
+        # Variables para Sesión DMA (Terapia completa en pigpiod)
+        self.wave_session = None
+        self.session_motor = ""
+        self.session_start_time = 0
+        self.session_reps_done = 0
+        self.session_rep_offset = 0     # Repeticiones hechas antes de reanudar
+        self.session_plan = None        # (first, second, home, reps) de la sesión en curso
+        
+        # Movimiento pausado pendiente de reanudar (tramo de pasos o resto de la sesión DMA)
+        self.paused_motion = None
+        
+        # Trayectoria enseñada (trajectory.py): grabación y cola de reproducción
+        self.recorder = None
+        self.taught_trajectory = None
+        self.trajectory_queue = None    # [('move', duracion_s, lineal, rotacional) | ('rep', n)]
+        self.trajectory_wait_until = 0
+        
+        # Verificación de posición contra el sensor de homing (recuperación tras paro)
+        self.verify_motor = ""
+        self.verify_start_pos = 0
+        self.verify_start_time = 0
+        self.verify_speed = 0
+        self.verify_tolerance = 0
 
         self.stable_count = 0
         
+        # Monitor de deriva: flancos de los sensores (gpio, nivel, time.time()) pendientes de
+        # procesar y último movimiento terminado de cada eje (inicio, ancla, posición, pasos/s)
+        self.drift = DriftMonitor()
+        self.limit_edges = deque()
+        self.limit_edge_times = {}
+        self.drift_last_motion = {}
+        self.limit_edge_seen.connect(self._drain_limit_edges)
+        
+        # Encoders de cuadratura por eje (solo los de ENCODER_EJES); sin encoder, lazo abierto
+        self.encoders = {}
+        
+        # Latencias del paro rápido (aviso -> drivers deshabilitados)
+        self.halt_latency = LatencyStats("Paro de emergencia")
+        
+        # Latencias del jog (pulsar -> PWM, cola GUI -> worker, soltar -> PWM detenido)
+        self.jog_latency = jog_latency_stats()
+        
+        # Watchdog y métricas de vida
+        self.watchdog = None
+        self.link_lost = False      # Enlace con el backend de GPIO caído (pigpiod muerto, microcontrolador desconectado)
+        self.heartbeat_failures = 0
+        self.gui_liveness = Heartbeat("GUI -> worker", WATCHDOG_GUI_LATIDO_MS)
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(WATCHDOG_LATIDO_MS)
+        self.heartbeat_timer.timeout.connect(self._send_heartbeat)
+        
         # Timer de monitoreo (Loop principal del hilo)
         self.poll_timer = QTimer(self)
         self.poll_timer.setInterval(20) # Se ejecuta cada 10ms
         self.poll_timer.timeout.connect(self._poll_status)
+        
+        # Muestreo de la trayectoria enseñada (solo mientras se graba)
+        self.record_timer = QTimer(self)
+        self.record_timer.setInterval(TRAYECTORIA_MUESTREO_MS)
+        self.record_timer.timeout.connect(self._record_sample)
+        
+        # Tiempo real (opcional) y jitter del ciclo de monitoreo
+        self.realtime = RealtimeMode(RT_PRIORIDAD, RT_CPUS) if TIEMPO_REAL else None
+        self.poll_jitter = LoopJitter("Jitter ciclo de monitoreo", self.poll_timer.interval())
 
     def initialize_gpio(self):
         """Inicializa la conexión con pigpio y configura pines."""
+        if self.realtime:
+            # Se ejecuta en el hilo (o proceso) del worker: los ajustes aplican a él
+            self.realtime.enter()
+        
         if not IS_RASPBERRY_PI:
             return
             
@@ -131,12 +416,40 @@ class HardwareController(QObject):
         for pin in input_pins:
             self.pi.set_mode(pin, pigpio.INPUT)
             self.pi.set_pull_up_down(pin, pigpio.PUD_DOWN)
-            self.pi.set_glitch_filter(pin, 1000)
+            self.pi.set_glitch_filter(pin, FILTRO_GLITCH_US)
+        
+        # Verificar que la ruta de paro rápido cumple el presupuesto de latencia
+        worst_us = self._self_test_halt_path()
+        if worst_us > HALT_LATENCIA_MAX_US:
+            msg = f"Latencia de paro {worst_us} us excede {HALT_LATENCIA_MAX_US} us"
+            print(f"[Hardware] ¡ATENCIÓN! {msg}. Motores deshabilitados.")
+            self.is_halted = True
+            self.calibration_finished.emit(False, msg)
+            return
+        
+        # Flancos de los sensores de límite: marcas de referencia para el monitor de deriva
+        self.limit_cbs = [self.pi.callback(pin, pigpio.EITHER_EDGE, self._limit_edge)
+                          for pin in SENSOR_EJE]
+        
+        # Encoders: posición medida y parada en el destino desde el callback
+        self.encoders = {motor: QuadratureEncoder(self.pi, *ENCODER_PINES[motor], ENCODER_CUENTAS_POR_PASO[motor], pigpio)
+                         for motor in ENCODER_EJES}
+        if self.encoders:
+            print(f"[Encoder] Lazo cerrado en: {', '.join(self.encoders)}.")
         
         # Configurar Interrupciones para el Botón de Paro Físico
         self.e_stop_press_cb = self.pi.callback(E_STOP_PIN, pigpio.RISING_EDGE, self._physical_estop_pressed)
         self.e_stop_release_cb = self.pi.callback(E_STOP_PIN, pigpio.FALLING_EDGE, self._physical_estop_released)
         
+        # Watchdog en pigpiod: corta PUL y ENABLE si el worker deja de latir
+        if hasattr(self.pi, 'store_script'):
+            self.watchdog = PigpioWatchdog(self.pi, [LIN_PUL_PIN, ROT_PUL_PIN], [ROT_EN_PIN, LIN_EN_PIN],
+                                           ENABLE_INACTIVO, WATCHDOG_TIMEOUT_MS, beat_ms=WATCHDOG_LATIDO_MS)
+            self.watchdog.start()
+        else:
+            print("[Watchdog] El backend de GPIO no ejecuta scripts: sin watchdog en el daemon.")
+        self.heartbeat_timer.start()
+        
         # Verificación de estado inicial del botón de paro
 
         # Leemos si el botón ya está presionado (1) antes de habilitar nada
@@ -156,6 +469,23 @@ class HardwareController(QObject):
             
         print("[Worker] GPIO Listo (Filtros de ruido activos).")
         self.debug_counter = 0
+        
+        if self.realtime:
+            self.realtime.freeze_heap()
+
+    def read_input(self, gpio):
+        """Nivel de una entrada (0 si no hay hardware)."""
+        if not (IS_RASPBERRY_PI and self.pi):
+            return 0
+        return self.pi.read(gpio)
+
+    @pyqtSlot()
+    def reset_positions(self):
+        """Olvida posiciones y ceros de terapia (se exige recalibrar)."""
+        self.posicion_lineal = 0
+        self.posicion_rotacional = 0
+        self.cero_terapia_lineal = 0
+        self.cero_terapia_rotacional = 0
 
     @pyqtSlot()
     def reset_internal_state(self):
@@ -169,11 +499,127 @@ class HardwareController(QObject):
         self.is_calibrating = False
         self.is_moving_steps = False
         self.is_jogging = False
+        self.is_verifying = False
         self.calibration_step = ""
+        self.homing_pending = set()
+        self.paused_motion = None
+        self.trajectory_queue = None
+        if self.recorder is not None:
+            self.record_timer.stop()
+            self.recorder = None
+        
+    def _stop_polling(self):
+        """Detiene el ciclo de monitoreo y, ya sin movimiento, reanuda el GC."""
+        self.poll_timer.stop()
+        self.poll_jitter.restart()
+        if self.realtime:
+            # Diferido: las banderas de movimiento se actualizan después de detener el timer
+            QTimer.singleShot(0, self._refresh_motion_gc)
+
+    def _refresh_motion_gc(self):
+        self.realtime.set_motion_active(self.poll_timer.isActive())
+
+    def _self_test_halt_path(self):
+        """Mide la escritura de banco del paro (drivers aún deshabilitados). Devuelve el peor caso en µs."""
+        worst_us = 0
+        for _ in range(HALT_AUTOPRUEBA_MUESTRAS):
+            start = self.pi.get_current_tick()
+            self._disable_drivers()
+            worst_us = max(worst_us, pigpio.tickDiff(start, self.pi.get_current_tick()))
+        print(f"[Hardware] Autoprueba de paro: peor caso {worst_us} us.")
+        return worst_us
+
+    def _disable_drivers(self):
+        """Deshabilita ambos drivers con una sola escritura de banco."""
+        if ENABLE_INACTIVO:
+            self.pi.set_bank_1(HALT_EN_MASK)
+        else:
+            self.pi.clear_bank_1(HALT_EN_MASK)
+
+    def fast_halt(self, source="", press_tick=None, press_time=None):
+        """
+        Ruta rápida de paro. Se puede llamar desde cualquier hilo (callback de
+        pigpio o GUI) sin pasar por la cola de eventos del worker.
+        press_tick: tick de pigpio del flanco del botón físico.
+        press_time: time.perf_counter() del evento en pantalla.
+        """
+        self.is_halted = True
+        self.halt_time = time.time()
+        self.halt_perf = time.perf_counter()
+        if not self.pi or self.link_lost:
+            return
+        
+        # 1. Cortar ENABLE de ambos drivers primero (una llamada al daemon)
+        self._disable_drivers()
+        
+        # 2. Medir latencia desde el aviso
+        latency_us = None
+        if press_tick is not None:
+            latency_us = pigpio.tickDiff(press_tick, self.pi.get_current_tick())
+        elif press_time is not None:
+            latency_us = int((time.perf_counter() - press_time) * 1e6)
+        
+        # 3. Detener PWM y ondas (los drivers ya no responden a los pulsos)
+        self.pi.hardware_PWM(LIN_PUL_PIN, 0, 0)
+        self.pi.hardware_PWM(ROT_PUL_PIN, 0, 0)
+        if self.wave_session:
+            self.pi.wave_tx_stop()
+        
+        if latency_us is not None:
+            self.halt_latency.record(latency_us)
+            if latency_us > HALT_LATENCIA_MAX_US:
+                print(f"[Hardware] ¡ATENCIÓN! Paro ({source}) tardó {latency_us} us "
+                      f"(máximo {HALT_LATENCIA_MAX_US} us).")
+            self.halt_latency_measured.emit(source, latency_us)
+
+    @pyqtSlot()
+    def _send_heartbeat(self):
+        """Latido hacia pigpiod y revisión de cortes hechos por el watchdog."""
+        if self.pi and not self.pi.connected:
+            self._on_link_lost("desconectado")
+            return
+        if not self.watchdog or not self.watchdog.active:
+            return
+        try:
+            self.watchdog.beat()
+            tripped = self.watchdog.poll_trips()
+        except Exception as e:
+            self.heartbeat_failures += 1
+            print(f"[Watchdog] Error de comunicación con pigpiod ({self.heartbeat_failures}/{WATCHDOG_FALLOS_ENLACE}): {e}")
+            if self.heartbeat_failures >= WATCHDOG_FALLOS_ENLACE:
+                self._on_link_lost(str(e))
+            return
+        self.heartbeat_failures = 0
         
+        if tripped and not self.is_halted:
+            print("[Watchdog] ¡pigpiod cortó los motores por falta de latidos del worker!")
+            self.fast_halt("watchdog")
+            self.reset_internal_state()
+            self.watchdog_tripped.emit("worker")
+
+    def _on_link_lost(self, reason):
+        """Sin enlace con el backend de GPIO: se detiene todo como con el watchdog y no se le habla más."""
+        if self.link_lost:
+            return
+        print(f"[Hardware] ¡Se perdió la conexión con el backend de GPIO ({reason})! Sistema detenido.")
+        try:
+            self.fast_halt("enlace")
+        except Exception as e:
+            print(f"[Hardware] No se pudieron deshabilitar los drivers: {e}")
+        self.link_lost = True
+        self._stop_polling()
+        self.heartbeat_timer.stop()
+        self.reset_internal_state()
+        self.watchdog_tripped.emit("worker")
+
+    @pyqtSlot()
+    def gui_heartbeat(self):
+        """Latido periódico de la interfaz."""
+        self.gui_liveness.beat()
+
     def _physical_estop_pressed(self, gpio, level, tick):
+        self.fast_halt("fisico", press_tick=tick)
         print("!!! E-STOP ACTIVADO (Físico) !!!")
-        self.trigger_software_halt(True)
         self.physical_estop_activated.emit(True)
 
     def _physical_estop_released(self, gpio, level, tick):
@@ -181,19 +627,142 @@ class HardwareController(QObject):
         self.trigger_software_halt(False)
         self.physical_estop_activated.emit(False)
 
+    def _limit_edge(self, gpio, level, tick):
+        """Callback de pigpio: anota el flanco con el instante en que ocurrió (su tick, no la llegada del aviso)."""
+        try:
+            age_us = pigpio.tickDiff(tick, self.pi.get_current_tick())
+        except Exception:
+            age_us = 0
+        # Con filtro de glitch, pigpiod fecha el flanco 'steady' µs después de producirse
+        edge_time = time.time() - (age_us + FILTRO_GLITCH_US) / 1e6
+        self.limit_edge_times[(gpio, level)] = edge_time
+        self.limit_edges.append((gpio, level, edge_time))
+        self.limit_edge_seen.emit()
+
+    @pyqtSlot()
+    def _drain_limit_edges(self):
+        """Compara cada flanco pendiente con su referencia (en el hilo del worker, con el estado de movimiento al día)."""
+        while self.limit_edges:
+            gpio, level, edge_time = self.limit_edges.popleft()
+            motor = SENSOR_EJE[gpio]
+            pos = self._position_at(motor, edge_time)
+            if pos is None:
+                continue
+            error = self.drift.observe(motor, gpio, level, pos)
+            if error is None:
+                print(f"[Deriva] Referencia {motor}: GPIO {gpio} -> {level} en {int(pos)} pasos.")
+                continue
+            
+            corrected = False
+            if abs(error) > DERIVA_MAX_PASOS[motor]:
+                print(f"[Deriva] ¡ATENCIÓN! {motor}: {error:+d} pasos en el sensor GPIO {gpio}. "
+                      f"Posible pérdida de pasos: se recomienda recalibrar.")
+            elif abs(error) > DERIVA_TOLERANCIA_PASOS[motor]:
+                print(f"[Deriva] {motor}: {error:+d} pasos en el sensor GPIO {gpio}.")
+                if DERIVA_REZERO:
+                    self.drift.axes[motor].pending = -error
+                    corrected = True
+                    self._apply_drift_correction(motor)
+            self.drift_measured.emit(motor, error, corrected)
+
+    def _position_at(self, motor, t):
+        """
+        Posición lógica del eje en el instante t (time.time()): la del movimiento en
+        curso o, si el aviso llegó después del paro, la del último movimiento terminado.
+        None si el eje estaba quieto o no se sigue su posición (calibración,
+        verificación, sesión DMA).
+        """
+        if self.is_calibrating or self.is_verifying or self.wave_session:
+            return None
+        if self.is_jogging and self.jog_motor == motor and t >= self.jog_press_time:
+            pos = self.posicion_lineal if motor == 'lineal' else self.posicion_rotacional
+            return pos + (min(t, self._jog_end_time()) - self.jog_last_update_time) * self.jog_speed * self.jog_direction
+        if self.is_moving_steps:
+            axis = self.combined_axes.get(motor)
+            if axis is not None and axis['running'] and t >= axis['start']:
+                return self._steps_reached(axis['initial'], axis['target'], axis['start'], axis['hz'], at=t,
+                                           accel=axis.get('accel', 0))
+            if not self.combined_axes and self.move_motor == motor and t >= self.move_steps_start_time:
+                return self._steps_reached(self.move_steps_initial_pos, self.move_steps_target_pos,
+                                           self.move_steps_start_time, self.move_steps_speed, at=t,
+                                           accel=self.move_steps_accel)
+        last = self.drift_last_motion.get(motor)
+        if last is not None:
+            start, anchor_time, anchor_pos, velocity = last
+            if start <= t <= anchor_time:
+                return anchor_pos - (anchor_time - t) * velocity
+        return None
+
+    def _record_motion(self, motor, start, anchor_time, anchor_pos, velocity):
+        """Movimiento terminado: permite situar flancos cuyo aviso llega después del paro."""
+        self.drift_last_motion[motor] = (start, anchor_time, anchor_pos, velocity)
+        self._apply_drift_correction(motor)
+
+    def _axis_busy(self, motor):
+        if self.is_calibrating or self.is_verifying or self.wave_session:
+            return True
+        if self.is_jogging and self.jog_motor == motor:
+            return True
+        return self.is_moving_steps and (motor in self.combined_axes
+                                         or (not self.combined_axes and self.move_motor == motor))
+
+    def _apply_drift_correction(self, motor):
+        """Aplica la corrección pendiente si el eje está quieto (si no, al terminar su movimiento)."""
+        if not self.drift.axes[motor].pending or self._axis_busy(motor):
+            return
+        correction = self.drift.take_pending(motor)
+        current = self.posicion_lineal if motor == 'lineal' else self.posicion_rotacional
+        print(f"[Deriva] {motor}: posición corregida {correction:+d} pasos.")
+        self._set_position(motor, current + correction)
+        self._sync_encoder(motor, current + correction)
+
+    def _seed_homing_reference(self, motor):
+        """El sensor de homing se activó antes del paro: su referencia es el sobre-recorrido hasta el nuevo cero."""
+        pin = LIN_LIMIT_OUT_PIN if motor == 'lineal' else ROT_LIMIT_IN_PIN
+        speed = VELOCIDAD_HZ_LINEAL_CALIBRATION if motor == 'lineal' else VELOCIDAD_HZ_ROTACIONAL_CALIBRATION
+        edge_time = self.limit_edge_times.get((pin, SENSORES_NIVEL_ACTIVO))
+        overrun_s = time.time() - edge_time if edge_time else None
+        if overrun_s is None or not 0 <= overrun_s < 1.0:
+            return      # Ya estaba sobre el sensor: la referencia se aprende en el próximo flanco
+        self.drift.seed(motor, pin, SENSORES_NIVEL_ACTIVO, int(overrun_s * speed))
+
+    def _measured(self, motor, estimate):
+        """Posición medida por el encoder del eje; sin encoder, la estimada (lazo abierto)."""
+        encoder = self.encoders.get(motor)
+        return estimate if encoder is None else encoder.steps()
+
+    def _sync_encoder(self, motor, pos):
+        """Nuevo cero o posición corregida: el encoder pasa a medir 'pos'."""
+        encoder = self.encoders.get(motor)
+        if encoder is not None:
+            encoder.set_steps(int(pos))
+
+    def _stalled(self, motor, expected):
+        """True si el encoder se queda a más de ENCODER_ERROR_MAX_PASOS del comando (motor calado o bloqueado)."""
+        encoder = self.encoders.get(motor)
+        if encoder is None:
+            return False
+        error = int(expected) - encoder.steps()
+        if abs(error) <= ENCODER_ERROR_MAX_PASOS[motor]:
+            return False
+        print(f"[Encoder] ¡ATENCIÓN! {motor}: el eje no sigue al comando ({error:+d} pasos). Deteniendo.")
+        self.stall_detected.emit(motor, error)
+        return True
+
+    def _encoder_target_reached(self):
+        """Callback del encoder (hilo de pigpio): corta el PWM del tramo al llegar al destino."""
+        self.pi.hardware_PWM(LIN_PUL_PIN if self.move_motor == 'lineal' else ROT_PUL_PIN, 0, 0)
+        self.move_steps_on_target = True
+
     @pyqtSlot(bool)
     def trigger_software_halt(self, halt_state):
         """Detiene o habilita los motores inmediatamente."""
-        self.is_halted = halt_state
-        if self.is_halted:
-            if self.pi:
-                # Detener PWM y deshabilitar drivers
-                self.pi.hardware_PWM(LIN_PUL_PIN, 0, 0)
-                self.pi.hardware_PWM(ROT_PUL_PIN, 0, 0)
-                self.pi.write(ROT_EN_PIN, ENABLE_INACTIVO)
-                self.pi.write(LIN_EN_PIN, ENABLE_INACTIVO)
+        if halt_state:
+            # Deshabilitar drivers y detener PWM
+            self.fast_halt()
         else:
-            if self.pi:
+            self.is_halted = False
+            if self.pi and not self.link_lost:
                 # Rehabilitar drivers
                 self.pi.write(ROT_EN_PIN, ENABLE_ACTIVO)
                 self.pi.write(LIN_EN_PIN, ENABLE_ACTIVO)
@@ -211,6 +780,16 @@ class HardwareController(QObject):
         if hasattr(self, 'stable_count'):
             self.stable_count = 0
         
+        # Nuevo período del monitor de deriva (el cero cambia)
+        if any(axis.observations for axis in self.drift.axes.values()):
+            print(f"[Deriva] Período anterior: {self.drift.summary()}")
+        self.drift.reset()
+        self.drift_last_motion = {}
+        
+        if CALIBRACION_PARALELA:
+            self._start_parallel_homing()
+            return
+        
         print("[Worker] Calibrando ROTACIONAL...")
         self.progress_updated.emit(10)
         
@@ -236,14 +815,72 @@ class HardwareController(QObject):
         else:
             QTimer.singleShot(2000, self._finish_calibration_step)
 
+    def _start_parallel_homing(self):
+        """
+        Ambos ejes buscan su sensor a la vez (canales PWM y sensores independientes).
+        El ciclo de monitoreo cierra cada eje por separado (_finish_homing_axis).
+        """
+        self.calibration_step = 'parallel'
+        self.homing_pending = {'rotacional', 'lineal'}
+        self.homing_stable = {'rotacional': 0, 'lineal': 0}
+        print("[Worker] Calibrando ROTACIONAL y LINEAL en paralelo...")
+        self.progress_updated.emit(10)
+        
+        if not IS_RASPBERRY_PI:
+            QTimer.singleShot(2000, lambda: self._finish_homing_axis('rotacional'))
+            QTimer.singleShot(2000, lambda: self._finish_homing_axis('lineal'))
+            return
+        
+        # Ejes ya sobre su sensor: listos sin moverse
+        axes = {'rotacional': (ROT_LIMIT_IN_PIN, ROT_DIR_PIN, SENTIDO_HOMING_ROTACIONAL, ROT_PUL_PIN, VELOCIDAD_HZ_ROTACIONAL_CALIBRATION),
+                'lineal': (LIN_LIMIT_OUT_PIN, LIN_DIR_PIN, SENTIDO_HOMING_LINEAL, LIN_PUL_PIN, VELOCIDAD_HZ_LINEAL_CALIBRATION)}
+        for motor, (sensor, dir_pin, homing_dir, _, _) in axes.items():
+            if self.pi.read(sensor) == SENSORES_NIVEL_ACTIVO:
+                print(f"[Worker] Sensor {motor.upper()} ya activo.")
+                self._finish_homing_axis(motor)
+            else:
+                self.pi.write(dir_pin, homing_dir)
+        if not self.is_calibrating:
+            return
+        
+        # Una sola espera de estabilización para ambas direcciones
+        time.sleep(0.1)
+        if self.is_halted:
+            return
+        for motor in self.homing_pending:
+            _, _, _, pul_pin, speed = axes[motor]
+            self.pi.hardware_PWM(pul_pin, speed, 500000)
+        self.poll_timer.start()
+
+    def _finish_homing_axis(self, motor):
+        """Un eje del homing paralelo tocó su sensor: se detiene y fija su cero."""
+        if motor not in self.homing_pending:
+            return
+        self.homing_pending.discard(motor)
+        if IS_RASPBERRY_PI:
+            self.pi.hardware_PWM(ROT_PUL_PIN if motor == 'rotacional' else LIN_PUL_PIN, 0, 0)
+            self._seed_homing_reference(motor)
+        
+        self._set_position(motor, 0)
+        self._sync_encoder(motor, 0)
+        self.progress_updated.emit(100 if not self.homing_pending else 55)
+        self.calibration_axis_homed.emit(motor)
+        
+        if not self.homing_pending:
+            self._stop_polling()
+            self.is_calibrating = False
+            self.calibration_finished.emit(True, "Calibración completada.")
+
     def _finish_calibration_step(self):
         """Maneja la transición entre etapas de calibración."""
         if self.calibration_step == 'rotational':
             # 1. Finalizar Rotacional
             if IS_RASPBERRY_PI: 
                 self.pi.hardware_PWM(ROT_PUL_PIN, 0, 0)
+                self._seed_homing_reference('rotacional')
                 
             self.posicion_rotacional = 0
+            self._sync_encoder('rotacional', 0)
             self.position_updated.emit('rotacional', 0)
             self.progress_updated.emit(50)
             time.sleep(0.5)
@@ -265,11 +902,12 @@ class HardwareController(QObject):
 
         elif self.calibration_step == 'linear':
             # 3. Finalizar Lineal y Despegar
-            self.poll_timer.stop()
+            self._stop_polling()
             self.is_calibrating = False
             
             if IS_RASPBERRY_PI: 
                 self.pi.hardware_PWM(LIN_PUL_PIN, 0, 0)
+                self._seed_homing_reference('lineal')
                 time.sleep(0.2)
                 
                 # Invertir dirección para despegar del sensor
@@ -282,18 +920,86 @@ class HardwareController(QObject):
                 self.pi.hardware_PWM(LIN_PUL_PIN, 0, 0)
 
             self.posicion_lineal = 0
+            self._sync_encoder('lineal', 0)
             self.position_updated.emit('lineal', 0)
             self.progress_updated.emit(100)
             self.calibration_finished.emit(True, "Calibración completada.")
 
     def _stop_calibration_on_fail(self):
-        self.poll_timer.stop()
+        self._stop_polling()
         self.is_calibrating = False
         if IS_RASPBERRY_PI:
             self.pi.hardware_PWM(ROT_PUL_PIN, 0, 0)
             self.pi.hardware_PWM(LIN_PUL_PIN, 0, 0)
         self.calibration_finished.emit(False, "Fallo Calibración")
 
+    @pyqtSlot(str)
+    def verify_position(self, motor_type):
+        """
+        Comprueba la posición que se conservó tras un paro: lleva el eje hasta su
+        sensor de homing a velocidad de calibración y compara los pasos recorridos
+        con los esperados. Si coincide, vuelve a fijar el cero en el sensor.
+        Emite position_verified(motor, ok, error_pasos).
+        """
+        if self.is_halted or self.is_calibrating or self.is_verifying or self.is_moving_steps or self.is_jogging:
+            self.position_verified.emit(motor_type, False, 0)
+            return
+        if not IS_RASPBERRY_PI:
+            self.position_verified.emit(motor_type, True, 0)
+            return
+        
+        if motor_type == 'lineal':
+            pul_pin, dir_pin, sensor_pin = LIN_PUL_PIN, LIN_DIR_PIN, LIN_LIMIT_OUT_PIN
+            homing_dir, speed = SENTIDO_HOMING_LINEAL, VELOCIDAD_HZ_LINEAL_CALIBRATION
+            self.verify_tolerance = RECUPERACION_TOLERANCIA_LINEAL_PASOS
+            self.verify_start_pos = int(self.posicion_lineal)
+        else:
+            pul_pin, dir_pin, sensor_pin = ROT_PUL_PIN, ROT_DIR_PIN, ROT_LIMIT_IN_PIN
+            homing_dir, speed = SENTIDO_HOMING_ROTACIONAL, VELOCIDAD_HZ_ROTACIONAL_CALIBRATION
+            self.verify_tolerance = RECUPERACION_TOLERANCIA_ROTACIONAL_PASOS
+            self.verify_start_pos = int(self.posicion_rotacional)
+        
+        self.verify_motor = motor_type
+        self.verify_speed = speed
+        print(f"[Worker] Verificando posición {motor_type} (estimada {self.verify_start_pos} pasos)...")
+        
+        if self.pi.read(sensor_pin) == SENSORES_NIVEL_ACTIVO:
+            self._finish_verification(0)
+            return
+        
+        self.pi.write(dir_pin, homing_dir)
+        time.sleep(0.1)
+        if self.is_halted:
+            self.position_verified.emit(motor_type, False, 0)
+            return
+        
+        self.is_verifying = True
+        self.verify_start_time = time.time()
+        self.pi.hardware_PWM(pul_pin, speed, 500000)
+        self.poll_timer.start()
+
+    def _finish_verification(self, traveled):
+        """traveled: pasos hasta tocar el sensor, o None si no apareció."""
+        if self.is_verifying:
+            self._stop_polling()
+            self.is_verifying = False
+            pin = LIN_PUL_PIN if self.verify_motor == 'lineal' else ROT_PUL_PIN
+            self.pi.hardware_PWM(pin, 0, 0)
+        
+        motor = self.verify_motor
+        if traveled is None:
+            self.position_verified.emit(motor, False, 0)
+            return
+        
+        # En el sensor la posición calibrada es 0: lo que sobre o falte es el error
+        error = self.verify_start_pos - traveled
+        ok = abs(error) <= self.verify_tolerance
+        print(f"[Worker] Verificación {motor}: error {error} pasos ({'OK' if ok else 'fuera de tolerancia'}).")
+        if ok:
+            self._set_position(motor, 0)
+            self._sync_encoder(motor, 0)
+        self.position_verified.emit(motor, ok, int(error))
+
     @pyqtSlot(str, int, int)
     def move_steps(self, motor_type, steps, speed_hz=None):
         """Configura un movimiento finito de pasos (Usado en Terapia)."""
@@ -322,10 +1028,22 @@ class HardwareController(QObject):
             self.move_steps_target_pos = self.posicion_rotacional + steps
 
         self.move_steps_direction = steps 
+        self.move_steps_speed = effective_speed
         
         print(f"[Worker] Moviendo {motor_type} {steps} pasos a {int(effective_speed)} Hz.")
         
-        if IS_RASPBERRY_PI:
+        self.move_steps_accel = 0
+        if IS_RASPBERRY_PI and TRAMOS_MCU:
+            # El microcontrolador pone DIR, espera su asentamiento y da los pasos exactos con rampa
+            self.is_moving_steps = True
+            self.move_steps_accel = effective_speed / MCU_RAMPA_S
+            self.move_segment = self.pi.segment(pul_pin, hw_direction, abs_steps, effective_speed,
+                                                self.move_steps_accel)
+            self.move_steps_start_time = time.time() + mcu_protocol.DIR_SETUP_US / 1e6
+            self.move_steps_end_time = self.move_steps_start_time + mcu_protocol.segment_duration(
+                abs_steps, effective_speed, self.move_steps_accel)
+            self.poll_timer.start()
+        elif IS_RASPBERRY_PI:
             self.is_moving_steps = True
             duration = abs_steps / effective_speed
             self.move_steps_end_time = time.time() + duration
@@ -333,6 +1051,19 @@ class HardwareController(QObject):
             self.pi.write(dir_pin, hw_direction)
             time.sleep(0.05)
             
+            # Un paro rápido pudo llegar durante la espera
+            if self.is_halted:
+                self.is_moving_steps = False
+                self.movement_finished.emit(False)
+                return
+            
+            self.move_steps_start_time = time.time()
+            self.move_steps_end_time = self.move_steps_start_time + duration
+            encoder = self.encoders.get(motor_type)
+            if encoder is not None:
+                # Lazo cerrado: el callback del encoder corta el PWM en el destino
+                self.move_steps_on_target = False
+                encoder.arm(self.move_steps_target_pos, steps, self._encoder_target_reached)
             self.pi.hardware_PWM(pul_pin, int(effective_speed), 500000)
             self.poll_timer.start()
         else:
@@ -346,19 +1077,233 @@ class HardwareController(QObject):
             self.position_updated.emit(motor_type, int(self.move_steps_target_pos))
             self.movement_finished.emit(True)
 
+    @pyqtSlot(str, int)
+    def move_to_position(self, motor_type, target_steps):
+        """
+        Movimiento absoluto exacto a 'target_steps' (entrada numérica de límites).
+        A diferencia de la terapia, lo detiene el sensor del sentido de avance.
+        """
+        if self.is_halted or self.is_moving_steps:
+            # La GUI espera el fin del movimiento para desbloquear la página de ejercicio
+            self.movement_finished.emit(False)
+            return
+        # La estimación del jog puede tener fracción de paso: se redondea para llegar exacto
+        if motor_type == 'lineal':
+            self.posicion_lineal = current = int(round(self.posicion_lineal))
+            speed = VELOCIDAD_HZ_LINEAL_JOG
+        else:
+            self.posicion_rotacional = current = int(round(self.posicion_rotacional))
+            speed = VELOCIDAD_HZ_ROTACIONAL_JOG
+        self.move_steps_guarded = True
+        self.move_steps(motor_type, target_steps - current, speed)
+        if not self.is_moving_steps:
+            self.move_steps_guarded = False
+
+    @pyqtSlot(str, int, bool)
+    def jog_nudge(self, motor_type, direction_sign, enforce_soft_limits=True):
+        """Modo paso fino: un toque mueve exactamente JOG_TOQUE_PASOS (sin pasar los límites suaves)."""
+        if self.is_halted or self.is_jogging or self.is_moving_steps:
+            return
+        if motor_type == 'lineal':
+            current, zero = self.posicion_lineal, self.cero_terapia_lineal
+        else:
+            current, zero = self.posicion_rotacional, self.cero_terapia_rotacional
+        target = int(round(current)) + JOG_TOQUE_PASOS[motor_type] * direction_sign
+        if enforce_soft_limits:
+            target = max(target, int(zero))
+            if motor_type == 'rotacional':
+                target = min(target, int(zero) + MAX_ABD_PASOS)
+        self.move_to_position(motor_type, target)
+
+    @pyqtSlot(int, int)
+    def move_steps_combined(self, lin_steps, rot_steps):
+        """
+        Movimiento interpolado: ambos ejes arrancan juntos y llegan a la vez
+        (cada uno a la frecuencia que le asigna joint_path.plan_segment).
+        """
+        if self.is_halted or self.is_moving_steps:
+            return
+        
+        plan = plan_segment({'lineal': lin_steps, 'rotacional': rot_steps},
+                            {'lineal': VELOCIDAD_HZ_LINEAL_TERAPIA,
+                             'rotacional': VELOCIDAD_HZ_ROTACIONAL_TERAPIA})
+        if not plan:
+            self.movement_finished.emit(True)
+            return
+        
+        steps = {'lineal': lin_steps, 'rotacional': rot_steps}
+        print(f"[Worker] Movimiento combinado {steps} a " + ", ".join(f"{m} {hz} Hz" for m, (hz, _) in plan.items()) + ".")
+        
+        if not IS_RASPBERRY_PI:
+            # Simulación
+            time.sleep(max(duration for _, duration in plan.values()))
+            for motor in plan:
+                current = self.posicion_lineal if motor == 'lineal' else self.posicion_rotacional
+                self._set_position(motor, current + steps[motor])
+            self.movement_finished.emit(True)
+            return
+        
+        if not self._start_combined_move(plan, steps):
+            self.movement_finished.emit(False)
+
+    def _start_combined_move(self, plan, steps):
+        """Arranca el plan de plan_segment en ambos ejes. False si el paro llegó antes."""
+        self.is_moving_steps = True
+        self.move_motor = 'combinado'
+        if TRAMOS_MCU:
+            return self._start_combined_segments(plan, steps)
+        
+        # Direcciones primero (una sola espera de asentamiento, y solo si alguna cambió)
+        changed = False
+        for motor in plan:
+            if motor == 'lineal':
+                dir_pin, level = LIN_DIR_PIN, 0 if steps[motor] > 0 else 1
+            else:
+                dir_pin, level = ROT_DIR_PIN, 1 if steps[motor] > 0 else 0
+            if self.pi.read(dir_pin) != level:
+                self.pi.write(dir_pin, level)
+                changed = True
+        if changed:
+            time.sleep(0.05)
+        
+        if self.is_halted:
+            self.is_moving_steps = False
+            return False
+        
+        self.combined_axes = {}
+        for motor, (hz, duration) in plan.items():
+            pin = LIN_PUL_PIN if motor == 'lineal' else ROT_PUL_PIN
+            current = self.posicion_lineal if motor == 'lineal' else self.posicion_rotacional
+            self.pi.hardware_PWM(pin, hz, 500000)
+            start = time.time()
+            self.combined_axes[motor] = {'pin': pin, 'initial': int(current), 'target': int(current) + steps[motor],
+                                         'start': start, 'end': start + duration, 'hz': hz, 'running': True}
+        self.poll_timer.start()
+        return True
+
+    def _start_combined_segments(self, plan, steps):
+        """Movimiento combinado en el microcontrolador: un tramo retenido por eje y un solo START."""
+        # En la reproducción de trayectorias cada tramo dura lo grabado: sin rampas
+        ramp_s = 0 if self.trajectory_queue is not None else MCU_RAMPA_S
+        self.combined_axes = {}
+        for motor, (hz, _) in plan.items():
+            if motor == 'lineal':
+                pin, level, current = LIN_PUL_PIN, 0 if steps[motor] > 0 else 1, self.posicion_lineal
+            else:
+                pin, level, current = ROT_PUL_PIN, 1 if steps[motor] > 0 else 0, self.posicion_rotacional
+            accel = hz / ramp_s if ramp_s else 0
+            segment = self.pi.segment(pin, level, abs(steps[motor]), hz, accel, hold=True)
+            self.combined_axes[motor] = {'pin': pin, 'initial': int(current), 'target': int(current) + steps[motor],
+                                         'hz': hz, 'accel': accel, 'segment': segment, 'running': True}
+        self.pi.start_held([axis['pin'] for axis in self.combined_axes.values()])
+        start = time.time() + mcu_protocol.DIR_SETUP_US / 1e6
+        for axis in self.combined_axes.values():
+            axis['start'] = start
+            axis['end'] = start + mcu_protocol.segment_duration(abs(axis['target'] - axis['initial']),
+                                                                axis['hz'], axis['accel'])
+        self.poll_timer.start()
+        return True
+
+    def _poll_combined_move(self):
+        """Detiene cada eje del movimiento combinado al cumplir su duración (o con el DONE de su tramo)."""
+        now = time.time()
+        for motor, axis in self.combined_axes.items():
+            segment = axis.get('segment')
+            finished = self.pi.segment_done(segment) if segment else now >= axis['end']
+            if axis['running'] and finished:
+                self.pi.hardware_PWM(axis['pin'], 0, 0)
+                axis['running'] = False
+                if segment:
+                    axis['target'] = self._segment_reached(axis['initial'], axis['target'], segment)
+                elif self.trajectory_queue is not None:
+                    # En la reproducción cuenta lo que de verdad se dio (el ciclo de 20 ms
+                    # puede pasarse): el tramo siguiente parte de ahí y corrige la deriva
+                    axis['target'] = self._steps_reached(axis['initial'], axis['target'], axis['start'],
+                                                         axis['hz'], clamp=False)
+                self._set_position(motor, self._measured(motor, axis['target']))
+                self._record_combined_axis(motor, axis)
+            elif axis['running']:
+                expected = self._steps_reached(axis['initial'], axis['target'], axis['start'], axis['hz'],
+                                               accel=axis.get('accel', 0))
+                if self._stalled(motor, expected):
+                    if self.trajectory_queue is not None:
+                        self._stop_trajectory(True)
+                    else:
+                        self._stop_combined_move(True)
+                    return
+                self._set_position(motor, self._measured(motor, expected))
+        
+        if not any(axis['running'] for axis in self.combined_axes.values()):
+            if self.trajectory_queue is not None:
+                self._stop_combined_move(False, notify=False)
+                self._advance_trajectory()
+            else:
+                self._stop_combined_move(False)
+
+    def _stop_combined_move(self, interrupted, notify=True):
+        """Corta los ejes que sigan en marcha y deja la posición realmente alcanzada."""
+        self._stop_polling()
+        self.is_moving_steps = False
+        reached = {}
+        for motor, axis in self.combined_axes.items():
+            was_running = axis['running']
+            if axis['running']:
+                self.pi.hardware_PWM(axis['pin'], 0, 0)
+                axis['running'] = False
+                if 'segment' in axis:
+                    reached[motor] = self._segment_reached(axis['initial'], axis['target'], axis['segment'])
+                else:
+                    reached[motor] = self._steps_reached(axis['initial'], axis['target'], axis['start'], axis['hz'])
+            else:
+                reached[motor] = axis['target']
+            reached[motor] = self._measured(motor, reached[motor])
+            self._set_position(motor, reached[motor])
+            if was_running:
+                self._record_combined_axis(motor, dict(axis, target=reached[motor]))
+        self.combined_axes = {}
+        for motor in reached:
+            self._apply_drift_correction(motor)
+        if notify:
+            self.movement_finished.emit(not interrupted)
+        return reached
+
+    def _motion_end(self, end_time):
+        """Instante en que el movimiento dejó de avanzar: su fin previsto, el paro o ahora."""
+        end = min(time.time(), end_time)
+        return min(end, self.halt_time) if self.is_halted else end
+
+    def _record_combined_axis(self, motor, axis):
+        sign = 1 if axis['target'] > axis['initial'] else -1
+        self.drift_last_motion[motor] = (axis['start'], self._motion_end(axis['end']), axis['target'], axis['hz'] * sign)
+
+    @pyqtSlot()
+    @pyqtSlot(bool)
     def stop_move_steps(self, interrupted=False):
         if not self.is_moving_steps:
             return
+        if self.combined_axes:
+            self._stop_combined_move(interrupted)
+            return
             
-        self.poll_timer.stop()
+        self._stop_polling()
         self.is_moving_steps = False
+        self.move_steps_guarded = False
         
         pin = LIN_PUL_PIN if self.move_motor == 'lineal' else ROT_PUL_PIN
         if IS_RASPBERRY_PI:
             self.pi.hardware_PWM(pin, 0, 0)
+        if self.move_motor in self.encoders:
+            self.encoders[self.move_motor].disarm()
         
-        # Actualizar posición final
+        # Actualizar posición final (si se cortó antes de tiempo, lo realmente recorrido)
         final_pos = self.move_steps_target_pos
+        if self.move_segment is not None:
+            final_pos = self._segment_reached(self.move_steps_initial_pos, self.move_steps_target_pos,
+                                              self.move_segment)
+            self.move_segment = None
+        elif interrupted or time.time() < self.move_steps_end_time:
+            final_pos = self._move_steps_reached()
+        final_pos = self._measured(self.move_motor, final_pos)
         
         if self.move_motor == 'lineal':
             self.posicion_lineal = int(final_pos)
@@ -366,60 +1311,505 @@ class HardwareController(QObject):
             self.posicion_rotacional = int(final_pos)
             
         self.position_updated.emit(self.move_motor, int(final_pos))
+        self._record_motion(self.move_motor, self.move_steps_start_time, self._motion_end(self.move_steps_end_time),
+                            final_pos, self.move_steps_speed * (1 if self.move_steps_direction > 0 else -1))
         self.movement_finished.emit(not interrupted) 
 
-    @pyqtSlot(str, int, bool)
-    def start_continuous_jog(self, motor_type, direction_sign, enforce_soft_limits=True):
-        """Inicia movimiento continuo manual (Jogging)."""
-        if self.is_halted or self.is_jogging:
+    @pyqtSlot()
+    def start_trajectory_recording(self):
+        """Empieza a muestrear ambos ejes mientras el fisioterapeuta mueve con el jog."""
+        if self.is_halted or self.recorder is not None:
+            return
+        self.recorder = TrajectoryRecorder()
+        self._record_sample()
+        self.record_timer.start()
+        print("[Worker] Grabando trayectoria...")
+
+    @pyqtSlot()
+    def stop_trajectory_recording(self):
+        """Cierra la grabación, la comprime (RDP) y la deja lista para reproducir."""
+        if self.recorder is None:
+            return
+        self.record_timer.stop()
+        self._record_sample()
+        recorder, self.recorder = self.recorder, None
+        
+        trajectory = recorder.finish((TRAYECTORIA_TOLERANCIA_LINEAL_PASOS, TRAYECTORIA_TOLERANCIA_ROTACIONAL_PASOS))
+        if len({wp[1:] for wp in trajectory.waypoints}) < 2:
+            print("[Worker] Trayectoria descartada: no hubo movimiento.")
+            self.taught_trajectory = None
+            self.trajectory_recorded.emit(trajectory.samples, 0, 0)
+            return
+        
+        self.taught_trajectory = trajectory
+        print(f"[Worker] Trayectoria grabada: {trajectory.samples} muestras -> "
+              f"{len(trajectory.waypoints)} waypoints, {trajectory.duration_s:.1f} s.")
+        self.trajectory_recorded.emit(trajectory.samples, len(trajectory.waypoints),
+                                      int(trajectory.duration_s * 1000))
+
+    def _record_sample(self):
+        if self.recorder is None:
+            return
+        self.recorder.add(time.perf_counter(), self._live_position('lineal'), self._live_position('rotacional'))
+
+    def _live_position(self, motor):
+        """Posición actual del eje, incluido lo avanzado por el jog desde el último ciclo de monitoreo."""
+        pos = self.posicion_lineal if motor == 'lineal' else self.posicion_rotacional
+        if self.is_jogging and self.jog_motor == motor:
+            pos += max(0.0, time.time() - self.jog_last_update_time) * self.jog_speed * self.jog_direction
+        return int(pos)
+
+    @pyqtSlot(int, int)
+    def run_trajectory(self, reps, speed_pct):
+        """
+        Reproduce la trayectoria enseñada 'reps' veces al 'speed_pct' % de la
+        velocidad grabada. Cada repetición arranca con un acercamiento al primer
+        waypoint a velocidad de terapia; el avance se informa con session_progress
+        y el final con session_finished, igual que la sesión DMA.
+        """
+        if (self.is_halted or self.is_moving_steps or self.wave_session or not IS_RASPBERRY_PI
+                or self.taught_trajectory is None or reps < 1):
+            self.session_finished.emit(False)
+            return
+        
+        speed = max(0.1, speed_pct / 100.0)
+        segments = self.taught_trajectory.segments(speed)
+        _, lin0, rot0 = self.taught_trajectory.waypoints[0]
+        queue = []
+        for rep in range(1, reps + 1):
+            queue.append(('move', 0.0, lin0, rot0))
+            queue.extend(('move', duration, lin, rot) for duration, lin, rot in segments)
+            queue.append(('rep', rep))
+        
+        self.paused_motion = None
+        self.session_reps_done = 0
+        self.trajectory_queue = queue
+        print(f"[Worker] Reproduciendo trayectoria: {reps} repeticiones al {speed_pct}%.")
+        self._advance_trajectory()
+
+    def _advance_trajectory(self):
+        """Lanza el siguiente tramo de la cola (o espera, si el tramo no mueve ningún eje)."""
+        self.trajectory_wait_until = 0
+        while self.trajectory_queue:
+            item = self.trajectory_queue.pop(0)
+            if item[0] == 'rep':
+                self.session_reps_done = item[1]
+                self.session_progress.emit(item[1])
+                continue
+            
+            _, duration, lin, rot = item
+            steps = {'lineal': lin - int(self.posicion_lineal), 'rotacional': rot - int(self.posicion_rotacional)}
+            plan = plan_segment(steps, {'lineal': VELOCIDAD_HZ_LINEAL_TERAPIA,
+                                        'rotacional': VELOCIDAD_HZ_ROTACIONAL_TERAPIA},
+                                min_duration_s=duration)
+            if plan:
+                if not self._start_combined_move(plan, steps):
+                    self._stop_trajectory(True)
+                return
+            if duration > 0:
+                # Pausa grabada: la cuenta el ciclo de monitoreo
+                self.trajectory_wait_until = time.time() + duration
+                self.poll_timer.start()
+                return
+        
+        self.trajectory_queue = None
+        self._stop_polling()
+        print("[Worker] Trayectoria completada.")
+        self.session_finished.emit(True)
+
+    def _stop_trajectory(self, interrupted):
+        if self.trajectory_queue is None:
+            return
+        self.trajectory_queue = None
+        if self.combined_axes and self.is_moving_steps:
+            self._stop_combined_move(interrupted, notify=False)
+        else:
+            self._stop_polling()
+        self.session_finished.emit(not interrupted)
+
+    @pyqtSlot(str, int, int, int)
+    def run_therapy_session(self, motor_type, first_target, second_target, reps):
+        """
+        Ejecuta una sesión completa (reps x [first, pausa, second, pausa], regreso
+        al cero) como una sola cadena de ondas DMA. El worker solo sigue el avance.
+        """
+        if self.is_halted or self.wave_session or self.is_moving_steps or not IS_RASPBERRY_PI:
+            # La GUI ya está en DMA_SESSION esperando el final
+            self.session_finished.emit(False)
+            return
+        
+        home = self.cero_terapia_lineal if motor_type == 'lineal' else self.cero_terapia_rotacional
+        self.paused_motion = None
+        self._start_wave_program(motor_type, int(first_target), int(second_target), int(home), reps)
+
+    def _start_wave_program(self, motor_type, first_target, second_target, home, reps,
+                            first_leg=True, rep_offset=0):
+        """Compila y lanza la cadena desde la posición actual (también al reanudar)."""
+        if motor_type == 'lineal':
+            pul_pin, dir_pin, dir_positive = LIN_PUL_PIN, LIN_DIR_PIN, 0
+            speed = VELOCIDAD_HZ_LINEAL_TERAPIA
+            start = self.posicion_lineal
+        else:
+            pul_pin, dir_pin, dir_positive = ROT_PUL_PIN, ROT_DIR_PIN, 1
+            speed = VELOCIDAD_HZ_ROTACIONAL_TERAPIA
+            start = self.posicion_rotacional
+        
+        try:
+            program = compile_session(pul_pin, dir_pin, dir_positive, speed, int(start),
+                                      first_target, second_target, home, reps,
+                                      TERAPIA_PAUSA_EXTREMO_MS, TERAPIA_PAUSA_FINAL_MS, first_leg)
+            # Con el microcontrolador, el mismo programa va como tramos (gpio_mcu.SegmentSession)
+            session = (pigpio.SegmentSession if TRAMOS_MCU else WaveSession)(self.pi, program, pigpio)
+            session.start()
+        except Exception as e:
+            print(f"[Worker] No se pudo iniciar la sesión DMA: {e}")
+            self.session_finished.emit(False)
+            return
+        
+        self.wave_session = session
+        self.session_motor = motor_type
+        self.session_plan = (first_target, second_target, home, reps)
+        self.session_rep_offset = rep_offset
+        self.session_start_time = time.perf_counter()
+        self.session_reps_done = 0
+        print(f"[Worker] Sesión DMA {motor_type}: {reps} repeticiones, {program.total_us / 1e6:.1f} s.")
+        self.poll_timer.start()
+
+    def stop_wave_session(self, interrupted=False):
+        if not self.wave_session:
+            return
+        
+        self._stop_polling()
+        session, self.wave_session = self.wave_session, None
+        if IS_RASPBERRY_PI:
+            session.stop()
+        
+        # Posición final según el tiempo transcurrido en la cadena (hasta el paro)
+        end = min(time.perf_counter(), self.halt_perf) if self.is_halted else time.perf_counter()
+        elapsed_us = int((end - self.session_start_time) * 1e6)
+        final_pos, _ = session.program.state_at(elapsed_us)
+        if hasattr(session, 'position'):
+            final_pos = session.position()      # Pasos contados por el microcontrolador
+        if not interrupted:
+            final_pos = session.program.final_position
+        final_pos = self._measured(self.session_motor, final_pos)
+        
+        if self.session_motor == 'lineal':
+            self.posicion_lineal = int(final_pos)
+        else:
+            self.posicion_rotacional = int(final_pos)
+        
+        self.position_updated.emit(self.session_motor, int(final_pos))
+        self.session_finished.emit(not interrupted)
+
+    @pyqtSlot()
+    def abort_wave_session(self):
+        """Cancela la sesión en curso y descarta cualquier movimiento pausado."""
+        self.paused_motion = None
+        self.stop_wave_session(interrupted=True)
+        self._stop_trajectory(True)
+
+    @pyqtSlot()
+    def pause_motion(self):
+        """
+        Congela el movimiento de terapia donde esté y guarda lo que falta:
+        los pasos restantes del tramo o el resto de la sesión DMA (fase y
+        repeticiones). Emite motion_paused(True) si hay algo que reanudar.
+        """
+        if self.wave_session:
+            # stop_wave_session emitiría session_finished: se detiene a mano
+            self._stop_polling()
+            session, self.wave_session = self.wave_session, None
+            session.stop()
+            
+            program = session.program
+            elapsed_us = int((time.perf_counter() - self.session_start_time) * 1e6)
+            phase = program.phase_at(elapsed_us)
+            pos, reps_done = program.state_at(elapsed_us)
+            if hasattr(session, 'position'):
+                pos = session.position()
+            motor = self.session_motor
+            pos = self._measured(motor, pos)
+            self._set_position(motor, pos)
+            if phase == 'done':
+                # La cadena ya había terminado: cuenta como sesión completa
+                self.motion_paused.emit(False)
+                self.session_finished.emit(True)
+                return
+            
+            first, second, home, reps = self.session_plan
+            offset = self.session_rep_offset + reps_done
+            reps_left = 0 if phase == 'final' else reps - reps_done
+            self.paused_motion = ('session', motor, first, second, home, reps_left,
+                                  phase == 'first', offset)
+            print(f"[Worker] Sesión DMA pausada en fase '{phase}' ({offset} repeticiones hechas, posición {pos}).")
+            self.motion_paused.emit(True)
+        
+        elif self.trajectory_queue is not None:
+            queue, self.trajectory_queue = self.trajectory_queue, None
+            if self.combined_axes and self.is_moving_steps:
+                # El tramo cortado se retoma hacia el mismo destino en el tiempo que le quedaba
+                left_s = max(axis['end'] for axis in self.combined_axes.values()) - time.time()
+                targets = {motor: axis['target'] for motor, axis in self.combined_axes.items()}
+                self._stop_combined_move(True, notify=False)
+                queue.insert(0, ('move', max(0.0, left_s), targets.get('lineal', int(self.posicion_lineal)),
+                                 targets.get('rotacional', int(self.posicion_rotacional))))
+            else:
+                self._stop_polling()
+                queue.insert(0, ('move', max(0.0, self.trajectory_wait_until - time.time()),
+                                 int(self.posicion_lineal), int(self.posicion_rotacional)))
+            self.paused_motion = ('trajectory', queue)
+            print(f"[Worker] Trayectoria pausada ({self.session_reps_done} repeticiones hechas).")
+            self.motion_paused.emit(True)
+        
+        elif self.is_moving_steps and self.combined_axes:
+            targets = {motor: axis['target'] for motor, axis in self.combined_axes.items()}
+            # Sin movement_finished: la máquina de estados no debe avanzar
+            reached = self._stop_combined_move(True, notify=False)
+            remaining = {motor: targets[motor] - reached[motor] for motor in targets}
+            self.paused_motion = ('combined', remaining.get('lineal', 0), remaining.get('rotacional', 0))
+            print(f"[Worker] Movimiento combinado pausado, faltan {remaining}.")
+            self.motion_paused.emit(any(remaining.values()))
+        
+        elif self.is_moving_steps:
+            self._stop_polling()
+            self.is_moving_steps = False
+            pin = LIN_PUL_PIN if self.move_motor == 'lineal' else ROT_PUL_PIN
+            self.pi.hardware_PWM(pin, 0, 0)
+            if self.move_motor in self.encoders:
+                self.encoders[self.move_motor].disarm()
+            
+            if self.move_segment is not None:
+                reached = self._segment_reached(self.move_steps_initial_pos, self.move_steps_target_pos,
+                                                self.move_segment)
+                self.move_segment = None
+            else:
+                reached = self._move_steps_reached()
+            pos = self._measured(self.move_motor, reached)
+            self._set_position(self.move_motor, pos)
+            
+            remaining = self.move_steps_target_pos - pos
+            self.paused_motion = ('steps', self.move_motor, remaining, self.move_steps_speed)
+            print(f"[Worker] Movimiento pausado en {pos}, faltan {remaining} pasos.")
+            self.motion_paused.emit(remaining != 0)
+        
+        else:
+            self.motion_paused.emit(False)
+
+    @pyqtSlot()
+    def resume_motion(self):
+        """Reanuda exactamente lo que pause_motion dejó pendiente."""
+        paused, self.paused_motion = self.paused_motion, None
+        if paused is None or self.is_halted:
+            return
+        
+        if paused[0] == 'steps':
+            _, motor, remaining, speed = paused
+            self.move_steps(motor, remaining, int(speed))
+        elif paused[0] == 'combined':
+            _, lin_remaining, rot_remaining = paused
+            self.move_steps_combined(lin_remaining, rot_remaining)
+        elif paused[0] == 'trajectory':
+            self.trajectory_queue = paused[1]
+            self._advance_trajectory()
+        else:
+            _, motor, first, second, home, reps_left, first_leg, offset = paused
+            self._start_wave_program(motor, first, second, home, reps_left, first_leg, offset)
+
+    def _move_steps_reached(self):
+        """Posición alcanzada por el tramo en curso según el tiempo con PWM activo (hasta el paro)."""
+        return self._steps_reached(self.move_steps_initial_pos, self.move_steps_target_pos,
+                                   self.move_steps_start_time, self.move_steps_speed, accel=self.move_steps_accel)
+
+    def _segment_reached(self, initial, target, segment):
+        """Posición exacta tras un tramo del microcontrolador (espera su DONE si se acaba de cortar)."""
+        sign = 1 if target > initial else -1
+        return int(initial + sign * self.pi.wait_segment(segment))
+
+    def _steps_reached(self, initial, target, start_time, speed_hz, clamp=True, at=None, accel=0):
+        end = time.time() if at is None else at
+        if self.is_halted:
+            end = min(end, self.halt_time)
+        total = abs(target - initial)
+        if accel:
+            # Tramo con rampas del microcontrolador: mismo perfil trapezoidal que el firmware
+            done = mcu_protocol.steps_at(total, speed_hz, accel, end - start_time)
+        else:
+            done = max(0, int((end - start_time) * speed_hz))
+        if clamp:
+            done = min(total, done)
+        sign = 1 if target > initial else -1
+        return int(initial + sign * done)
+
+    def _set_position(self, motor_type, pos):
+        if motor_type == 'lineal':
+            self.posicion_lineal = int(pos)
+        else:
+            self.posicion_rotacional = int(pos)
+        self.position_updated.emit(motor_type, int(pos))
+
+    def _poll_wave_session(self):
+        """Seguimiento de la sesión DMA: solo aritmética, sin llamadas a pigpiod hasta el final."""
+        program = self.wave_session.program
+        elapsed_us = int((time.perf_counter() - self.session_start_time) * 1e6)
+        pos, reps_done = program.state_at(elapsed_us)
+        if self._stalled(self.session_motor, pos):
+            self.stop_wave_session(True)
+            return
+        pos = self._measured(self.session_motor, pos)
+        
+        if self.session_motor == 'lineal': self.posicion_lineal = pos
+        else: self.posicion_rotacional = pos
+        self.position_updated.emit(self.session_motor, int(pos))
+        
+        if reps_done != self.session_reps_done:
+            self.session_reps_done = reps_done
+            self.session_progress.emit(self.session_rep_offset + reps_done)
+        
+        if elapsed_us >= program.total_us and not self.wave_session.busy():
+            self.stop_wave_session(False)
+
+    @pyqtSlot(str, int, bool, float)
+    def start_continuous_jog(self, motor_type, direction_sign, enforce_soft_limits=True, press_time=0.0):
+        """
+        Inicia movimiento continuo manual (Jogging).
+        press_time: time.perf_counter() del botón pulsado (0 = sin medir).
+        """
+        if press_time:
+            self._record_jog_latency("despacho", press_time)
+        if self.is_halted or self.is_jogging or self._jog_released_since(press_time):
             return
             
         self.is_jogging = True
         self.jog_motor = motor_type
         self.jog_direction = direction_sign
         self.jog_enforce_soft_limits = enforce_soft_limits 
+        self.jog_stop_time = None
         
         if motor_type == 'lineal':
             pul_pin = LIN_PUL_PIN
             dir_pin = LIN_DIR_PIN
-            speed = VELOCIDAD_HZ_LINEAL_JOG
             hw_dir = 0 if direction_sign > 0 else 1
         else:
             pul_pin = ROT_PUL_PIN
             dir_pin = ROT_DIR_PIN
-            speed = VELOCIDAD_HZ_ROTACIONAL_JOG
             hw_dir = 1 if direction_sign > 0 else 0
+        self.jog_press_time = time.time()
+        self.jog_speed = self._jog_target_hz()
             
         if IS_RASPBERRY_PI:
-            self.pi.write(dir_pin, hw_dir)
-            time.sleep(0.05) 
-            self.pi.hardware_PWM(pul_pin, int(speed), 500000)
-            self.jog_last_update_time = time.time()
+            if self.pi.read(dir_pin) != hw_dir:
+                self.pi.write(dir_pin, hw_dir)
+                time.sleep(DIR_ASENTAMIENTO_JOG_S)
+            # Bajo el mismo cerrojo que fast_stop_jog: un soltar concurrente o se ve
+            # aquí o llega después del arranque y corta el PWM
+            with self.jog_pwm_lock:
+                if self.is_halted or self._jog_released_since(press_time):
+                    # Soltado (ruta rápida) antes de arrancar: no hay movimiento que contar
+                    self.is_jogging = False
+                    return
+                self.pi.hardware_PWM(pul_pin, self.jog_speed, 500000)
+                self.jog_last_update_time = time.time()
+            if press_time:
+                self._record_jog_latency("pulsar", press_time)
             self.poll_timer.start()
 
+    def fast_stop_jog(self, release_time=0.0):
+        """
+        Ruta rápida al soltar el jog. Se llama desde el hilo de la GUI (como
+        fast_halt): corta el PWM sin esperar la cola del worker. La cuenta de
+        pasos la cierra después stop_continuous_jog, hasta este instante.
+        """
+        self.jog_release_perf = release_time or time.perf_counter()
+        if not self.is_jogging or not self.pi:
+            return
+        pin = LIN_PUL_PIN if self.jog_motor == 'lineal' else ROT_PUL_PIN
+        with self.jog_pwm_lock:
+            self.pi.hardware_PWM(pin, 0, 0)
+            self.jog_stop_time = time.time()
+        latency_us = self._record_jog_latency("soltar", self.jog_release_perf)
+        if latency_us > JOG_SOLTAR_MAX_US:
+            print(f"[Hardware] ¡ATENCIÓN! Soltar jog tardó {latency_us} us (objetivo {JOG_SOLTAR_MAX_US} us).")
+
+    def _jog_limit_distance(self):
+        """Pasos hasta el límite conocido en el sentido del jog (cero de terapia o MAX_GRADOS_ABD)."""
+        if not self.jog_enforce_soft_limits:
+            return None
+        if self.jog_motor == 'lineal':
+            curr, zero = self.posicion_lineal, self.cero_terapia_lineal
+        else:
+            curr, zero = self.posicion_rotacional, self.cero_terapia_rotacional
+        if self.jog_direction < 0:
+            return curr - zero
+        if self.jog_motor == 'rotacional':
+            return zero + MAX_ABD_PASOS - curr
+        return None
+
+    def _jog_target_hz(self):
+        profile = JOG_PERFILES[self.jog_motor]
+        return profile.hz(time.time() - self.jog_press_time, self._jog_limit_distance())
+
+    def _update_jog_speed(self):
+        """Reprograma el PWM si la rampa o la zona de aproximación cambian la frecuencia."""
+        hz = self._jog_target_hz()
+        if hz == self.jog_speed or not IS_RASPBERRY_PI:
+            return
+        pin = LIN_PUL_PIN if self.jog_motor == 'lineal' else ROT_PUL_PIN
+        with self.jog_pwm_lock:
+            if self.jog_stop_time is None and not self.is_halted:
+                # Hasta que pigpiod aplica el cambio (al volver la llamada, como al arrancar)
+                # el eje sigue a la frecuencia anterior
+                self.pi.hardware_PWM(pin, hz, 500000)
+                now = time.time()
+                steps = max(0.0, now - self.jog_last_update_time) * self.jog_speed * self.jog_direction
+                if self.jog_motor == 'lineal': self.posicion_lineal += steps
+                else: self.posicion_rotacional += steps
+                self.jog_last_update_time = now
+                self.jog_speed = hz
+
+    def _jog_released_since(self, press_time):
+        return bool(press_time) and self.jog_release_perf > press_time
+
+    def _record_jog_latency(self, kind, since):
+        latency_us = self.jog_latency[kind].record((time.perf_counter() - since) * 1e6)
+        self.jog_latency_measured.emit(kind, latency_us)
+        return latency_us
+
+    def _jog_end_time(self):
+        """Instante hasta el que el jog tuvo PWM (paro, ruta rápida o ahora)."""
+        end = time.time()
+        if self.is_halted:
+            end = min(end, self.halt_time)
+        if self.jog_stop_time is not None:
+            end = min(end, self.jog_stop_time)
+        return end
+
     @pyqtSlot()
     def stop_continuous_jog(self):
         if not self.is_jogging:
             return
             
-        self.poll_timer.stop()
+        self._stop_polling()
         self.is_jogging = False
         
         pin = LIN_PUL_PIN if self.jog_motor == 'lineal' else ROT_PUL_PIN
         if IS_RASPBERRY_PI:
             self.pi.hardware_PWM(pin, 0, 0)
         
-        # Calcular pasos aproximados recorridos
-        speed = VELOCIDAD_HZ_LINEAL_JOG if self.jog_motor == 'lineal' else VELOCIDAD_HZ_ROTACIONAL_JOG
-        elapsed = time.time() - self.jog_last_update_time
-        steps = elapsed * speed * self.jog_direction
+        # Calcular pasos aproximados recorridos (a la frecuencia vigente desde el último ciclo)
+        end = self._jog_end_time()
+        elapsed = max(0.0, end - self.jog_last_update_time)
+        steps = elapsed * self.jog_speed * self.jog_direction
         
         if self.jog_motor == 'lineal':
-            self.posicion_lineal += steps
+            self.posicion_lineal = self._measured('lineal', self.posicion_lineal + steps)
             self.position_updated.emit('lineal', int(self.posicion_lineal))
+            final_pos = self.posicion_lineal
         else:
-            self.posicion_rotacional += steps
+            self.posicion_rotacional = self._measured('rotacional', self.posicion_rotacional + steps)
             self.position_updated.emit('rotacional', int(self.posicion_rotacional))
+            final_pos = self.posicion_rotacional
+        self._record_motion(self.jog_motor, self.jog_press_time, end, final_pos, self.jog_speed * self.jog_direction)
 
     @pyqtSlot(str)
     def set_therapy_zero(self, motor_type):
@@ -433,22 +1823,32 @@ class HardwareController(QObject):
     def go_to_therapy_start_position(self, motor_type):
         """Mueve el motor a una posición segura inicial."""
         if motor_type == 'lineal':
-            req = int(5.0 / LINEAL_CM_POR_PASO)
-            self.move_steps('lineal', req - self.posicion_lineal, VELOCIDAD_HZ_LINEAL_JOG)
+            self.move_steps('lineal', POSICION_INICIO_LINEAL_PASOS - self.posicion_lineal, VELOCIDAD_HZ_LINEAL_JOG)
         else:
-            req = int(1.0 / ROTACIONAL_GRADOS_POR_PASO)
-            self.move_steps('rotacional', req - self.posicion_rotacional, VELOCIDAD_HZ_ROTACIONAL_JOG)
+            self.move_steps('rotacional', POSICION_INICIO_ROTACIONAL_PASOS - self.posicion_rotacional, VELOCIDAD_HZ_ROTACIONAL_JOG)
 
     @pyqtSlot()
     def _poll_status(self):
         """
         Ciclo de monitoreo.
         """
+        self.poll_jitter.tick()
+        if self.realtime and not self.realtime.gc_paused:
+            self.realtime.set_motion_active(True)
+        
         # 1. Seguridad Crítica
         if self.is_halted:
             if self.is_calibrating: self._stop_calibration_on_fail()
             if self.is_jogging: self.stop_continuous_jog()
+            if self.trajectory_queue is not None: self._stop_trajectory(True)
             if self.is_moving_steps: self.stop_move_steps(True)
+            if self.wave_session: self.stop_wave_session(True)
+            if self.is_verifying: self._finish_verification(None)
+            return
+        
+        # Sesión DMA: los sensores no intervienen en terapia
+        if self.wave_session:
+            self._poll_wave_session()
             return
 
         # 2. Lectura de Sensores
@@ -466,7 +1866,18 @@ class HardwareController(QObject):
         if self.is_calibrating:
             detected = False
             
-            if self.calibration_step == 'rotational':
+            if self.calibration_step == 'parallel':
+                sensors = {'rotacional': r_in, 'lineal': l_out}
+                for motor in list(self.homing_pending):
+                    if sensors[motor] == SENSORES_NIVEL_ACTIVO:
+                        self.homing_stable[motor] += 1
+                    else:
+                        self.homing_stable[motor] = 0
+                    if self.homing_stable[motor] >= 1:
+                        print(f"[Worker] Sensor {motor.upper()} confirmado.")
+                        self._finish_homing_axis(motor)
+
+            elif self.calibration_step == 'rotational':
                 if r_in == SENSORES_NIVEL_ACTIVO:
                     self.stable_count += 1
                 else:
@@ -489,37 +1900,65 @@ class HardwareController(QObject):
                     self.stable_count = 0
             return
         
+        # 3b. Verificación de posición (toque del sensor de homing)
+        if self.is_verifying:
+            sensor = l_out if self.verify_motor == 'lineal' else r_in
+            traveled = int((time.time() - self.verify_start_time) * self.verify_speed)
+            if sensor == SENSORES_NIVEL_ACTIVO:
+                self._finish_verification(traveled)
+            elif traveled > self.verify_start_pos + self.verify_tolerance:
+                print(f"[Worker] Sensor {self.verify_motor} no encontrado donde se esperaba.")
+                self._finish_verification(None)
+            return
+        
         # 4. Modo Jogging 
         if self.is_jogging:
+            # El jog solo se detiene al soltar el botón: si la GUI no late, detenerlo aquí
+            if self.gui_liveness.age_ms() > WATCHDOG_GUI_TIMEOUT_MS:
+                print("[Watchdog] La interfaz no responde. Deteniendo jog.")
+                self.stop_continuous_jog()
+                self.watchdog_tripped.emit("gui")
+                return
+            
             pos_hit = False; neg_hit = False
             if self.jog_motor == 'lineal':
                 pos_hit = (l_in == SENSORES_NIVEL_ACTIVO)
                 neg_hit = (l_out == SENSORES_NIVEL_ACTIVO)
-                curr = self.posicion_lineal; zero = self.cero_terapia_lineal; speed = VELOCIDAD_HZ_LINEAL_JOG
+                curr = self.posicion_lineal; zero = self.cero_terapia_lineal
             else:
                 pos_hit = (r_out == SENSORES_NIVEL_ACTIVO)
                 neg_hit = (r_in == SENSORES_NIVEL_ACTIVO)
-                curr = self.posicion_rotacional; zero = self.cero_terapia_rotacional; speed = VELOCIDAD_HZ_ROTACIONAL_JOG
+                curr = self.posicion_rotacional; zero = self.cero_terapia_rotacional
 
             if (self.jog_direction > 0 and pos_hit) or (self.jog_direction < 0 and neg_hit):
                 self.limit_status_updated.emit(pos_hit, neg_hit)
                 self.stop_continuous_jog()
                 return
 
-            now = time.time()
-            steps = (now - self.jog_last_update_time) * speed * self.jog_direction
-            self.jog_last_update_time = now
+            now = self._jog_end_time()
+            steps = max(0.0, now - self.jog_last_update_time) * self.jog_speed * self.jog_direction
+            self.jog_last_update_time = max(now, self.jog_last_update_time)
             
-            if self.jog_enforce_soft_limits and self.jog_direction < 0 and (curr + steps) < zero:
+            soft_stop = self.jog_enforce_soft_limits and self.jog_direction < 0 and (curr + steps) < zero
+            if soft_stop:
                 steps = zero - curr
-                self.limit_status_updated.emit(False, True)
-                self.stop_continuous_jog()
             
+            # La estimación se acumula antes de detener: al detener, con encoder, pasa a la medida
             if self.jog_motor == 'lineal': self.posicion_lineal += steps
             else: self.posicion_rotacional += steps
             
-            self.position_updated.emit(self.jog_motor, int(self.posicion_lineal if self.jog_motor == 'lineal' else self.posicion_rotacional))
+            if soft_stop:
+                self.limit_status_updated.emit(False, True)
+                self.stop_continuous_jog()
+            
+            pos = self.posicion_lineal if self.jog_motor == 'lineal' else self.posicion_rotacional
+            if self.is_jogging and self._stalled(self.jog_motor, pos):
+                self.stop_continuous_jog()
+                return
+            self.position_updated.emit(self.jog_motor, int(self._measured(self.jog_motor, pos)))
             self.limit_status_updated.emit(pos_hit, neg_hit)
+            if self.is_jogging:
+                self._update_jog_speed()
 
         # 5. Terapia
         if self.is_moving_steps:
@@ -536,14 +1975,70 @@ class HardwareController(QObject):
             #    self.stop_move_steps(interrupted=True)
             #    return
 
-            if time.time() >= self.move_steps_end_time:
+            if self.move_steps_guarded:
+                if self.move_motor == 'lineal':
+                    hit = (l_in if self.move_steps_direction > 0 else l_out) == SENSORES_NIVEL_ACTIVO
+                else:
+                    hit = (r_out if self.move_steps_direction > 0 else r_in) == SENSORES_NIVEL_ACTIVO
+                if hit:
+                    print(f"[Worker] Sensor detectado yendo a posición ({self.move_motor}). Parada.")
+                    self.limit_status_updated.emit(self.move_steps_direction > 0, self.move_steps_direction < 0)
+                    self.stop_move_steps(interrupted=True)
+                    return
+
+            if self.combined_axes:
+                self._poll_combined_move()
+            elif self.move_segment is not None:
+                # Tramo del microcontrolador: termina con su DONE, no por tiempo
+                if self.pi.segment_done(self.move_segment):
+                    self.stop_move_steps(False)
+                elif self._stalled(self.move_motor, self._move_steps_reached()):
+                    self.stop_move_steps(True)
+            elif self.move_motor in self.encoders:
+                # Lazo cerrado: termina cuando el encoder llega al destino, no por tiempo
+                if self.move_steps_on_target:
+                    self.stop_move_steps(False)
+                elif self._stalled(self.move_motor, self._move_steps_reached()):
+                    self.stop_move_steps(True)
+            elif time.time() >= self.move_steps_end_time:
                 self.stop_move_steps(False)
+        elif self.trajectory_queue is not None and time.time() >= self.trajectory_wait_until:
+            self._advance_trajectory()
 
     def cleanup(self):
         """Limpieza segura de recursos al cerrar."""
         if self.poll_timer.isActive():
             self.poll_timer.stop()
         
+        if self.heartbeat_timer.isActive():
+            self.heartbeat_timer.stop()
+        
+        if self.halt_latency.count:
+            print(self.halt_latency.report())
+        for stats in self.jog_latency.values():
+            if stats.count:
+                print(stats.report())
+        
+        if self.poll_jitter.stats.count:
+            print(self.poll_jitter.stats.report())
+        if any(axis.observations for axis in self.drift.axes.values()):
+            print(f"[Deriva] {self.drift.summary()}")
+        for motor, encoder in self.encoders.items():
+            print(f"[Encoder] {motor}: {encoder.steps()} pasos medidos, {encoder.errors} flancos perdidos.")
+            encoder.cancel()
+        if self.realtime:
+            print(f"[TiempoReal] {self.realtime.summary()}")
+        
+        if self.watchdog:
+            print(f"[Watchdog] {self.watchdog.summary()} | {self.gui_liveness.summary()}")
+            self.watchdog.stop()
+        
+        if self.wave_session:
+            try:
+                self.wave_session.stop()
+            except Exception:
+                pass
+        
         if IS_RASPBERRY_PI and self.pi:
             try:
                 self.pi.hardware_PWM(LIN_PUL_PIN, 0, 0)
@@ -562,8 +2057,26 @@ class RehabilitationApp(QMainWindow):
     trigger_halt_signal = pyqtSignal(bool)
     trigger_go_to_therapy_start = pyqtSignal(str)
     trigger_move_steps = pyqtSignal(str, int, int)
-    trigger_start_continuous_jog = pyqtSignal(str, int, bool)
+    trigger_move_steps_combined = pyqtSignal(int, int)
+    trigger_move_to_position = pyqtSignal(str, int)
+    trigger_jog_nudge = pyqtSignal(str, int, bool)
+    trigger_start_trajectory_recording = pyqtSignal()
+    trigger_stop_trajectory_recording = pyqtSignal()
+    trigger_run_trajectory = pyqtSignal(int, int)
+    trigger_therapy_session = pyqtSignal(str, int, int, int)
+    trigger_abort_therapy_session = pyqtSignal()
+    trigger_stop_move_steps = pyqtSignal()
+    trigger_pause_motion = pyqtSignal()
+    trigger_resume_motion = pyqtSignal()
+    trigger_verify_position = pyqtSignal(str)
+    trigger_start_continuous_jog = pyqtSignal(str, int, bool, float)
     trigger_stop_continuous_jog = pyqtSignal()
+    trigger_gui_heartbeat = pyqtSignal()
+    
+    # --- SEÑALES DE ESTADO DE TERAPIA (API / telemetría) ---
+    therapy_progress = pyqtSignal(int, int)
+    therapy_stopped = pyqtSignal(bool)
+    therapy_paused = pyqtSignal(bool)
 
     def __init__(self):
         super().__init__()
@@ -575,13 +2088,46 @@ class RehabilitationApp(QMainWindow):
         self.physical_estop_active = False
         self.software_estop_active = False
         self.therapy_in_progress = False
+        self.system_calibrated = False
+        
+        # Estado guardado al activar el paro por software (límites, terapia), para recuperar sin recalibrar
+        self.recovery_snapshot = None
         
         # Variables de Terapia
         self.current_therapy_type = ""
         self.current_rep_count = 0
         self.current_therapy_reps = 0
         self.therapy_state = "IDLE"
+        self.therapy_is_paused = False
+        self.paused_motion_in_worker = False   # El worker guardó un tramo/sesión a medias
+        self.therapy_rep_offset = 0            # Repeticiones ya hechas al continuar tras un paro
         self.pending_therapy_page = "" 
+        self.control_bridge = None
+        
+        # Trayectoria enseñada: la guarda el worker; aquí solo su resumen y la velocidad elegida
+        self.trajectory_recording = False
+        self.trajectory_info = None            # (muestras, waypoints, duración ms)
+        self.trajectory_speed_index = TRAYECTORIA_VELOCIDADES.index(1.0)
+        self.record_trajectory_buttons = []
+        self.trajectory_feedback_labels = []
+        
+        # Deriva medida en los sensores desde la última calibración (la mide el worker)
+        self.drift_report = {}
+        
+        # Calados detectados por el encoder (por eje) desde la última calibración
+        self.stall_report = {}
+        
+        # Modo paso fino del jog (compartido por la página de ejercicio y el posicionamiento)
+        self.jog_fine_mode = False
+        self.fine_jog_buttons = []
+        
+        # Sesión programada: [{type, reps, limits, saved}] y ejercicio en curso
+        self.session_plan = []
+        self.session_plan_index = 0
+        self.session_plan_active = False
+        
+        # Acciones diferidas (esperas de terapia, navegación, mensajes) cancelables por grupo
+        self.scheduler = ActionScheduler(self)
         
         # Estado de Sensores (Hardware)
         self.hw_pos_hit = False
@@ -592,16 +2138,23 @@ class RehabilitationApp(QMainWindow):
         self.extension_limite_saved = False
         self.flexion_limite_pasos = 0
         self.extension_limite_pasos = 0
-        self.flexext_reps_value = 0
-        self.flexext_keypad_string = ""
         
         # Variables Abducción-Aducción
         self.adduction_limite_saved = False
         self.abduction_limite_saved = False
         self.adduction_limite_pasos = 0
         self.abduction_limite_pasos = 0
-        self.abdadd_reps_value = 0
-        self.abdadd_keypad_string = ""
+        
+        # Página de ejercicio compartida: descriptor enlazado y teclado de repeticiones
+        self.current_exercise = EJERCICIOS["flexion_extension"]
+        self.pending_exercise = ""
+        self.exercise_reps_value = 0
+        self.exercise_keypad_string = ""
+        self.exercise_keypad_mode = "reps"     # "reps" o "limit" (valor numérico del límite)
+        self.limit_entry_pending = None        # Límite (0/1) que se guarda al llegar el movimiento
+        # Teclado de repeticiones de los modos sin página de ejercicio (combinado, trayectoria)
+        self.reps_page_type = TERAPIA_COMBINADA
+        self.reps_page_string = ""
 
         # --- CONFIGURACIÓN DE INTERFAZ (UI) ---
         self.main_container = QWidget()
@@ -617,20 +2170,22 @@ class RehabilitationApp(QMainWindow):
         self.loading_page = self.create_loading_page()
         self.calibrated_page = self.create_calibrated_page()
         self.rehab_selection_page = self.create_rehab_selection_page()
-        self.flexion_extension_page = self.create_flexion_extension_page()
-        self.abduction_adduction_page = self.create_abduction_adduction_page()
+        self.exercise_page = self.create_exercise_page()
         self.therapy_summary_page = self.create_therapy_summary_page()
         self.leg_positioning_page = self.create_leg_positioning_page()
+        self.reps_page = self.create_reps_page()
 
         # Añadir páginas al Stack
         self.stacked_widget.addWidget(self.welcome_page)            # Index 0
         self.stacked_widget.addWidget(self.loading_page)            # Index 1
         self.stacked_widget.addWidget(self.calibrated_page)         # Index 2
         self.stacked_widget.addWidget(self.rehab_selection_page)    # Index 3
-        self.stacked_widget.addWidget(self.flexion_extension_page)  # Index 4
-        self.stacked_widget.addWidget(self.abduction_adduction_page)# Index 5
-        self.stacked_widget.addWidget(self.therapy_summary_page)    # Index 6
-        self.stacked_widget.addWidget(self.leg_positioning_page)    # Index 7
+        self.stacked_widget.addWidget(self.exercise_page)           # Index 4
+        self.stacked_widget.addWidget(self.therapy_summary_page)    # Index 5
+        self.stacked_widget.addWidget(self.leg_positioning_page)    # Index 6
+        self.stacked_widget.addWidget(self.reps_page)               # Index 7
+        self.bind_exercise_page("flexion_extension")
+        self.stacked_widget.currentChanged.connect(self._on_page_changed)
 
         # --- ELEMENTOS FLOTANTES (PARO DE EMERGENCIA) ---
         self.shutdown_button = QPushButton(self)
@@ -661,12 +2216,16 @@ class RehabilitationApp(QMainWindow):
 
     def _setup_hardware_thread(self):
         """Configura el hilo secundario y conecta las señales."""
-        self.worker = HardwareController()
-        self.worker_thread = QThread()
-        self.worker.moveToThread(self.worker_thread)
+        if MOTOR_EN_PROCESO:
+            # Núcleo en otro proceso: el proxy expone las mismas señales y slots
+            self.worker = MotionProcessProxy()
+        else:
+            self.worker = HardwareController()
+            self.worker_thread = QThread()
+            self.worker.moveToThread(self.worker_thread)
+            self.worker_thread.started.connect(self.worker.initialize_gpio)
         
         # Conexiones: UI -> Hardware
-        self.worker_thread.started.connect(self.worker.initialize_gpio)
         self.trigger_calibration.connect(self.worker.run_calibration_sequence)
         self.trigger_halt_signal.connect(self.worker.trigger_software_halt)
         
@@ -676,18 +2235,50 @@ class RehabilitationApp(QMainWindow):
         self.trigger_go_to_therapy_start.connect(self.worker.go_to_therapy_start_position)
         self.trigger_set_therapy_zero.connect(self.worker.set_therapy_zero)
         self.trigger_move_steps.connect(self.worker.move_steps)
+        self.trigger_move_steps_combined.connect(self.worker.move_steps_combined)
+        self.trigger_move_to_position.connect(self.worker.move_to_position)
+        self.trigger_jog_nudge.connect(self.worker.jog_nudge)
+        self.trigger_start_trajectory_recording.connect(self.worker.start_trajectory_recording)
+        self.trigger_stop_trajectory_recording.connect(self.worker.stop_trajectory_recording)
+        self.trigger_run_trajectory.connect(self.worker.run_trajectory)
+        self.trigger_therapy_session.connect(self.worker.run_therapy_session)
+        self.trigger_abort_therapy_session.connect(self.worker.abort_wave_session)
+        self.trigger_stop_move_steps.connect(self.worker.stop_move_steps)
+        self.trigger_pause_motion.connect(self.worker.pause_motion)
+        self.trigger_resume_motion.connect(self.worker.resume_motion)
+        self.trigger_verify_position.connect(self.worker.verify_position)
         self.trigger_start_continuous_jog.connect(self.worker.start_continuous_jog)
         self.trigger_stop_continuous_jog.connect(self.worker.stop_continuous_jog)
         
         # Conexiones: Hardware -> UI
         self.worker.progress_updated.connect(self.handle_progress_update)
         self.worker.calibration_finished.connect(self.handle_calibration_finished)
+        self.worker.calibration_axis_homed.connect(self.handle_calibration_axis_homed)
         self.worker.physical_estop_activated.connect(self.handle_physical_estop_state)
         self.worker.movement_finished.connect(self.on_movement_finished)
         self.worker.position_updated.connect(self.on_position_updated)
         self.worker.limit_status_updated.connect(self.on_limit_status_updated)
-        
-        self.worker_thread.start()
+        self.worker.halt_latency_measured.connect(self.on_halt_latency_measured)
+        self.worker.watchdog_tripped.connect(self.on_watchdog_tripped)
+        self.worker.session_progress.connect(self.on_session_progress)
+        self.worker.session_finished.connect(self.on_session_finished)
+        self.worker.motion_paused.connect(self.on_motion_paused)
+        self.worker.position_verified.connect(self.on_position_verified)
+        self.worker.trajectory_recorded.connect(self.on_trajectory_recorded)
+        self.worker.drift_measured.connect(self.on_drift_measured)
+        self.worker.stall_detected.connect(self.on_stall_detected)
+        
+        # Latido de la interfaz hacia el worker
+        self.trigger_gui_heartbeat.connect(self.worker.gui_heartbeat)
+        self.gui_heartbeat_timer = QTimer(self)
+        self.gui_heartbeat_timer.setInterval(WATCHDOG_GUI_LATIDO_MS)
+        self.gui_heartbeat_timer.timeout.connect(self.trigger_gui_heartbeat.emit)
+        self.gui_heartbeat_timer.start()
+        
+        if MOTOR_EN_PROCESO:
+            self.worker.start()
+        else:
+            self.worker_thread.start()
 
     def _update_emergency_state(self):
         """
@@ -697,17 +2288,32 @@ class RehabilitationApp(QMainWindow):
         is_emergency = self.physical_estop_active or self.software_estop_active
         
         # Deshabilitar controles manuales de seguridad
-        self.flex_button.setEnabled(not is_emergency)
-        self.ext_button.setEnabled(not is_emergency)
-        self.abd_button.setEnabled(not is_emergency)
-        self.add_button.setEnabled(not is_emergency)
+        for btn in self.exercise_arrow_buttons:
+            btn.setEnabled(not is_emergency)
         self.leg_pos_flex_button.setEnabled(not is_emergency)
         self.leg_pos_ext_button.setEnabled(not is_emergency)
 
         if is_emergency:
-            # 1. Detener terapia si está activa
+            # 0. Paro solo por software con el sistema calibrado: la posición se conserva
+            recoverable = (self.software_estop_active and not self.physical_estop_active
+                           and self.system_calibrated and self.system_state == "IDLE")
+            if not recoverable:
+                self.recovery_snapshot = None
+            elif self.recovery_snapshot is None:
+                self.recovery_snapshot = self._take_recovery_snapshot()
+            
+            # 1. Detener terapia si está activa y descartar esperas pendientes
             if self.therapy_in_progress:
                 self.stop_therapy_session(finished=False)
+            self.scheduler.cancel_group("terapia")
+            self.scheduler.cancel_group("calibracion")
+            self.scheduler.cancel_group("sesion")
+            self.session_plan_active = False
+            self.limit_entry_pending = None
+            
+            # El worker descarta la grabación en curso al reiniciar su estado
+            if self.trajectory_recording:
+                self._set_trajectory_recording_ui(False)
             
             # 2. Diagnóstico de la fuente del paro
             msg = "¡PARADA DE EMERGENCIA!\nSISTEMA DETENIDO\n"
@@ -737,10 +2343,10 @@ class RehabilitationApp(QMainWindow):
             self.system_state = "IDLE"
             self.gears_movie.stop()
             
-            self.worker.posicion_lineal = 0          
-            self.worker.posicion_rotacional = 0         
-            self.worker.cero_terapia_lineal = 0       
-            self.worker.cero_terapia_rotacional = 0   
+            if self.recovery_snapshot is None:
+                self.worker.reset_positions()
+                self.system_calibrated = False
+            self.recover_button.hide()
 
             # Borrar límites guardados
             self.flexion_limite_saved = False
@@ -766,15 +2372,54 @@ class RehabilitationApp(QMainWindow):
             self.pos_leg_button.setText("Posicionar pierna en mecanismo")
             self.rehab_button.setEnabled(True)
             self.rehab_button.setText("    Comenzar rehabilitación")
+            self.recover_button.setVisible(self.recovery_snapshot is not None)
 
 
+    @pyqtSlot(str, int)
+    def on_halt_latency_measured(self, source, latency_us):
+        print(f"[SISTEMA] Paro ({source}): drivers deshabilitados en {latency_us} us "
+              f"(peor caso {self.worker.halt_latency.worst_us} us).")
+
+    @pyqtSlot(str, int, bool)
+    def on_drift_measured(self, motor, error, corrected):
+        """Acumula la deriva del período (desde la última calibración) para el estado de la API."""
+        report = self.drift_report.setdefault(motor, {"n": 0, "last": 0, "max_abs": 0, "corrected": 0})
+        report["n"] += 1
+        report["last"] = error
+        report["max_abs"] = max(report["max_abs"], abs(error))
+        if corrected:
+            report["corrected"] -= error
+
+    @pyqtSlot(str, int)
+    def on_stall_detected(self, motor, error):
+        """El encoder vio que el eje no seguía al comando; el worker ya detuvo el movimiento."""
+        print(f"[SISTEMA] Eje {motor} calado o bloqueado (error de seguimiento {error:+d} pasos).")
+        self.stall_report[motor] = self.stall_report.get(motor, 0) + 1
+
+    @pyqtSlot(str)
+    def on_watchdog_tripped(self, source):
+        if source == "gui":
+            print("[SISTEMA] Jog detenido por el worker: la interfaz dejó de responder.")
+            return
+        
+        # El daemon ya cortó los motores; se bloquea como un paro de pantalla
+        print("[SISTEMA] Watchdog activado: el hilo de hardware dejó de responder.")
+        if not self.software_estop_active:
+            self.toggle_software_estop()
+        self.overlay_msg.setText("¡PARADA DE EMERGENCIA!\nSISTEMA DETENIDO\n\n[X] WATCHDOG (HARDWARE SIN RESPUESTA)")
+
     @pyqtSlot(bool)
     def handle_physical_estop_state(self, is_active):
         self.physical_estop_active = is_active
         self._update_emergency_state()
 
     def toggle_software_estop(self):
+        press_time = time.perf_counter()
         self.software_estop_active = not self.software_estop_active
+        
+        # Ruta rápida: deshabilitar drivers desde este hilo sin esperar al worker
+        if self.software_estop_active:
+            self.worker.fast_halt("pantalla", press_time=press_time)
         self.trigger_halt_signal.emit(self.software_estop_active)
         
         # Actualizar estilo del botón
@@ -875,6 +2520,7 @@ class RehabilitationApp(QMainWindow):
         right_col.addWidget(self.leg_pos_status_label, 0, Qt.AlignCenter)
         right_col.addLayout(arrows_layout)
         right_col.addLayout(lbls_layout)
+        fine_button = self._add_fine_jog_button(right_col)
         right_col.addStretch()
         right_col.addWidget(btn_finish, 0, Qt.AlignRight)
         
@@ -882,7 +2528,7 @@ class RehabilitationApp(QMainWindow):
         content.addLayout(right_col, 6)
         l.addLayout(content)
         
-        self.leg_pos_interactive_widgets = [btn_finish]
+        self.leg_pos_interactive_widgets = [btn_finish, fine_button]
         return p
 
     def set_leg_pos_jogging_mode(self, is_jogging):
@@ -890,37 +2536,96 @@ class RehabilitationApp(QMainWindow):
             w.setEnabled(not is_jogging)
     
     def on_leg_pos_flex_press(self):
+        if self.jog_fine_mode:
+            self.trigger_jog_nudge.emit('lineal', 1, False)
+            return
+        self._emit_jog_start('lineal', 1, False)
         self.leg_pos_ext_button.setEnabled(True)
         self.set_leg_pos_jogging_mode(True)
         self.leg_pos_status_label.setText("Moviendo Flexión...")
         self._update_jog_label_style(self.leg_pos_status_label, True)
-        self.trigger_start_continuous_jog.emit('lineal', 1, False) 
 
     def on_leg_pos_ext_press(self):
+        if self.jog_fine_mode:
+            self.trigger_jog_nudge.emit('lineal', -1, False)
+            return
+        self._emit_jog_start('lineal', -1, False)
         self.leg_pos_flex_button.setEnabled(True)
         self.set_leg_pos_jogging_mode(True)
         self.leg_pos_status_label.setText("Moviendo Extensión...")
         self._update_jog_label_style(self.leg_pos_status_label, True)
-        self.trigger_start_continuous_jog.emit('lineal', -1, False) 
 
     def on_leg_pos_release(self):
-        self.trigger_stop_continuous_jog.emit()
+        if self.jog_fine_mode:
+            return
+        self._emit_jog_stop()
         self.set_leg_pos_jogging_mode(False)
         self.leg_pos_status_label.setText("Sistema detenido")
         self._update_jog_label_style(self.leg_pos_status_label, False)
 
         # Verificación de Hardware
-        if IS_RASPBERRY_PI and self.worker.pi:
-            if self.worker.pi.read(LIN_LIMIT_IN_PIN) != SENSORES_NIVEL_ACTIVO:
-                self.leg_pos_flex_button.setEnabled(True)
-            
-            if self.worker.pi.read(LIN_LIMIT_OUT_PIN) != SENSORES_NIVEL_ACTIVO:
-                self.leg_pos_ext_button.setEnabled(True)
-        else:
+        if self.worker.read_input(LIN_LIMIT_IN_PIN) != SENSORES_NIVEL_ACTIVO:
             self.leg_pos_flex_button.setEnabled(True)
+        
+        if self.worker.read_input(LIN_LIMIT_OUT_PIN) != SENSORES_NIVEL_ACTIVO:
             self.leg_pos_ext_button.setEnabled(True)
 
 
+    def create_reps_page(self):
+        p = QWidget()
+        p.setObjectName("RepsPage")
+        l = QVBoxLayout(p)
+        header = self.create_header(p, False, "")
+        self.reps_page_title_label = header.findChild(QLabel, "TherapyTitleLabel")
+        l.addWidget(header)
+        
+        vl = QVBoxLayout()
+        vl.setAlignment(Qt.AlignCenter)
+        vl.setSpacing(10)
+        
+        title = QLabel("Número de repeticiones")
+        title.setObjectName("SectionTitleLabel")
+        title.setAlignment(Qt.AlignCenter)
+        
+        self.reps_page_display = QLabel("")
+        self.reps_page_display.setObjectName("KeypadDisplay")
+        self.reps_page_display.setFixedSize(220,50)
+        
+        self.reps_page_feedback_label = QLabel("")
+        self.reps_page_feedback_label.setObjectName("FeedbackLabel")
+        self.reps_page_feedback_label.setAlignment(Qt.AlignCenter)
+        
+        kg = QGridLayout()
+        kg.setSpacing(5)
+        for i, n in enumerate([1,2,3,4,5,6,7,8,9,-1,0,-2]):
+            btn = QPushButton("DEL" if n==-1 else "OK" if n==-2 else str(n))
+            btn.setObjectName("NumberButtonRed" if n==-1 else "NumberButtonGreen" if n==-2 else "NumberButton")
+            if n==-1: btn.clicked.connect(self.reps_page_delete)
+            elif n==-2: btn.clicked.connect(self.reps_page_confirm)
+            else: btn.clicked.connect(lambda _, x=n: self.reps_page_add_digit(x))
+            kg.addWidget(btn, i//3, i%3)
+        
+        back = QPushButton("VOLVER AL MENÚ")
+        back.setObjectName("SecondaryButton")
+        back.setFixedSize(200, 60)
+        back.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(3))
+        
+        vl.addStretch()
+        vl.addWidget(title)
+        vl.addWidget(self.reps_page_display, 0, Qt.AlignCenter)
+        vl.addLayout(kg)
+        vl.addWidget(self.reps_page_feedback_label)
+        vl.addSpacing(10)
+        vl.addWidget(back, 0, Qt.AlignCenter)
+        vl.addStretch()
+        
+        hl = QHBoxLayout()
+        hl.addStretch()
+        hl.addLayout(vl)
+        hl.addStretch()
+        l.addLayout(hl)
+        return p
+
     def create_welcome_page(self):
         p = QWidget()
         p.setObjectName("WelcomePage")
@@ -937,13 +2642,19 @@ class RehabilitationApp(QMainWindow):
         self.pos_leg_button.setObjectName("MainButton")
         self.pos_leg_button.setFixedSize(475, 90)
         self.pos_leg_button.setIcon(QIcon("icons/settings_icon.png")) 
-        self.pos_leg_button.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(7))
+        self.pos_leg_button.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(6))
         
         self.rehab_button = QPushButton("    Comenzar rehabilitación") 
         self.rehab_button.setObjectName("MainButton")
         self.rehab_button.setFixedSize(450, 90)
         self.rehab_button.setIcon(QIcon("icons/play_icon.png"))
         self.rehab_button.clicked.connect(self.start_rehabilitation)
+        
+        self.recover_button = QPushButton("Continuar sin recalibrar")
+        self.recover_button.setObjectName("SecondaryButton")
+        self.recover_button.setFixedSize(450, 60)
+        self.recover_button.clicked.connect(self.start_position_recovery)
+        self.recover_button.hide()
 
         img = QLabel()
         img.setPixmap(QPixmap("icons/fisioterapeuta.png").scaled(300,300,Qt.KeepAspectRatio))
@@ -954,6 +2665,8 @@ class RehabilitationApp(QMainWindow):
         vl.addWidget(self.pos_leg_button, 0, Qt.AlignHCenter)
         vl.addSpacing(20)
         vl.addWidget(self.rehab_button, 0, Qt.AlignHCenter)
+        vl.addSpacing(10)
+        vl.addWidget(self.recover_button, 0, Qt.AlignHCenter)
         vl.addStretch()
         
         hl.addStretch()
@@ -1041,341 +2754,247 @@ class RehabilitationApp(QMainWindow):
         
         l.addWidget(self.create_header(p))
         l.addLayout(vl)
-        return p
-
-    def create_rehab_selection_page(self):
-        p = QWidget()
-        p.setObjectName("RehabSelectionPage")
-        l = QVBoxLayout(p)
-        l.addWidget(self.create_header(p))
-        l.addSpacing(30)
-        
-        il = QLabel("ELIGE EL TIPO DE REHABILITACIÓN")
-        il.setObjectName("InstructionLabel")
-        il.setAlignment(Qt.AlignCenter)
-        l.addWidget(il, 0, Qt.AlignHCenter)
-        l.addSpacing(40)
-        
-        hl = QHBoxLayout()
-        vl_buttons = QVBoxLayout()
-        vl_buttons.setSpacing(30)
-        
-        btn_style = "text-align: left; padding-left: 30px;"
-        
-        b1 = QPushButton("     Abducción-Aducción")
-        b1.setObjectName("SecondaryButton")
-        b1.setFixedSize(400, 70)
-        b1.setIcon(QIcon("icons/play_icon.png"))
-        b1.setIconSize(QSize(24, 24))
-        b1.setStyleSheet(btn_style)
-        b1.clicked.connect(lambda: self.start_therapy_setup("abduction_adduction_page"))
-        
-        b2 = QPushButton("     Flexión-Extensión")
-        b2.setObjectName("SecondaryButton")
-        b2.setFixedSize(400, 70)
-        b2.setIcon(QIcon("icons/play_icon.png"))
-        b2.setIconSize(QSize(24, 24))
-        b2.setStyleSheet(btn_style)
-        b2.clicked.connect(lambda: self.start_therapy_setup("flexion_extension_page"))
-        
-        vl_buttons.addWidget(b1)
-        vl_buttons.addWidget(b2)
-        
-        img = QLabel()
-        img.setPixmap(QPixmap("icons/fisioterapeuta.png").scaled(280, 280, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-        
-        hl.addStretch()
-        hl.addLayout(vl_buttons)
-        hl.addSpacing(50)
-        hl.addWidget(img)
-        hl.addStretch()
-        
-        l.addLayout(hl)
-        l.addStretch()
-        return p
-
-    def create_flexion_extension_page(self):
-        p = QWidget()
-        p.setObjectName("FlexExtPage")
-        l = QVBoxLayout(p)
-        l.setContentsMargins(20, 20, 20, 20)
-        
-        # Columna Izquierda: Jogging
-        left_layout = QVBoxLayout()
-        left_layout.setAlignment(Qt.AlignTop)
-        
-        self.flexext_undo_limit_button = QPushButton("Deshacer Límite")
-        self.flexext_undo_limit_button.setObjectName("UndoButton")
-        self.flexext_undo_limit_button.setFixedSize(180, 40)
-        self.flexext_undo_limit_button.clicked.connect(self.undo_last_flexext_limit)
-        
-        left_layout.addWidget(self.flexext_undo_limit_button, 0, Qt.AlignCenter)
-        left_layout.addSpacing(30)
-        
-        mov_label = QLabel("MOVIMIENTO")
-        mov_label.setObjectName("SectionTitleLabel")
-        mov_label.setAlignment(Qt.AlignCenter)
-        
-        self.flexext_jog_status_label = QLabel("Sistema detenido")
-        self.flexext_jog_status_label.setObjectName("JogStatusLabel")
-        self.flexext_jog_status_label.setAlignment(Qt.AlignCenter)
-        self.flexext_jog_status_label.setFixedHeight(25)
-        
-        left_layout.addWidget(mov_label)
-        left_layout.addWidget(self.flexext_jog_status_label)
-        left_layout.addSpacing(50)
-        
-        self.flex_button = QPushButton()
-        self.flex_button.setObjectName("ArrowButton")
-        self.flex_button.setIcon(QIcon("icons/arrow_right.png"))
-        self.flex_button.setIconSize(QSize(80, 80))
-        self.flex_button.setFixedSize(100, 100)
-        self.flex_button.pressed.connect(self.on_flex_press)
-        self.flex_button.released.connect(self.on_flexext_jog_release)
-        
-        self.ext_button = QPushButton()
-        self.ext_button.setObjectName("ArrowButton")
-        self.ext_button.setIcon(QIcon("icons/arrow_left.png"))
-        self.ext_button.setIconSize(QSize(80, 80))
-        self.ext_button.setFixedSize(100,100)
-        self.ext_button.pressed.connect(self.on_ext_press)
-        self.ext_button.released.connect(self.on_flexext_jog_release)
-        
-        arrows_layout = QHBoxLayout()
-        arrows_layout.addWidget(self.flex_button)
-        arrows_layout.addSpacing(20)
-        arrows_layout.addWidget(self.ext_button)
-        
-        labels_layout = QHBoxLayout()
-        labels_layout.addWidget(QLabel("Flexión"), 0, Qt.AlignCenter)
-        labels_layout.addSpacing(20)
-        labels_layout.addWidget(QLabel("Extensión"), 0, Qt.AlignCenter)
-        
-        left_layout.addLayout(arrows_layout)
-        left_layout.addLayout(labels_layout)
-        left_layout.addStretch()
-        
-        # Columna Central: Configuración
-        center_layout = QVBoxLayout()
-        center_layout.setSpacing(15)
-        center_layout.setAlignment(Qt.AlignCenter)
-        
-        self.switch_to_abd_button = QPushButton("IR A ABDUCCIÓN / ADUCCIÓN")
-        self.switch_to_abd_button.setObjectName("SwitchTherapyButton")
-        self.switch_to_abd_button.setFixedSize(300, 40)
-        self.switch_to_abd_button.clicked.connect(lambda: self.start_therapy_setup("abduction_adduction_page"))
-        
-        self.flexext_save_position_button = QPushButton("GUARDAR LÍMITE EXTENSIÓN")
-        self.flexext_save_position_button.setObjectName("SecondaryButton")
-        self.flexext_save_position_button.setFixedSize(340, 60)
-        self.flexext_save_position_button.clicked.connect(self.save_current_flexext_position)
-        
-        self.extension_feedback_label = QLabel("")
-        self.extension_feedback_label.setObjectName("FeedbackLabel")
-        self.extension_feedback_label.setAlignment(Qt.AlignCenter)
-        
-        self.flexion_feedback_label = QLabel("")
-        self.flexion_feedback_label.setObjectName("FeedbackLabel")
-        self.flexion_feedback_label.setAlignment(Qt.AlignCenter)
-        
-        self.flexext_start_therapy_button = QPushButton("COMENZAR TERAPIA")
-        self.flexext_start_therapy_button.setObjectName("SecondaryButton")
-        self.flexext_start_therapy_button.setFixedSize(340, 60)
-        self.flexext_start_therapy_button.clicked.connect(lambda: self.go_to_therapy_summary("Flexión/Extensión", self.flexext_reps_value))
-        
-        self.exit_menu_button_flex = QPushButton("SALIR AL MENÚ")
-        self.exit_menu_button_flex.setObjectName("ExitMenuButton")
-        self.exit_menu_button_flex.setFixedSize(180,40)
-        self.exit_menu_button_flex.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(3))
+        return p
+
+    def create_rehab_selection_page(self):
+        p = QWidget()
+        p.setObjectName("RehabSelectionPage")
+        l = QVBoxLayout(p)
+        l.addWidget(self.create_header(p))
+        l.addSpacing(30)
         
-        center_layout.addWidget(self.switch_to_abd_button, 0, Qt.AlignHCenter)
-        center_layout.addStretch()
-        center_layout.addWidget(self.flexext_save_position_button)
-        center_layout.addWidget(self.extension_feedback_label)
-        center_layout.addWidget(self.flexion_feedback_label)
-        center_layout.addStretch()
-        center_layout.addWidget(self.flexext_start_therapy_button)
-        center_layout.addWidget(self.exit_menu_button_flex, 0, Qt.AlignHCenter)
+        il = QLabel("ELIGE EL TIPO DE REHABILITACIÓN")
+        il.setObjectName("InstructionLabel")
+        il.setAlignment(Qt.AlignCenter)
+        l.addWidget(il, 0, Qt.AlignHCenter)
+        l.addSpacing(20)
         
-        # Columna Derecha: Teclado
-        right_layout = QVBoxLayout()
-        right_layout.setAlignment(Qt.AlignTop)
-        right_layout.addSpacing(50)
+        hl = QHBoxLayout()
+        vl_buttons = QVBoxLayout()
+        vl_buttons.setSpacing(12)
         
-        reps_label = QLabel("Número de repeticiones")
-        reps_label.setObjectName("SectionTitleLabel")
-        reps_label.setAlignment(Qt.AlignCenter)
+        btn_style = "text-align: left; padding-left: 30px;"
         
-        self.flexext_keypad_display = QLabel("")
-        self.flexext_keypad_display.setObjectName("KeypadDisplay")
-        self.flexext_keypad_display.setFixedSize(220,50)
+        b1 = QPushButton("     Abducción-Aducción")
+        b1.setObjectName("SecondaryButton")
+        b1.setFixedSize(400, 70)
+        b1.setIcon(QIcon("icons/play_icon.png"))
+        b1.setIconSize(QSize(24, 24))
+        b1.setStyleSheet(btn_style)
+        b1.clicked.connect(lambda: self.start_therapy_setup("abduction_adduction"))
         
-        self.flexext_reps_feedback_label = QLabel("")
-        self.flexext_reps_feedback_label.setObjectName("FeedbackLabel")
-        self.flexext_reps_feedback_label.setAlignment(Qt.AlignCenter)
+        b2 = QPushButton("     Flexión-Extensión")
+        b2.setObjectName("SecondaryButton")
+        b2.setFixedSize(400, 70)
+        b2.setIcon(QIcon("icons/play_icon.png"))
+        b2.setIconSize(QSize(24, 24))
+        b2.setStyleSheet(btn_style)
+        b2.clicked.connect(lambda: self.start_therapy_setup("flexion_extension"))
+        
+        # Combinado: usa los límites ya guardados de ambos ejercicios
+        self.combined_button = QPushButton("     Combinado (Flex. + Abd.)")
+        self.combined_button.setObjectName("SecondaryButton")
+        self.combined_button.setFixedSize(400, 70)
+        self.combined_button.setIcon(QIcon("icons/play_icon.png"))
+        self.combined_button.setIconSize(QSize(24, 24))
+        self.combined_button.setStyleSheet(btn_style)
+        self.combined_button.clicked.connect(lambda: self.open_reps_page(TERAPIA_COMBINADA))
+        self.combined_button.setEnabled(False)
+        
+        # Trayectoria enseñada con el jog en las páginas de ejercicio
+        self.trajectory_button = QPushButton("     Trayectoria grabada")
+        self.trajectory_button.setObjectName("SecondaryButton")
+        self.trajectory_button.setFixedSize(400, 70)
+        self.trajectory_button.setIcon(QIcon("icons/play_icon.png"))
+        self.trajectory_button.setIconSize(QSize(24, 24))
+        self.trajectory_button.setStyleSheet(btn_style)
+        self.trajectory_button.clicked.connect(lambda: self.open_reps_page(TERAPIA_TRAYECTORIA))
+        self.trajectory_button.setEnabled(False)
         
-        kg = QGridLayout()
-        kg.setSpacing(5)
-        self.flexext_keypad_buttons = {}
-        for i, n in enumerate([1,2,3,4,5,6,7,8,9,-1,0,-2]):
-            btn = QPushButton("DEL" if n==-1 else "OK" if n==-2 else str(n))
-            btn.setObjectName("NumberButtonRed" if n==-1 else "NumberButtonGreen" if n==-2 else "NumberButton")
-            if n==-1: btn.clicked.connect(self.flexext_keypad_delete)
-            elif n==-2: btn.clicked.connect(self.flexext_keypad_confirm)
-            else: btn.clicked.connect(lambda _, x=n: self.flexext_keypad_add_digit(x))
-            kg.addWidget(btn, i//3, i%3)
-            self.flexext_keypad_buttons[n] = btn
-            
-        right_layout.addWidget(reps_label)
-        right_layout.addWidget(self.flexext_keypad_display, 0, Qt.AlignCenter)
-        right_layout.addLayout(kg)
-        right_layout.addWidget(self.flexext_reps_feedback_label)
-        right_layout.addStretch()
+        vl_buttons.addWidget(b1)
+        vl_buttons.addWidget(b2)
+        vl_buttons.addWidget(self.combined_button)
+        vl_buttons.addWidget(self.trajectory_button)
+        
+        # Sesión programada: ejercicios añadidos desde el resumen, sin reset entre ellos
+        self.session_plan_button = QPushButton()
+        self.session_plan_button.setObjectName("SecondaryButton")
+        self.session_plan_button.setFixedSize(290, 70)
+        self.session_plan_button.setIcon(QIcon("icons/play_icon.png"))
+        self.session_plan_button.setIconSize(QSize(24, 24))
+        self.session_plan_button.setStyleSheet(btn_style)
+        self.session_plan_button.clicked.connect(self.start_session_plan)
+        
+        self.clear_plan_button = QPushButton("Vaciar")
+        self.clear_plan_button.setObjectName("UndoButton")
+        self.clear_plan_button.setFixedSize(100, 70)
+        self.clear_plan_button.clicked.connect(self.clear_session_plan)
+        
+        plan_row = QHBoxLayout()
+        plan_row.addWidget(self.session_plan_button)
+        plan_row.addSpacing(10)
+        plan_row.addWidget(self.clear_plan_button)
+        vl_buttons.addLayout(plan_row)
+        self._update_session_plan_buttons()
         
-        content_layout = QHBoxLayout()
-        content_layout.addLayout(left_layout, 2)
-        content_layout.addLayout(center_layout, 3)
-        content_layout.addLayout(right_layout, 2)
+        img = QLabel()
+        img.setPixmap(QPixmap("icons/fisioterapeuta.png").scaled(280, 280, Qt.KeepAspectRatio, Qt.SmoothTransformation))
         
-        l.addWidget(self.create_header(p, False, "Flexión / Extensión"))
-        l.addLayout(content_layout)
+        hl.addStretch()
+        hl.addLayout(vl_buttons)
+        hl.addSpacing(50)
+        hl.addWidget(img)
+        hl.addStretch()
         
-        self.flexext_interactive_widgets = [self.flexext_save_position_button, self.flexext_start_therapy_button, self.flexext_undo_limit_button, self.flex_button, self.ext_button, self.switch_to_abd_button, self.exit_menu_button_flex] + list(self.flexext_keypad_buttons.values())
+        l.addLayout(hl)
+        l.addStretch()
         return p
 
-    def create_abduction_adduction_page(self):
+    def create_exercise_page(self):
+        """Página única de configuración de ejercicio; bind_exercise_page la enlaza al descriptor."""
         p = QWidget()
-        p.setObjectName("AbdAddPage")
+        p.setObjectName("ExercisePage")
         l = QVBoxLayout(p)
         l.setContentsMargins(20, 20, 20, 20)
         
+        # Columna Izquierda: Jogging
         left_layout = QVBoxLayout()
         left_layout.setAlignment(Qt.AlignTop)
         
-        self.abdadd_undo_limit_button = QPushButton("Deshacer Límite")
-        self.abdadd_undo_limit_button.setObjectName("UndoButton")
-        self.abdadd_undo_limit_button.setFixedSize(180, 40)
-        self.abdadd_undo_limit_button.clicked.connect(self.undo_last_abdadd_limit)
+        self.exercise_undo_limit_button = QPushButton("Deshacer Límite")
+        self.exercise_undo_limit_button.setObjectName("UndoButton")
+        self.exercise_undo_limit_button.setFixedSize(180, 40)
+        self.exercise_undo_limit_button.clicked.connect(self.undo_last_exercise_limit)
         
-        left_layout.addWidget(self.abdadd_undo_limit_button, 0, Qt.AlignCenter)
-        left_layout.addSpacing(30)
+        left_layout.addWidget(self.exercise_undo_limit_button, 0, Qt.AlignCenter)
+        left_layout.addSpacing(10)
+        self._add_record_trajectory_controls(left_layout)
+        left_layout.addSpacing(10)
         
         mov_label = QLabel("MOVIMIENTO")
         mov_label.setObjectName("SectionTitleLabel")
         mov_label.setAlignment(Qt.AlignCenter)
         
-        self.abdadd_jog_status_label = QLabel("Sistema detenido")
-        self.abdadd_jog_status_label.setObjectName("JogStatusLabel")
-        self.abdadd_jog_status_label.setAlignment(Qt.AlignCenter)
-        self.abdadd_jog_status_label.setFixedHeight(25)
+        self.exercise_jog_status_label = QLabel("Sistema detenido")
+        self.exercise_jog_status_label.setObjectName("JogStatusLabel")
+        self.exercise_jog_status_label.setAlignment(Qt.AlignCenter)
+        self.exercise_jog_status_label.setFixedHeight(25)
         
         left_layout.addWidget(mov_label)
-        left_layout.addWidget(self.abdadd_jog_status_label)
-        left_layout.addSpacing(50)
-        
-        self.add_button = QPushButton()
-        self.add_button.setObjectName("ArrowButton")
-        self.add_button.setIcon(QIcon("icons/rotate_right.png"))
-        self.add_button.setIconSize(QSize(80, 80))
-        self.add_button.setFixedSize(100,100)
-        self.add_button.pressed.connect(self.on_add_press)
-        self.add_button.released.connect(self.on_abdadd_jog_release)
-        
-        self.abd_button = QPushButton()
-        self.abd_button.setObjectName("ArrowButton")
-        self.abd_button.setIcon(QIcon("icons/rotate_left.png"))
-        self.abd_button.setIconSize(QSize(80, 80))
-        self.abd_button.setFixedSize(100,100)
-        self.abd_button.pressed.connect(self.on_abd_press)
-        self.abd_button.released.connect(self.on_abdadd_jog_release)
+        left_layout.addWidget(self.exercise_jog_status_label)
+        left_layout.addSpacing(20)
         
+        # Dos flechas (izquierda, derecha): el descriptor decide sentido, icono y texto
         arrows_layout = QHBoxLayout()
-        arrows_layout.addWidget(self.abd_button)
-        arrows_layout.addSpacing(20)
-        arrows_layout.addWidget(self.add_button)
-        
         labels_layout = QHBoxLayout()
-        labels_layout.addWidget(QLabel("Abducción"), 0, Qt.AlignCenter)
-        labels_layout.addSpacing(20)
-        labels_layout.addWidget(QLabel("Aducción"), 0, Qt.AlignCenter)
+        self.exercise_arrow_buttons = []
+        self.exercise_arrow_labels = []
+        for slot in range(2):
+            btn = QPushButton()
+            btn.setObjectName("ArrowButton")
+            btn.setIconSize(QSize(80, 80))
+            btn.setFixedSize(100, 100)
+            btn.pressed.connect(lambda s=slot: self.on_exercise_jog_press(s))
+            btn.released.connect(self.on_exercise_jog_release)
+            lbl = QLabel("")
+            if slot:
+                arrows_layout.addSpacing(20)
+                labels_layout.addSpacing(20)
+            arrows_layout.addWidget(btn)
+            labels_layout.addWidget(lbl, 0, Qt.AlignCenter)
+            self.exercise_arrow_buttons.append(btn)
+            self.exercise_arrow_labels.append(lbl)
         
         left_layout.addLayout(arrows_layout)
         left_layout.addLayout(labels_layout)
+        left_layout.addSpacing(10)
+        self.exercise_fine_jog_button = self._add_fine_jog_button(left_layout)
         left_layout.addStretch()
         
+        # Columna Central: Configuración
         center_layout = QVBoxLayout()
         center_layout.setSpacing(15)
         center_layout.setAlignment(Qt.AlignCenter)
         
-        self.switch_to_flex_button = QPushButton("IR A FLEXIÓN / EXTENSIÓN")
-        self.switch_to_flex_button.setObjectName("SwitchTherapyButton")
-        self.switch_to_flex_button.setFixedSize(300, 40)
-        self.switch_to_flex_button.clicked.connect(lambda: self.start_therapy_setup("flexion_extension_page"))
-        
-        self.abdadd_save_position_button = QPushButton("GUARDAR LÍMITE ADUCCIÓN")
-        self.abdadd_save_position_button.setObjectName("SecondaryButton")
-        self.abdadd_save_position_button.setFixedSize(340, 60)
-        self.abdadd_save_position_button.clicked.connect(self.save_current_abdadd_position)
-        
-        self.adduction_feedback_label = QLabel("")
-        self.adduction_feedback_label.setObjectName("FeedbackLabel")
-        self.adduction_feedback_label.setAlignment(Qt.AlignCenter)
-        
-        self.abduction_feedback_label = QLabel("")
-        self.abduction_feedback_label.setObjectName("FeedbackLabel")
-        self.abduction_feedback_label.setAlignment(Qt.AlignCenter)
-        
-        self.abdadd_start_therapy_button = QPushButton("COMENZAR TERAPIA")
-        self.abdadd_start_therapy_button.setObjectName("SecondaryButton")
-        self.abdadd_start_therapy_button.setFixedSize(340, 60)
-        self.abdadd_start_therapy_button.clicked.connect(lambda: self.go_to_therapy_summary("Abducción/Aducción", self.abdadd_reps_value))
-        
-        self.exit_menu_button_abd = QPushButton("SALIR AL MENÚ")
-        self.exit_menu_button_abd.setObjectName("ExitMenuButton")
-        self.exit_menu_button_abd.setFixedSize(180,40)
-        self.exit_menu_button_abd.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(3))
-        
-        center_layout.addWidget(self.switch_to_flex_button, 0, Qt.AlignHCenter)
+        self.switch_exercise_button = QPushButton("")
+        self.switch_exercise_button.setObjectName("SwitchTherapyButton")
+        self.switch_exercise_button.setFixedSize(300, 40)
+        self.switch_exercise_button.clicked.connect(
+            lambda: self.start_therapy_setup(self.current_exercise.switch_to))
+        
+        self.exercise_save_position_button = QPushButton("")
+        self.exercise_save_position_button.setObjectName("SecondaryButton")
+        self.exercise_save_position_button.setFixedSize(340, 60)
+        self.exercise_save_position_button.clicked.connect(self.save_current_exercise_position)
+        
+        # Retroalimentación de cada límite: [inferior, superior]
+        self.exercise_limit_feedback_labels = []
+        for _ in range(2):
+            lbl = QLabel("")
+            lbl.setObjectName("FeedbackLabel")
+            lbl.setAlignment(Qt.AlignCenter)
+            self.exercise_limit_feedback_labels.append(lbl)
+        
+        self.exercise_start_therapy_button = QPushButton("COMENZAR TERAPIA")
+        self.exercise_start_therapy_button.setObjectName("SecondaryButton")
+        self.exercise_start_therapy_button.setFixedSize(340, 60)
+        self.exercise_start_therapy_button.clicked.connect(
+            lambda: self.go_to_therapy_summary(self.current_exercise.therapy_type, self.exercise_reps_value))
+        
+        self.exit_menu_button_exercise = QPushButton("SALIR AL MENÚ")
+        self.exit_menu_button_exercise.setObjectName("ExitMenuButton")
+        self.exit_menu_button_exercise.setFixedSize(180,40)
+        self.exit_menu_button_exercise.clicked.connect(lambda: self.stacked_widget.setCurrentIndex(3))
+        
+        center_layout.addWidget(self.switch_exercise_button, 0, Qt.AlignHCenter)
         center_layout.addStretch()
-        center_layout.addWidget(self.abdadd_save_position_button)
-        center_layout.addWidget(self.adduction_feedback_label)
-        center_layout.addWidget(self.abduction_feedback_label)
+        center_layout.addWidget(self.exercise_save_position_button)
+        for lbl in self.exercise_limit_feedback_labels:
+            center_layout.addWidget(lbl)
         center_layout.addStretch()
-        center_layout.addWidget(self.abdadd_start_therapy_button)
-        center_layout.addWidget(self.exit_menu_button_abd, 0, Qt.AlignHCenter)
+        center_layout.addWidget(self.exercise_start_therapy_button)
+        center_layout.addWidget(self.exit_menu_button_exercise, 0, Qt.AlignHCenter)
         
+        # Columna Derecha: Teclado
         right_layout = QVBoxLayout()
         right_layout.setAlignment(Qt.AlignTop)
         right_layout.addSpacing(50)
         
-        reps_label = QLabel("Número de repeticiones")
-        reps_label.setObjectName("SectionTitleLabel")
-        reps_label.setAlignment(Qt.AlignCenter)
+        self.exercise_keypad_title_label = QLabel("Número de repeticiones")
+        self.exercise_keypad_title_label.setObjectName("SectionTitleLabel")
+        self.exercise_keypad_title_label.setAlignment(Qt.AlignCenter)
         
-        self.abdadd_keypad_display = QLabel("")
-        self.abdadd_keypad_display.setObjectName("KeypadDisplay")
-        self.abdadd_keypad_display.setFixedSize(220,50)
+        self.exercise_keypad_display = QLabel("")
+        self.exercise_keypad_display.setObjectName("KeypadDisplay")
+        self.exercise_keypad_display.setFixedSize(220,50)
         
-        self.abdadd_reps_feedback_label = QLabel("")
-        self.abdadd_reps_feedback_label.setObjectName("FeedbackLabel")
-        self.abdadd_reps_feedback_label.setAlignment(Qt.AlignCenter)
+        self.exercise_reps_feedback_label = QLabel("")
+        self.exercise_reps_feedback_label.setObjectName("FeedbackLabel")
+        self.exercise_reps_feedback_label.setAlignment(Qt.AlignCenter)
         
         kg = QGridLayout()
         kg.setSpacing(5)
-        self.abdadd_keypad_buttons = {}
+        self.exercise_keypad_buttons = {}
         for i, n in enumerate([1,2,3,4,5,6,7,8,9,-1,0,-2]):
             btn = QPushButton("DEL" if n==-1 else "OK" if n==-2 else str(n))
             btn.setObjectName("NumberButtonRed" if n==-1 else "NumberButtonGreen" if n==-2 else "NumberButton")
-            if n==-1: btn.clicked.connect(self.abdadd_keypad_delete)
-            elif n==-2: btn.clicked.connect(self.abdadd_keypad_confirm)
-            else: btn.clicked.connect(lambda _, x=n: self.abdadd_keypad_add_digit(x))
+            if n==-1: btn.clicked.connect(self.exercise_keypad_delete)
+            elif n==-2: btn.clicked.connect(self.exercise_keypad_confirm)
+            else: btn.clicked.connect(lambda _, x=n: self.exercise_keypad_add_digit(x))
             kg.addWidget(btn, i//3, i%3)
-            self.abdadd_keypad_buttons[n] = btn
+            self.exercise_keypad_buttons[n] = btn
+            
+        # El mismo teclado sirve para teclear el límite (cm / grados) en vez de buscarlo con el jog
+        self.exercise_keypad_mode_button = QPushButton("INGRESAR LÍMITE")
+        self.exercise_keypad_mode_button.setObjectName("UndoButton")
+        self.exercise_keypad_mode_button.setFixedSize(180, 40)
+        self.exercise_keypad_mode_button.clicked.connect(self.toggle_exercise_keypad_mode)
             
-        right_layout.addWidget(reps_label)
-        right_layout.addWidget(self.abdadd_keypad_display, 0, Qt.AlignCenter)
+        right_layout.addWidget(self.exercise_keypad_title_label)
+        right_layout.addWidget(self.exercise_keypad_display, 0, Qt.AlignCenter)
         right_layout.addLayout(kg)
-        right_layout.addWidget(self.abdadd_reps_feedback_label)
+        right_layout.addWidget(self.exercise_reps_feedback_label)
+        right_layout.addWidget(self.exercise_keypad_mode_button, 0, Qt.AlignCenter)
         right_layout.addStretch()
         
         content_layout = QHBoxLayout()
@@ -1383,12 +3002,14 @@ class RehabilitationApp(QMainWindow):
         content_layout.addLayout(center_layout, 3)
         content_layout.addLayout(right_layout, 2)
         
-        l.addWidget(self.create_header(p, False, "Abducción / Aducción"))
+        header = self.create_header(p, False, "")
+        self.exercise_title_label = header.findChild(QLabel, "TherapyTitleLabel")
+        l.addWidget(header)
         l.addLayout(content_layout)
         
-        self.abdadd_interactive_widgets = [self.abdadd_save_position_button, self.abdadd_start_therapy_button, self.abdadd_undo_limit_button, self.add_button, self.abd_button, self.switch_to_flex_button, self.exit_menu_button_abd] + list(self.abdadd_keypad_buttons.values())
+        self.exercise_interactive_widgets = [self.exercise_save_position_button, self.exercise_start_therapy_button, self.exercise_undo_limit_button, self.switch_exercise_button, self.exit_menu_button_exercise, self.exercise_keypad_mode_button, self.exercise_fine_jog_button] + list(self.exercise_keypad_buttons.values())
         return p
-    
+
     def create_therapy_summary_page(self):
         p = QWidget()
         p.setObjectName("TherapySummaryPage")
@@ -1431,6 +3052,25 @@ class RehabilitationApp(QMainWindow):
         self.start_stop_button.setFixedSize(380, 80)
         self.start_stop_button.clicked.connect(self.toggle_therapy_session)
         
+        self.pause_resume_button = QPushButton("PAUSAR")
+        self.pause_resume_button.setObjectName("SecondaryButton")
+        self.pause_resume_button.setFixedSize(200, 60)
+        self.pause_resume_button.clicked.connect(self.toggle_therapy_pause)
+        self.pause_resume_button.setEnabled(False)
+        
+        # Solo para la trayectoria grabada: multiplicador de velocidad de la reproducción
+        self.trajectory_speed_button = QPushButton()
+        self.trajectory_speed_button.setObjectName("SecondaryButton")
+        self.trajectory_speed_button.setFixedSize(200, 60)
+        self.trajectory_speed_button.clicked.connect(self.cycle_trajectory_speed)
+        self.trajectory_speed_button.hide()
+        self._update_trajectory_speed_button()
+        
+        self.add_to_plan_button = QPushButton("AÑADIR A SESIÓN")
+        self.add_to_plan_button.setObjectName("SecondaryButton")
+        self.add_to_plan_button.setFixedSize(200, 60)
+        self.add_to_plan_button.clicked.connect(self.add_current_to_session_plan)
+        
         center_col.addStretch()
         center_col.addWidget(self.therapy_title_label, 0, Qt.AlignCenter)
         center_col.addWidget(self.summary_params_label, 0, Qt.AlignCenter)
@@ -1457,6 +3097,12 @@ class RehabilitationApp(QMainWindow):
         right_col.addStretch(1)  
         right_col.addWidget(self.therapy_status_label)
         right_col.addStretch(1) 
+        right_col.addWidget(self.trajectory_speed_button, 0, Qt.AlignCenter)
+        right_col.addSpacing(10)
+        right_col.addWidget(self.pause_resume_button, 0, Qt.AlignCenter)
+        right_col.addSpacing(10)
+        right_col.addWidget(self.add_to_plan_button, 0, Qt.AlignCenter)
+        right_col.addSpacing(10)
         right_col.addWidget(self.summary_back_button, 0, Qt.AlignCenter | Qt.AlignBottom)
         
         content_layout.addLayout(right_col, 1) 
@@ -1464,259 +3110,326 @@ class RehabilitationApp(QMainWindow):
         main_layout.addLayout(content_layout)
         return p
 
+    def _add_record_trajectory_controls(self, layout):
+        """Botón de grabación (sigue activo al cambiar de ejercicio: se puede enseñar un eje y luego el otro)."""
+        button = QPushButton("GRABAR TRAYECTORIA")
+        button.setObjectName("UndoButton")
+        button.setFixedSize(180, 40)
+        button.clicked.connect(self.toggle_trajectory_recording)
+        
+        label = QLabel("")
+        label.setObjectName("FeedbackLabel")
+        label.setAlignment(Qt.AlignCenter)
+        
+        layout.addWidget(button, 0, Qt.AlignCenter)
+        layout.addWidget(label)
+        self.record_trajectory_buttons.append(button)
+        self.trajectory_feedback_labels.append(label)
+
+    def _add_fine_jog_button(self, layout):
+        """Conmutador del modo paso fino: cada toque de flecha avanza una cantidad exacta."""
+        button = QPushButton()
+        button.setObjectName("UndoButton")
+        button.setFixedSize(180, 40)
+        button.clicked.connect(self.toggle_fine_jog_mode)
+        layout.addWidget(button, 0, Qt.AlignCenter)
+        self.fine_jog_buttons.append(button)
+        self._update_fine_jog_buttons()
+        return button
+
+    def toggle_fine_jog_mode(self):
+        self.jog_fine_mode = not self.jog_fine_mode
+        self._update_fine_jog_buttons()
+
+    def _update_fine_jog_buttons(self):
+        for button in self.fine_jog_buttons:
+            button.setText("PASO FINO: SÍ" if self.jog_fine_mode else "PASO FINO: NO")
+
+    def _on_page_changed(self, index):
+        if index == 3:
+            self.combined_button.setEnabled(self._combined_limits_ready())
+            self.trajectory_button.setEnabled(self.trajectory_info is not None)
+            self._update_session_plan_buttons()
+        if index in (3, 5) and self.trajectory_recording:
+            # Volver al menú o pasar al resumen termina la grabación
+            self.toggle_trajectory_recording()
+
+    def _combined_limits_ready(self):
+        return (self.extension_limite_saved and self.flexion_limite_saved
+                and self.adduction_limite_saved and self.abduction_limite_saved)
+
+    def _emit_jog_start(self, motor_type, direction, enforce_soft_limits=True):
+        """Antes que cualquier cambio visual: el instante de pulsar viaja con la orden."""
+        self.trigger_start_continuous_jog.emit(motor_type, direction, enforce_soft_limits, time.perf_counter())
+
+    def _emit_jog_stop(self):
+        # Ruta rápida (corta el PWM desde este hilo) y luego la contabilidad en el worker
+        self.worker.fast_stop_jog(time.perf_counter())
+        self.trigger_stop_continuous_jog.emit()
+
     def _update_jog_label_style(self, label, is_active):
         label.setProperty("active", is_active)
         label.style().unpolish(label)
         label.style().polish(label)
 
     # ==========================================================================
-    # LÓGICA DE PÁGINA: FLEXIÓN / EXTENSIÓN
+    # LÓGICA DE PÁGINA: EJERCICIO (FLEXIÓN / EXTENSIÓN, ABDUCCIÓN / ADUCCIÓN)
     # ==========================================================================
 
-    def reset_flexext_page_state(self):
-        self.extension_limite_saved = False
-        self.flexion_limite_saved = False
-        self.flexext_reps_value = 0
-        self.flexext_keypad_string = ""
-        
-        self.extension_feedback_label.setText("")
-        self.flexion_feedback_label.setText("")
-        self.flexext_reps_feedback_label.setText("")
-        self.flexext_keypad_display.setText("")
-        self.flexext_jog_status_label.setText("Sistema detenido")
-        self._update_jog_label_style(self.flexext_jog_status_label, False)
-        
-        self.flexext_save_position_button.setText("GUARDAR LÍMITE EXTENSIÓN")
-        self.flexext_save_position_button.setEnabled(True)
-        self.flexext_undo_limit_button.setEnabled(False)
-        self.ext_button.setDisabled(True)
-        self.flex_button.setDisabled(False)
-        self.check_flexext_ready_state()
-
-    def set_flexext_jogging_mode(self, is_jogging):
-        for w in self.flexext_interactive_widgets: 
-            if w not in [self.flex_button, self.ext_button]: 
-                w.setEnabled(not is_jogging)
+    def bind_exercise_page(self, key):
+        """Enlaza la página de ejercicio al descriptor: textos, iconos y flechas."""
+        ex = EJERCICIOS[key]
+        self.current_exercise = ex
+        self.exercise_title_label.setText(ex.title)
+        self.exercise_arrow_by_direction = {}
+        for btn, lbl, arrow in zip(self.exercise_arrow_buttons, self.exercise_arrow_labels, ex.arrows):
+            btn.setIcon(QIcon(arrow.icon))
+            lbl.setText(arrow.label)
+            self.exercise_arrow_by_direction[arrow.direction] = btn
+        self.switch_exercise_button.setVisible(ex.switch_to is not None)
+        if ex.switch_to is not None:
+            self.switch_exercise_button.setText(f"IR A {EJERCICIOS[ex.switch_to].title.upper()}")
+
+    def _exercise_arrow_button(self, direction):
+        return self.exercise_arrow_by_direction[direction]
+
+    def reset_exercise_page_state(self):
+        ex = self.current_exercise
+        setattr(self, ex.saved_attr(0), False)
+        setattr(self, ex.saved_attr(1), False)
+        self.exercise_reps_value = 0
+        self.exercise_keypad_string = ""
+        self.limit_entry_pending = None
+        self._set_exercise_keypad_mode("reps")
+        
+        for lbl in self.exercise_limit_feedback_labels:
+            lbl.setText("")
+        self.exercise_reps_feedback_label.setText("")
+        self.exercise_keypad_display.setText("")
+        self.exercise_jog_status_label.setText("Sistema detenido")
+        self._update_jog_label_style(self.exercise_jog_status_label, False)
+        
+        self.exercise_save_position_button.setText(f"GUARDAR LÍMITE {ex.names[0].upper()}")
+        self.exercise_save_position_button.setEnabled(True)
+        self.exercise_undo_limit_button.setEnabled(False)
+        self._exercise_arrow_button(-1).setDisabled(True)
+        self._exercise_arrow_button(1).setDisabled(False)
+        self.check_exercise_ready_state()
+
+    def set_exercise_jogging_mode(self, is_jogging):
+        for w in self.exercise_interactive_widgets: 
+            w.setEnabled(not is_jogging)
         if not is_jogging: 
-            self.check_flexext_ready_state()
-
-    def on_flex_press(self): 
-        self.ext_button.setEnabled(True)
-        self.set_flexext_jogging_mode(True)
-        self.flexext_jog_status_label.setText("Flexión...")
-        self._update_jog_label_style(self.flexext_jog_status_label, True)
-        self.trigger_start_continuous_jog.emit('lineal', 1, True)
-
-    def on_ext_press(self): 
-        self.flex_button.setEnabled(True)
-        self.set_flexext_jogging_mode(True)
-        self.flexext_jog_status_label.setText("Extensión...")
-        self._update_jog_label_style(self.flexext_jog_status_label, True)
-        self.trigger_start_continuous_jog.emit('lineal', -1, True)
-
-    def on_flexext_jog_release(self): 
-        self.trigger_stop_continuous_jog.emit()
-        self.set_flexext_jogging_mode(False)
+            self.check_exercise_ready_state()
+
+    def on_exercise_jog_press(self, slot):
+        arrow = self.current_exercise.arrows[slot]
+        if self.jog_fine_mode:
+            self.trigger_jog_nudge.emit(self.current_exercise.motor, arrow.direction, True)
+            return
+        self._emit_jog_start(self.current_exercise.motor, arrow.direction)
+        self._exercise_arrow_button(-arrow.direction).setEnabled(True)
+        self.set_exercise_jogging_mode(True)
+        self.exercise_jog_status_label.setText(f"{arrow.label}...")
+        self._update_jog_label_style(self.exercise_jog_status_label, True)
+
+    def on_exercise_jog_release(self): 
+        if self.jog_fine_mode:
+            return
+        self._emit_jog_stop()
+        self.set_exercise_jogging_mode(False)
 
         # Verificación de Hardware
-        if IS_RASPBERRY_PI and self.worker.pi:
-            if self.worker.pi.read(LIN_LIMIT_IN_PIN) != SENSORES_NIVEL_ACTIVO:
-                self.flex_button.setEnabled(True)
-            
-            if self.worker.pi.read(LIN_LIMIT_OUT_PIN) != SENSORES_NIVEL_ACTIVO:
-                self.ext_button.setEnabled(True)
+        for btn, arrow in zip(self.exercise_arrow_buttons, self.current_exercise.arrows):
+            if self.worker.read_input(arrow.guard_pin) != SENSORES_NIVEL_ACTIVO:
+                btn.setEnabled(True)
+
+    def save_current_exercise_position(self):
+        ex = self.current_exercise
+        if ex.motor == 'lineal':
+            pos = self.worker.posicion_lineal
+            disp = ex.units.text(pos - self.worker.cero_terapia_lineal)
         else:
-            self.flex_button.setEnabled(True)
-            self.ext_button.setEnabled(True)
-
-
-    def save_current_flexext_position(self):
-        pos = self.worker.posicion_lineal
-        cm = (pos - self.worker.cero_terapia_lineal) * LINEAL_CM_POR_PASO
-        disp_cm = max(0.0, cm)
-        
-        if not self.extension_limite_saved:
-            self.extension_limite_pasos = pos
-            self.extension_limite_saved = True
-            self.extension_feedback_label.setText(f"Extensión: {disp_cm:.2f} cm Guardado ✓")
-            self.extension_feedback_label.setStyleSheet("color: #27ae60;") 
-            self.flexext_save_position_button.setText("GUARDAR LÍMITE FLEXIÓN")
-            self.flexext_undo_limit_button.setEnabled(True)
-        elif not self.flexion_limite_saved:
-            if pos <= self.extension_limite_pasos:
-                self.flexion_feedback_label.setText("Flexión debe ser mayor que extensión.")
-                self.flexion_feedback_label.setStyleSheet("color: red;")
-                QTimer.singleShot(2000, lambda: self.flexion_feedback_label.setText(""))
+            pos = self.worker.posicion_rotacional
+            disp = ex.units.text(pos - self.worker.cero_terapia_rotacional)
+        low_lbl, high_lbl = self.exercise_limit_feedback_labels
+        
+        if not getattr(self, ex.saved_attr(0)):
+            setattr(self, ex.steps_attr(0), pos)
+            setattr(self, ex.saved_attr(0), True)
+            low_lbl.setText(f"{ex.names[0]}: {disp} Guardado ✓")
+            low_lbl.setStyleSheet("color: #27ae60;") 
+            self.exercise_save_position_button.setText(f"GUARDAR LÍMITE {ex.names[1].upper()}")
+            self.exercise_undo_limit_button.setEnabled(True)
+        elif not getattr(self, ex.saved_attr(1)):
+            if pos <= getattr(self, ex.steps_attr(0)):
+                high_lbl.setText(f"{ex.names[1]} debe ser mayor que {ex.names[0].lower()}.")
+                high_lbl.setStyleSheet("color: red;")
+                self.scheduler.schedule(2000, lambda: high_lbl.setText(""), "ui", key="exercise_feedback")
                 return 
-            self.flexion_limite_pasos = pos
-            self.flexion_limite_saved = True
-            self.flexion_feedback_label.setText(f"Flexión: {disp_cm:.2f} cm Guardado ✓")
-            self.flexion_feedback_label.setStyleSheet("color: #27ae60;")
-            self.flexext_save_position_button.setEnabled(False)
-        self.check_flexext_ready_state()
-
-    def undo_last_flexext_limit(self):
-        if self.flexion_limite_saved: 
-            self.flexion_limite_saved = False
-            self.flexion_feedback_label.setText("")
-            self.flexext_save_position_button.setText("GUARDAR LÍMITE FLEXIÓN")
-            self.flexext_save_position_button.setEnabled(True)
-        elif self.extension_limite_saved: 
-            self.extension_limite_saved = False
-            self.extension_feedback_label.setText("")
-            self.flexext_save_position_button.setText("GUARDAR LÍMITE EXTENSIÓN")
-            self.flexext_undo_limit_button.setEnabled(False)
-        self.check_flexext_ready_state()
-
-    def flexext_keypad_add_digit(self, d): 
-        if len(self.flexext_keypad_string) < 3: 
-            self.flexext_keypad_string += str(d)
-            self.flexext_keypad_display.setText(self.flexext_keypad_string)
-
-    def flexext_keypad_delete(self): 
-        self.flexext_keypad_string = self.flexext_keypad_string[:-1]
-        self.flexext_keypad_display.setText(self.flexext_keypad_string)
-
-    def flexext_keypad_confirm(self):
-        val = int(self.flexext_keypad_string) if self.flexext_keypad_string else 0
-
-        if val > 50:
-            val = 50
-            self.flexext_keypad_string = "50"
-            self.flexext_keypad_display.setText("50")
-
-        self.flexext_reps_value = val
-        self.flexext_reps_feedback_label.setText(f"Reps: {self.flexext_reps_value} ✓")
-        self.check_flexext_ready_state()
-
-    def check_flexext_ready_state(self): 
-        ready = self.flexion_limite_saved and self.extension_limite_saved and self.flexext_reps_value > 0
-        self.flexext_start_therapy_button.setEnabled(ready)
-
-    # ==========================================================================
-    # LÓGICA DE PÁGINA: ABDUCCIÓN / ADUCCIÓN
-    # ==========================================================================
+            setattr(self, ex.steps_attr(1), pos)
+            setattr(self, ex.saved_attr(1), True)
+            high_lbl.setText(f"{ex.names[1]}: {disp} Guardado ✓")
+            high_lbl.setStyleSheet("color: #27ae60;")
+            self.exercise_save_position_button.setEnabled(False)
+        self._refresh_limit_entry()
+        self.check_exercise_ready_state()
+
+    def undo_last_exercise_limit(self):
+        ex = self.current_exercise
+        low_lbl, high_lbl = self.exercise_limit_feedback_labels
+        if getattr(self, ex.saved_attr(1)): 
+            setattr(self, ex.saved_attr(1), False)
+            high_lbl.setText("")
+            self.exercise_save_position_button.setText(f"GUARDAR LÍMITE {ex.names[1].upper()}")
+            self.exercise_save_position_button.setEnabled(True)
+        elif getattr(self, ex.saved_attr(0)): 
+            setattr(self, ex.saved_attr(0), False)
+            low_lbl.setText("")
+            self.exercise_save_position_button.setText(f"GUARDAR LÍMITE {ex.names[0].upper()}")
+            self.exercise_undo_limit_button.setEnabled(False)
+        self._refresh_limit_entry()
+        self.check_exercise_ready_state()
+
+    def exercise_keypad_add_digit(self, d): 
+        if len(self.exercise_keypad_string) < (4 if self.exercise_keypad_mode == "limit" else 3): 
+            self.exercise_keypad_string += str(d)
+            self._update_exercise_keypad_display()
+
+    def exercise_keypad_delete(self): 
+        self.exercise_keypad_string = self.exercise_keypad_string[:-1]
+        self._update_exercise_keypad_display()
+
+    def _update_exercise_keypad_display(self):
+        text = self.exercise_keypad_string
+        if self.exercise_keypad_mode == "limit" and text:
+            # Punto fijo con los decimales del eje: "250" -> 2.50 cm, "125" -> 12.5°
+            text = self.current_exercise.units.format_q(int(text))
+        self.exercise_keypad_display.setText(text)
+
+    def _next_exercise_limit(self):
+        """Límite que toca guardar (0 inferior, 1 superior) o None si ya están ambos."""
+        ex = self.current_exercise
+        for which in (0, 1):
+            if not getattr(self, ex.saved_attr(which)):
+                return which
+        return None
+
+    def toggle_exercise_keypad_mode(self):
+        if self.exercise_keypad_mode == "reps" and self._next_exercise_limit() is not None:
+            self._set_exercise_keypad_mode("limit")
+        else:
+            self._set_exercise_keypad_mode("reps")
+
+    def _set_exercise_keypad_mode(self, mode):
+        self.exercise_keypad_mode = mode
+        if mode == "limit":
+            ex = self.current_exercise
+            self.exercise_keypad_string = ""
+            self.exercise_keypad_title_label.setText(
+                f"Límite {ex.names[self._next_exercise_limit()]} ({ex.units.suffix.strip()})")
+            self.exercise_keypad_mode_button.setText("REPETICIONES")
+        else:
+            self.exercise_keypad_string = str(self.exercise_reps_value) if self.exercise_reps_value else ""
+            self.exercise_keypad_title_label.setText("Número de repeticiones")
+            self.exercise_keypad_mode_button.setText("INGRESAR LÍMITE")
+        self._update_exercise_keypad_display()
+
+    def _refresh_limit_entry(self):
+        """Tras guardar o deshacer: el teclado pide el siguiente límite o vuelve a las repeticiones."""
+        if self.exercise_keypad_mode == "limit":
+            self._set_exercise_keypad_mode("limit" if self._next_exercise_limit() is not None else "reps")
+
+    def _confirm_limit_entry(self):
+        """Valor tecleado -> movimiento absoluto exacto; el límite se guarda al llegar."""
+        ex = self.current_exercise
+        which = self._next_exercise_limit()
+        if which is None:
+            self._set_exercise_keypad_mode("reps")
+            return
+        q = int(self.exercise_keypad_string) if self.exercise_keypad_string else 0
+        zero = self.worker.cero_terapia_lineal if ex.motor == 'lineal' else self.worker.cero_terapia_rotacional
+        target = int(zero) + ex.units.steps_for_units(q / ex.units.scale)
+        
+        error = None
+        if ex.units.max_q is not None and q > ex.units.max_q:
+            error = f"Máximo {ex.units.format_q(ex.units.max_q)}"
+        elif which == 1 and target <= getattr(self, ex.steps_attr(0)):
+            error = f"{ex.names[1]} debe ser mayor que {ex.names[0].lower()}."
+        if error:
+            lbl = self.exercise_limit_feedback_labels[which]
+            lbl.setText(error)
+            lbl.setStyleSheet("color: red;")
+            self.scheduler.schedule(2000, lambda: lbl.setText(""), "ui", key="exercise_feedback")
+            return
+        
+        self.limit_entry_pending = which
+        self.set_exercise_jogging_mode(True)
+        for btn in self.exercise_arrow_buttons:
+            btn.setEnabled(False)
+        self.exercise_jog_status_label.setText(f"Hacia {ex.units.format_q(q)}...")
+        self._update_jog_label_style(self.exercise_jog_status_label, True)
+        self.trigger_move_to_position.emit(ex.motor, target)
+
+    def _on_limit_entry_finished(self, success):
+        which, self.limit_entry_pending = self.limit_entry_pending, None
+        self._update_jog_label_style(self.exercise_jog_status_label, False)
+        self.set_exercise_jogging_mode(False)
+        for btn, arrow in zip(self.exercise_arrow_buttons, self.current_exercise.arrows):
+            if self.worker.read_input(arrow.guard_pin) != SENSORES_NIVEL_ACTIVO:
+                btn.setEnabled(True)
+        if not success:
+            lbl = self.exercise_limit_feedback_labels[which]
+            lbl.setText("Movimiento no completado: no se guardó")
+            lbl.setStyleSheet("color: red;")
+            return
+        self.save_current_exercise_position()
 
-    def reset_abdadd_page_state(self):
-        self.adduction_limite_saved = False
-        self.abduction_limite_saved = False
-        self.abdadd_reps_value = 0
-        self.abdadd_keypad_string = ""
-        
-        self.adduction_feedback_label.setText("")
-        self.abduction_feedback_label.setText("")
-        self.abdadd_reps_feedback_label.setText("")
-        self.abdadd_keypad_display.setText("")
-        self.abdadd_jog_status_label.setText("Sistema detenido")
-        self._update_jog_label_style(self.abdadd_jog_status_label, False)
-        
-        self.abdadd_save_position_button.setText("GUARDAR LÍMITE ADUCCIÓN")
-        self.abdadd_save_position_button.setEnabled(True)
-        self.abdadd_undo_limit_button.setEnabled(False)
-        self.add_button.setDisabled(True)
-        self.abd_button.setDisabled(False)
-        self.check_abdadd_ready_state()
-
-    def set_abdadd_jogging_mode(self, is_jogging):
-        for w in self.abdadd_interactive_widgets: 
-            if w not in [self.add_button, self.abd_button]: 
-                w.setEnabled(not is_jogging)
-        if not is_jogging: 
-            self.check_abdadd_ready_state()
-
-    def on_add_press(self): 
-        self.abd_button.setEnabled(True)
-        self.set_abdadd_jogging_mode(True)
-        self.abdadd_jog_status_label.setText("Aducción...")
-        self._update_jog_label_style(self.abdadd_jog_status_label, True)
-        self.trigger_start_continuous_jog.emit('rotacional', -1, True)
-
-    def on_abd_press(self): 
-        self.add_button.setEnabled(True)
-        self.set_abdadd_jogging_mode(True)
-        self.abdadd_jog_status_label.setText("Abducción...")
-        self._update_jog_label_style(self.abdadd_jog_status_label, True)
-        self.trigger_start_continuous_jog.emit('rotacional', 1, True)
-
-    def on_abdadd_jog_release(self): 
-        self.trigger_stop_continuous_jog.emit()
-        self.set_abdadd_jogging_mode(False)
+    def exercise_keypad_confirm(self):
+        if self.exercise_keypad_mode == "limit":
+            self._confirm_limit_entry()
+            return
+        val = int(self.exercise_keypad_string) if self.exercise_keypad_string else 0
 
-        # Verificación de Hardware
-        if IS_RASPBERRY_PI and self.worker.pi:
-            if self.worker.pi.read(ROT_LIMIT_IN_PIN) != SENSORES_NIVEL_ACTIVO:
-                self.add_button.setEnabled(True)
-            
-            if self.worker.pi.read(ROT_LIMIT_OUT_PIN) != SENSORES_NIVEL_ACTIVO:
-                self.abd_button.setEnabled(True)
-        else:
-            self.add_button.setEnabled(True)
-            self.abd_button.setEnabled(True)
-
-
-    def save_current_abdadd_position(self):
-        pos = self.worker.posicion_rotacional
-        deg = (pos - self.worker.cero_terapia_rotacional) * ROTACIONAL_GRADOS_POR_PASO
-        disp_deg = max(0.0, min(MAX_GRADOS_ABD, deg))
-        
-        if not self.adduction_limite_saved:
-            self.adduction_limite_pasos = pos
-            self.adduction_limite_saved = True
-            self.adduction_feedback_label.setText(f"Aducción: {disp_deg:.1f}° ✓")
-            self.adduction_feedback_label.setStyleSheet("color: #27ae60;")
-            self.abdadd_save_position_button.setText("GUARDAR LÍMITE ABDUCCIÓN")
-            self.abdadd_undo_limit_button.setEnabled(True)
-        elif not self.abduction_limite_saved:
-            if pos <= self.adduction_limite_pasos:
-                self.abduction_feedback_label.setText("Abd. debe ser mayor que Ad.")
-                self.abduction_feedback_label.setStyleSheet("color: red;")
-                QTimer.singleShot(2000, lambda: self.abduction_feedback_label.setText(""))
-                return
-            self.abduction_limite_pasos = pos
-            self.abduction_limite_saved = True
-            self.abduction_feedback_label.setText(f"Abducción: {disp_deg:.1f}° ✓")
-            self.abduction_feedback_label.setStyleSheet("color: #27ae60;")
-            self.abdadd_save_position_button.setEnabled(False)
-        self.check_abdadd_ready_state()
-
-    def undo_last_abdadd_limit(self):
-        if self.abduction_limite_saved: 
-            self.abduction_limite_saved = False
-            self.abduction_feedback_label.setText("")
-            self.abdadd_save_position_button.setText("GUARDAR LÍMITE ABDUCCIÓN")
-            self.abdadd_save_position_button.setEnabled(True)
-        elif self.adduction_limite_saved: 
-            self.adduction_limite_saved = False
-            self.adduction_feedback_label.setText("")
-            self.abdadd_save_position_button.setText("GUARDAR LÍMITE ADUCCIÓN")
-            self.abdadd_undo_limit_button.setEnabled(False)
-        self.check_abdadd_ready_state()
-
-    def abdadd_keypad_add_digit(self, d): 
-        if len(self.abdadd_keypad_string) < 3: 
-            self.abdadd_keypad_string += str(d)
-            self.abdadd_keypad_display.setText(self.abdadd_keypad_string)
-
-    def abdadd_keypad_delete(self): 
-        self.abdadd_keypad_string = self.abdadd_keypad_string[:-1]
-        self.abdadd_keypad_display.setText(self.abdadd_keypad_string)
-
-    def abdadd_keypad_confirm(self):
-        # Obtener el valor numérico (o 0 si está vacío)
-        val = int(self.abdadd_keypad_string) if self.abdadd_keypad_string else 0
-                
         if val > 50:
             val = 50
-            self.abdadd_keypad_string = str(val)
-            self.abdadd_keypad_display.setText(str(val))
-
-        self.abdadd_reps_value = val
-        self.abdadd_reps_feedback_label.setText(f"Reps: {self.abdadd_reps_value} ✓")
-        self.check_abdadd_ready_state()
+            self.exercise_keypad_string = "50"
+            self.exercise_keypad_display.setText("50")
+
+        self.exercise_reps_value = val
+        self.exercise_reps_feedback_label.setText(f"Reps: {self.exercise_reps_value} ✓")
+        self.check_exercise_ready_state()
+
+    def open_reps_page(self, therapy_type):
+        """Combinado y trayectoria no pasan por la página de ejercicio: se piden aquí las repeticiones."""
+        self.reps_page_type = therapy_type
+        self.reps_page_string = ""
+        self.reps_page_title_label.setText(therapy_type.upper())
+        self.reps_page_display.setText("")
+        self.reps_page_feedback_label.setText("")
+        self.stacked_widget.setCurrentIndex(7)
+
+    def reps_page_add_digit(self, d):
+        if len(self.reps_page_string) < 3:
+            self.reps_page_string += str(d)
+            self.reps_page_display.setText(self.reps_page_string)
+
+    def reps_page_delete(self):
+        self.reps_page_string = self.reps_page_string[:-1]
+        self.reps_page_display.setText(self.reps_page_string)
+
+    def reps_page_confirm(self):
+        val = min(int(self.reps_page_string) if self.reps_page_string else 0, 50)
+        if val <= 0:
+            self.reps_page_feedback_label.setText("Ingrese el número de repeticiones")
+            self.scheduler.schedule(2000, lambda: self.reps_page_feedback_label.setText(""), "ui", key="reps_feedback")
+            return
+        self.go_to_therapy_summary(self.reps_page_type, val)
 
-    def check_abdadd_ready_state(self): 
-        ready = self.adduction_limite_saved and self.abduction_limite_saved and self.abdadd_reps_value > 0
-        self.abdadd_start_therapy_button.setEnabled(ready)
+    def check_exercise_ready_state(self): 
+        ex = self.current_exercise
+        ready = getattr(self, ex.saved_attr(0)) and getattr(self, ex.saved_attr(1)) and self.exercise_reps_value > 0
+        self.exercise_start_therapy_button.setEnabled(ready)
 
     # ==========================================================================
     # SECUENCIA DE INICIO Y CALIBRACIÓN
@@ -1724,6 +3437,8 @@ class RehabilitationApp(QMainWindow):
 
     def start_rehabilitation(self):
         if self.physical_estop_active or self.software_estop_active: return
+        self.recovery_snapshot = None
+        self.recover_button.hide()
         self.system_state = "CALIBRATING"
         self.loading_status_label.setText("CALIBRANDO SISTEMA...")
         self.progress_bar.setValue(0)
@@ -1731,20 +3446,44 @@ class RehabilitationApp(QMainWindow):
         self.gears_movie.start()
         self.trigger_calibration.emit()
 
-    def start_therapy_setup(self, therapy_page_name):
+    def start_therapy_setup(self, exercise_key):
         if self.physical_estop_active or self.software_estop_active: return
-        self.pending_therapy_page = therapy_page_name
-        self.system_state = "RESETTING_ROTATIONAL"
+        self.pending_exercise = exercise_key
+        if self._start_position_established():
+            self._switch_exercise_fast()
+        else:
+            self.start_go_to_start_sequence("exercise_page")
+
+    def _start_position_established(self):
+        """El cero de terapia ya es la posición de inicio (hubo un reset completo desde la calibración)."""
+        return (self.system_calibrated and self.system_state == "IDLE" and not self.therapy_in_progress
+                and int(self.worker.cero_terapia_lineal) == POSICION_INICIO_LINEAL_PASOS
+                and int(self.worker.cero_terapia_rotacional) == POSICION_INICIO_ROTACIONAL_PASOS)
+
+    def _switch_exercise_fast(self):
+        """
+        Cambio de ejercicio sin el reset secuencial: solo se mueven los ejes que
+        quedaron fuera del cero, y ambos a la vez (movimiento interpolado).
+        """
+        lin_diff = int(self.worker.cero_terapia_lineal - self.worker.posicion_lineal)
+        rot_diff = int(self.worker.cero_terapia_rotacional - self.worker.posicion_rotacional)
+        if not lin_diff and not rot_diff:
+            print("[UI] Cambio de ejercicio: ejes ya en el inicio.")
+            self.go_to_exercise_page(self.pending_exercise)
+            return
+        
+        print(f"[UI] Cambio de ejercicio: volviendo al inicio (lineal {lin_diff}, rotacional {rot_diff} pasos).")
+        self.pending_therapy_page = "exercise_page"
+        self.system_state = "SWITCHING_EXERCISE"
         self.loading_status_label.setText("MOVIENDO A POSICIÓN DE INICIO...")
         self.progress_bar.setValue(0)
-        self.stacked_widget.setCurrentIndex(1) 
+        self.stacked_widget.setCurrentIndex(1)
         self.gears_movie.start()
-        self.move_start_time = time.time() 
-        self.trigger_go_to_therapy_start.emit("rotacional")
+        self.trigger_move_steps_combined.emit(lin_diff, rot_diff)
 
-    def start_go_to_start_sequence(self):
+    def start_go_to_start_sequence(self, pending_page="rehab_selection_page"):
         if self.physical_estop_active or self.software_estop_active: return
-        self.pending_therapy_page = "rehab_selection_page" 
+        self.pending_therapy_page = pending_page
         self.system_state = "RESETTING_ROTATIONAL"
         self.loading_status_label.setText("MOVIENDO A POSICIÓN DE INICIO...")
         self.progress_bar.setValue(0)
@@ -1785,7 +3524,7 @@ class RehabilitationApp(QMainWindow):
                 self._start_linear_reset_step()
             else:
                 self.loading_status_label.setText("ESPERANDO SEGUNDO MOTOR...")
-                QTimer.singleShot(1500, self._start_linear_reset_step)
+                self.scheduler.schedule(1500, self._start_linear_reset_step, "calibracion")
             
         # 2. TERMINÓ LINEAL (Reset)
         elif self.system_state == "RESETTING_LINEAR":
@@ -1800,10 +3539,28 @@ class RehabilitationApp(QMainWindow):
             
             elapsed = time.time() - getattr(self, 'move_start_time', 0)
             wait_time = 200 if elapsed < 0.5 else 1000
-            QTimer.singleShot(wait_time, self._finalize_reset_sequence)
+            self.scheduler.schedule(wait_time, self._finalize_reset_sequence, "calibracion")
+                
+        # 2b. TERMINÓ EL REGRESO RÁPIDO (Cambio de ejercicio)
+        elif self.system_state == "SWITCHING_EXERCISE":
+            self.system_state = "IDLE"
+            if not success:
+                # Algún sensor cortó el regreso: reset completo como antes
+                self.start_go_to_start_sequence("exercise_page")
+                return
+            self.progress_bar.setValue(100)
+            self.gears_movie.stop()
+            self._finalize_reset_sequence()
+                
+        # 2c. LLEGÓ AL LÍMITE TECLEADO (Página de ejercicio)
+        elif self.limit_entry_pending is not None:
+            self._on_limit_entry_finished(success)
                 
         # 3. LÓGICA DE TERAPIA (Secuencia de Repeticiones)
         elif self.therapy_in_progress:
+            if self.therapy_is_paused and self.therapy_state != "FINISHING":
+                # Terminó justo al pausar: la reanudación retoma desde la espera
+                return
             if self.therapy_state == "FINISHING":
                 self.stop_therapy_session(finished=True)
             elif "PAUSE" in self.therapy_state:
@@ -1813,57 +3570,156 @@ class RehabilitationApp(QMainWindow):
                 if self.therapy_state.startswith("PAUSE_BEFORE"):
                      pause_time = 1000
                 
-                QTimer.singleShot(pause_time, self.execute_therapy_step)
+                self.scheduler.schedule(pause_time, self.execute_therapy_step, "terapia")
 
     def _finalize_reset_sequence(self):
         if self.physical_estop_active or self.software_estop_active: return
 
         if self.pending_therapy_page == "rehab_selection_page": 
             self.stacked_widget.setCurrentIndex(3)
-        elif self.pending_therapy_page == "flexion_extension_page": 
-            self.go_to_flexion_extension_page()
-        elif self.pending_therapy_page == "abduction_adduction_page": 
-            self.go_to_abduction_adduction_page()
+        elif self.pending_therapy_page == "exercise_page": 
+            self.go_to_exercise_page(self.pending_exercise)
+        elif self.pending_therapy_page == "therapy_summary_page":
+            self._restore_therapy_summary()
+        elif self.pending_therapy_page == "session_plan":
+            if self.session_plan_active:
+                self._start_session_plan_entry()
+            else:
+                self.stacked_widget.setCurrentIndex(3)
+
+    # --- Recuperación tras paro por software ---
+
+    def _limits_state(self):
+        """Límites de ambos ejercicios (pasos absolutos) y si están guardados."""
+        return {
+            "limits": (self.extension_limite_pasos, self.flexion_limite_pasos,
+                       self.adduction_limite_pasos, self.abduction_limite_pasos),
+            "saved": (self.extension_limite_saved, self.flexion_limite_saved,
+                      self.adduction_limite_saved, self.abduction_limite_saved),
+        }
+
+    def _restore_limits_state(self, state):
+        (self.extension_limite_pasos, self.flexion_limite_pasos,
+         self.adduction_limite_pasos, self.abduction_limite_pasos) = state["limits"]
+        (self.extension_limite_saved, self.flexion_limite_saved,
+         self.adduction_limite_saved, self.abduction_limite_saved) = state["saved"]
+
+    def _take_recovery_snapshot(self):
+        in_summary = self.therapy_in_progress or self.stacked_widget.currentIndex() == 5
+        snapshot = {
+            **self._limits_state(),
+            "therapy_type": self.current_therapy_type if in_summary else "",
+            "reps": self.current_therapy_reps,
+            "rep_count": self.current_rep_count if self.therapy_in_progress else 0,
+        }
+        print(f"[SISTEMA] Estado guardado para recuperación: {snapshot}")
+        return snapshot
+
+    def start_position_recovery(self):
+        """Verifica la posición eje por eje (toque de sensor) en lugar de recalibrar."""
+        if self.physical_estop_active or self.software_estop_active or self.recovery_snapshot is None:
+            return
+        self.recover_button.hide()
+        self.system_state = "VERIFYING_ROTATIONAL"
+        self.loading_status_label.setText("VERIFICANDO POSICIÓN...")
+        self.progress_bar.setValue(0)
+        self.stacked_widget.setCurrentIndex(1)
+        self.gears_movie.start()
+        self.trigger_verify_position.emit("rotacional")
+
+    @pyqtSlot(str, bool, int)
+    def on_position_verified(self, motor_type, ok, error_steps):
+        if self.system_state not in ("VERIFYING_ROTATIONAL", "VERIFYING_LINEAR"):
+            return
+        
+        if not ok:
+            print(f"[SISTEMA] Posición {motor_type} no verificada (error {error_steps} pasos). Se requiere calibrar.")
+            self.recovery_snapshot = None
+            self.system_calibrated = False
+            self.worker.reset_positions()
+            self.system_state = "IDLE"
+            self.gears_movie.stop()
+            self.loading_status_label.setText("POSICIÓN NO VERIFICADA\nCALIBRE EL SISTEMA")
+            self.scheduler.schedule(3000, lambda: self.stacked_widget.setCurrentIndex(0), "ui")
+            return
+        
+        if self.system_state == "VERIFYING_ROTATIONAL":
+            self.progress_bar.setValue(50)
+            self.system_state = "VERIFYING_LINEAR"
+            self.trigger_verify_position.emit("lineal")
+            return
+        
+        # Ambos ejes verificados: restaurar límites y volver a la posición de inicio
+        snapshot = self.recovery_snapshot
+        self._restore_limits_state(snapshot)
+        self.progress_bar.setValue(100)
+        self.system_state = "IDLE"
+        print("[SISTEMA] Posición verificada. Límites restaurados.")
+        
+        page = "therapy_summary_page" if snapshot["therapy_type"] else "rehab_selection_page"
+        if not snapshot["therapy_type"]:
+            self.recovery_snapshot = None
+        self.start_go_to_start_sequence(page)
+
+    def _restore_therapy_summary(self):
+        snapshot, self.recovery_snapshot = self.recovery_snapshot, None
+        if snapshot is None:
+            self.stacked_widget.setCurrentIndex(3)
+            return
+        
+        self.go_to_therapy_summary(snapshot["therapy_type"], snapshot["reps"])
+        if 0 < snapshot["rep_count"] < snapshot["reps"]:
+            self.therapy_rep_offset = snapshot["rep_count"]
+            self.current_rep_count = snapshot["rep_count"]
+            self.start_stop_button.setText("CONTINUAR TERAPIA")
+            self.therapy_status_label.setText(f"CONTINÚA EN LA\nREPETICIÓN {snapshot['rep_count'] + 1}")
+            self.therapy_status_label.setStyleSheet("color: #2c3e50;")
+            self.therapy_status_label.show()
 
     @pyqtSlot(int)
     def handle_progress_update(self, value): 
         self.progress_bar.setValue(value)
 
+    @pyqtSlot(str)
+    def handle_calibration_axis_homed(self, motor):
+        """Homing paralelo: informa qué eje ya encontró su sensor."""
+        pending = "LINEAL" if motor == 'rotacional' else "ROTACIONAL"
+        if self.progress_bar.value() < 100:
+            self.loading_status_label.setText(f"{motor.upper()} LISTO, CALIBRANDO {pending}...")
+        else:
+            self.loading_status_label.setText("CALIBRACIÓN COMPLETADA")
+
     @pyqtSlot(bool, str)
     def handle_calibration_finished(self, success, message):
         self.gears_movie.stop()
         self.system_state = "IDLE"
+        self.system_calibrated = success
+        self.drift_report = {}
+        self.stall_report = {}
         if success: 
-            QTimer.singleShot(2000, lambda: self.stacked_widget.setCurrentIndex(2))
+            self.scheduler.schedule(2000, lambda: self.stacked_widget.setCurrentIndex(2), "calibracion")
         else: 
             self.loading_status_label.setText(f"ERROR: {message}")
-            QTimer.singleShot(3000, lambda: self.stacked_widget.setCurrentIndex(0))
+            self.scheduler.schedule(3000, lambda: self.stacked_widget.setCurrentIndex(0), "ui")
             self._update_emergency_state()
 
     @pyqtSlot(str, int)
     def on_position_updated(self, motor_type, position):
 
-        if motor_type == 'lineal':
-            pos_cm = (position - self.worker.cero_terapia_lineal) * LINEAL_CM_POR_PASO
-            disp_cm = max(0.0, pos_cm)
-            
-            self.flexext_jog_status_label.setText(f"Posición: {disp_cm:.2f} cm")
-            
-            disable_ext = (pos_cm <= 0.01) or self.hw_neg_hit
-            disable_flex = self.hw_pos_hit
-            self.ext_button.setDisabled(disable_ext)
-            self.flex_button.setDisabled(disable_flex)
-            
-        elif motor_type == 'rotacional':
-            pos_grados = (position - self.worker.cero_terapia_rotacional) * ROTACIONAL_GRADOS_POR_PASO
-            disp_deg = max(0.0, min(MAX_GRADOS_ABD, pos_grados))
-            
-            self.abdadd_jog_status_label.setText(f"Posición: {disp_deg:.1f}°")
-            
-            disable_add = (pos_grados <= 0.1) or self.hw_neg_hit
-            disable_abd = (pos_grados >= MAX_GRADOS_ABD) or self.hw_pos_hit
-            self.add_button.setDisabled(disable_add)
-            self.abd_button.setDisabled(disable_abd)
+        # Solo aritmética entera y textos en caché (se llama a alta frecuencia)
+        ex = self.current_exercise
+        if motor_type != ex.motor:
+            return
+        zero = self.worker.cero_terapia_lineal if motor_type == 'lineal' else self.worker.cero_terapia_rotacional
+        delta = position - zero
+        q = ex.units.quantize(delta)
+        
+        self.exercise_jog_status_label.setText(f"Posición: {ex.units.text(delta)}")
+        
+        disable_neg = (q <= 1) or self.hw_neg_hit
+        disable_pos = (ex.units.max_q is not None and q >= ex.units.max_q) or self.hw_pos_hit
+        self._exercise_arrow_button(-1).setDisabled(disable_neg)
+        self._exercise_arrow_button(1).setDisabled(disable_pos)
 
     @pyqtSlot(bool, bool)
     def on_limit_status_updated(self, pos_hit, neg_hit):
@@ -1873,18 +3729,132 @@ class RehabilitationApp(QMainWindow):
         
         idx = self.stacked_widget.currentIndex()
         
-        if idx == 4: # FlexExt
-            if pos_hit: self.flex_button.setDisabled(True)
-            if neg_hit: self.ext_button.setDisabled(True)
+        if idx == 4: # Ejercicio
+            if pos_hit: self._exercise_arrow_button(1).setDisabled(True)
+            if neg_hit: self._exercise_arrow_button(-1).setDisabled(True)
             
-        elif idx == 5: # AbdAdd
-            if pos_hit: self.abd_button.setDisabled(True)
-            if neg_hit: self.add_button.setDisabled(True)
-            
-        elif idx == 7: # Leg Positioning
+        elif idx == 6: # Leg Positioning
             if pos_hit: self.leg_pos_flex_button.setDisabled(True)
             if neg_hit: self.leg_pos_ext_button.setDisabled(True)
 
+    # ==========================================================================
+    # TRAYECTORIA ENSEÑADA (GRABACIÓN CON EL JOG)
+    # ==========================================================================
+
+    def toggle_trajectory_recording(self):
+        if self.trajectory_recording:
+            self.trigger_stop_trajectory_recording.emit()
+            self._set_trajectory_recording_ui(False)
+        else:
+            if self.physical_estop_active or self.software_estop_active:
+                return
+            self.trigger_start_trajectory_recording.emit()
+            self._set_trajectory_recording_ui(True)
+            for label in self.trajectory_feedback_labels:
+                label.setText("Grabando: use las flechas")
+
+    def _set_trajectory_recording_ui(self, recording):
+        self.trajectory_recording = recording
+        for button in self.record_trajectory_buttons:
+            button.setText("DETENER GRABACIÓN" if recording else "GRABAR TRAYECTORIA")
+
+    @pyqtSlot(int, int, int)
+    def on_trajectory_recorded(self, samples, waypoints, duration_ms):
+        self.trajectory_info = (samples, waypoints, duration_ms) if waypoints else None
+        text = (f"Trayectoria: {waypoints} puntos, {duration_ms / 1000:.1f} s" if waypoints
+                else "Sin movimiento: no se guardó")
+        for label in self.trajectory_feedback_labels:
+            label.setText(text)
+        print(f"[UI] Trayectoria grabada: {samples} muestras -> {waypoints} puntos.")
+
+    def cycle_trajectory_speed(self):
+        self.trajectory_speed_index = (self.trajectory_speed_index + 1) % len(TRAYECTORIA_VELOCIDADES)
+        self._update_trajectory_speed_button()
+
+    def _update_trajectory_speed_button(self):
+        self.trajectory_speed_button.setText(f"VELOCIDAD: {TRAYECTORIA_VELOCIDADES[self.trajectory_speed_index]:g}x")
+
+    # ==========================================================================
+    # SESIÓN PROGRAMADA (VARIOS EJERCICIOS SEGUIDOS)
+    # ==========================================================================
+
+    def add_current_to_session_plan(self):
+        """Añade el ejercicio del resumen (con sus límites actuales) a la sesión."""
+        if self.therapy_in_progress or self.session_plan_active or not self.current_therapy_type:
+            return
+        if len(self.session_plan) >= SESION_MAX_EJERCICIOS:
+            return
+        entry = {"type": self.current_therapy_type, "reps": self.current_therapy_reps, **self._limits_state()}
+        self.session_plan.append(entry)
+        self.add_to_plan_button.setEnabled(len(self.session_plan) < SESION_MAX_EJERCICIOS)
+        self.therapy_status_label.setText(f"AÑADIDO A LA SESIÓN\n({len(self.session_plan)} EJERCICIOS)")
+        self.therapy_status_label.setStyleSheet("color: #27ae60;")
+        self.therapy_status_label.show()
+        print(f"[UI] Sesión programada: {[(e['type'], e['reps']) for e in self.session_plan]}")
+
+    def clear_session_plan(self):
+        if self.session_plan_active:
+            return
+        self.session_plan = []
+        self.session_plan_index = 0
+        self._update_session_plan_buttons()
+
+    def _update_session_plan_buttons(self):
+        n = len(self.session_plan)
+        if n and self.session_plan_index:
+            text = f"     Sesión: continuar ({self.session_plan_index + 1}/{n})"
+        else:
+            text = f"     Sesión programada ({n})"
+        self.session_plan_button.setText(text)
+        self.session_plan_button.setEnabled(n > 0 and not self.session_plan_active)
+        self.clear_plan_button.setEnabled(n > 0 and not self.session_plan_active)
+
+    def start_session_plan(self):
+        """Ejecuta la sesión desde el ejercicio pendiente (el cero ya está fijado por la posición de inicio)."""
+        if self.physical_estop_active or self.software_estop_active:
+            return
+        if not self.session_plan or self.session_plan_active or self.therapy_in_progress:
+            return
+        if self.session_plan_index >= len(self.session_plan):
+            self.session_plan_index = 0
+        self.session_plan_active = True
+        print(f"[UI] Iniciando sesión programada en el ejercicio {self.session_plan_index + 1} de {len(self.session_plan)}.")
+        self._start_session_plan_entry()
+
+    def _start_session_plan_entry(self):
+        if not self._at_therapy_zero():
+            # Solo si el ejercicio anterior (o el jog) dejó algún eje fuera del cero
+            print("[UI] Sesión programada: ejes fuera del cero, volviendo a la posición de inicio.")
+            self.start_go_to_start_sequence("session_plan")
+            return
+        entry = self.session_plan[self.session_plan_index]
+        self._restore_limits_state(entry)
+        self.go_to_therapy_summary(entry["type"], entry["reps"])
+        self.toggle_therapy_session()
+
+    def _at_therapy_zero(self):
+        return (int(self.worker.posicion_lineal) == int(self.worker.cero_terapia_lineal)
+                and int(self.worker.posicion_rotacional) == int(self.worker.cero_terapia_rotacional))
+
+    def _advance_session_plan(self):
+        if not self.session_plan_active:
+            return
+        if self.physical_estop_active or self.software_estop_active:
+            return
+        self.session_plan_index += 1
+        if self.session_plan_index < len(self.session_plan):
+            self._start_session_plan_entry()
+            return
+        
+        self.session_plan_active = False
+        self.session_plan_index = 0
+        self.start_stop_button.setEnabled(True)
+        self.summary_back_button.setEnabled(True)
+        self.therapy_status_label.setText("¡SESIÓN COMPLETA!")
+        self.therapy_status_label.setStyleSheet("color: #27ae60; font-weight: bold;")
+        self.therapy_status_label.show()
+        print(f"[UI] Sesión programada completa ({len(self.session_plan)} ejercicios).")
+
     # ==========================================================================
     # LÓGICA DE TERAPIA (MÁQUINA DE ESTADOS)
     # ==========================================================================
@@ -1893,6 +3863,7 @@ class RehabilitationApp(QMainWindow):
         self.current_therapy_type = therapy_type
         self.current_therapy_reps = reps
         self.current_rep_count = 0
+        self.therapy_rep_offset = 0
     
         self.therapy_status_label.setText("")  
         self.therapy_status_label.hide()       
@@ -1901,24 +3872,44 @@ class RehabilitationApp(QMainWindow):
         
         base_info = ""
         
-        if "Flexión" in therapy_type:
+        if therapy_type == TERAPIA_COMBINADA:
+            cm_min = UNIDADES_LINEAL.text(self.extension_limite_pasos - self.worker.cero_terapia_lineal, False)
+            cm_max = UNIDADES_LINEAL.text(self.flexion_limite_pasos - self.worker.cero_terapia_lineal, False)
+            deg_min = UNIDADES_ROTACIONAL.text(self.adduction_limite_pasos - self.worker.cero_terapia_rotacional, False)
+            deg_max = UNIDADES_ROTACIONAL.text(self.abduction_limite_pasos - self.worker.cero_terapia_rotacional, False)
+            
+            base_info = (f"<b>Rango Configurado:</b><br>{cm_min} a {cm_max} cm<br>"
+                         f"{deg_min} a {deg_max}° (simultáneo)<br><br>")
+            
+        elif therapy_type == TERAPIA_TRAYECTORIA:
+            _, waypoints, duration_ms = self.trajectory_info or (0, 0, 0)
+            base_info = (f"<b>Trayectoria Grabada:</b><br>{waypoints} puntos, "
+                         f"{duration_ms / 1000:.1f} s por repetición<br><br>")
+            
+        elif "Flexión" in therapy_type:
 
-            cm_min = (self.extension_limite_pasos - self.worker.cero_terapia_lineal) * LINEAL_CM_POR_PASO
-            cm_max = (self.flexion_limite_pasos - self.worker.cero_terapia_lineal) * LINEAL_CM_POR_PASO
+            cm_min = UNIDADES_LINEAL.text(self.extension_limite_pasos - self.worker.cero_terapia_lineal, False)
+            cm_max = UNIDADES_LINEAL.text(self.flexion_limite_pasos - self.worker.cero_terapia_lineal, False)
             
-            base_info = f"<b>Rango Configurado:</b><br>{max(0, cm_min):.2f} a {max(0, cm_max):.2f} cm<br><br>"
+            base_info = f"<b>Rango Configurado:</b><br>{cm_min} a {cm_max} cm<br><br>"
             
         else: # Abducción / Aducción
-            deg_min = (self.adduction_limite_pasos - self.worker.cero_terapia_rotacional) * ROTACIONAL_GRADOS_POR_PASO
-            deg_max = (self.abduction_limite_pasos - self.worker.cero_terapia_rotacional) * ROTACIONAL_GRADOS_POR_PASO
+            deg_min = UNIDADES_ROTACIONAL.text(self.adduction_limite_pasos - self.worker.cero_terapia_rotacional, False)
+            deg_max = UNIDADES_ROTACIONAL.text(self.abduction_limite_pasos - self.worker.cero_terapia_rotacional, False)
             
-            base_info = f"<b>Rango Configurado:</b><br>{max(0, deg_min):.1f} a {max(0, deg_max):.1f}°<br><br>"
+            base_info = f"<b>Rango Configurado:</b><br>{deg_min} a {deg_max}°<br><br>"
             
         base_info += f"<b>Repeticiones Totales:</b> {reps}"
+        if self.session_plan_active:
+            base_info += f"<br><b>Sesión:</b> ejercicio {self.session_plan_index + 1} de {len(self.session_plan)}"
         
         self.summary_static_text = base_info
         
         self.update_summary_box_text()
+        self.trajectory_speed_button.setVisible(therapy_type == TERAPIA_TRAYECTORIA)
+        self.trajectory_speed_button.setEnabled(True)
+        self.add_to_plan_button.setEnabled(not self.session_plan_active and reps > 0
+                                           and len(self.session_plan) < SESION_MAX_EJERCICIOS)
         
         self.therapy_status_label.hide()
         self.start_stop_button.setText("COMENZAR TERAPIA")
@@ -1926,7 +3917,7 @@ class RehabilitationApp(QMainWindow):
         self.start_stop_button.setEnabled(True)
         self.summary_back_button.setEnabled(True)
         
-        self.stacked_widget.setCurrentIndex(6)
+        self.stacked_widget.setCurrentIndex(5)
     
     def update_summary_box_text(self):
         """Actualiza el cuadro de resumen combinando info estática y progreso."""
@@ -1952,25 +3943,45 @@ class RehabilitationApp(QMainWindow):
         else:
             # INICIAR
             self.therapy_in_progress = True
-            self.current_rep_count = 0
+            self.therapy_is_paused = False
+            self.current_rep_count = self.therapy_rep_offset
             self.therapy_state = "STARTING"
             
             # Actualizar UI
             self.start_stop_button.setText("DETENER TERAPIA")
             self.start_stop_button.setStyleSheet("background-color: #c0392b; color: white;")
             self.summary_back_button.setEnabled(False)
+            self.pause_resume_button.setText("PAUSAR")
+            self.pause_resume_button.setEnabled(True)
+            self.trajectory_speed_button.setEnabled(False)
+            self.add_to_plan_button.setEnabled(False)
             
             self.therapy_status_label.setText("REHABILITACIÓN\nEN PROCESO")
             self.therapy_status_label.setStyleSheet("color: #2c3e50;")
             self.therapy_status_label.show()
             
             self.update_summary_box_text() 
+            self.therapy_progress.emit(self.current_rep_count, self.current_therapy_reps)
             
-            self.execute_therapy_step()
+            if self.current_therapy_type == TERAPIA_TRAYECTORIA:
+                self.start_trajectory_therapy_session()
+            elif TERAPIA_EN_CADENA_DMA and IS_RASPBERRY_PI and self.current_therapy_type != TERAPIA_COMBINADA:
+                self.start_dma_therapy_session()
+            else:
+                self.execute_therapy_step()
 
     def stop_therapy_session(self, finished=False):
         self.therapy_in_progress = False
-        self.worker.stop_move_steps() 
+        self.therapy_is_paused = False
+        self.paused_motion_in_worker = False
+        self.therapy_rep_offset = 0
+        self.pause_resume_button.setText("PAUSAR")
+        self.pause_resume_button.setEnabled(False)
+        self.trajectory_speed_button.setEnabled(True)
+        self.scheduler.cancel_group("terapia")
+        self.trigger_stop_move_steps.emit()
+        self.trigger_abort_therapy_session.emit()
+        self.therapy_stopped.emit(finished)
         
         self.start_stop_button.setText("REINICIAR TERAPIA")
         self.start_stop_button.setStyleSheet(STYLESHEET)
@@ -1985,21 +3996,167 @@ class RehabilitationApp(QMainWindow):
             self.therapy_status_label.setText("TERAPIA\nDETENIDA")
             self.therapy_status_label.setStyleSheet("color: #c0392b;")
             self.update_summary_box_text()
+        
+        if self.session_plan_active:
+            if finished:
+                # Mismo cero de terapia: el siguiente ejercicio arranca sin volver a la posición de inicio
+                self.summary_back_button.setEnabled(False)
+                self.start_stop_button.setEnabled(False)
+                self.scheduler.schedule(SESION_PAUSA_ENTRE_EJERCICIOS_MS, self._advance_session_plan, "sesion")
+            else:
+                # Se conserva el índice: la sesión puede retomarse desde este ejercicio
+                self.session_plan_active = False
+                self.scheduler.cancel_group("sesion")
+                print(f"[UI] Sesión programada detenida en el ejercicio {self.session_plan_index + 1}.")
+        if not self.session_plan_active:
+            self.add_to_plan_button.setEnabled(len(self.session_plan) < SESION_MAX_EJERCICIOS)
+
+    def toggle_therapy_pause(self):
+        if not self.therapy_in_progress:
+            return
+        if self.therapy_is_paused:
+            self.resume_therapy_session()
+        else:
+            self.pause_therapy_session()
+
+    def pause_therapy_session(self):
+        """
+        Congela la terapia sin perder el avance: cancela las esperas pendientes y
+        pide al worker detener el tramo en curso guardando lo que falta.
+        """
+        if not self.therapy_in_progress or self.therapy_is_paused:
+            return
+        self.therapy_is_paused = True
+        self.paused_motion_in_worker = False
+        self.scheduler.cancel_group("terapia")
+        self.trigger_pause_motion.emit()
+        self.therapy_paused.emit(True)
+        
+        self.pause_resume_button.setText("REANUDAR")
+        self.therapy_status_label.setText("TERAPIA\nEN PAUSA")
+        self.therapy_status_label.setStyleSheet("color: #e67e22;")
+        print(f"[UI] Terapia en pausa (repetición {self.current_rep_count}/{self.current_therapy_reps}, estado {self.therapy_state}).")
+
+    def resume_therapy_session(self):
+        if not self.therapy_in_progress or not self.therapy_is_paused:
+            return
+        if self.physical_estop_active or self.software_estop_active:
+            return
+        self.therapy_is_paused = False
+        self.therapy_paused.emit(False)
+        
+        if self.paused_motion_in_worker or self.therapy_state in ("DMA_SESSION", "TRAJECTORY"):
+            # El worker retoma el tramo (o el resto de la cadena) desde la posición actual
+            self.trigger_resume_motion.emit()
+        else:
+            # Pausado durante una espera: se repite la espera completa
+            self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")
+        self.paused_motion_in_worker = False
+        
+        self.pause_resume_button.setText("PAUSAR")
+        self.therapy_status_label.setText("REHABILITACIÓN\nEN PROCESO")
+        self.therapy_status_label.setStyleSheet("color: #2c3e50;")
+
+    @pyqtSlot(bool)
+    def on_motion_paused(self, has_remaining):
+        self.paused_motion_in_worker = has_remaining
+
+    def start_dma_therapy_session(self):
+        """Envía la sesión completa al worker como cadena DMA (mismo orden que execute_therapy_step)."""
+        self.therapy_state = "DMA_SESSION"
+        reps = self.current_therapy_reps - self.therapy_rep_offset
+        if "Flexión" in self.current_therapy_type:
+            self.trigger_therapy_session.emit('lineal', self.extension_limite_pasos,
+                                              self.flexion_limite_pasos, reps)
+        else:
+            self.trigger_therapy_session.emit('rotacional', self.adduction_limite_pasos,
+                                              self.abduction_limite_pasos, reps)
+
+    def start_trajectory_therapy_session(self):
+        """La reproducción completa corre en el worker; avisa con session_progress/session_finished."""
+        self.therapy_state = "TRAJECTORY"
+        speed = TRAYECTORIA_VELOCIDADES[self.trajectory_speed_index]
+        self.trigger_run_trajectory.emit(self.current_therapy_reps - self.therapy_rep_offset, int(speed * 100))
+
+    def on_session_progress(self, reps_done):
+        if not self.therapy_in_progress:
+            return
+        self.current_rep_count = self.therapy_rep_offset + reps_done
+        self.update_summary_box_text()
+        self.therapy_progress.emit(self.current_rep_count, self.current_therapy_reps)
+        print(f"DEBUG: Repetición {self.current_rep_count}/{self.current_therapy_reps} completada (DMA).")
+
+    def on_session_finished(self, success):
+        if not self.therapy_in_progress:
+            return
+        self.stop_therapy_session(finished=success)
 
     def execute_therapy_step(self):
         """Máquina de estados"""
-        if not self.therapy_in_progress: 
+        if not self.therapy_in_progress or self.therapy_is_paused: 
             return
         if self.physical_estop_active or self.software_estop_active: 
             return
 
         print(f"--- DEBUG: Entrando a execute_therapy_step | Estado: {self.therapy_state} ---")
 
+        # =====================================================================
+        # TERAPIA COMBINADA (AMBOS EJES INTERPOLADOS)
+        # Orden: (Extensión, Aducción) -> (Flexión, Abducción) -> Cero
+        # =====================================================================
+        if self.current_therapy_type == TERAPIA_COMBINADA:
+            
+            # 1. INICIO: Mover hacia EXTENSIÓN + ADUCCIÓN
+            if self.therapy_state == "STARTING" or self.therapy_state == "PAUSE_BEFORE_HOME_COMBINED":
+                print("DEBUG [STARTING]: Moviendo hacia Extensión + Aducción.")
+                self.therapy_state = "MOVING_TO_EXT_ADD"
+                self._emit_combined_move(self.extension_limite_pasos, self.adduction_limite_pasos)
+            
+            # 2. LLEGADA: Pausa
+            elif self.therapy_state == "MOVING_TO_EXT_ADD":
+                self.therapy_state = "PAUSE_AT_EXT_ADD"
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")
+            
+            # 3. RETORNO: Mover hacia FLEXIÓN + ABDUCCIÓN
+            elif self.therapy_state == "PAUSE_AT_EXT_ADD":
+                print("DEBUG [RETURN]: Moviendo hacia Flexión + Abducción.")
+                self.therapy_state = "MOVING_TO_FLEX_ABD"
+                self._emit_combined_move(self.flexion_limite_pasos, self.abduction_limite_pasos)
+            
+            # 4. LLEGADA: Pausa antes de contar
+            elif self.therapy_state == "MOVING_TO_FLEX_ABD":
+                self.therapy_state = "PAUSE_AT_FLEX_ABD"
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")
+            
+            # 5. CONTADOR Y DECISIÓN
+            elif self.therapy_state == "PAUSE_AT_FLEX_ABD":
+                self.current_rep_count += 1
+                self.update_summary_box_text()
+                self.therapy_progress.emit(self.current_rep_count, self.current_therapy_reps)
+                print(f"DEBUG: Repetición {self.current_rep_count}/{self.current_therapy_reps} completada.")
+                
+                if self.current_rep_count >= self.current_therapy_reps:
+                    self.therapy_state = "PAUSE_AT_MOVING_HOME_COMBINED"
+                else:
+                    self.therapy_state = "PAUSE_BEFORE_HOME_COMBINED"
+                self.execute_therapy_step()
+            
+            # 6. SECUENCIA FINAL
+            elif self.therapy_state == "PAUSE_AT_MOVING_HOME_COMBINED":
+                self.therapy_state = "MOVING_HOME_COMBINED"
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")
+            
+            # 7. MOVER AMBOS EJES A CERO TERAPIA
+            elif self.therapy_state == "MOVING_HOME_COMBINED":
+                print("DEBUG: Yendo a Cero Terapia (ambos ejes).")
+                self.therapy_state = "FINISHING"
+                self._emit_combined_move(self.worker.cero_terapia_lineal, self.worker.cero_terapia_rotacional)
+        
         # =====================================================================
         # TERAPIA FLEXIÓN / EXTENSIÓN (LINEAL)
         # Orden: Extensión -> Flexión -> Cero
         # =====================================================================
-        if "Flexión" in self.current_therapy_type:
+        elif "Flexión" in self.current_therapy_type:
             
             # 1. INICIO: Mover hacia EXTENSIÓN
             if self.therapy_state == "STARTING" or self.therapy_state == "PAUSE_BEFORE_HOME_LINEAR":
@@ -2015,7 +4172,7 @@ class RehabilitationApp(QMainWindow):
             elif self.therapy_state == "MOVING_TO_EXTENSION":
                 print("DEBUG: Llegada a Extensión. Pausa 1s.")
                 self.therapy_state = "PAUSE_AT_EXTENSION"
-                QTimer.singleShot(1000, self.execute_therapy_step) 
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia") 
                 
             # 3. RETORNO: Mover hacia FLEXIÓN
             elif self.therapy_state == "PAUSE_AT_EXTENSION":
@@ -2030,12 +4187,13 @@ class RehabilitationApp(QMainWindow):
             # 4. LLEGADA A FLEXIÓN: Pausa antes de contar
             elif self.therapy_state == "MOVING_TO_FLEXION":
                 self.therapy_state = "PAUSE_AT_FLEXION"
-                QTimer.singleShot(1000, self.execute_therapy_step)
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")
 
             # 5. CONTADOR Y DECISIÓN
             elif self.therapy_state == "PAUSE_AT_FLEXION":
                 self.current_rep_count += 1
                 self.update_summary_box_text()
+                self.therapy_progress.emit(self.current_rep_count, self.current_therapy_reps)
                 print(f"DEBUG: Repetición {self.current_rep_count}/{self.current_therapy_reps} completada.")
                 
                 if self.current_rep_count >= self.current_therapy_reps:
@@ -2051,7 +4209,7 @@ class RehabilitationApp(QMainWindow):
             elif self.therapy_state == "PAUSE_AT_MOVING_HOME_LINEAR":
                 print("DEBUG: Finalizando. Esperando 1s antes de ir a Cero Terapia.")
                 self.therapy_state = "MOVING_HOME_LINEAR"
-                QTimer.singleShot(1000, self.execute_therapy_step)                
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")                
 
             # 7. MOVER A CERO TERAPIA
             elif self.therapy_state == "MOVING_HOME_LINEAR":
@@ -2082,7 +4240,7 @@ class RehabilitationApp(QMainWindow):
             elif self.therapy_state == "MOVING_TO_ADDUCTION":
                 print("DEBUG: Llegada a Aducción. Pausa 1s.")
                 self.therapy_state = "PAUSE_AT_ADDUCTION"
-                QTimer.singleShot(1000, self.execute_therapy_step)
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")
                 
             # 3. RETORNO: Mover hacia ABDUCCIÓN
             elif self.therapy_state == "PAUSE_AT_ADDUCTION":
@@ -2097,12 +4255,13 @@ class RehabilitationApp(QMainWindow):
             # 4. LLEGADA A ABDUCCIÓN: Pausa antes de contar
             elif self.therapy_state == "MOVING_TO_ABDUCTION":
                 self.therapy_state = "PAUSE_AT_ABDUCTION"
-                QTimer.singleShot(1000, self.execute_therapy_step)
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")
             
             # 5. CONTADOR Y DECISIÓN
             elif self.therapy_state == "PAUSE_AT_ABDUCTION":
                 self.current_rep_count += 1
                 self.update_summary_box_text()
+                self.therapy_progress.emit(self.current_rep_count, self.current_therapy_reps)
                 print(f"DEBUG: Repetición {self.current_rep_count}/{self.current_therapy_reps} completada.")
                 
                 if self.current_rep_count >= self.current_therapy_reps:
@@ -2118,7 +4277,7 @@ class RehabilitationApp(QMainWindow):
             elif self.therapy_state == "PAUSE_AT_MOVING_HOME_ROTATIONAL":
                 print("DEBUG: Finalizando. Esperando 1s antes de ir a Cero Terapia.")
                 self.therapy_state = "MOVING_HOME_ROTATIONAL"
-                QTimer.singleShot(1000, self.execute_therapy_step)              
+                self.scheduler.schedule(1000, self.execute_therapy_step, "terapia")              
             
             # 7. MOVER A CERO TERAPIA
             elif self.therapy_state == "MOVING_HOME_ROTATIONAL":
@@ -2130,14 +4289,241 @@ class RehabilitationApp(QMainWindow):
                  self.therapy_state = "FINISHING"
                  self.trigger_move_steps.emit('rotacional', int(diff), VELOCIDAD_HZ_ROTACIONAL_TERAPIA)
                    
-    def go_to_flexion_extension_page(self):
-        self.reset_flexext_page_state()
+    def _emit_combined_move(self, lin_target, rot_target):
+        lin_diff = int(lin_target - self.worker.posicion_lineal)
+        rot_diff = int(rot_target - self.worker.posicion_rotacional)
+        self.trigger_move_steps_combined.emit(lin_diff, rot_diff)
+
+    def go_to_exercise_page(self, exercise_key):
+        self.bind_exercise_page(exercise_key)
+        self.reset_exercise_page_state()
         self.stacked_widget.setCurrentIndex(4)
 
-    def go_to_abduction_adduction_page(self):
-        self.reset_abdadd_page_state()
-        self.stacked_widget.setCurrentIndex(5)
 
+    # ==========================================================================
+    # API DE CONTROL LOCAL (control_api.py)
+    # ==========================================================================
+
+    def start_control_api(self, socket_path=DEFAULT_SOCKET_PATH, tcp_port=None):
+        """Publica los controles de la interfaz en un socket local."""
+        self.api_jog_timer = QTimer(self)
+        self.api_jog_timer.setSingleShot(True)
+        self.api_jog_timer.timeout.connect(self.api_jog_stop)
+        
+        self.control_bridge = ControlBridge(self)
+        self.control_bridge.start(socket_path, tcp_port)
+
+    def _api_require_ready(self):
+        if self.physical_estop_active or self.software_estop_active:
+            raise RuntimeError("Sistema en paro de emergencia")
+        if self.system_state != "IDLE":
+            raise RuntimeError(f"Sistema ocupado ({self.system_state})")
+
+    def api_status(self):
+        return {
+            "system_state": self.system_state,
+            "page": self.stacked_widget.currentIndex(),
+            "estop": {"physical": self.physical_estop_active, "software": self.software_estop_active},
+            "position_steps": {"lineal": int(self.worker.posicion_lineal),
+                               "rotacional": int(self.worker.posicion_rotacional)},
+            "therapy_zero_steps": {"lineal": int(self.worker.cero_terapia_lineal),
+                                   "rotacional": int(self.worker.cero_terapia_rotacional)},
+            "limits_steps": {
+                "flexion_extension": [self.extension_limite_pasos, self.flexion_limite_pasos]
+                if self.extension_limite_saved and self.flexion_limite_saved else None,
+                "abduction_adduction": [self.adduction_limite_pasos, self.abduction_limite_pasos]
+                if self.adduction_limite_saved and self.abduction_limite_saved else None,
+                "combined": [self.extension_limite_pasos, self.flexion_limite_pasos,
+                             self.adduction_limite_pasos, self.abduction_limite_pasos]
+                if self._combined_limits_ready() else None,
+            },
+            "trajectory": {"recording": self.trajectory_recording,
+                           "samples": self.trajectory_info[0] if self.trajectory_info else 0,
+                           "waypoints": self.trajectory_info[1] if self.trajectory_info else 0,
+                           "duration_ms": self.trajectory_info[2] if self.trajectory_info else 0,
+                           "speed": TRAYECTORIA_VELOCIDADES[self.trajectory_speed_index]},
+            "therapy": {"type": self.current_therapy_type, "in_progress": self.therapy_in_progress,
+                        "state": self.therapy_state, "rep": self.current_rep_count,
+                        "total": self.current_therapy_reps, "paused": self.therapy_is_paused},
+            "session_plan": {"exercises": [[e["type"], e["reps"]] for e in self.session_plan],
+                             "index": self.session_plan_index, "active": self.session_plan_active},
+            "scheduler": self.scheduler.summary(),
+            "recovery_available": self.recovery_snapshot is not None,
+            "drift_steps": self.drift_report,
+            "encoder": {"axes": ENCODER_EJES, "stalls": self.stall_report},
+        }
+
+    def api_calibrate(self):
+        self._api_require_ready()
+        self.start_rehabilitation()
+        return {"started": True}
+
+    def api_go_to_start(self):
+        self._api_require_ready()
+        self.start_go_to_start_sequence()
+        return {"started": True}
+
+    def api_jog(self, motor, direction, duration_ms=500):
+        """Jog de hombre muerto: dura 'duration_ms' salvo que el cliente lo renueve."""
+        self._api_require_ready()
+        if motor not in ('lineal', 'rotacional') or direction not in (1, -1):
+            raise ValueError("motor debe ser 'lineal' o 'rotacional' y direction 1 o -1")
+        
+        if self.worker.is_jogging and (self.worker.jog_motor, self.worker.jog_direction) != (motor, direction):
+            raise RuntimeError("Ya hay un jog activo en otro eje o dirección")
+        if not self.worker.is_jogging:
+            self._emit_jog_start(motor, direction)
+        self.api_jog_timer.start(min(int(duration_ms), API_JOG_MAX_MS))
+        return {"jogging": True}
+
+    def api_jog_stop(self):
+        self.api_jog_timer.stop()
+        self._emit_jog_stop()
+        return {"jogging": False}
+
+    def api_set_limits(self, exercise, low, high, in_steps=False):
+        """Fija límites (cm o grados desde el cero de terapia, o pasos absolutos)."""
+        self._api_require_ready()
+        if self.therapy_in_progress or self.session_plan_active:
+            raise RuntimeError("No se pueden cambiar los límites con una terapia en curso")
+        if not self.system_calibrated:
+            raise RuntimeError("Sistema no calibrado: los límites son relativos al cero de terapia")
+        if exercise not in API_TIPOS_TERAPIA:
+            raise ValueError(f"Ejercicio desconocido: {exercise}")
+        if exercise == "combined":
+            raise ValueError("El ejercicio combinado usa los límites de flexion_extension y abduction_adduction")
+        if exercise == "trajectory":
+            raise ValueError("La trayectoria grabada no usa límites")
+        if high <= low:
+            raise ValueError("El límite superior debe ser mayor que el inferior")
+        
+        if exercise == "flexion_extension":
+            units, zero = UNIDADES_LINEAL, self.worker.cero_terapia_lineal
+        else:
+            units, zero = UNIDADES_ROTACIONAL, self.worker.cero_terapia_rotacional
+        if not in_steps:
+            low = units.steps_for_units(low) + zero
+            high = units.steps_for_units(high) + zero
+        # Mismo rango que el teclado de la pantalla (ningún sensor detiene la terapia)
+        for q in (units.quantize(int(low) - zero), units.quantize(int(high) - zero)):
+            if units.min_q is not None and q < units.min_q:
+                raise ValueError(f"Mínimo {units.format_q(units.min_q)}")
+            if units.max_q is not None and q > units.max_q:
+                raise ValueError(f"Máximo {units.format_q(units.max_q)}")
+        
+        if exercise == "flexion_extension":
+            self.extension_limite_pasos, self.flexion_limite_pasos = int(low), int(high)
+            self.extension_limite_saved = self.flexion_limite_saved = True
+        else:
+            self.adduction_limite_pasos, self.abduction_limite_pasos = int(low), int(high)
+            self.adduction_limite_saved = self.abduction_limite_saved = True
+        return {"exercise": exercise, "limits_steps": [int(low), int(high)]}
+
+    def _api_exercise_limits(self, exercise, reps):
+        """Valida ejercicio y repeticiones; devuelve sus límites (None para la trayectoria)."""
+        if exercise not in API_TIPOS_TERAPIA:
+            raise ValueError(f"Ejercicio desconocido: {exercise}")
+        if not 0 < int(reps) <= 50:
+            raise ValueError("reps debe estar entre 1 y 50")
+        if exercise == "trajectory":
+            if self.trajectory_info is None:
+                raise RuntimeError("No hay trayectoria grabada")
+            return None
+        limits = self.api_status()["limits_steps"][exercise]
+        if limits is None:
+            raise RuntimeError("Límites no configurados para este ejercicio")
+        return limits
+
+    def api_start_therapy(self, exercise, reps, speed=None):
+        self._api_require_ready()
+        if self.therapy_in_progress or self.session_plan_active:
+            raise RuntimeError("Ya hay una terapia en curso")
+        limits = self._api_exercise_limits(exercise, reps)
+        if exercise == "trajectory" and speed is not None:
+            if speed not in TRAYECTORIA_VELOCIDADES:
+                raise ValueError(f"speed debe ser uno de {list(TRAYECTORIA_VELOCIDADES)}")
+            self.trajectory_speed_index = TRAYECTORIA_VELOCIDADES.index(speed)
+            self._update_trajectory_speed_button()
+        
+        self.go_to_therapy_summary(API_TIPOS_TERAPIA[exercise], int(reps))
+        self.toggle_therapy_session()
+        return {"started": True, "limits_steps": limits, "reps": int(reps)}
+
+    def api_plan_add(self, exercise, reps):
+        """Añade un ejercicio a la sesión programada con los límites configurados ahora."""
+        if self.session_plan_active:
+            raise RuntimeError("La sesión programada está en curso")
+        if len(self.session_plan) >= SESION_MAX_EJERCICIOS:
+            raise RuntimeError(f"La sesión admite como máximo {SESION_MAX_EJERCICIOS} ejercicios")
+        self._api_exercise_limits(exercise, reps)
+        self.session_plan.append({"type": API_TIPOS_TERAPIA[exercise], "reps": int(reps), **self._limits_state()})
+        self._update_session_plan_buttons()
+        return self.api_status()["session_plan"]
+
+    def api_plan_clear(self):
+        if self.session_plan_active:
+            raise RuntimeError("La sesión programada está en curso")
+        self.clear_session_plan()
+        return self.api_status()["session_plan"]
+
+    def api_plan_start(self):
+        self._api_require_ready()
+        if self.therapy_in_progress or self.session_plan_active:
+            raise RuntimeError("Ya hay una terapia en curso")
+        if not self.session_plan:
+            raise RuntimeError("La sesión programada está vacía")
+        self.start_session_plan()
+        return self.api_status()["session_plan"]
+
+    def api_stop_therapy(self):
+        if self.therapy_in_progress:
+            self.stop_therapy_session(finished=False)
+        elif self.session_plan_active:
+            # Entre dos ejercicios de la sesión programada
+            self.session_plan_active = False
+            self.scheduler.cancel_group("sesion")
+            self.start_stop_button.setEnabled(True)
+            self.summary_back_button.setEnabled(True)
+        return {"in_progress": False}
+
+    def api_pause_therapy(self):
+        if not self.therapy_in_progress:
+            raise RuntimeError("No hay terapia en curso")
+        self.pause_therapy_session()
+        return {"paused": True, "rep": self.current_rep_count}
+
+    def api_resume_therapy(self):
+        if not self.therapy_in_progress:
+            raise RuntimeError("No hay terapia en curso")
+        self.resume_therapy_session()
+        return {"paused": self.therapy_is_paused, "rep": self.current_rep_count}
+
+    def api_recover(self):
+        """Tras liberar un paro por software: verifica posición y restaura límites sin recalibrar."""
+        if self.physical_estop_active or self.software_estop_active:
+            raise RuntimeError("Paro de emergencia activo")
+        if self.recovery_snapshot is None:
+            raise RuntimeError("No hay estado que recuperar; calibre el sistema")
+        self.start_position_recovery()
+        return {"started": True}
+
+    def api_latency(self):
+        """Histogramas de latencia: paro de emergencia y jog (pulsar / despacho / soltar)."""
+        return {"halt": self.worker.halt_latency.summary(),
+                "jog": {key: stats.summary() for key, stats in self.worker.jog_latency.items()}}
+
+    def api_record_trajectory(self, active=True):
+        """Empieza o termina la grabación; mientras tanto se enseña el movimiento con 'jog'."""
+        if bool(active) != self.trajectory_recording:
+            if active:
+                self._api_require_ready()
+            self.toggle_trajectory_recording()
+        return {"recording": self.trajectory_recording}
+
+    def api_halt(self, active=True):
+        if bool(active) != self.software_estop_active:
+            self.toggle_software_estop()
+        return {"software_estop": self.software_estop_active}
 
     # ==========================================================================
     # EVENTOS DE LA VENTANA
@@ -2147,6 +4533,12 @@ class RehabilitationApp(QMainWindow):
         """Limpieza segura al cerrar la aplicación."""
         print("Cerrando aplicación...")
         
+        if self.control_bridge:
+            self.control_bridge.stop()
+        
+        print(f"[UI] Acciones diferidas: {self.scheduler.summary()}")
+        self.scheduler.cancel_all()
+        
         if hasattr(self, 'worker'):
             self.worker.cleanup()
         
@@ -2189,13 +4581,25 @@ if __name__ == "__main__":
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "0"
     os.environ["QT_SCREEN_SCALE_FACTORS"] = "1"
     os.environ["QT_SCALE_FACTOR"] = "1"
+    
+    # --headless: sin pantalla (implica --api)  |  --api: socket de control local
+    headless = "--headless" in sys.argv
+    if headless:
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
 
     app = QApplication(sys.argv)
     window = RehabilitationApp()
     
     window.setFixedSize(1024, 600)
     
-    window.show()
+    if headless or "--api" in sys.argv:
+        api_port = None
+        if "--api-port" in sys.argv:
+            api_port = int(sys.argv[sys.argv.index("--api-port") + 1])
+        window.start_control_api(tcp_port=api_port)
+    
+    if not headless:
+        window.show()
     
     sys.exit(app.exec_())
 
@@ -0,0 +1,81 @@
+# =================================================================================
+# Archivo: axis_units.py
+# Conversión de pasos a unidades de pantalla (cm / grados) en punto fijo.
+# =================================================================================
+
+from fractions import Fraction
+
+
+class AxisUnits:
+    """
+    Convierte pasos de motor a unidades físicas usando aritmética entera.
+
+    La posición se cuantiza al número de decimales que muestra la interfaz
+    (centésimas de cm, décimas de grado, ...). Los textos ya formateados se
+    guardan en caché por valor cuantizado, de modo que una actualización de
+    posición a alta frecuencia solo cuesta una multiplicación entera y una
+    búsqueda en diccionario.
+    """
+
+    def __init__(self, units_per_step, decimals, suffix, min_units=None, max_units=None):
+        self.decimals = decimals
+        self.suffix = suffix
+        self.scale = 10 ** decimals
+
+        # Relación exacta pasos -> cuantos de pantalla (num / den)
+        ratio = Fraction(units_per_step).limit_denominator(10 ** 9) * self.scale
+        self.num = ratio.numerator
+        self.den = ratio.denominator
+
+        self.min_q = None if min_units is None else round(min_units * self.scale)
+        self.max_q = None if max_units is None else round(max_units * self.scale)
+
+        self._text_cache = {}
+
+    # --- Conversión pasos <-> cuantos ---
+
+    def quantize(self, delta_steps):
+        """Pasos relativos al cero -> entero en cuantos de pantalla (redondeado)."""
+        n = int(delta_steps) * self.num
+        # Redondeo al más cercano (simétrico respecto a cero)
+        if n >= 0:
+            return (n + self.den // 2) // self.den
+        return -((-n + self.den // 2) // self.den)
+
+    def clamp(self, q):
+        """Limita un valor cuantizado al rango mostrable del eje."""
+        if self.min_q is not None and q < self.min_q:
+            return self.min_q
+        if self.max_q is not None and q > self.max_q:
+            return self.max_q
+        return q
+
+    def steps_for_units(self, value):
+        """Unidades físicas -> pasos relativos al cero (entero más cercano)."""
+        n = round(value * self.scale) * self.den
+        if n >= 0:
+            return (n + self.num // 2) // self.num
+        return -((-n + self.num // 2) // self.num)
+
+    def units(self, delta_steps):
+        """Valor físico sin limitar (para comparaciones y registros)."""
+        return self.quantize(delta_steps) / self.scale
+
+    # --- Texto para la interfaz ---
+
+    def text(self, delta_steps, with_suffix=True):
+        """Texto formateado y limitado al rango, p. ej. '2.35 cm' o '12.5°'."""
+        q = self.clamp(self.quantize(delta_steps))
+        key = (q, with_suffix)
+        cached = self._text_cache.get(key)
+        if cached is None:
+            cached = self.format_q(q, with_suffix)
+            self._text_cache[key] = cached
+        return cached
+
+    def format_q(self, q, with_suffix=True):
+        """Texto de un valor ya cuantizado (p. ej. lo tecleado en el teclado numérico)."""
+        sign = "-" if q < 0 else ""
+        whole, frac = divmod(abs(q), self.scale)
+        body = f"{sign}{whole}.{frac:0{self.decimals}d}" if self.decimals else f"{sign}{whole}"
+        return body + self.suffix if with_suffix else body
@@ -0,0 +1,455 @@
+# =================================================================================
+# Archivo: benchmark_motion.py
+# Benchmark sin interfaz de HardwareController sobre pigpio simulado.
+# =================================================================================
+#
+# Uso:
+#   python benchmark_motion.py --reps 5 --output bench.json
+#   python benchmark_motion.py --baseline bench.json      # compara contra una corrida previa
+#
+# Mide error de pasos por movimiento, latencia de señales worker -> GUI,
+# latencia de paro de emergencia hasta PWM apagado, tiempo de CPU del ciclo de
+# monitoreo y tiempo total de sesiones de N repeticiones (paso a paso desde
+# Python y como cadena de ondas DMA). Con --realtime y --stress-procs se
+# compara el jitter del ciclo de monitoreo con y sin el modo de tiempo real.
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import platform
+
+os.environ["ORTESIS_GPIO"] = "sim"
+
+from PyQt5.QtCore import (QCoreApplication, QObject, QThread, QTimer, QEventLoop, Qt, pyqtSignal, pyqtSlot)
+
+import pigpio_sim
+import app_fisioterapia as app
+
+
+class InstrumentedController(app.HardwareController):
+    """HardwareController que contabiliza el costo del ciclo de monitoreo."""
+
+    def __init__(self):
+        super().__init__()
+        self.poll_calls = 0
+        self.poll_cpu_s = 0.0
+        self.last_finish_emit = 0.0
+
+    # Sin @pyqtSlot, PyQt entregaría poll_timer.timeout a un proxy en el hilo principal
+    @pyqtSlot()
+    def _poll_status(self):
+        t0 = time.thread_time()
+        super()._poll_status()
+        self.poll_cpu_s += time.thread_time() - t0
+        self.poll_calls += 1
+
+    @pyqtSlot()
+    @pyqtSlot(bool)
+    def stop_move_steps(self, interrupted=False):
+        if self.is_moving_steps:
+            self.last_finish_emit = time.perf_counter()
+        super().stop_move_steps(interrupted)
+
+    @pyqtSlot()
+    def cleanup(self):
+        super().cleanup()
+
+
+def _stress():
+    """Carga de CPU y de asignación de memoria en otro proceso."""
+    garbage = []
+    while True:
+        garbage.append([{} for _ in range(50)])
+        if len(garbage) > 2000:
+            garbage = []
+
+
+def _stats(values):
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+    return {
+        "n": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "max": ordered[-1],
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+    }
+
+
+class MotionBenchmark(QObject):
+    # Señales hacia el hilo de hardware (mismas conexiones que RehabilitationApp)
+    trigger_calibration = pyqtSignal()
+    trigger_halt_signal = pyqtSignal(bool)
+    trigger_move_steps = pyqtSignal(str, int, int)
+    trigger_therapy_session = pyqtSignal(str, int, int, int)
+    trigger_start_continuous_jog = pyqtSignal(str, int, bool, float)
+    trigger_stop_continuous_jog = pyqtSignal()
+    trigger_set_therapy_zero = pyqtSignal(str)
+    trigger_cleanup = pyqtSignal()
+
+    def __init__(self, args):
+        super().__init__()
+        self.args = args
+        self.results = {}
+        self.signal_latencies = []
+
+        self.worker = InstrumentedController()
+        self.worker_thread = QThread()
+        self.worker.moveToThread(self.worker_thread)
+
+        self.worker_thread.started.connect(self.worker.initialize_gpio)
+        self.trigger_calibration.connect(self.worker.run_calibration_sequence)
+        self.trigger_halt_signal.connect(self.worker.trigger_software_halt)
+        self.trigger_halt_signal.connect(lambda x: self.worker.reset_internal_state() if x else None)
+        self.trigger_move_steps.connect(self.worker.move_steps)
+        self.trigger_therapy_session.connect(self.worker.run_therapy_session)
+        self.trigger_start_continuous_jog.connect(self.worker.start_continuous_jog)
+        self.trigger_stop_continuous_jog.connect(self.worker.stop_continuous_jog)
+        self.trigger_set_therapy_zero.connect(self.worker.set_therapy_zero)
+        # Los temporizadores del worker solo pueden detenerse desde su propio hilo
+        self.trigger_cleanup.connect(self.worker.cleanup, Qt.BlockingQueuedConnection)
+
+    # --- Utilidades ---
+
+    @property
+    def sim(self):
+        return self.worker.pi
+
+    def wait_signal(self, signal, timeout_s):
+        """Espera una emisión de 'signal' procesando eventos. Devuelve (args, instante)."""
+        loop = QEventLoop()
+        received = []
+
+        def on_signal(*args):
+            received.append((args, time.perf_counter()))
+            loop.quit()
+
+        signal.connect(on_signal)
+        QTimer.singleShot(int(timeout_s * 1000), loop.quit)
+        loop.exec_()
+        signal.disconnect(on_signal)
+        return received[0] if received else (None, None)
+
+    def sleep(self, seconds):
+        loop = QEventLoop()
+        QTimer.singleShot(int(seconds * 1000), loop.quit)
+        loop.exec_()
+
+    def poll_snapshot(self):
+        return self.worker.poll_calls, self.worker.poll_cpu_s
+
+    def poll_delta(self, snapshot):
+        calls = self.worker.poll_calls - snapshot[0]
+        cpu = self.worker.poll_cpu_s - snapshot[1]
+        return {"calls": calls, "cpu_s": cpu, "cpu_us_per_call": (cpu / calls * 1e6) if calls else 0.0}
+
+    def logical_position(self, motor):
+        return self.worker.posicion_lineal if motor == 'lineal' else self.worker.posicion_rotacional
+
+    def move(self, motor, steps, speed_hz):
+        """Movimiento finito: devuelve error de pasos (físico vs. comandado) y latencia."""
+        phys_before, _ = self.sim.axis_state(motor)
+        self.trigger_move_steps.emit(motor, int(steps), int(speed_hz))
+        args, received_at = self.wait_signal(self.worker.movement_finished, abs(steps) / speed_hz + 5.0)
+        phys_after, _ = self.sim.axis_state(motor)
+
+        latency = None
+        if received_at and self.worker.last_finish_emit:
+            latency = received_at - self.worker.last_finish_emit
+            self.signal_latencies.append(latency)
+
+        actual = phys_after - phys_before
+        return {
+            "motor": motor,
+            "commanded": int(steps),
+            "actual": round(actual, 1),
+            "error_steps": round(actual - steps, 1),
+            "finished": bool(args and args[0]),
+            "signal_latency_ms": None if latency is None else latency * 1e3,
+        }
+
+    # --- Escenarios ---
+
+    def bench_calibration(self):
+        snap = self.poll_snapshot()
+        t0 = time.perf_counter()
+        self.trigger_calibration.emit()
+        args, _ = self.wait_signal(self.worker.calibration_finished, 120.0)
+        elapsed = time.perf_counter() - t0
+        self.results["calibration"] = {
+            "ok": bool(args and args[0]),
+            "wall_time_s": elapsed,
+            "home_error_steps": {m: round(self.sim.axis_state(m)[0], 1) for m in ('lineal', 'rotacional')},
+            "poll": self.poll_delta(snap),
+        }
+
+    def bench_moves(self):
+        moves = []
+        snap = self.poll_snapshot()
+        plan = [('lineal', s, app.VELOCIDAD_HZ_LINEAL_TERAPIA) for s in (6400, 3200, -3200, 12800, -6400)]
+        plan += [('rotacional', s, app.VELOCIDAD_HZ_ROTACIONAL_TERAPIA) for s in (400, 800, -400, 1600, -800)]
+        for motor, steps, speed in plan:
+            moves.append(self.move(motor, steps, speed))
+        errors = [abs(m["error_steps"]) for m in moves]
+        self.results["moves"] = {
+            "per_move": moves,
+            "abs_error_steps": _stats(errors),
+            "poll": self.poll_delta(snap),
+        }
+
+    def bench_jog(self):
+        runs = []
+        for motor, direction in (('lineal', 1), ('lineal', -1), ('rotacional', 1), ('rotacional', -1)):
+            pul = app.LIN_PUL_PIN if motor == 'lineal' else app.ROT_PUL_PIN
+            speed = app.VELOCIDAD_HZ_LINEAL_JOG if motor == 'lineal' else app.VELOCIDAD_HZ_ROTACIONAL_JOG
+            phys_before, _ = self.sim.axis_state(motor)
+            logic_before = self.logical_position(motor)
+
+            # Igual que los botones de la GUI: instante de pulsar y ruta rápida al soltar
+            press_at = time.perf_counter()
+            self.trigger_start_continuous_jog.emit(motor, direction, False, press_at)
+            self.sleep(self.args.jog_ms / 1000.0)
+            stop_at = time.perf_counter()
+            self.worker.fast_stop_jog(stop_at)
+            self.trigger_stop_continuous_jog.emit()
+            self.sleep(0.2)
+
+            on_at = self.sim.last_event_time('pwm', pul, int(speed), since=press_at)
+            off_at = self.sim.last_event_time('pwm', pul, 0, since=stop_at)
+            phys_delta = self.sim.axis_state(motor)[0] - phys_before
+            logic_delta = self.logical_position(motor) - logic_before
+            runs.append({
+                "motor": motor,
+                "direction": direction,
+                "physical_steps": round(phys_delta, 1),
+                "logical_steps": round(logic_delta, 1),
+                "position_error_steps": round(logic_delta - phys_delta, 1),
+                "press_to_pwm_on_ms": None if on_at is None else (on_at - press_at) * 1e3,
+                "release_to_pwm_off_ms": None if off_at is None else (off_at - stop_at) * 1e3,
+            })
+        self.results["jog"] = {
+            "runs": runs,
+            "abs_error_steps": _stats([abs(r["position_error_steps"]) for r in runs]),
+            "press_to_pwm_on_ms": _stats([r["press_to_pwm_on_ms"] for r in runs
+                                          if r["press_to_pwm_on_ms"] is not None]),
+            "release_to_pwm_off_ms": _stats([r["release_to_pwm_off_ms"] for r in runs
+                                             if r["release_to_pwm_off_ms"] is not None]),
+            "latency": {key: stats.summary() for key, stats in self.worker.jog_latency.items()},
+        }
+
+    def bench_estop(self):
+        latencies = []
+        for _ in range(self.args.estop_trials):
+            self.trigger_move_steps.emit('lineal', 64000, app.VELOCIDAD_HZ_LINEAL_TERAPIA)
+            self.sleep(0.2)
+            pressed_at = self.sim.press_estop()
+            self.wait_signal(self.worker.physical_estop_activated, 2.0)
+            self.sleep(0.1)
+
+            pwm_off = self.sim.last_event_time('pwm', app.LIN_PUL_PIN, 0, since=pressed_at)
+            en_off = [self.sim.last_event_time('write', pin, app.ENABLE_INACTIVO, since=pressed_at)
+                      for pin in (app.LIN_EN_PIN, app.ROT_EN_PIN)]
+            if pwm_off is not None and None not in en_off:
+                latencies.append({
+                    "pwm_off_ms": (pwm_off - pressed_at) * 1e3,
+                    "drivers_off_ms": (max(en_off) - pressed_at) * 1e3,
+                })
+
+            self.sim.release_estop()
+            self.wait_signal(self.worker.physical_estop_activated, 2.0)
+            self.worker.reset_internal_state()
+            self.sleep(0.1)
+        self.results["estop"] = {
+            "trials": latencies,
+            "pwm_off_ms": _stats([x["pwm_off_ms"] for x in latencies]),
+            "drivers_off_ms": _stats([x["drivers_off_ms"] for x in latencies]),
+            "fast_path": self.worker.halt_latency.summary(),
+        }
+
+    def run_program(self, motor, low, high, reps, speed):
+        """Reproduce la secuencia de execute_therapy_step: bajo -> alto por repetición y regreso a cero."""
+        zero = self.logical_position(motor)
+        dwell = self.args.dwell_ms / 1000.0
+        moves = []
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            moves.append(self.move(motor, zero + low - self.logical_position(motor), speed))
+            self.sleep(dwell)
+            moves.append(self.move(motor, zero + high - self.logical_position(motor), speed))
+            self.sleep(dwell)
+        self.sleep(dwell)
+        moves.append(self.move(motor, zero - self.logical_position(motor), speed))
+        wall = time.perf_counter() - t0
+
+        phys_final, _ = self.sim.axis_state(motor)
+        return {
+            "reps": reps,
+            "wall_time_s": wall,
+            "motion_time_s": sum(abs(m["commanded"]) for m in moves) / speed,
+            "abs_error_steps": _stats([abs(m["error_steps"]) for m in moves]),
+            "final_logical_minus_physical": round(self.logical_position(motor) - phys_final, 1),
+        }
+
+    def run_dma_program(self, motor, low, high, reps):
+        """Misma secuencia que run_program, pero como una cadena de ondas DMA."""
+        zero = self.logical_position(motor)
+        phys_start, pulses_start = self.sim.axis_state(motor)
+        snap = self.poll_snapshot()
+        t0 = time.perf_counter()
+        self.trigger_therapy_session.emit(motor, int(zero + low), int(zero + high), reps)
+        args, _ = self.wait_signal(self.worker.session_finished, 3600)
+        wall = time.perf_counter() - t0
+
+        phys_final, pulses_final = self.sim.axis_state(motor)
+        return {
+            "reps": reps,
+            "ok": bool(args and args[0]),
+            "wall_time_s": wall,
+            "pulses": round(pulses_final - pulses_start),
+            "final_logical_minus_physical": round(self.logical_position(motor) - phys_final, 1),
+            "final_physical_minus_start": round(phys_final - phys_start, 1),
+            "poll": self.poll_delta(snap),
+        }
+
+    def bench_sessions_dma(self):
+        # Las pausas de la cadena usan las mismas duraciones que run_program
+        app.TERAPIA_PAUSA_EXTREMO_MS = self.args.dwell_ms
+        app.TERAPIA_PAUSA_FINAL_MS = self.args.dwell_ms
+        self.results["sessions_dma"] = {
+            "flexion_extension": self.run_dma_program(
+                'lineal', int(1.0 / app.LINEAL_CM_POR_PASO), int(3.0 / app.LINEAL_CM_POR_PASO), self.args.reps),
+            "abduction_adduction": self.run_dma_program(
+                'rotacional', int(2.0 / app.ROTACIONAL_GRADOS_POR_PASO), int(15.0 / app.ROTACIONAL_GRADOS_POR_PASO),
+                self.args.reps),
+        }
+
+    def bench_sessions(self):
+        snap = self.poll_snapshot()
+        self.trigger_set_therapy_zero.emit('lineal')
+        self.trigger_set_therapy_zero.emit('rotacional')
+        self.sleep(0.05)
+        self.results["sessions"] = {
+            "flexion_extension": self.run_program(
+                'lineal', int(1.0 / app.LINEAL_CM_POR_PASO), int(3.0 / app.LINEAL_CM_POR_PASO),
+                self.args.reps, app.VELOCIDAD_HZ_LINEAL_TERAPIA),
+            "abduction_adduction": self.run_program(
+                'rotacional', int(2.0 / app.ROTACIONAL_GRADOS_POR_PASO), int(15.0 / app.ROTACIONAL_GRADOS_POR_PASO),
+                self.args.reps, app.VELOCIDAD_HZ_ROTACIONAL_TERAPIA),
+            "poll": self.poll_delta(snap),
+        }
+
+    def run(self):
+        self.worker_thread.start()
+        self.sleep(0.2)
+        t0 = time.perf_counter()
+
+        self.bench_calibration()
+        self.bench_moves()
+        self.bench_jog()
+        self.bench_sessions()
+        self.bench_sessions_dma()
+        self.bench_estop()
+
+        self.results["signal_latency_ms"] = _stats([x * 1e3 for x in self.signal_latencies])
+        self.results["poll_jitter"] = self.worker.poll_jitter.stats.summary()
+        if self.worker.realtime:
+            self.results["realtime"] = self.worker.realtime.summary()
+        if self.worker.watchdog:
+            self.results["watchdog"] = self.worker.watchdog.summary()
+        self.results["total_wall_time_s"] = time.perf_counter() - t0
+        self.results["meta"] = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "sim_call_latency_ms": pigpio_sim.CALL_LATENCY_S * 1e3,
+            "reps": self.args.reps,
+            "dwell_ms": self.args.dwell_ms,
+            "realtime": self.args.realtime,
+            "stress_procs": self.args.stress_procs,
+        }
+
+        self.trigger_cleanup.emit()
+        self.worker_thread.quit()
+        self.worker_thread.wait(1000)
+        return self.results
+
+
+# --- Comparación con una corrida previa ---
+
+REGRESSION_KEYS = [
+    ("moves", "abs_error_steps", "max"),
+    ("jog", "abs_error_steps", "max"),
+    ("jog", "press_to_pwm_on_ms", "max"),
+    ("jog", "release_to_pwm_off_ms", "max"),
+    ("estop", "drivers_off_ms", "max"),
+    ("estop", "fast_path", "worst_us"),
+    ("signal_latency_ms", "p95"),
+    ("calibration", "wall_time_s"),
+    ("sessions", "flexion_extension", "wall_time_s"),
+    ("sessions", "abduction_adduction", "wall_time_s"),
+    ("sessions", "poll", "cpu_us_per_call"),
+    ("poll_jitter", "p99_us"),
+    ("poll_jitter", "worst_us"),
+    ("sessions_dma", "flexion_extension", "wall_time_s"),
+    ("sessions_dma", "flexion_extension", "poll", "cpu_s"),
+]
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare(current, baseline):
+    print("\n--- Comparación contra línea base ---")
+    for path in REGRESSION_KEYS:
+        now, before = _lookup(current, path), _lookup(baseline, path)
+        name = ".".join(path)
+        if now is None or before is None:
+            print(f"{name:55s} sin datos")
+            continue
+        change = ((now - before) / before * 100.0) if before else 0.0
+        print(f"{name:55s} {before:10.3f} -> {now:10.3f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de movimiento sobre pigpio simulado.")
+    parser.add_argument("--reps", type=int, default=3, help="Repeticiones por sesión de terapia.")
+    parser.add_argument("--dwell-ms", type=int, default=1000, help="Pausa en cada extremo (ms).")
+    parser.add_argument("--jog-ms", type=int, default=500, help="Duración de cada prueba de jog (ms).")
+    parser.add_argument("--estop-trials", type=int, default=5, help="Número de paros de emergencia.")
+    parser.add_argument("--call-latency-ms", type=float, default=0.1,
+                        help="Latencia simulada por llamada a pigpiod (ms).")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Activa el modo de tiempo real del worker (ORTESIS_TIEMPO_REAL).")
+    parser.add_argument("--stress-procs", type=int, default=0,
+                        help="Procesos ocupados que emulan carga de CPU en la Raspberry Pi.")
+    parser.add_argument("--output", default="bench_results.json", help="Archivo JSON de resultados.")
+    parser.add_argument("--baseline", help="JSON de una corrida previa para comparar.")
+    args = parser.parse_args()
+
+    pigpio_sim.CALL_LATENCY_S = args.call_latency_ms / 1000.0
+    app.TIEMPO_REAL = args.realtime
+    for _ in range(args.stress_procs):
+        multiprocessing.Process(target=_stress, daemon=True).start()
+
+    qt_app = QCoreApplication(sys.argv)
+    results = MotionBenchmark(args).run()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# =================================================================================
+# Archivo: characterization.py
+# Resultados de la caracterización de ejes (characterize_axes.py) y su análisis.
+# =================================================================================
+#
+# La rutina recorre cada eje de sensor a sensor a velocidades crecientes. Los
+# pasos de un recorrido se cuentan por tiempo: frecuencia x (tick del flanco
+# del sensor de llegada - tick del flanco de salida del sensor de partida), con
+# los ticks de los callbacks de pigpio, sin depender de la latencia de las
+# llamadas. Si el motor pierde pasos el recorrido "cuesta" más pulsos que la
+# referencia lenta (o no llega), y esa velocidad se descarta.
+#
+# El archivo resultante se carga al arrancar app_fisioterapia.py y sustituye
+# los pasos por unidad, las velocidades de terapia/jog y el filtro de glitch
+# ajustados a mano. Si no existe se usan las constantes de siempre.
+
+import json
+import math
+import os
+import time
+
+VERSION = 1
+
+# Rangos aceptados de los campos que usa la aplicación; un valor fuera de rango
+# se descarta y ese campo vuelve a la constante ajustada a mano
+RANGOS = {
+    "units_per_step": (1e-6, 1.0),      # cm o grados por paso
+    "therapy_hz": (1, 200000),         # Entrada de pulsos de los drivers
+    "jog_max_hz": (1, 200000),
+    "glitch_filter_us": (1, 300000),    # Máximo de pigpio
+}
+
+
+def _validated(field, value):
+    """'value' si es un número dentro de RANGOS[field]; None (constante por defecto) si no."""
+    if value is None:
+        return None
+    low, high = RANGOS[field]
+    if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+            or not low <= value <= high):
+        print(f"[SISTEMA] Caracterización: {field}={value!r} fuera de [{low}, {high}], se usa la constante.")
+        return None
+    return value
+
+
+class TraverseResult:
+    """Un recorrido sensor a sensor: frecuencia final, pulsos contados y si fue con rampa."""
+
+    def __init__(self, hz, steps, ramp_s=0.0, direction="ida"):
+        self.hz = hz
+        self.steps = steps          # None si no llegó al sensor (motor calado)
+        self.ramp_s = ramp_s
+        self.direction = direction
+
+    def error(self, reference_steps):
+        return None if self.steps is None else self.steps - reference_steps
+
+    def to_dict(self):
+        return {"hz": self.hz, "steps": self.steps, "ramp_s": self.ramp_s, "direction": self.direction}
+
+
+def steps_match(steps, reference_steps, tolerance):
+    """Un recorrido sin pasos perdidos mide lo mismo que la referencia (dentro de la tolerancia)."""
+    return steps is not None and abs(steps - reference_steps) <= tolerance
+
+
+def highest_passing(results, reference_steps, tolerance):
+    """
+    Mayor frecuencia cuyos recorridos (todos los de esa frecuencia) coinciden con
+    la referencia, recorriendo en orden ascendente y parando en el primer fallo.
+    """
+    best = None
+    for hz in sorted({r.hz for r in results}):
+        if not all(steps_match(r.steps, reference_steps, tolerance) for r in results if r.hz == hz):
+            break
+        best = hz
+    return best
+
+
+def glitch_filter_for(bounce_us, margin=2.0, minimum_us=100, rounding_us=100):
+    """Filtro de glitch recomendado: el rebote medido con margen, redondeado hacia arriba."""
+    value = max(minimum_us, bounce_us * margin)
+    return int(-(-value // rounding_us) * rounding_us)
+
+
+class AxisCharacterization:
+    """Resultados de un eje. Los campos que usa la aplicación son los de la primera línea de __init__."""
+
+    def __init__(self, units_per_step, therapy_hz, jog_max_hz, travel_steps=0, start_hz=0, ramp_hz=0,
+                 accel_hz_s=0.0, bounce_us=0, tests=None):
+        self.units_per_step = units_per_step
+        self.therapy_hz = therapy_hz
+        self.jog_max_hz = jog_max_hz
+        self.travel_steps = travel_steps
+        self.start_hz = start_hz            # Mayor frecuencia de arranque desde reposo sin pérdidas
+        self.ramp_hz = ramp_hz              # Mayor frecuencia alcanzada con rampa sin pérdidas
+        self.accel_hz_s = accel_hz_s
+        self.bounce_us = bounce_us
+        self.tests = tests or []
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        axis = cls(**data)
+        for field in ("units_per_step", "therapy_hz", "jog_max_hz"):
+            setattr(axis, field, _validated(field, getattr(axis, field)))
+        return axis
+
+
+class DeviceCharacterization:
+    """Caracterización completa de un equipo: un AxisCharacterization por eje y el filtro de glitch."""
+
+    def __init__(self, axes=None, glitch_filter_us=None, created=None):
+        self.axes = axes or {}
+        self.glitch_filter_us = glitch_filter_us
+        self.created = created or time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def get(self, motor, field, default):
+        """Valor caracterizado de un eje, o 'default' si el eje no está caracterizado."""
+        axis = self.axes.get(motor)
+        value = getattr(axis, field, None) if axis is not None else None
+        return default if value is None else value
+
+    def to_json(self):
+        return json.dumps({
+            "version": VERSION,
+            "created": self.created,
+            "glitch_filter_us": self.glitch_filter_us,
+            "axes": {motor: axis.to_dict() for motor, axis in self.axes.items()},
+        }, indent=2)
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        if data.get("version") != VERSION:
+            raise ValueError(f"Versión de caracterización no soportada: {data.get('version')}")
+        axes = {motor: AxisCharacterization.from_dict(axis) for motor, axis in data.get("axes", {}).items()}
+        return cls(axes, _validated("glitch_filter_us", data.get("glitch_filter_us")), data.get("created"))
+
+    @classmethod
+    def load(cls, path):
+        """Caracterización guardada, o una vacía (constantes por defecto) si no existe o no es válida."""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path) as f:
+                device = cls.from_json(f.read())
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            print(f"[SISTEMA] Caracterización '{path}' ignorada: {e}")
+            return cls()
+        print(f"[SISTEMA] Caracterización de ejes cargada ({device.created}): {', '.join(device.axes) or 'sin ejes'}.")
+        return device
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_json())
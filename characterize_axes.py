@@ -0,0 +1,305 @@
+# =================================================================================
+# Archivo: characterize_axes.py
+# Caracterización automática de los ejes: pasos por unidad, velocidad y
+# aceleración máximas sin pérdida de pasos y rebote de los sensores.
+# =================================================================================
+#
+# Uso (con la aplicación cerrada, la órtesis sin paciente y el paro a mano):
+#   python characterize_axes.py                          # ambos ejes -> caracterizacion.json
+#   python characterize_axes.py --axes rotacional --output rot.json
+#   ORTESIS_GPIO=sim python characterize_axes.py         # sobre pigpio simulado
+#
+# Cada eje se lleva a su sensor de homing y se recorre de sensor a sensor:
+#   1. Referencia a la velocidad de calibración (pasos entre sensores).
+#   2. Arranques desde reposo a frecuencias crecientes hasta el primer recorrido
+#      que pierde pasos o no llega: da la velocidad de terapia.
+#   3. Rampas de JOG_RAMPA_S desde la velocidad de terapia hasta topes
+#      crecientes: da el tope del jog y la aceleración.
+# Los filtros de glitch se quitan durante la prueba para medir el rebote de
+# los sensores; al final se deja el filtro recomendado.
+
+import sys
+import time
+import argparse
+import threading
+
+import app_fisioterapia as app
+from characterization import (AxisCharacterization, DeviceCharacterization, TraverseResult,
+                              highest_passing, steps_match, glitch_filter_for)
+
+# Frecuencias de arranque, como múltiplos de la velocidad de calibración
+FACTORES_ARRANQUE = (1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 6.0)
+# Topes de rampa, como múltiplos de la mayor frecuencia de arranque
+FACTORES_RAMPA = (1.25, 1.5, 2.0, 2.5, 3.0, 4.0)
+# Fracción de la frecuencia máxima medida que se usa en terapia y jog
+MARGEN_SEGURIDAD = 0.8
+# Un recorrido sin pérdidas mide lo mismo que la referencia con esta tolerancia
+TOLERANCIA_RELATIVA = 0.002
+TOLERANCIA_MIN_PASOS = 4
+# Ventana tras un flanco de sensor en la que se cuentan los rebotes
+VENTANA_REBOTE_US = 20000
+RAMPA_PERIODO_S = 0.02
+DIR_ASENTAMIENTO_S = 0.01
+
+# Ejes: (PUL, DIR, EN, sensor de homing, sensor opuesto, DIR hacia el homing,
+#        velocidad de calibración, carrera entre sensores en unidades)
+EJES = {
+    'rotacional': (app.ROT_PUL_PIN, app.ROT_DIR_PIN, app.ROT_EN_PIN, app.ROT_LIMIT_IN_PIN, app.ROT_LIMIT_OUT_PIN,
+                   app.SENTIDO_HOMING_ROTACIONAL, app.VELOCIDAD_HZ_ROTACIONAL_CALIBRATION, app.CARRERA_ROTACIONAL_GRADOS),
+    'lineal': (app.LIN_PUL_PIN, app.LIN_DIR_PIN, app.LIN_EN_PIN, app.LIN_LIMIT_OUT_PIN, app.LIN_LIMIT_IN_PIN,
+               app.SENTIDO_HOMING_LINEAL, app.VELOCIDAD_HZ_LINEAL_CALIBRATION, app.CARRERA_LINEAL_CM),
+}
+
+
+class CharacterizationAborted(Exception):
+    pass
+
+
+class AxisCharacterizer:
+    """Recorridos sensor a sensor de un eje, cronometrados con los ticks de los callbacks de pigpio."""
+
+    def __init__(self, pi, motor, ramp_s=app.JOG_RAMPA_S):
+        self.pi = pi
+        self.motor = motor
+        (self.pul, self.dir_pin, self.en, self.home_pin, self.far_pin,
+         self.home_dir, self.base_hz, self.distance_units) = EJES[motor]
+        self.ramp_s = ramp_s
+        units_per_step = app.LINEAL_CM_POR_PASO if motor == 'lineal' else app.ROTACIONAL_GRADOS_POR_PASO
+        self.expected_steps = self.distance_units / units_per_step
+
+        self.edges = []             # (gpio, nivel, tick)
+        self.edges_lock = threading.Lock()
+        self.arrived = threading.Event()
+        self.target_pin = None
+        self.aborted = False
+        self.bounces_us = []
+        self.results = []
+
+    # --- Callbacks (hilo de pigpio) ---
+
+    def _on_edge(self, gpio, level, tick):
+        # Bajo el lock: un rebote tardío del recorrido anterior no puede marcar la llegada del siguiente
+        with self.edges_lock:
+            self.edges.append((gpio, level, tick))
+            if gpio == self.target_pin and level == app.SENSORES_NIVEL_ACTIVO:
+                self.pi.hardware_PWM(self.pul, 0, 0)    # Parar en el propio callback: mínimo sobre-recorrido
+                self.arrived.set()
+
+    def _on_estop(self, gpio, level, tick):
+        self.aborted = True
+        self.pi.hardware_PWM(self.pul, 0, 0)
+        self.pi.write(self.en, app.ENABLE_INACTIVO)
+        self.arrived.set()
+
+    # --- Recorridos ---
+
+    def _first_edge(self, edges, gpio, level):
+        for g, l, tick in edges:
+            if g == gpio and l == level:
+                return tick
+        return None
+
+    def _bounce_us(self, edges, gpio, since_tick):
+        """Tiempo entre el primer flanco de 'gpio' y el último dentro de la ventana de rebote."""
+        last = 0
+        for g, _, tick in edges:
+            diff = app.pigpio.tickDiff(since_tick, tick)
+            if g == gpio and diff < VENTANA_REBOTE_US:
+                last = max(last, diff)
+        return last
+
+    def traverse(self, hz, toward_far, ramp_from_hz=None):
+        """
+        Recorre de un sensor al otro. Con ramp_from_hz arranca en esa frecuencia y
+        sube linealmente hasta 'hz' en ramp_s. Devuelve los pasos entre el flanco de
+        salida del sensor de partida y el de llegada, o None si no llegó.
+        """
+        source, target = (self.home_pin, self.far_pin) if toward_far else (self.far_pin, self.home_pin)
+        direction = 1 - self.home_dir if toward_far else self.home_dir
+        start_hz = ramp_from_hz or hz
+        timeout = self.expected_steps / start_hz * 1.5 + self.ramp_s + 2.0
+
+        with self.edges_lock:
+            self.edges = []
+            self.target_pin = target
+            self.arrived.clear()
+        self.pi.write(self.dir_pin, direction)
+        time.sleep(DIR_ASENTAMIENTO_S)
+
+        # Tramos de frecuencia constante: (tick de inicio, Hz)
+        self.pi.hardware_PWM(self.pul, start_hz, 500000)
+        segments = [(self.pi.get_current_tick(), start_hz)]
+        t0 = time.perf_counter()
+        if ramp_from_hz:
+            while not self.arrived.is_set() and segments[-1][1] < hz:
+                time.sleep(RAMPA_PERIODO_S)
+                fraction = min(1.0, (time.perf_counter() - t0) / self.ramp_s)
+                step_hz = int(ramp_from_hz + (hz - ramp_from_hz) * fraction)
+                if self.arrived.is_set():
+                    break
+                self.pi.hardware_PWM(self.pul, step_hz, 500000)
+                segments.append((self.pi.get_current_tick(), step_hz))
+        reached = self.arrived.wait(max(0.0, timeout - (time.perf_counter() - t0)))
+        self.pi.hardware_PWM(self.pul, 0, 0)
+        if self.aborted:
+            raise CharacterizationAborted("Paro de emergencia durante la caracterización.")
+
+        with self.edges_lock:
+            edges = list(self.edges)
+        left = self._first_edge(edges, source, 1 - app.SENSORES_NIVEL_ACTIVO)
+        arrived = self._first_edge(edges, target, app.SENSORES_NIVEL_ACTIVO)
+        if not reached or left is None or arrived is None:
+            return None, segments[-1][1]
+
+        self.bounces_us.append(self._bounce_us(edges, source, left))
+        self.bounces_us.append(self._bounce_us(edges, target, arrived))
+        return self._integrate(segments, left, arrived), segments[-1][1]
+
+    def _integrate(self, segments, from_tick, to_tick):
+        """Pulsos emitidos entre dos ticks según los tramos de frecuencia."""
+        def offset_us(tick):
+            diff = app.pigpio.tickDiff(from_tick, tick)
+            return diff - (1 << 32) if diff & 0x80000000 else diff
+
+        end_us = offset_us(to_tick)
+        total = 0.0
+        for i, (tick, hz) in enumerate(segments):
+            seg_start = max(0, offset_us(tick))
+            seg_end = min(end_us, offset_us(segments[i + 1][0])) if i + 1 < len(segments) else end_us
+            if seg_end > seg_start:
+                total += hz * (seg_end - seg_start) / 1e6
+        return int(round(total))
+
+    def home(self):
+        """Lleva el eje a su sensor de homing a velocidad de calibración."""
+        if self.pi.read(self.home_pin) == app.SENSORES_NIVEL_ACTIVO:
+            return
+        self.traverse(self.base_hz, toward_far=False)
+        if self.pi.read(self.home_pin) != app.SENSORES_NIVEL_ACTIVO:
+            raise CharacterizationAborted(f"El eje {self.motor} no llegó a su sensor de homing.")
+
+    def round_trip(self, hz, ramp_from_hz=None):
+        """Ida y vuelta a la misma frecuencia; tras un recorrido fallido vuelve a hacer homing."""
+        out = []
+        for toward_far in (True, False):
+            steps, reached_hz = self.traverse(hz, toward_far, ramp_from_hz)
+            result = TraverseResult(hz, steps, self.ramp_s if ramp_from_hz else 0.0, "ida" if toward_far else "vuelta")
+            out.append(result)
+            self.results.append(result)
+            if steps is None or reached_hz < hz:
+                if steps is not None:
+                    result.steps = None     # No alcanzó el tope antes del sensor: la prueba no vale
+                time.sleep(0.2)
+                self.home()
+                break
+        return out
+
+    # --- Rutina completa ---
+
+    def run(self):
+        glitch = {pin: 0 for pin in (self.home_pin, self.far_pin)}
+        for pin in glitch:
+            self.pi.set_glitch_filter(pin, 0)
+        callbacks = [self.pi.callback(pin, app.pigpio.EITHER_EDGE, self._on_edge) for pin in glitch]
+        callbacks.append(self.pi.callback(app.E_STOP_PIN, app.pigpio.RISING_EDGE, self._on_estop))
+        self.pi.write(self.en, app.ENABLE_ACTIVO)
+        try:
+            return self._run()
+        finally:
+            self.pi.hardware_PWM(self.pul, 0, 0)
+            self.pi.write(self.en, app.ENABLE_INACTIVO)
+            for cb in callbacks:
+                cb.cancel()
+
+    def _run(self):
+        print(f"[Caracterización] {self.motor}: homing...")
+        self.home()
+
+        reference = self.round_trip(self.base_hz)
+        if any(r.steps is None for r in reference):
+            raise CharacterizationAborted(f"{self.motor}: la referencia a {self.base_hz} Hz no llegó al sensor.")
+        reference_steps = sum(r.steps for r in reference) / len(reference)
+        tolerance = max(TOLERANCIA_MIN_PASOS, reference_steps * TOLERANCIA_RELATIVA)
+        print(f"[Caracterización] {self.motor}: {reference_steps:.0f} pasos entre sensores (±{tolerance:.0f}).")
+
+        def passed(results):
+            return all(steps_match(r.steps, reference_steps, tolerance) for r in results)
+
+        for factor in FACTORES_ARRANQUE:
+            hz = int(self.base_hz * factor)
+            ok = passed(self.round_trip(hz))
+            print(f"[Caracterización] {self.motor}: arranque a {hz} Hz {'OK' if ok else 'FALLA'}.")
+            if not ok:
+                break
+        starts = [r for r in self.results if not r.ramp_s]
+        start_hz = highest_passing(starts, reference_steps, tolerance) or self.base_hz
+        therapy_hz = int(start_hz * MARGEN_SEGURIDAD)
+
+        for factor in FACTORES_RAMPA:
+            hz = int(start_hz * factor)
+            ok = passed(self.round_trip(hz, ramp_from_hz=therapy_hz))
+            print(f"[Caracterización] {self.motor}: rampa {therapy_hz} -> {hz} Hz en {self.ramp_s} s {'OK' if ok else 'FALLA'}.")
+            if not ok:
+                break
+        ramps = [r for r in self.results if r.ramp_s]
+        ramp_hz = highest_passing(ramps, reference_steps, tolerance) or start_hz
+
+        return AxisCharacterization(
+            units_per_step=self.distance_units / reference_steps,
+            therapy_hz=therapy_hz,
+            jog_max_hz=max(therapy_hz, int(ramp_hz * MARGEN_SEGURIDAD)),
+            travel_steps=int(round(reference_steps)),
+            start_hz=start_hz,
+            ramp_hz=ramp_hz,
+            accel_hz_s=(ramp_hz - therapy_hz) / self.ramp_s,
+            bounce_us=max(self.bounces_us or [0]),
+            tests=[r.to_dict() for r in self.results],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caracteriza los ejes de la órtesis y guarda los resultados.")
+    parser.add_argument("--axes", default="rotacional,lineal", help="Ejes a caracterizar, separados por comas.")
+    parser.add_argument("--output", default=app.CARACTERIZACION_ARCHIVO, help="Archivo JSON de resultados.")
+    args = parser.parse_args()
+
+    if not app.IS_RASPBERRY_PI:
+        sys.exit("Se necesita pigpio (o ORTESIS_GPIO=sim) para caracterizar los ejes.")
+    pi = app.pigpio.pi()
+    if not pi.connected:
+        sys.exit("No se pudo conectar con pigpiod.")
+
+    for pin in (app.ROT_PUL_PIN, app.ROT_DIR_PIN, app.ROT_EN_PIN, app.LIN_PUL_PIN, app.LIN_DIR_PIN, app.LIN_EN_PIN):
+        pi.set_mode(pin, app.pigpio.OUTPUT)
+    for pin in (app.ROT_EN_PIN, app.LIN_EN_PIN):
+        pi.write(pin, app.ENABLE_INACTIVO)
+    sensors = (app.ROT_LIMIT_IN_PIN, app.ROT_LIMIT_OUT_PIN, app.LIN_LIMIT_IN_PIN, app.LIN_LIMIT_OUT_PIN, app.E_STOP_PIN)
+    for pin in sensors:
+        pi.set_mode(pin, app.pigpio.INPUT)
+        pi.set_pull_up_down(pin, app.pigpio.PUD_DOWN)
+    if pi.read(app.E_STOP_PIN) == 1:
+        sys.exit("El paro de emergencia está activo.")
+
+    device = DeviceCharacterization.load(args.output)
+    device.created = time.strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        for motor in [m.strip() for m in args.axes.split(",") if m.strip()]:
+            result = AxisCharacterizer(pi, motor).run()
+            device.axes[motor] = result
+            print(f"[Caracterización] {motor}: {result.units_per_step:.6g} unidades/paso, terapia {result.therapy_hz} Hz, "
+                  f"jog hasta {result.jog_max_hz} Hz, {result.accel_hz_s:.0f} Hz/s, rebote {result.bounce_us} us.")
+    except CharacterizationAborted as e:
+        print(f"[Caracterización] ABORTADA: {e}")
+        pi.stop()
+        sys.exit(1)
+
+    device.glitch_filter_us = glitch_filter_for(max(axis.bounce_us for axis in device.axes.values()))
+    for pin in sensors:
+        pi.set_glitch_filter(pin, device.glitch_filter_us)
+    device.save(args.output)
+    print(f"[Caracterización] Filtro de glitch recomendado: {device.glitch_filter_us} us. Guardado en {args.output}")
+    pi.stop()
+
+
+if __name__ == "__main__":
+    main()
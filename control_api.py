@@ -0,0 +1,311 @@
+# =================================================================================
+# Archivo: control_api.py
+# API local de control (JSON-RPC 2.0 sobre socket Unix / TCP localhost).
+# =================================================================================
+#
+# Permite calibrar, mover (jog), fijar límites, iniciar terapia y recibir
+# telemetría sin tocar la pantalla. Cada petición se ejecuta en el hilo de la
+# GUI a través de ControlBridge, de modo que se usan exactamente las mismas
+# señales y slots de HardwareController que los botones de RehabilitationApp.
+#
+# Protocolo: un objeto JSON por línea.
+#   -> {"jsonrpc": "2.0", "id": 1, "method": "status"}
+#   <- {"jsonrpc": "2.0", "id": 1, "result": {...}}
+#   -> {"jsonrpc": "2.0", "id": 2, "method": "subscribe"}
+#   <- {"jsonrpc": "2.0", "method": "telemetry", "params": {"event": "position", ...}}
+#
+# Cliente de línea de comandos:
+#   python control_api.py status
+#   python control_api.py start_therapy '{"exercise": "flexion_extension", "reps": 10}'
+#   python control_api.py subscribe
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+
+DEFAULT_SOCKET_PATH = os.environ.get("ORTESIS_API_SOCKET", "/tmp/ortesis_api.sock")
+# Permisos del socket: solo el usuario de la aplicación (0660 para un grupo dedicado)
+SOCKET_MODE = int(os.environ.get("ORTESIS_API_SOCKET_MODO", "600"), 8)
+SUBSCRIBER_QUEUE_SIZE = 256
+REQUEST_TIMEOUT_S = 5.0
+
+# Códigos de error JSON-RPC
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class ApiError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class _Subscriber:
+    """Cola acotada por cliente: si un cliente es lento se descartan los eventos más viejos."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class ControlServer:
+    """Servidor asyncio en un hilo propio con difusión de telemetría a N suscriptores."""
+
+    def __init__(self, handler, socket_path=DEFAULT_SOCKET_PATH, tcp_port=None):
+        self.handler = handler          # Callable(method, params) -> concurrent Future
+        self.socket_path = socket_path
+        self.tcp_port = tcp_port
+        self.loop = None
+        self.thread = None
+        self.subscribers = set()
+        self.published = 0
+        self._ready = threading.Event()
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="control-api", daemon=True)
+        self.thread.start()
+        self._ready.wait(2.0)
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.socket_path and os.path.exists(self.socket_path):
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            if self.socket_path:
+                if os.path.exists(self.socket_path):
+                    os.unlink(self.socket_path)
+                self.loop.run_until_complete(asyncio.start_unix_server(self._handle_client, path=self.socket_path))
+                os.chmod(self.socket_path, SOCKET_MODE)
+                print(f"[API] Escuchando en {self.socket_path}")
+            if self.tcp_port:
+                self.loop.run_until_complete(asyncio.start_server(self._handle_client, "127.0.0.1", self.tcp_port))
+                print(f"[API] Escuchando en 127.0.0.1:{self.tcp_port}")
+        except OSError as e:
+            print(f"[API] No se pudo iniciar el servidor: {e}")
+            self._ready.set()
+            return
+        self._ready.set()
+        self.loop.run_forever()
+
+    # --- Telemetría ---
+
+    def publish(self, event):
+        """Publica un evento a todos los suscriptores. Seguro desde cualquier hilo."""
+        if self.loop is None or not self.subscribers:
+            return
+        message = {"jsonrpc": "2.0", "method": "telemetry", "params": event}
+        self.loop.call_soon_threadsafe(self._fan_out, message)
+
+    def _fan_out(self, message):
+        self.published += 1
+        for sub in list(self.subscribers):
+            sub.offer(message)
+
+    async def _pump(self, sub):
+        while True:
+            message = await sub.queue.get()
+            sub.writer.write((json.dumps(message) + "\n").encode())
+            await sub.writer.drain()
+
+    # --- Peticiones ---
+
+    async def _handle_client(self, reader, writer):
+        sub = None
+        pump = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, reply = await self._handle_line(line)
+                if method == "subscribe" and sub is None:
+                    sub = _Subscriber(writer)
+                    self.subscribers.add(sub)
+                    pump = asyncio.ensure_future(self._pump(sub))
+                elif method == "unsubscribe" and sub is not None:
+                    self.subscribers.discard(sub)
+                    pump.cancel()
+                    sub = pump = None
+                if reply is None:
+                    continue
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if sub is not None:
+                self.subscribers.discard(sub)
+            if pump is not None:
+                pump.cancel()
+            writer.close()
+
+    async def _handle_line(self, line):
+        """Procesa una línea. Devuelve (método, respuesta o None)."""
+        req_id = None
+        method = None
+        try:
+            try:
+                req = json.loads(line)
+            except ValueError:
+                raise ApiError(PARSE_ERROR, "JSON inválido")
+            if not isinstance(req, dict) or "method" not in req:
+                raise ApiError(INVALID_REQUEST, "Petición inválida")
+            req_id = req.get("id")
+            method = req["method"]
+            params = req.get("params") or {}
+
+            if method == "subscribe":
+                result = {"subscribed": True}
+            elif method == "unsubscribe":
+                result = {"subscribed": False}
+            else:
+                future = self.handler(method, params)
+                result = await asyncio.wait_for(asyncio.wrap_future(future), REQUEST_TIMEOUT_S)
+        except ApiError as e:
+            return method, {"jsonrpc": "2.0", "id": req_id, "error": {"code": e.code, "message": e.message}}
+        except asyncio.TimeoutError:
+            return method, {"jsonrpc": "2.0", "id": req_id, "error": {"code": SERVER_ERROR, "message": "Tiempo agotado"}}
+        except Exception as e:
+            return method, {"jsonrpc": "2.0", "id": req_id, "error": {"code": SERVER_ERROR, "message": str(e)}}
+
+        if req_id is None:
+            return method, None     # Notificación JSON-RPC: sin respuesta
+        return method, {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+
+# =================================================================================
+# Puente con la aplicación Qt
+# =================================================================================
+
+try:
+    from concurrent.futures import Future
+    from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+    class ControlBridge(QObject):
+        """
+        Ejecuta las peticiones de la API en el hilo de la GUI y reenvía las
+        señales del worker como telemetría.
+        """
+        request_received = pyqtSignal(object)
+
+        def __init__(self, app):
+            super().__init__()
+            self.app = app
+            self.server = None
+            self.request_received.connect(self._dispatch)
+
+            worker = app.worker
+            worker.position_updated.connect(
+                lambda motor, pos: self._publish("position", motor=motor, steps=pos))
+            worker.limit_status_updated.connect(
+                lambda pos_hit, neg_hit: self._publish("limits", pos_hit=pos_hit, neg_hit=neg_hit))
+            worker.movement_finished.connect(lambda ok: self._publish("movement_finished", ok=ok))
+            worker.progress_updated.connect(lambda value: self._publish("calibration_progress", value=value))
+            worker.calibration_finished.connect(
+                lambda ok, msg: self._publish("calibration_finished", ok=ok, message=msg))
+            worker.physical_estop_activated.connect(lambda active: self._publish("estop", active=active))
+            app.therapy_progress.connect(lambda rep, total: self._publish("therapy_progress", rep=rep, total=total))
+            app.therapy_stopped.connect(lambda finished: self._publish("therapy_stopped", finished=finished))
+            app.therapy_paused.connect(lambda paused: self._publish("therapy_paused", paused=paused))
+            worker.trajectory_recorded.connect(
+                lambda samples, waypoints, ms: self._publish("trajectory_recorded", samples=samples,
+                                                             waypoints=waypoints, duration_ms=ms))
+
+        def start(self, socket_path=DEFAULT_SOCKET_PATH, tcp_port=None):
+            self.server = ControlServer(self.submit, socket_path, tcp_port)
+            self.server.start()
+
+        def stop(self):
+            if self.server:
+                self.server.stop()
+
+        def submit(self, method, params):
+            """Llamado desde el hilo asyncio: encola la petición hacia el hilo de la GUI."""
+            future = Future()
+            self.request_received.emit((method, params, future))
+            return future
+
+        def _publish(self, event, **data):
+            if self.server:
+                data["event"] = event
+                data["t"] = time.time()
+                self.server.publish(data)
+
+        @pyqtSlot(object)
+        def _dispatch(self, request):
+            method, params, future = request
+            handler = getattr(self.app, "api_" + method, None)
+            if handler is None:
+                future.set_exception(ApiError(METHOD_NOT_FOUND, f"Método desconocido: {method}"))
+                return
+            try:
+                future.set_result(handler(**params) if isinstance(params, dict) else handler(*params))
+            except TypeError as e:
+                future.set_exception(ApiError(INVALID_PARAMS, str(e)))
+            except Exception as e:
+                future.set_exception(e)
+
+except ImportError:
+    ControlBridge = None
+
+
+# =================================================================================
+# Cliente mínimo (pruebas y supervisión)
+# =================================================================================
+
+def call(method, params=None, socket_path=DEFAULT_SOCKET_PATH):
+    """Envía una petición y devuelve el resultado (o lanza ApiError)."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(socket_path)
+        s.sendall((json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params or {}}) + "\n").encode())
+        reply = json.loads(s.makefile().readline())
+    if "error" in reply:
+        raise ApiError(reply["error"]["code"], reply["error"]["message"])
+    return reply["result"]
+
+
+def subscribe(socket_path=DEFAULT_SOCKET_PATH):
+    """Generador de eventos de telemetría."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(socket_path)
+        s.sendall(b'{"jsonrpc": "2.0", "id": 1, "method": "subscribe"}\n')
+        for line in s.makefile():
+            message = json.loads(line)
+            if message.get("method") == "telemetry":
+                yield message["params"]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python control_api.py <método> [params_json] | subscribe")
+        sys.exit(1)
+    if sys.argv[1] == "subscribe":
+        for event in subscribe():
+            print(json.dumps(event))
+    else:
+        print(json.dumps(call(sys.argv[1], json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}), indent=2))
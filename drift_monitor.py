@@ -0,0 +1,71 @@
+# =================================================================================
+# Archivo: drift_monitor.py
+# Detección de pasos perdidos: los sensores de límite como marcas de referencia.
+# =================================================================================
+#
+# La posición de los ejes es de lazo abierto (pasos comandados o tiempo x Hz).
+# Cada sensor conmuta siempre en el mismo punto físico, así que cada flanco es
+# una medida gratuita de la deriva: el worker anota la posición lógica en el
+# instante del flanco (tick de pigpio) y la compara con la referencia de ese
+# flanco. Activación y liberación se guardan por separado (histéresis del
+# sensor). La activación del sensor de homing queda fijada por la calibración;
+# las demás referencias se aprenden la primera vez que se ven tras calibrar.
+#
+# Un "período" va de una calibración a la siguiente: el resumen acumula el
+# error medido y las correcciones aplicadas en ese tiempo.
+
+
+class AxisDrift:
+    """Estadística de deriva de un eje en el período actual."""
+
+    def __init__(self):
+        self.observations = 0
+        self.last_error = 0
+        self.max_abs_error = 0
+        self.corrected = 0          # Suma de las correcciones aplicadas (pasos)
+        self.pending = 0            # Corrección medida, aún sin aplicar (eje en movimiento)
+
+    def summary(self):
+        return {"n": self.observations, "last": self.last_error, "max_abs": self.max_abs_error,
+                "corrected": self.corrected}
+
+
+class DriftMonitor:
+    """
+    Referencias por flanco {(motor, gpio, nivel): posición} y deriva por eje.
+    observe() devuelve el error de un flanco (None si solo aprendió la referencia).
+    """
+
+    def __init__(self, motors=('lineal', 'rotacional')):
+        self.motors = motors
+        self.reset()
+
+    def reset(self):
+        self.references = {}
+        self.axes = {motor: AxisDrift() for motor in self.motors}
+
+    def seed(self, motor, gpio, level, position):
+        """Referencia conocida de antemano (p. ej. el sensor de homing al calibrar)."""
+        self.references[(motor, gpio, level)] = int(position)
+
+    def observe(self, motor, gpio, level, position):
+        key = (motor, gpio, level)
+        if key not in self.references:
+            self.references[key] = int(position)
+            return None
+        error = int(position) - self.references[key]
+        axis = self.axes[motor]
+        axis.observations += 1
+        axis.last_error = error
+        axis.max_abs_error = max(axis.max_abs_error, abs(error))
+        return error
+
+    def take_pending(self, motor):
+        """Corrección pendiente del eje (y la da por aplicada)."""
+        axis = self.axes[motor]
+        correction, axis.pending = axis.pending, 0
+        axis.corrected += correction
+        return correction
+
+    def summary(self):
+        return {motor: axis.summary() for motor, axis in self.axes.items()}
@@ -0,0 +1,106 @@
+# =================================================================================
+# Archivo: encoder.py
+# Encoder de cuadratura (canales A/B) decodificado con callbacks de pigpio.
+# =================================================================================
+#
+# pigpiod muestrea los GPIO cada pocos µs y entrega cada flanco (con su tick)
+# al hilo de callbacks; cada flanco suma o resta una cuenta según la tabla de
+# transiciones de cuadratura. El callback es lo más corto posible: un índice
+# en una tupla y una suma sobre atributos con __slots__.
+#
+# El estado es de 2 bits (A << 1 | B). El sentido positivo es A adelantado a B:
+# 00 -> 10 -> 11 -> 01 -> 00. Un flanco que no cambia el estado (el canal ya
+# estaba en ese nivel) indica un flanco perdido y se cuenta en 'errors'.
+#
+# Parada sobre el objetivo: arm() deja un umbral en cuentas; el mismo callback
+# que cruza el umbral llama a on_target (en el hilo de pigpio, sin esperar el
+# ciclo de monitoreo del worker).
+
+import threading
+
+# Incremento por transición, indexado por (estado_anterior << 2 | estado_nuevo)
+_TRANSICIONES = (0, -1, 1, 0,
+                 1, 0, 0, -1,
+                 -1, 0, 0, 1,
+                 0, 1, -1, 0)
+
+
+class QuadratureEncoder:
+    """Contador de cuadratura de un eje, en cuentas y en pasos del motor."""
+
+    __slots__ = ('pi', 'gpio_a', 'gpio_b', 'counts_per_step', 'state', 'count', 'errors', 'last_tick',
+                 'zero', 'target', 'target_dir', 'on_target', 'target_lock', 'callbacks')
+
+    def __init__(self, pi, gpio_a, gpio_b, counts_per_step, pigpio):
+        self.pi = pi
+        self.gpio_a = gpio_a
+        self.gpio_b = gpio_b
+        self.counts_per_step = counts_per_step
+        self.count = 0
+        self.errors = 0
+        self.last_tick = 0
+        self.zero = 0.0             # Cuenta que corresponde al paso 0
+        self.target = 0.0
+        self.target_dir = 0         # 0 = sin objetivo armado
+        self.on_target = None
+        self.target_lock = threading.Lock()
+
+        for gpio in (gpio_a, gpio_b):
+            pi.set_mode(gpio, pigpio.INPUT)
+            pi.set_pull_up_down(gpio, pigpio.PUD_UP)
+        self.state = (pi.read(gpio_a) << 1) | pi.read(gpio_b)
+        self.callbacks = [pi.callback(gpio_a, pigpio.EITHER_EDGE, self._edge_a),
+                          pi.callback(gpio_b, pigpio.EITHER_EDGE, self._edge_b)]
+
+    def _edge_a(self, gpio, level, tick):
+        if level > 1:
+            return      # Aviso de watchdog de pigpio, no es un flanco
+        self._transition((self.state & 1) | (level << 1), tick)
+
+    def _edge_b(self, gpio, level, tick):
+        if level > 1:
+            return
+        self._transition((self.state & 2) | level, tick)
+
+    def _transition(self, new, tick):
+        old, self.state = self.state, new
+        if old == new:
+            self.errors += 1
+            return
+        self.count += _TRANSICIONES[(old << 2) | new]
+        self.last_tick = tick
+        if self.target_dir and (self.count - self.target) * self.target_dir >= 0:
+            self._fire()
+
+    def _fire(self):
+        with self.target_lock:
+            # disarm() pudo ganar la carrera: solo dispara si sigue armado
+            if not self.target_dir:
+                return
+            self.target_dir = 0
+            self.on_target()
+
+    def steps(self):
+        """Posición medida, en pasos del motor."""
+        return int(round((self.count - self.zero) / self.counts_per_step))
+
+    def set_steps(self, position):
+        """Hace que la posición actual mida 'position' pasos (cero de calibración, corrección)."""
+        self.zero = self.count - position * self.counts_per_step
+
+    def arm(self, target_steps, direction, on_target):
+        """Llama a on_target (hilo de pigpio) al alcanzar target_steps avanzando en 'direction' (+1/-1)."""
+        with self.target_lock:
+            self.on_target = on_target
+            self.target = self.zero + target_steps * self.counts_per_step
+            self.target_dir = 1 if direction > 0 else -1
+
+    def disarm(self):
+        with self.target_lock:
+            self.target_dir = 0
+            self.on_target = None
+
+    def cancel(self):
+        self.disarm()
+        for cb in self.callbacks:
+            cb.cancel()
@@ -0,0 +1,47 @@
+# =================================================================================
+# Archivo: exercises.py
+# Descriptores de ejercicio para la página de configuración compartida.
+# =================================================================================
+#
+# La interfaz construye una sola página de ejercicio (jog, límites, teclado de
+# repeticiones) y la vuelve a enlazar con el descriptor del ejercicio elegido.
+# El descriptor dice qué eje mueve, cómo se muestran sus unidades, qué límites
+# guarda (el inferior primero) y qué flechas ofrece; un ejercicio nuevo de un
+# solo eje es un descriptor más, sin widgets nuevos.
+
+
+class JogArrow:
+    """Flecha de jog: sentido (+1/-1), nombre del movimiento, icono y sensor que la bloquea."""
+
+    def __init__(self, direction, label, icon, guard_pin):
+        self.direction = direction
+        self.label = label
+        self.icon = icon
+        self.guard_pin = guard_pin
+
+
+class Exercise:
+    """
+    Ejercicio de un eje. 'limits' son los prefijos de los atributos de límite
+    de la interfaz (inferior, superior): p. ej. ("extension", "flexion") ->
+    extension_limite_pasos / extension_limite_saved. 'arrows' van de izquierda
+    a derecha tal como se dibujan.
+    """
+
+    def __init__(self, key, title, therapy_type, motor, units, limits, names, arrows, switch_to=None):
+        self.key = key
+        self.title = title
+        self.therapy_type = therapy_type
+        self.motor = motor
+        self.units = units
+        self.limits = limits
+        self.names = names
+        self.arrows = arrows
+        self.switch_to = switch_to
+
+    def steps_attr(self, which):
+        """which: 0 inferior, 1 superior."""
+        return f"{self.limits[which]}_limite_pasos"
+
+    def saved_attr(self, which):
+        return f"{self.limits[which]}_limite_saved"
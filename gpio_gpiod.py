@@ -0,0 +1,271 @@
+# =================================================================================
+# Archivo: gpio_gpiod.py
+# Sustituto de 'pigpio' sobre el dispositivo de caracteres GPIO (libgpiod v2),
+# sin el daemon pigpiod. Se selecciona con ORTESIS_GPIO=gpiod.
+# =================================================================================
+#
+# Con pigpio cada read/write/hardware_PWM es un viaje de ida y vuelta por el
+# socket de pigpiod. Aquí son ioctl del propio proceso sobre /dev/gpiochipN
+# (una petición de línea por GPIO) y escrituras en sysfs para el PWM.
+#
+# - Entradas: read() lee la línea. Los callbacks se atienden en un hilo que
+#   espera los eventos de flanco del kernel; el tick de cada flanco es su
+#   marca de tiempo del kernel (CLOCK_MONOTONIC, en µs de 32 bits como pigpio),
+#   así que tickDiff() contra get_current_tick() da la antigüedad real del flanco.
+# - set_glitch_filter() usa el debounce del kernel (debounce_period).
+# - hardware_PWM() escribe en /sys/class/pwm/pwmchipN (dtoverlay=pwm-2chan:
+#   GPIO 18 -> canal 0, GPIO 13 -> canal 1). Esos GPIO no se piden como línea:
+#   pedirlos como salida le quitaría la función PWM al pin.
+# - No hay ondas DMA ni scripts en el daemon: la terapia usa la máquina de
+#   estados y el watchdog de pigpiod no está disponible.
+#
+# Se prueba en cualquier Linux con el módulo gpio-sim (ver gpiod_check.py).
+
+import os
+import select
+import threading
+import time
+from datetime import timedelta
+
+import gpiod
+from gpiod.line import Bias, Direction, Edge, Value
+
+# --- Constantes compatibles con pigpio ---
+INPUT = 0
+OUTPUT = 1
+
+PUD_OFF = 0
+PUD_DOWN = 1
+PUD_UP = 2
+
+RISING_EDGE = 0
+FALLING_EDGE = 1
+EITHER_EDGE = 2
+
+DEFAULT_CHIP = os.environ.get("ORTESIS_GPIOCHIP", "/dev/gpiochip0")
+DEFAULT_PWM_CHIP = os.environ.get("ORTESIS_PWMCHIP", "/sys/class/pwm/pwmchip0")
+
+# GPIO PUL -> canal del pwmchip (dtoverlay=pwm-2chan,pin=18,func=2,pin2=13,func2=4)
+PWM_CANALES = {18: 0, 13: 1}
+
+_BIAS = {PUD_OFF: Bias.DISABLED, PUD_DOWN: Bias.PULL_DOWN, PUD_UP: Bias.PULL_UP}
+
+# Espera máxima del hilo de eventos antes de revisar si hay líneas nuevas
+_EVENT_WAIT_S = 0.1
+
+
+def tickDiff(t1, t2):
+    """Diferencia entre dos ticks de 32 bits (igual que pigpio.tickDiff)."""
+    return (t2 - t1) & 0xFFFFFFFF
+
+
+def _tick(ns):
+    return (ns // 1000) & 0xFFFFFFFF
+
+
+class _Callback:
+    def __init__(self, owner, gpio, edge, func):
+        self.owner = owner
+        self.gpio = gpio
+        self.edge = edge
+        self.func = func
+
+    def cancel(self):
+        with self.owner._lock:
+            if self in self.owner._callbacks:
+                self.owner._callbacks.remove(self)
+
+
+class _SysfsPwm:
+    """Un canal de /sys/class/pwm con los archivos abiertos (cada cambio es un pwrite)."""
+
+    def __init__(self, chip, channel):
+        path = os.path.join(chip, f"pwm{channel}")
+        if not os.path.isdir(path):
+            with open(os.path.join(chip, "export"), "w") as f:
+                f.write(str(channel))
+            for _ in range(50):     # udev tarda en dar permisos al canal recién exportado
+                if os.access(os.path.join(path, "enable"), os.W_OK):
+                    break
+                time.sleep(0.01)
+        self.fds = {name: os.open(os.path.join(path, name), os.O_WRONLY)
+                    for name in ("period", "duty_cycle", "enable")}
+        self.period = 0
+        self.duty = 0
+        self.enabled = None
+
+    def _put(self, name, value):
+        os.pwrite(self.fds[name], str(value).encode(), 0)
+
+    def set(self, frequency, dutycycle):
+        """Misma semántica que pigpio: frecuencia en Hz y ciclo de trabajo en millonésimas."""
+        if frequency <= 0 or dutycycle <= 0:
+            if self.enabled is not False:
+                self._put("enable", 0)
+                self.enabled = False
+            return
+        period = int(1e9 / frequency)
+        duty = period * min(dutycycle, 1000000) // 1000000
+        if period != self.period:
+            # El kernel exige duty <= period en todo momento
+            if self.duty > period:
+                self._put("duty_cycle", 0)
+                self.duty = 0
+            self._put("period", period)
+            self.period = period
+        if duty != self.duty:
+            self._put("duty_cycle", duty)
+            self.duty = duty
+        if not self.enabled:
+            self._put("enable", 1)
+            self.enabled = True
+
+    def close(self):
+        self.set(0, 0)
+        for fd in self.fds.values():
+            os.close(fd)
+
+
+class pi:
+    """Conexión 'pigpio' sobre libgpiod: una petición de línea por GPIO y un hilo para los flancos."""
+
+    def __init__(self, chip=DEFAULT_CHIP, pwm_chip=DEFAULT_PWM_CHIP):
+        self.chip = chip
+        self.pwm_chip = pwm_chip if os.path.isdir(pwm_chip) else None
+        self.connected = os.path.exists(chip)
+        self._lock = threading.RLock()
+        self._settings = {}         # gpio -> argumentos de LineSettings
+        self._requests = {}         # gpio -> LineRequest
+        self._callbacks = []
+        self._pwm = {}
+        if not self.pwm_chip:
+            print(f"[GPIO] ADVERTENCIA: '{pwm_chip}' no existe: hardware_PWM no generará pulsos.")
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="gpiod-edges", daemon=True)
+        self._thread.start()
+
+    # --- Líneas ---
+
+    def _configure(self, gpio, **changes):
+        """Aplica 'changes' a la configuración de la línea (la pide la primera vez)."""
+        with self._lock:
+            settings = self._settings.setdefault(gpio, {"direction": Direction.INPUT})
+            settings.update(changes)
+            config = {gpio: gpiod.LineSettings(**settings)}
+            request = self._requests.get(gpio)
+            if request is None:
+                self._requests[gpio] = gpiod.request_lines(self.chip, consumer="ortesis", config=config)
+            else:
+                request.reconfigure_lines(config)
+
+    def _is_pwm(self, gpio):
+        return self.pwm_chip is not None and gpio in PWM_CANALES
+
+    def _request(self, gpio):
+        request = self._requests.get(gpio)
+        if request is None:
+            self._configure(gpio)
+            request = self._requests[gpio]
+        return request
+
+    # --- API compatible con pigpio ---
+
+    def set_mode(self, gpio, mode):
+        if self._is_pwm(gpio):
+            return
+        if mode == OUTPUT:
+            # Como pigpio, la salida conserva el nivel que tenía el pin (ENABLE activo en bajo:
+            # no debe pasar por 0 antes de que la aplicación escriba su nivel)
+            level = self._request(gpio).get_value(gpio)
+            self._configure(gpio, direction=Direction.OUTPUT, edge_detection=Edge.NONE, output_value=level)
+        else:
+            self._configure(gpio, direction=Direction.INPUT)
+
+    def set_pull_up_down(self, gpio, pud):
+        self._configure(gpio, bias=_BIAS[pud])
+
+    def set_glitch_filter(self, gpio, steady):
+        self._configure(gpio, debounce_period=timedelta(microseconds=steady))
+
+    def read(self, gpio):
+        return 1 if self._request(gpio).get_value(gpio) == Value.ACTIVE else 0
+
+    def write(self, gpio, level):
+        self._request(gpio).set_value(gpio, Value.ACTIVE if level else Value.INACTIVE)
+
+    def read_bank_1(self):
+        with self._lock:
+            gpios = [g for g in self._requests if g < 32]
+        return sum(1 << g for g in gpios if self.read(g))
+
+    def set_bank_1(self, bits):
+        for gpio in range(32):
+            if bits & (1 << gpio):
+                self.write(gpio, 1)
+
+    def clear_bank_1(self, bits):
+        for gpio in range(32):
+            if bits & (1 << gpio):
+                self.write(gpio, 0)
+
+    def hardware_PWM(self, gpio, frequency, dutycycle):
+        if not self._is_pwm(gpio):
+            return 0
+        channel = self._pwm.get(gpio)
+        if channel is None:
+            if frequency <= 0 or dutycycle <= 0:
+                return 0
+            channel = self._pwm[gpio] = _SysfsPwm(self.pwm_chip, PWM_CANALES[gpio])
+        channel.set(frequency, dutycycle)
+        return 0
+
+    def callback(self, user_gpio, edge=RISING_EDGE, func=None):
+        # La línea detecta siempre ambos flancos; cada callback filtra el suyo
+        if self._settings.get(user_gpio, {}).get("edge_detection") != Edge.BOTH:
+            self._configure(user_gpio, direction=Direction.INPUT, edge_detection=Edge.BOTH)
+        cb = _Callback(self, user_gpio, edge, func)
+        with self._lock:
+            self._callbacks.append(cb)
+        return cb
+
+    def get_current_tick(self):
+        return _tick(time.monotonic_ns())
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=2 * _EVENT_WAIT_S)
+        with self._lock:
+            for channel in self._pwm.values():
+                channel.close()
+            for request in self._requests.values():
+                request.release()
+            self._pwm = {}
+            self._requests = {}
+        self.connected = False
+
+    # --- Hilo de eventos de flanco ---
+
+    def _run(self):
+        while self._running:
+            with self._lock:
+                watched = {self._requests[g].fd: self._requests[g] for g, s in self._settings.items()
+                           if s.get("edge_detection") == Edge.BOTH and g in self._requests}
+            if not watched:
+                time.sleep(_EVENT_WAIT_S)
+                continue
+            ready, _, _ = select.select(list(watched), [], [], _EVENT_WAIT_S)
+            for fd in ready:
+                for event in watched[fd].read_edge_events():
+                    self._dispatch(event)
+
+    def _dispatch(self, event):
+        gpio = event.line_offset
+        level = 1 if event.event_type == event.Type.RISING_EDGE else 0
+        tick = _tick(event.timestamp_ns)
+        with self._lock:
+            callbacks = [cb for cb in self._callbacks if cb.gpio == gpio]
+        for cb in callbacks:
+            if (cb.edge == EITHER_EDGE or (cb.edge == RISING_EDGE and level == 1)
+                    or (cb.edge == FALLING_EDGE and level == 0)):
+                cb.func(gpio, level, tick)
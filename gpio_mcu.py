@@ -0,0 +1,492 @@
+# =================================================================================
+# Archivo: gpio_mcu.py
+# Sustituto de 'pigpio' que delega la generación de pasos en un microcontrolador
+# conectado por puerto serie (protocolo de mcu_protocol.py). Se selecciona con
+# ORTESIS_GPIO=mcu.
+# =================================================================================
+#
+# El temporizado de los pulsos deja de depender del planificador de Linux: el
+# host envía tramos compactos (pasos, frecuencia, aceleración, pausa) y el
+# microcontrolador da exactamente esos pasos. A cambio devuelve:
+#   - INPUTS en cada flanco de una entrada: read() lee el espejo local (sin
+#     viaje por el puerto) y los callbacks reciben el tick del microcontrolador.
+#     get_current_tick() está en la misma base (desfase medido con PING al
+#     conectar y reestimado con cada trama con tick: la muestra de menor
+#     latencia de la última VENTANA_DESFASE_S; sin tráfico se reenvía PING),
+#     así que tickDiff() da la antigüedad real del flanco aunque los relojes
+#     deriven.
+#   - STATUS periódico con la posición y el avance del tramo en curso.
+#   - DONE al terminar (o abortar) cada tramo con los pasos dados.
+# hardware_PWM() se traduce a giro continuo (CMD_RUN) para jog, homing y
+# verificación; frecuencia 0 detiene el eje y vacía su cola de tramos.
+#
+# Extensiones sobre pigpio: segment(), start_held(), segment_steps(),
+# segment_done(), wait_segment(), position() y SegmentSession (la sesión de
+# terapia compilada por wave_session.py, enviada como tramos en lugar de una
+# cadena de ondas DMA). No hay scripts en el daemon: el watchdog de pigpiod
+# no se usa; el firmware detiene los pulsos por sí mismo con el paro.
+#
+# ORTESIS_MCU_PUERTO=sim arranca el firmware simulado (mcu_sim.py) en un pty.
+
+import os
+import select
+import threading
+import time
+import tty
+from collections import deque
+
+import mcu_protocol as proto
+
+# --- Constantes compatibles con pigpio ---
+INPUT = 0
+OUTPUT = 1
+
+PUD_OFF = 0
+PUD_DOWN = 1
+PUD_UP = 2
+
+RISING_EDGE = 0
+FALLING_EDGE = 1
+EITHER_EDGE = 2
+
+DEFAULT_PORT = os.environ.get("ORTESIS_MCU_PUERTO", "/dev/ttyACM0")
+
+# Ejes cableados al microcontrolador: GPIO PUL -> GPIO DIR (mismos números que en la Raspberry Pi)
+EJES = {18: 27, 13: 19}
+
+_RESPUESTA_S = 0.5
+_PINGS_SINCRONIA = 5
+VENTANA_DESFASE_S = 1.0     # Muestras de desfase consideradas (la deriva del cristal es de µs/s)
+_PING_PERIODO_S = 0.25      # PING de mantenimiento si no llega ninguna trama con tick
+_PING_SEQ = 0xFFFF          # Secuencia de los PING de mantenimiento (no los espera nadie)
+_TICK_MASK = 0xFFFFFFFF
+
+
+def tickDiff(t1, t2):
+    """Diferencia entre dos ticks de 32 bits (igual que pigpio.tickDiff)."""
+    return (t2 - t1) & _TICK_MASK
+
+
+def _host_us():
+    return int(time.perf_counter() * 1e6)
+
+
+class _Callback:
+    def __init__(self, owner, gpio, edge, func):
+        self.owner = owner
+        self.gpio = gpio
+        self.edge = edge
+        self.func = func
+
+    def cancel(self):
+        with self.owner._lock:
+            if self in self.owner._callbacks:
+                self.owner._callbacks.remove(self)
+
+
+class _Segment:
+    __slots__ = ('pul', 'steps', 'done', 'finished', 'aborted')
+
+    def __init__(self, pul, steps):
+        self.pul = pul
+        self.steps = steps
+        self.done = 0
+        self.finished = False
+        self.aborted = False
+
+
+class pi:
+    """Conexión 'pigpio' con el microcontrolador: un hilo lee las tramas de vuelta."""
+
+    def __init__(self, port=DEFAULT_PORT):
+        self.sim = None
+        if port == "sim":
+            import mcu_sim
+            self.sim = mcu_sim.McuSimulator()
+            port = self.sim.port
+        self.port = port
+        self.connected = False
+        self._lock = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._parser = proto.FrameParser()
+        self._callbacks = []
+        self._listeners = []        # Funciones (seg_id, pul, pasos, abortado) llamadas con cada DONE
+        self._config = {}           # gpio -> {mode, pud, glitch}
+        self._outputs = {}
+        self._levels = 0
+        self._inputs_seen = 0
+        self._segments = {}
+        self._next_id = 0
+        self._positions = {}
+        self._pongs = {}
+        self._tick_offset = 0
+        self._offset_samples = deque()  # (llegada µs, desfase) de las tramas con tick
+        self._last_sample_s = 0.0
+        self.frames_out = 0
+
+        try:
+            self.fd = os.open(port, os.O_RDWR | os.O_NOCTTY)
+        except OSError as e:
+            print(f"[GPIO] No se pudo abrir el microcontrolador en '{port}': {e}")
+            self.fd = None
+            return
+        tty.setraw(self.fd)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="mcu-rx", daemon=True)
+        self._thread.start()
+
+        for pul, dir_gpio in EJES.items():
+            self._send(proto.CMD_AXIS, pul, dir_gpio)
+        self.connected = self._sync_clock()
+        if not self.connected:
+            print(f"[GPIO] El microcontrolador en '{port}' no responde.")
+
+    # --- Puerto serie ---
+
+    def _send(self, kind, *fields):
+        if not self._running:
+            return              # Enlace perdido: el firmware ya detuvo los pulsos por su cuenta
+        frame = proto.encode(kind, *fields)
+        try:
+            with self._write_lock:
+                os.write(self.fd, frame)
+                self.frames_out += 1
+        except OSError as e:
+            self._link_lost(e)
+
+    def _link_lost(self, error):
+        if not self._running:
+            return
+        self._running = False
+        self.connected = False
+        print(f"[GPIO] Se perdió el enlace con el microcontrolador en '{self.port}': {error}")
+        with self._lock:
+            self._lock.notify_all()
+
+    def _sync_clock(self):
+        """Desfase host -> tick del microcontrolador con el PING de menor ida y vuelta."""
+        best = None
+        for seq in range(_PINGS_SINCRONIA):
+            sent = _host_us()
+            self._send(proto.CMD_PING, seq)
+            with self._lock:
+                if not self._lock.wait_for(lambda: seq in self._pongs, _RESPUESTA_S):
+                    return False
+                received, tick = self._pongs.pop(seq)
+            rtt = received - sent
+            if best is None or rtt < best[0]:
+                best = (rtt, (sent + rtt // 2 - tick) & _TICK_MASK)
+        with self._lock:
+            self._tick_offset = best[1]
+            self._offset_samples.clear()
+        return True
+
+    def _tick_sample(self, tick):
+        """
+        Reestima el desfase con el tick de una trama recién llegada: la llegada
+        acota el envío por arriba, así que la muestra mínima de la ventana es
+        la de menor latencia.
+        """
+        received = _host_us()
+        with self._lock:
+            # Relativo al desfase actual para no confundir el desborde de 32 bits
+            delta = (((received - tick - self._tick_offset) + (1 << 31)) & _TICK_MASK) - (1 << 31)
+            samples = self._offset_samples
+            samples.append((received, self._tick_offset + delta))
+            while received - samples[0][0] > VENTANA_DESFASE_S * 1e6:
+                samples.popleft()
+            self._tick_offset = min(offset for _, offset in samples) & _TICK_MASK
+            self._last_sample_s = time.perf_counter()
+
+    def _run(self):
+        while self._running:
+            ready, _, _ = select.select([self.fd], [], [], 0.1)
+            if self.connected and time.perf_counter() - self._last_sample_s > _PING_PERIODO_S:
+                self._send(proto.CMD_PING, _PING_SEQ)
+                self._last_sample_s = time.perf_counter()
+            if not ready:
+                continue
+            try:
+                data = os.read(self.fd, 4096)
+                if not data:
+                    raise OSError("fin de archivo en el puerto")
+            except OSError as e:
+                self._link_lost(e)
+                return
+            for kind, payload in self._parser.feed(data):
+                self._handle(kind, proto.decode(kind, payload))
+
+    def _handle(self, kind, fields):
+        if kind == proto.MSG_INPUTS:
+            tick, levels = fields
+            self._tick_sample(tick)
+            with self._lock:
+                changed, self._levels = levels ^ self._levels, levels
+                self._inputs_seen += 1
+                self._lock.notify_all()
+                callbacks = list(self._callbacks)
+            for gpio in range(32):
+                if not changed & (1 << gpio):
+                    continue
+                level = (levels >> gpio) & 1
+                for cb in callbacks:
+                    if cb.gpio == gpio and (cb.edge == EITHER_EDGE or (cb.edge == RISING_EDGE and level == 1)
+                                            or (cb.edge == FALLING_EDGE and level == 0)):
+                        cb.func(gpio, level, tick)
+        elif kind == proto.MSG_STATUS:
+            tick, axes = fields
+            self._tick_sample(tick)
+            with self._lock:
+                for pul, position, seg_id, seg_steps, _flags in axes:
+                    self._positions[pul] = position
+                    seg = self._segments.get(seg_id)
+                    if seg is not None and not seg.finished:
+                        seg.done = seg_steps
+        elif kind == proto.MSG_DONE:
+            seg_id, pul, steps, aborted, tick = fields
+            self._tick_sample(tick)
+            with self._lock:
+                seg = self._segments.get(seg_id)
+                if seg is not None:
+                    seg.done, seg.finished, seg.aborted = steps, True, bool(aborted)
+                self._lock.notify_all()
+                listeners = list(self._listeners)
+            for func in listeners:
+                func(seg_id, pul, steps, bool(aborted))
+        elif kind == proto.MSG_PONG:
+            seq, tick = fields
+            if seq == _PING_SEQ:
+                self._tick_sample(tick)
+                return
+            with self._lock:
+                self._pongs[seq] = (_host_us(), tick)
+                self._lock.notify_all()
+
+    def _configure(self, gpio, **changes):
+        config = self._config.setdefault(gpio, {"mode": INPUT, "pud": PUD_OFF, "glitch": 0})
+        config.update(changes)
+        with self._lock:
+            seen = self._inputs_seen
+        self._send(proto.CMD_CONFIG, gpio, config["mode"], config["pud"], config["glitch"])
+        if config["mode"] == INPUT:
+            # El microcontrolador responde con INPUTS: read() ya ve el nivel real
+            with self._lock:
+                self._lock.wait_for(lambda: self._inputs_seen > seen, _RESPUESTA_S)
+
+    # --- API compatible con pigpio ---
+
+    def set_mode(self, gpio, mode):
+        if gpio in EJES:
+            return      # PUL lo maneja el generador de pasos
+        self._configure(gpio, mode=mode)
+
+    def set_pull_up_down(self, gpio, pud):
+        self._configure(gpio, pud=pud)
+
+    def set_glitch_filter(self, gpio, steady):
+        self._configure(gpio, glitch=steady)
+
+    def read(self, gpio):
+        if gpio in self._outputs:
+            return self._outputs[gpio]
+        return (self._levels >> gpio) & 1
+
+    def write(self, gpio, level):
+        self._outputs[gpio] = 1 if level else 0
+        self._send(proto.CMD_WRITE, gpio, 1 if level else 0)
+
+    def read_bank_1(self):
+        outputs = sum(1 << g for g, v in self._outputs.items() if v and g < 32)
+        return self._levels | outputs
+
+    def set_bank_1(self, bits):
+        self._send(proto.CMD_BANK, bits, 0)
+        for gpio in range(32):
+            if bits & (1 << gpio):
+                self._outputs[gpio] = 1
+
+    def clear_bank_1(self, bits):
+        self._send(proto.CMD_BANK, 0, bits)
+        for gpio in range(32):
+            if bits & (1 << gpio):
+                self._outputs[gpio] = 0
+
+    def hardware_PWM(self, gpio, frequency, dutycycle):
+        if gpio not in EJES:
+            return 0
+        rate = frequency if dutycycle > 0 else 0
+        self._send(proto.CMD_RUN, gpio, int(round(rate * 1000)))
+        return 0
+
+    def wave_tx_stop(self):
+        """Detiene todos los ejes y vacía sus colas de tramos."""
+        for pul in EJES:
+            self._send(proto.CMD_RUN, pul, 0)
+        return 0
+
+    def callback(self, user_gpio, edge=RISING_EDGE, func=None):
+        cb = _Callback(self, user_gpio, edge, func)
+        with self._lock:
+            self._callbacks.append(cb)
+        return cb
+
+    def get_current_tick(self):
+        return (_host_us() - self._tick_offset) & _TICK_MASK
+
+    def stop(self):
+        if self.fd is not None:
+            self.wave_tx_stop()
+            self._running = False
+            self._thread.join(timeout=0.5)
+            os.close(self.fd)
+            self.fd = None
+        if self.sim:
+            self.sim.stop()
+            self.sim = None
+        self.connected = False
+
+    # --- Tramos de movimiento (no existen en pigpio) ---
+
+    def segment(self, pul, dir_level, steps, rate_hz, accel_hz_s=0, dwell_us=0, hold=False):
+        """
+        Encola un tramo en el eje 'pul': DIR a 'dir_level', 'steps' pulsos a
+        'rate_hz' con rampas de 'accel_hz_s' (0 = sin rampa) y 'dwell_us' de
+        pausa. hold=True lo deja retenido hasta start_held(). Devuelve su id.
+        """
+        with self._lock:
+            if len(self._segments) > 1024:
+                self._segments = {k: s for k, s in self._segments.items() if not s.finished}
+            self._next_id = self._next_id % 0xFFFF + 1
+            seg_id = self._next_id
+            self._segments[seg_id] = _Segment(pul, steps)
+        self._outputs[EJES[pul]] = 1 if dir_level else 0
+        self._send(proto.CMD_SEGMENT, seg_id, pul, 1 if dir_level else 0, proto.FLAG_HOLD if hold else 0,
+                   int(steps), int(round(rate_hz * 1000)), int(accel_hz_s), int(dwell_us))
+        return seg_id
+
+    def start_held(self, puls):
+        """Arranca a la vez los tramos retenidos de los ejes 'puls'."""
+        self._send(proto.CMD_START, sum(1 << pul for pul in puls))
+
+    def segment_steps(self, seg_id):
+        """Pasos dados por el tramo (último STATUS o DONE)."""
+        seg = self._segments.get(seg_id)
+        return seg.done if seg else 0
+
+    def segment_done(self, seg_id):
+        seg = self._segments.get(seg_id)
+        return seg is None or seg.finished
+
+    def wait_segment(self, seg_id, timeout=_RESPUESTA_S):
+        """Espera el DONE del tramo (tras detenerlo) y devuelve los pasos exactos."""
+        with self._lock:
+            self._lock.wait_for(lambda: self.segment_done(seg_id), timeout)
+        return self.segment_steps(seg_id)
+
+    def position(self, pul):
+        """Contador de pasos del eje en el microcontrolador (+1 por paso con DIR=1)."""
+        return self._positions.get(pul, 0)
+
+    def add_segment_listener(self, func):
+        with self._lock:
+            self._listeners.append(func)
+
+    def remove_segment_listener(self, func):
+        with self._lock:
+            if func in self._listeners:
+                self._listeners.remove(func)
+
+
+class SegmentSession:
+    """
+    Ejecuta un wave_session.SessionProgram como tramos del microcontrolador
+    (misma interfaz que WaveSession). Los tramos se generan al vuelo y se
+    mantienen COLA_TRAMOS en vuelo: cada DONE envía el siguiente.
+    """
+
+    def __init__(self, pi, program, pigpio_module=None):
+        self.pi = pi
+        self.program = program
+        self.pending = self._segments()
+        self.next = next(self.pending, None)
+        self.in_flight = deque()    # (seg_id, posición al empezar, sentido)
+        self.position_done = program.timeline[0][2] if program.timeline else program.final_position
+        self.stopped = False
+        self.aborted = False
+        self.lock = threading.Lock()
+
+    def _segments(self):
+        """Recorre las operaciones de la cadena: (nivel de DIR, pasos, pausa en µs, sentido)."""
+        program = self.program
+        levels = {name: 1 if program.waves[name][0][0] else 0 for name in ('dir+', 'dir-')}
+        rate_hz = 1e6 / sum(delay for _, _, delay in program.waves['step'])
+        state = {'dir': 'dir+', 'last': None}
+
+        def walk(ops):
+            for op in ops:
+                if op[0] == 'wave' and op[1] == 'step':
+                    if state['last']:
+                        yield state['last']
+                    sign = 1 if state['dir'] == 'dir+' else -1
+                    state['last'] = [levels[state['dir']], op[2], 0, sign]
+                elif op[0] == 'wave':
+                    state['dir'] = op[1]
+                elif op[0] == 'delay':
+                    if state['last'] is None:
+                        state['last'] = [0, 0, 0, 0]
+                    state['last'][2] += op[1]     # La pausa va en el mismo tramo que el movimiento anterior
+                else:
+                    for _ in range(op[1]):
+                        yield from walk(op[2])
+
+        for level, steps, dwell_us, sign in walk(program.ops):
+            yield level, steps, rate_hz, dwell_us, sign
+        if state['last']:
+            level, steps, dwell_us, sign = state['last']
+            yield level, steps, rate_hz, dwell_us, sign
+
+    def _feed(self):
+        with self.lock:
+            while not self.stopped and self.next is not None and len(self.in_flight) < proto.COLA_TRAMOS:
+                level, steps, rate_hz, dwell_us, sign = self.next
+                start = self.in_flight[-1][1] + self.in_flight[-1][2] * self.in_flight[-1][3] \
+                    if self.in_flight else self.position_done
+                seg_id = self.pi.segment(self.program.pul_pin, level, steps, rate_hz, 0, dwell_us)
+                self.in_flight.append((seg_id, start, sign, steps))
+                self.next = next(self.pending, None)
+
+    def _on_done(self, seg_id, pul, steps, aborted):
+        with self.lock:
+            if not self.in_flight or self.in_flight[0][0] != seg_id:
+                return
+            _, start, sign, _ = self.in_flight.popleft()
+            # Tras el primer tramo abortado, los encolados no llegaron a moverse
+            if not self.aborted:
+                self.position_done = start + sign * steps
+            self.aborted = self.aborted or aborted
+        self._feed()
+
+    def start(self):
+        self.pi.add_segment_listener(self._on_done)
+        self._feed()
+
+    def busy(self):
+        return bool(self.in_flight) or (self.next is not None and not self.stopped)
+
+    def position(self):
+        """Posición exacta (pasos del programa) según los pasos contados por el microcontrolador."""
+        with self.lock:
+            if not self.in_flight:
+                return self.position_done
+            seg_id, start, sign, _ = self.in_flight[0]
+        return start + sign * self.pi.segment_steps(seg_id)
+
+    def stop(self):
+        """Detiene el eje y espera los DONE de los tramos abortados."""
+        with self.lock:
+            self.stopped = True
+            last = self.in_flight[-1][0] if self.in_flight else None
+        self.pi.hardware_PWM(self.program.pul_pin, 0, 0)
+        if last is not None:
+            self.pi.wait_segment(last)
+        self.pi.remove_segment_listener(self._on_done)
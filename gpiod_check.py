@@ -0,0 +1,187 @@
+# =================================================================================
+# Archivo: gpiod_check.py
+# Prueba del backend libgpiod (gpio_gpiod.py) sobre un chip gpio-sim del kernel,
+# en cualquier Linux (sin Raspberry Pi).
+# =================================================================================
+#
+# Uso (como root, kernel con CONFIG_GPIO_SIM y configfs montado):
+#   modprobe gpio-sim
+#   python gpiod_check.py
+#
+# Crea un banco gpio-sim de 32 líneas (los offsets coinciden con los GPIO BCM
+# de la aplicación) y comprueba:
+#   1. Salidas: DIR/ENABLE escritas por la línea, leídas en sim_gpioN/value;
+#      ENABLE no cambia de nivel al pasar a salida.
+#   2. Entradas: sensores y paro con pull-down, siguiendo el 'pull' del simulador.
+#   3. Flancos: callbacks con la marca de tiempo del kernel (latencia desde el
+#      cambio hasta el flanco y hasta el callback).
+#   4. Debounce: un rebote más corto que el filtro de glitch no llega al callback.
+# Al final imprime las latencias por llamada y borra el banco.
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+import app_fisioterapia as app
+import gpio_gpiod
+from latency import LatencyStats
+
+CONFIGFS = "/sys/kernel/config/gpio-sim"
+NOMBRE_SIM = "ortesis-check"
+LINEAS_SIM = 32
+MUESTRAS = 200
+
+
+class GpioSimBank:
+    """Banco gpio-sim creado por configfs; 'pull' fija el nivel que ve una entrada."""
+
+    def __init__(self, name=NOMBRE_SIM, lines=LINEAS_SIM):
+        self.root = os.path.join(CONFIGFS, name)
+        self.bank = os.path.join(self.root, "gpio-bank0")
+        os.makedirs(self.bank)
+        self._put(os.path.join(self.bank, "num_lines"), lines)
+        self._put(os.path.join(self.root, "live"), 1)
+        chip_name = self._get(os.path.join(self.bank, "chip_name"))
+        self.chip = f"/dev/{chip_name}"
+        self.sysfs = f"/sys/devices/platform/{self._get(os.path.join(self.root, 'dev_name'))}/{chip_name}"
+        self._pull_fds = {}
+
+    @staticmethod
+    def _put(path, value):
+        with open(path, "w") as f:
+            f.write(str(value))
+
+    @staticmethod
+    def _get(path):
+        with open(path) as f:
+            return f.read().strip()
+
+    def pull(self, gpio, level):
+        fd = self._pull_fds.get(gpio)
+        if fd is None:
+            fd = self._pull_fds[gpio] = os.open(f"{self.sysfs}/sim_gpio{gpio}/pull", os.O_WRONLY)
+        os.pwrite(fd, b"pull-up" if level else b"pull-down", 0)
+
+    def value(self, gpio):
+        return int(self._get(f"{self.sysfs}/sim_gpio{gpio}/value"))
+
+    def remove(self):
+        for fd in self._pull_fds.values():
+            os.close(fd)
+        self._put(os.path.join(self.root, "live"), 0)
+        os.rmdir(self.bank)
+        os.rmdir(self.root)
+
+
+def check(name, ok, detail=""):
+    print(f"[gpiod] {'OK   ' if ok else 'FALLO'} {name}{': ' + detail if detail else ''}")
+    return ok
+
+
+def run_checks(sim, pi):
+    results = []
+    read_stats = LatencyStats("read()")
+    write_stats = LatencyStats("write()")
+    edge_stats = LatencyStats("cambio -> flanco del kernel")
+    callback_stats = LatencyStats("flanco del kernel -> callback")
+
+    # 1. Salidas
+    for pin in (app.ROT_EN_PIN, app.LIN_EN_PIN):
+        sim.pull(pin, app.ENABLE_INACTIVO)
+    outputs = (app.ROT_DIR_PIN, app.ROT_EN_PIN, app.LIN_DIR_PIN, app.LIN_EN_PIN)
+    for pin in outputs:
+        pi.set_mode(pin, gpio_gpiod.OUTPUT)
+    results.append(check("ENABLE conserva el nivel al pasar a salida",
+                         all(sim.value(pin) == app.ENABLE_INACTIVO for pin in (app.ROT_EN_PIN, app.LIN_EN_PIN))))
+    ok = True
+    for pin in outputs:
+        for level in (1, 0, 1):
+            start = time.perf_counter()
+            pi.write(pin, level)
+            write_stats.record((time.perf_counter() - start) * 1e6)
+            ok = ok and sim.value(pin) == level
+    results.append(check("salidas DIR/ENABLE", ok))
+
+    # 2. Entradas
+    inputs = (app.ROT_LIMIT_IN_PIN, app.ROT_LIMIT_OUT_PIN, app.LIN_LIMIT_IN_PIN, app.LIN_LIMIT_OUT_PIN, app.E_STOP_PIN)
+    for pin in inputs:
+        pi.set_mode(pin, gpio_gpiod.INPUT)
+        pi.set_pull_up_down(pin, gpio_gpiod.PUD_DOWN)
+    ok = True
+    for pin in inputs:
+        for level in (1, 0):
+            sim.pull(pin, level)
+            start = time.perf_counter()
+            value = pi.read(pin)
+            read_stats.record((time.perf_counter() - start) * 1e6)
+            ok = ok and value == level
+    results.append(check("entradas (sensores y paro)", ok))
+
+    # 3. Flancos con marca de tiempo del kernel
+    pin = app.LIN_LIMIT_OUT_PIN
+    seen = []
+    arrived = threading.Event()
+
+    def on_edge(gpio, level, tick):
+        seen.append((level, tick, pi.get_current_tick()))
+        arrived.set()
+
+    cb = pi.callback(pin, gpio_gpiod.EITHER_EDGE, on_edge)
+    time.sleep(0.2)     # El hilo de eventos recoge la línea nueva
+    missing = 0
+    for i in range(MUESTRAS):
+        arrived.clear()
+        before = pi.get_current_tick()
+        sim.pull(pin, (i + 1) % 2)
+        if not arrived.wait(1.0):
+            missing += 1
+            continue
+        level, tick, now = seen[-1]
+        edge_stats.record(gpio_gpiod.tickDiff(before, tick))
+        callback_stats.record(gpio_gpiod.tickDiff(tick, now))
+    levels_ok = all(level == (i + 1) % 2 for i, (level, _, _) in enumerate(seen))
+    results.append(check("flancos con tick del kernel", missing == 0 and levels_ok and len(seen) == MUESTRAS,
+                         f"{len(seen)}/{MUESTRAS} flancos"))
+
+    # 4. Debounce del kernel (filtro de glitch)
+    sim.pull(pin, 0)
+    time.sleep(0.05)
+    pi.set_glitch_filter(pin, app.FILTRO_GLITCH_US)
+    seen.clear()
+    for level in (1, 0, 1, 0, 1):       # Rebote de unas decenas de µs, termina en 1
+        sim.pull(pin, level)
+    time.sleep(5 * app.FILTRO_GLITCH_US / 1e6 + 0.05)
+    results.append(check(f"rebote filtrado ({app.FILTRO_GLITCH_US} us)",
+                         [level for level, _, _ in seen] == [1], f"flancos vistos {[l for l, _, _ in seen]}"))
+    cb.cancel()
+
+    for stats in (read_stats, write_stats, edge_stats, callback_stats):
+        print(stats.report())
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba el backend libgpiod sobre gpio-sim.")
+    parser.add_argument("--pwmchip", default=gpio_gpiod.DEFAULT_PWM_CHIP,
+                        help="pwmchip de sysfs (gpio-sim no tiene PWM: por defecto se omite si no existe).")
+    args = parser.parse_args()
+
+    if not os.path.isdir(CONFIGFS):
+        sys.exit(f"No existe {CONFIGFS}: cargue el módulo (modprobe gpio-sim) y monte configfs.")
+    sim = GpioSimBank()
+    try:
+        print(f"[gpiod] Banco gpio-sim en {sim.chip}.")
+        pi = gpio_gpiod.pi(chip=sim.chip, pwm_chip=args.pwmchip)
+        try:
+            ok = run_checks(sim, pi)
+        finally:
+            pi.stop()
+    finally:
+        sim.remove()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# =================================================================================
+# Archivo: jog_speed.py
+# Velocidad variable del jog: acelera mientras se mantiene el botón y frena
+# al acercarse a un límite conocido.
+# =================================================================================
+#
+# El worker pide la frecuencia en cada ciclo de monitoreo y solo reprograma el
+# PWM cuando cambia. La posición del jog se integra por tramos (pasos = tiempo
+# x frecuencia vigente), así que cambiar de frecuencia entre ciclos no pierde
+# la cuenta.
+#
+# Rampa: de base_hz a max_hz en ramp_s segundos de botón mantenido.
+# Zona de aproximación: a menos de approach_steps del límite la frecuencia se
+# limita linealmente, de max_hz en el borde de la zona a min_hz en el límite.
+
+
+class JogSpeedProfile:
+    """Frecuencia de jog (Hz enteros) según el tiempo pulsado y la distancia al límite."""
+
+    def __init__(self, base_hz, max_hz, min_hz, ramp_s, approach_steps):
+        self.base_hz = base_hz
+        self.max_hz = max_hz
+        self.min_hz = min_hz
+        self.ramp_s = ramp_s
+        self.approach_steps = approach_steps
+
+    def hz(self, held_s, distance_steps=None):
+        """distance_steps: pasos hasta el límite en el sentido de avance (None si no hay límite conocido)."""
+        ramp = min(1.0, max(0.0, held_s) / self.ramp_s) if self.ramp_s > 0 else 1.0
+        hz = self.base_hz + (self.max_hz - self.base_hz) * ramp
+        if distance_steps is not None and distance_steps < self.approach_steps:
+            fraction = max(0.0, distance_steps) / self.approach_steps
+            hz = min(hz, self.min_hz + (self.max_hz - self.min_hz) * fraction)
+        return int(hz)
@@ -0,0 +1,38 @@
+# =================================================================================
+# Archivo: joint_path.py
+# Movimientos interpolados en el espacio articular (ambos ejes a la vez).
+# =================================================================================
+#
+# Cada tramo es una recta en (pasos lineal, pasos rotacional): ambos ejes
+# arrancan juntos y cada uno recibe la frecuencia que lo hace llegar al mismo
+# tiempo que el eje más lento (limitado por su velocidad máxima). Los dos
+# pines PUL usan canales distintos de PWM por hardware, así que el reparto de
+# pasos lo hace el propio reloj de PWM, sin intercalar pulsos desde Python.
+#
+# hardware_PWM solo admite Hz enteros: cada eje conserva su duración exacta
+# (pasos / Hz entero) y se detiene por separado; la diferencia de llegada es
+# de milisegundos y ningún eje pierde pasos.
+
+
+def plan_segment(deltas, max_hz, min_hz=1, min_duration_s=0.0):
+    """
+    deltas: {motor: pasos con signo}; max_hz: {motor: frecuencia máxima}.
+    min_duration_s alarga el tramo (trayectorias enseñadas) sin pasar de max_hz.
+    Devuelve {motor: (hz, duracion_s)} solo para los ejes que se mueven.
+    """
+    moving = {motor: steps for motor, steps in deltas.items() if steps}
+    if not moving:
+        return {}
+
+    duration = max([min_duration_s] + [abs(steps) / max_hz[motor] for motor, steps in moving.items()])
+    plan = {}
+    for motor, steps in moving.items():
+        hz = max(min_hz, min(max_hz[motor], int(round(abs(steps) / duration))))
+        plan[motor] = (hz, abs(steps) / hz)
+    return plan
+
+
+def path_position(start, end, fraction):
+    """Punto de la recta start -> end (dicts por motor) en la fracción dada del tramo."""
+    fraction = min(1.0, max(0.0, fraction))
+    return {motor: int(round(start[motor] + (end[motor] - start[motor]) * fraction)) for motor in start}
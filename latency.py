@@ -0,0 +1,89 @@
+# =================================================================================
+# Archivo: latency.py
+# Estadísticas de latencia (µs) con histograma y peor caso.
+# =================================================================================
+
+import threading
+from collections import deque
+
+# Cubetas por defecto (límite superior en µs)
+DEFAULT_BUCKETS_US = (100, 250, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+
+class LatencyStats:
+    """
+    Acumula mediciones de latencia en microsegundos.
+
+    Guarda una ventana de las últimas muestras para percentiles, un histograma
+    acumulado por cubetas y el peor caso desde el arranque. Es seguro llamarlo
+    desde varios hilos (callbacks de pigpio, hilo de hardware y GUI).
+    """
+
+    def __init__(self, name, buckets_us=DEFAULT_BUCKETS_US, window=1000):
+        self.name = name
+        self.buckets_us = tuple(buckets_us)
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self._counts = [0] * (len(self.buckets_us) + 1)
+        self.count = 0
+        self.worst_us = 0
+        self.total_us = 0
+
+    def record(self, value_us):
+        value_us = int(value_us)
+        with self._lock:
+            self._samples.append(value_us)
+            self.count += 1
+            self.total_us += value_us
+            if value_us > self.worst_us:
+                self.worst_us = value_us
+            for i, edge in enumerate(self.buckets_us):
+                if value_us <= edge:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+        return value_us
+
+    def percentile(self, p):
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return 0
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    def histogram(self):
+        """Lista de (etiqueta, conteo) por cubeta."""
+        with self._lock:
+            counts = list(self._counts)
+        labels = [f"<={edge}us" for edge in self.buckets_us] + [f">{self.buckets_us[-1]}us"]
+        return list(zip(labels, counts))
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "count": self.count,
+            "mean_us": (self.total_us / self.count) if self.count else 0,
+            "p50_us": self.percentile(50),
+            "p99_us": self.percentile(99),
+            "worst_us": self.worst_us,
+            "histogram": self.histogram(),
+        }
+
+    def report(self):
+        s = self.summary()
+        return (f"[Latencia] {self.name}: n={s['count']} media={s['mean_us']:.0f}us "
+                f"p99={s['p99_us']}us peor={s['worst_us']}us")
+
+
+# Mediciones del jog: clave -> nombre
+JOG_LATENCIAS = (
+    ("pulsar", "Jog: pulsar -> PWM en marcha"),
+    ("despacho", "Jog: pulsar -> slot del worker"),
+    ("soltar", "Jog: soltar -> PWM detenido"),
+)
+
+
+def jog_latency_stats():
+    """Un LatencyStats por cada medición del jog (mismas claves en el worker y en el proxy)."""
+    return {key: LatencyStats(name) for key, name in JOG_LATENCIAS}
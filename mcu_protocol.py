@@ -0,0 +1,157 @@
+# =================================================================================
+# Archivo: mcu_protocol.py
+# Protocolo serie binario entre la Raspberry Pi y el microcontrolador generador
+# de pasos (gpio_mcu.py en el host, mcu_sim.py como firmware simulado).
+# =================================================================================
+#
+# Trama: 0xA5 | tipo | longitud | carga (little-endian) | CRC-8 (poli 0x07) de
+# tipo, longitud y carga. Una trama corrupta se descarta y el lector se
+# resincroniza en el siguiente 0xA5.
+#
+# El host envía tramos de movimiento (pasos, frecuencia, aceleración, pausa):
+# el microcontrolador ajusta DIR, espera DIR_SETUP_US, genera exactamente
+# 'steps' pulsos con un perfil trapezoidal y después la pausa. Los tramos se
+# encolan por eje (hasta COLA_TRAMOS); el microcontrolador avisa con DONE al
+# terminar cada uno (o al abortarlo) y envía STATUS periódico con la posición
+# y el avance del tramo, e INPUTS en cada cambio de una entrada con su tick.
+# El paro de emergencia (entrada activa) lo aplica también el propio firmware.
+
+import math
+import struct
+
+SYNC = 0xA5
+DIR_SETUP_US = 1000         # Igual que las sesiones DMA (wave_session.py)
+COLA_TRAMOS = 16            # Tramos en vuelo por eje
+STATUS_PERIODO_MS = 10
+
+# Host -> microcontrolador
+CMD_PING = 0x01         # seq
+CMD_AXIS = 0x02         # pul, dir: pines de un eje (la posición cuenta +1 por paso con DIR=1)
+CMD_CONFIG = 0x03       # gpio, modo (0 entrada, 1 salida), pull, filtro de glitch (µs)
+CMD_WRITE = 0x04        # gpio, nivel
+CMD_BANK = 0x05         # máscara a 1, máscara a 0 (una sola trama para el paro)
+CMD_RUN = 0x06          # pul, frecuencia (mHz): giro continuo; 0 = parar y vaciar la cola
+CMD_SEGMENT = 0x07      # id, pul, nivel de DIR, flags, pasos, frecuencia (mHz), aceleración (Hz/s), pausa (µs)
+CMD_START = 0x08        # máscara de pines PUL: arranca a la vez los tramos retenidos
+
+# Microcontrolador -> host
+MSG_PONG = 0x81         # seq, tick
+MSG_INPUTS = 0x82       # tick, niveles de las entradas (bit = gpio)
+MSG_STATUS = 0x83       # tick y, por eje: pul, posición, tramo en curso, pasos del tramo, flags
+MSG_DONE = 0x84         # id, pul, pasos dados, abortado, tick
+
+MODO_ENTRADA = 0        # CMD_CONFIG
+MODO_SALIDA = 1
+FLAG_HOLD = 0x01        # CMD_SEGMENT: esperar a CMD_START
+ESTADO_EN_MARCHA = 0x01
+ESTADO_GIRO = 0x02      # STATUS: eje en CMD_RUN
+
+FORMATOS = {
+    CMD_PING: "<H",
+    CMD_AXIS: "<BB",
+    CMD_CONFIG: "<BBBH",
+    CMD_WRITE: "<BB",
+    CMD_BANK: "<II",
+    CMD_RUN: "<BI",
+    CMD_SEGMENT: "<HBBBIIII",
+    CMD_START: "<I",
+    MSG_PONG: "<HI",
+    MSG_INPUTS: "<II",
+    MSG_DONE: "<HBIBI",
+}
+STATUS_CABECERA = "<I"
+STATUS_EJE = "<BiHIB"
+
+
+def crc8(data):
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode(kind, *fields):
+    payload = struct.pack(FORMATOS[kind], *fields)
+    body = bytes((kind, len(payload))) + payload
+    return bytes((SYNC,)) + body + bytes((crc8(body),))
+
+
+def encode_status(tick, axes):
+    """axes: [(pul, posición, tramo, pasos_del_tramo, flags)]."""
+    payload = struct.pack(STATUS_CABECERA, tick) + b"".join(struct.pack(STATUS_EJE, *axis) for axis in axes)
+    body = bytes((MSG_STATUS, len(payload))) + payload
+    return bytes((SYNC,)) + body + bytes((crc8(body),))
+
+
+def decode(kind, payload):
+    if kind == MSG_STATUS:
+        (tick,), size = struct.unpack_from(STATUS_CABECERA, payload), struct.calcsize(STATUS_CABECERA)
+        step = struct.calcsize(STATUS_EJE)
+        return tick, [struct.unpack_from(STATUS_EJE, payload, off) for off in range(size, len(payload), step)]
+    return struct.unpack(FORMATOS[kind], payload)
+
+
+class FrameParser:
+    """Reensambla tramas desde bytes sueltos; cuenta las descartadas por CRC."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        """Devuelve [(tipo, carga)] de las tramas completas recibidas."""
+        self.buffer += data
+        frames = []
+        buf = self.buffer
+        while True:
+            start = buf.find(SYNC)
+            if start < 0:
+                buf.clear()
+                break
+            del buf[:start]
+            if len(buf) < 4 or len(buf) < 4 + buf[2]:
+                break
+            end = 3 + buf[2]
+            if crc8(buf[1:end]) != buf[end]:
+                self.errors += 1
+                del buf[:1]
+                continue
+            frames.append((buf[1], bytes(buf[3:end])))
+            del buf[:end + 1]
+        return frames
+
+
+# --- Perfil trapezoidal de un tramo (lo usan el firmware y el host para estimar) ---
+
+def _profile(steps, rate_hz, accel_hz_s):
+    """(frecuencia pico, duración de cada rampa, duración a velocidad constante)."""
+    if accel_hz_s <= 0 or steps <= 0:
+        return rate_hz, 0.0, (steps / rate_hz if rate_hz > 0 else 0.0)
+    ramp_steps = rate_hz * rate_hz / (2.0 * accel_hz_s)
+    if 2 * ramp_steps >= steps:
+        peak = math.sqrt(accel_hz_s * steps)
+        return peak, peak / accel_hz_s, 0.0
+    return rate_hz, rate_hz / accel_hz_s, (steps - 2 * ramp_steps) / rate_hz
+
+
+def segment_duration(steps, rate_hz, accel_hz_s):
+    """Duración (s) de los pulsos de un tramo, sin el asentamiento de DIR ni la pausa."""
+    _, t_ramp, t_cruise = _profile(steps, rate_hz, accel_hz_s)
+    return 2 * t_ramp + t_cruise
+
+
+def steps_at(steps, rate_hz, accel_hz_s, t):
+    """Pulsos dados 't' segundos después del primero (perfil trapezoidal)."""
+    if t <= 0:
+        return 0
+    peak, t_ramp, t_cruise = _profile(steps, rate_hz, accel_hz_s)
+    if t < t_ramp:
+        done = 0.5 * accel_hz_s * t * t
+    elif t < t_ramp + t_cruise:
+        done = 0.5 * peak * t_ramp + peak * (t - t_ramp)
+    else:
+        td = min(t - t_ramp - t_cruise, t_ramp)
+        done = 0.5 * peak * t_ramp + peak * t_cruise + peak * td - 0.5 * accel_hz_s * td * td
+    return min(steps, int(done + 1e-9))
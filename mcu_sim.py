@@ -0,0 +1,302 @@
+# =================================================================================
+# Archivo: mcu_sim.py
+# Microcontrolador generador de pasos simulado detrás de un pseudo-terminal.
+# =================================================================================
+#
+# Modela el firmware del protocolo de mcu_protocol.py: recibe tramas por el
+# pty, genera los pasos de cada tramo (asentamiento de DIR, perfil
+# trapezoidal, pausa) con la cuenta exacta y los aplica a la mecánica de
+# pigpio_sim (posición, sensores de límite, paro, encoders). Devuelve DONE al
+# terminar cada tramo, STATUS cada STATUS_PERIODO_MS mientras hay movimiento e
+# INPUTS en cada flanco de una entrada configurada.
+#
+# Los tramos encadenados empiezan en el instante exacto en que termina el
+# anterior (no en el ciclo en que se detecta), así que la duración de una
+# sesión coincide con la línea de tiempo de wave_session.py.
+#
+# Uso:
+#   python mcu_sim.py                   # imprime el pty; después, en otra terminal:
+#   ORTESIS_GPIO=mcu ORTESIS_MCU_PUERTO=/dev/pts/N python app_fisioterapia.py
+# Con ORTESIS_MCU_PUERTO=sim la aplicación lo arranca en su propio proceso.
+
+import os
+import select
+import threading
+import time
+import tty
+from collections import deque
+
+import pigpio_sim
+import mcu_protocol as proto
+
+PERIODO_S = 0.0002          # Ciclo del generador de pasos
+
+
+class _Segment:
+    __slots__ = ('id', 'level', 'hold', 'steps', 'rate', 'accel', 'dwell_us', 't0', 'done')
+
+    def __init__(self, seg_id, level, flags, steps, rate_mhz, accel, dwell_us):
+        self.id = seg_id
+        self.level = level
+        self.hold = bool(flags & proto.FLAG_HOLD)
+        self.steps = steps
+        self.rate = rate_mhz / 1000.0
+        self.accel = accel
+        self.dwell_us = dwell_us
+        self.t0 = None
+        self.done = 0
+
+    def settle_s(self):
+        return proto.DIR_SETUP_US / 1e6 if self.steps else 0.0
+
+    def end_s(self):
+        return self.settle_s() + proto.segment_duration(self.steps, self.rate, self.accel) + self.dwell_us / 1e6
+
+
+class _Axis:
+    def __init__(self, name, pul, dir):
+        self.name = name
+        self.pul = pul
+        self.dir = dir
+        self.queue = deque()
+        self.current = None
+        self.t_free = None          # Fin exacto del tramo anterior (encadenado)
+        self.run_rate = 0.0         # CMD_RUN (Hz)
+        self.run_t = 0.0
+        self.run_frac = 0.0
+        self.position = 0
+
+    def active(self):
+        return bool(self.run_rate or self.current or self.queue)
+
+
+class McuSimulator:
+    """Firmware simulado sobre un pty; 'port' es la ruta que abre el host."""
+
+    def __init__(self, axes=None, estop_gpio=pigpio_sim.E_STOP_PIN):
+        self.world = pigpio_sim.pi(axes=axes)
+        self.estop_gpio = estop_gpio
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self.parser = proto.FrameParser()
+        self.axes = {}              # pul -> _Axis
+        self.outputs = {}
+        self.inputs = {}            # gpio -> callback en la mecánica simulada
+        self.levels = 0
+        self.status_due = 0.0
+        self.was_moving = False
+        self.frames_in = 0
+        self.frames_out = 0
+
+        self._running = True
+        self._threads = [threading.Thread(target=self._rx, name="mcu-sim-rx", daemon=True),
+                         threading.Thread(target=self._run, name="mcu-sim-steps", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running = False
+        for thread in self._threads:
+            thread.join(timeout=0.5)
+        self.world.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+    # --- Salida ---
+
+    def _send(self, frame):
+        with self._write_lock:
+            os.write(self.master, frame)
+            self.frames_out += 1
+
+    def _tick(self):
+        return pigpio_sim._now_tick()
+
+    # --- Recepción de órdenes ---
+
+    def _rx(self):
+        while self._running:
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            for kind, payload in self.parser.feed(data):
+                self.frames_in += 1
+                self._handle(kind, proto.decode(kind, payload))
+
+    def _handle(self, kind, fields):
+        now = time.perf_counter()
+        with self._lock:
+            if kind == proto.CMD_PING:
+                self._send(proto.encode(proto.MSG_PONG, fields[0], self._tick()))
+            elif kind == proto.CMD_AXIS:
+                pul, dir_gpio = fields
+                name = next(a.name for a in self.world.axes.values() if a.pul == pul)
+                self.axes[pul] = _Axis(name, pul, dir_gpio)
+            elif kind == proto.CMD_CONFIG:
+                self._configure(*fields)
+            elif kind == proto.CMD_WRITE:
+                gpio, level = fields
+                self.outputs[gpio] = level
+                self.world.write(gpio, level)
+            elif kind == proto.CMD_BANK:
+                bits_set, bits_clear = fields
+                for gpio in range(32):
+                    if bits_set & (1 << gpio):
+                        self.outputs[gpio] = 1
+                    elif bits_clear & (1 << gpio):
+                        self.outputs[gpio] = 0
+                if bits_set:
+                    self.world.set_bank_1(bits_set)
+                if bits_clear:
+                    self.world.clear_bank_1(bits_clear)
+            elif kind == proto.CMD_RUN:
+                pul, rate_mhz = fields
+                axis = self.axes.get(pul)
+                if axis is None:
+                    return
+                if axis.current or axis.queue:
+                    self._abort(axis)
+                if not rate_mhz:
+                    if axis.run_rate:
+                        self._advance(axis, now)    # Pasos hasta el instante del paro
+                    axis.run_rate = 0.0
+                    return
+                if not axis.run_rate:
+                    axis.run_t, axis.run_frac = now, 0.0
+                else:
+                    self._advance(axis, now)
+                axis.run_rate = rate_mhz / 1000.0
+            elif kind == proto.CMD_SEGMENT:
+                seg_id, pul, level, flags, steps, rate_mhz, accel, dwell_us = fields
+                axis = self.axes.get(pul)
+                if axis is None or axis.run_rate:
+                    self._send(proto.encode(proto.MSG_DONE, seg_id, pul, 0, 1, self._tick()))
+                    return
+                if not axis.current and not axis.queue:
+                    axis.t_free = None
+                axis.queue.append(_Segment(seg_id, level, flags, steps, rate_mhz, accel, dwell_us))
+            elif kind == proto.CMD_START:
+                for pul, axis in self.axes.items():
+                    if fields[0] & (1 << pul):
+                        for seg in axis.queue:
+                            seg.hold = False
+                        axis.t_free = now       # Mismo instante para todos los ejes
+
+    def _configure(self, gpio, mode, pud, glitch_us):
+        if mode == proto.MODO_SALIDA:
+            self.world.set_mode(gpio, pigpio_sim.OUTPUT)
+            return
+        self.world.set_mode(gpio, pigpio_sim.INPUT)
+        self.world.set_glitch_filter(gpio, glitch_us)
+        if gpio not in self.inputs:
+            self.inputs[gpio] = self.world.callback(gpio, pigpio_sim.EITHER_EDGE, self._edge)
+        level = self.world.read(gpio)
+        self.levels = (self.levels & ~(1 << gpio)) | (level << gpio)
+        self._send(proto.encode(proto.MSG_INPUTS, self._tick(), self.levels))
+
+    def _edge(self, gpio, level, tick):
+        with self._lock:
+            self.levels = (self.levels & ~(1 << gpio)) | (level << gpio)
+            if gpio == self.estop_gpio and level:
+                # El firmware corta los pulsos por sí mismo, sin esperar al host
+                for axis in self.axes.values():
+                    self._abort(axis)
+                    axis.run_rate = 0.0
+            self._send(proto.encode(proto.MSG_INPUTS, tick, self.levels))
+
+    # --- Generador de pasos ---
+
+    def _pulse(self, axis, count, sign):
+        self.world.step_axis(axis.name, count)
+        axis.position += sign * count
+
+    def _finish(self, axis, seg, aborted):
+        self._send(proto.encode(proto.MSG_DONE, seg.id, axis.pul, seg.done, 1 if aborted else 0, self._tick()))
+
+    def _abort(self, axis):
+        if axis.current:
+            self._advance(axis, time.perf_counter())
+        for seg in ([axis.current] if axis.current else []) + list(axis.queue):
+            self._finish(axis, seg, True)
+        axis.current = None
+        axis.queue.clear()
+        axis.t_free = None
+
+    def _advance(self, axis, now):
+        if axis.run_rate:
+            due = axis.run_rate * (now - axis.run_t) + axis.run_frac
+            count = int(due)
+            axis.run_frac = due - count
+            axis.run_t = now
+            if count:
+                self._pulse(axis, count, 1 if self.outputs.get(axis.dir, 0) else -1)
+            return
+        while True:
+            seg = axis.current
+            if seg is None:
+                if not axis.queue or axis.queue[0].hold:
+                    return
+                seg = axis.current = axis.queue.popleft()
+                seg.t0 = axis.t_free if axis.t_free is not None else now
+                if seg.steps:
+                    self.outputs[axis.dir] = seg.level
+                    self.world.write(axis.dir, seg.level)
+            t = now - seg.t0
+            target = proto.steps_at(seg.steps, seg.rate, seg.accel, t - seg.settle_s())
+            if target > seg.done:
+                self._pulse(axis, target - seg.done, 1 if seg.level else -1)
+                seg.done = target
+            end = seg.end_s()
+            if t < end:
+                return
+            self._finish(axis, seg, False)
+            axis.current = None
+            axis.t_free = seg.t0 + end
+
+    def _run(self):
+        while self._running:
+            now = time.perf_counter()
+            with self._lock:
+                moving = False
+                for axis in self.axes.values():
+                    self._advance(axis, now)
+                    moving = moving or axis.active()
+                # Periódico mientras hay movimiento y uno más al quedar parado
+                if (moving and now >= self.status_due) or (self.was_moving and not moving):
+                    self._send(proto.encode_status(self._tick(), [self._status(a) for a in self.axes.values()]))
+                    self.status_due = now + proto.STATUS_PERIODO_MS / 1000.0
+                self.was_moving = moving
+            time.sleep(PERIODO_S)
+
+    def _status(self, axis):
+        seg = axis.current
+        flags = (proto.ESTADO_EN_MARCHA if axis.active() else 0) | (proto.ESTADO_GIRO if axis.run_rate else 0)
+        return axis.pul, axis.position, seg.id if seg else 0, seg.done if seg else 0, flags
+
+
+def main():
+    sim = McuSimulator()
+    print(f"[MCU-sim] Microcontrolador simulado en {sim.port}")
+    print(f"[MCU-sim]   ORTESIS_GPIO=mcu ORTESIS_MCU_PUERTO={sim.port} python app_fisioterapia.py")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[MCU-sim] Tramas recibidas {sim.frames_in}, enviadas {sim.frames_out}, "
+              f"descartadas por CRC {sim.parser.errors}.")
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+# =================================================================================
+# Archivo: motion_process.py
+# Núcleo de movimiento en un proceso separado (estado en memoria compartida).
+# =================================================================================
+#
+# Con ORTESIS_MOTOR_PROCESO=1 el HardwareController no corre en un QThread de
+# la interfaz sino en su propio proceso, de modo que el pintado de widgets, los
+# estilos y la decodificación del GIF de carga no compiten por el GIL con el
+# ciclo de control.
+#
+#   GUI (MotionProcessProxy) --- comandos (SpscRing) ---> núcleo (MotionCore)
+#   GUI --- paro / soltar jog (Pipe) ---> hilo urgente del núcleo
+#   GUI <--- señales (SpscRing) --- núcleo
+#   GUI <--- estado de ejes (SharedAxisState, seqlock) --- núcleo
+#
+# Las colas son anillos de un productor / un consumidor sin locks: cada índice
+# lo escribe un solo lado y se publica después del dato.
+#
+# fast_halt y fast_stop_jog no pasan por la cola de comandos: esa cola se lee
+# desde el ciclo de eventos del núcleo y esperaría a cualquier slot que
+# bloquee (pausas de DIR, esperas de la calibración). Un hilo dedicado del
+# núcleo espera en un Pipe y los ejecuta en cuanto llegan, como en el modo de
+# hilo; la contabilidad (trigger_software_halt, stop_continuous_jog) sigue
+# por la cola.
+
+import time
+import pickle
+import struct
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+
+from latency import LatencyStats, jog_latency_stats
+
+COMMAND_SLOTS = 256
+EVENT_SLOTS = 1024
+SLOT_SIZE = 256
+
+COMMAND_POLL_MS = 2         # Revisión de la cola de comandos en el núcleo
+STATE_PUBLISH_MS = 10       # Publicación periódica del estado de ejes
+EVENT_POLL_MS = 5           # Revisión de la cola de señales en la GUI
+
+# Banderas del estado compartido
+FLAG_HALTED = 1 << 0
+FLAG_JOGGING = 1 << 1
+FLAG_MOVING = 1 << 2
+FLAG_CALIBRATING = 1 << 3
+FLAG_SESSION = 1 << 4
+
+MOTORES = ("", "lineal", "rotacional")
+
+# Comandos que la GUI puede invocar en el núcleo (mismos nombres que HardwareController)
+CORE_COMMANDS = (
+    "run_calibration_sequence", "trigger_software_halt", "reset_internal_state",
+    "go_to_therapy_start_position", "set_therapy_zero", "move_steps",
+    "run_therapy_session", "abort_wave_session", "start_continuous_jog",
+    "stop_continuous_jog", "stop_move_steps", "gui_heartbeat",
+    "reset_positions", "pause_motion", "resume_motion", "verify_position",
+    "move_steps_combined", "start_trajectory_recording", "stop_trajectory_recording",
+    "run_trajectory", "move_to_position", "jog_nudge",
+)
+
+# Rutas rápidas: se ejecutan en el hilo urgente del núcleo, sin esperar su ciclo de eventos
+URGENT_COMMANDS = ("fast_halt", "fast_stop_jog")
+
+# Señales de HardwareController reenviadas a la GUI
+CORE_SIGNALS = (
+    "progress_updated", "calibration_finished", "physical_estop_activated",
+    "movement_finished", "position_updated", "limit_status_updated",
+    "halt_latency_measured", "watchdog_tripped", "session_progress",
+    "session_finished", "motion_paused", "position_verified", "trajectory_recorded",
+    "jog_latency_measured", "calibration_axis_homed", "drift_measured",
+    "stall_detected",
+)
+
+
+def _attach(name, size=0):
+    """Crea (name=None) o abre un bloque de memoria compartida."""
+    if name is None:
+        return shared_memory.SharedMemory(create=True, size=size)
+    # El proceso hijo comparte el resource_tracker del padre: el bloque se borra una sola vez
+    return shared_memory.SharedMemory(name=name)
+
+
+class SpscRing:
+    """Cola circular de un productor y un consumidor en memoria compartida."""
+
+    # head (solo escribe el productor) y tail (solo escribe el consumidor) en líneas de caché distintas
+    HEAD_OFFSET = 0
+    TAIL_OFFSET = 64
+    DATA_OFFSET = 128
+    INDEX = struct.Struct("<Q")
+    LENGTH = struct.Struct("<I")
+
+    def __init__(self, name=None, slots=COMMAND_SLOTS, slot_size=SLOT_SIZE):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.shm = _attach(name, self.DATA_OFFSET + slots * slot_size)
+        self.buf = self.shm.buf
+        self.dropped = 0
+        if name is None:
+            self.INDEX.pack_into(self.buf, self.HEAD_OFFSET, 0)
+            self.INDEX.pack_into(self.buf, self.TAIL_OFFSET, 0)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def put(self, item):
+        """Encola 'item'. Devuelve False si la cola está llena."""
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.slot_size - self.LENGTH.size:
+            raise ValueError(f"Mensaje de {len(data)} bytes excede la ranura de {self.slot_size}")
+        head = self.INDEX.unpack_from(self.buf, self.HEAD_OFFSET)[0]
+        tail = self.INDEX.unpack_from(self.buf, self.TAIL_OFFSET)[0]
+        if head - tail >= self.slots:
+            self.dropped += 1
+            return False
+        offset = self.DATA_OFFSET + (head % self.slots) * self.slot_size
+        self.LENGTH.pack_into(self.buf, offset, len(data))
+        self.buf[offset + self.LENGTH.size:offset + self.LENGTH.size + len(data)] = data
+        # Publicar el índice después del dato
+        self.INDEX.pack_into(self.buf, self.HEAD_OFFSET, head + 1)
+        return True
+
+    def get(self):
+        """Desencola un elemento o devuelve None si la cola está vacía."""
+        tail = self.INDEX.unpack_from(self.buf, self.TAIL_OFFSET)[0]
+        head = self.INDEX.unpack_from(self.buf, self.HEAD_OFFSET)[0]
+        if tail == head:
+            return None
+        offset = self.DATA_OFFSET + (tail % self.slots) * self.slot_size
+        length = self.LENGTH.unpack_from(self.buf, offset)[0]
+        item = pickle.loads(self.buf[offset + self.LENGTH.size:offset + self.LENGTH.size + length])
+        self.INDEX.pack_into(self.buf, self.TAIL_OFFSET, tail + 1)
+        return item
+
+    def close(self, unlink=False):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class SharedAxisState:
+    """
+    Estado de los ejes publicado por el núcleo. Un solo escritor; los lectores
+    usan un seqlock (contador impar = escritura en curso) y reintentan.
+    """
+
+    SEQ = struct.Struct("<Q")
+    FIELDS = struct.Struct("<ddddIiBxxxIdQ")
+    DATA_OFFSET = 8
+
+    def __init__(self, name=None):
+        self.shm = _attach(name, self.DATA_OFFSET + self.FIELDS.size)
+        self.buf = self.shm.buf
+        if name is None:
+            self.SEQ.pack_into(self.buf, 0, 0)
+            self.FIELDS.pack_into(self.buf, self.DATA_OFFSET, 0.0, 0.0, 0.0, 0.0, 0, 0, 0, 0, 0.0, 0)
+        self._publishes = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, worker, inputs):
+        seq = self.SEQ.unpack_from(self.buf, 0)[0]
+        flags = ((FLAG_HALTED if worker.is_halted else 0)
+                 | (FLAG_JOGGING if worker.is_jogging else 0)
+                 | (FLAG_MOVING if worker.is_moving_steps else 0)
+                 | (FLAG_CALIBRATING if worker.is_calibrating else 0)
+                 | (FLAG_SESSION if worker.wave_session else 0))
+        self._publishes += 1
+        self.SEQ.pack_into(self.buf, 0, seq + 1)
+        self.FIELDS.pack_into(self.buf, self.DATA_OFFSET,
+                              float(worker.posicion_lineal), float(worker.posicion_rotacional),
+                              float(worker.cero_terapia_lineal), float(worker.cero_terapia_rotacional),
+                              flags, int(worker.jog_direction), MOTORES.index(worker.jog_motor or ""),
+                              inputs, time.perf_counter(), self._publishes)
+        self.SEQ.pack_into(self.buf, 0, seq + 2)
+
+    def read(self):
+        """(pos_lin, pos_rot, cero_lin, cero_rot, flags, jog_dir, jog_motor, inputs, instante, n)."""
+        while True:
+            seq = self.SEQ.unpack_from(self.buf, 0)[0]
+            if seq & 1:
+                continue
+            values = self.FIELDS.unpack_from(self.buf, self.DATA_OFFSET)
+            if self.SEQ.unpack_from(self.buf, 0)[0] == seq:
+                return values
+
+    def close(self, unlink=False):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+# =================================================================================
+# Proceso del núcleo
+# =================================================================================
+
+def _core_main(state_name, command_name, event_name, urgent):
+    """Punto de entrada del proceso del núcleo de movimiento."""
+    from PyQt5.QtCore import QCoreApplication
+    import app_fisioterapia as app
+
+    qt_app = QCoreApplication([])
+    state = SharedAxisState(state_name)
+    commands = SpscRing(command_name, COMMAND_SLOTS)
+    events = SpscRing(event_name, EVENT_SLOTS)
+
+    core = MotionCore(app.HardwareController(), state, commands, events, urgent)
+    core.start()
+    qt_app.exec_()
+
+    state.close()
+    commands.close()
+    events.close()
+
+
+try:
+    from PyQt5.QtCore import QObject, QTimer, QCoreApplication, pyqtSignal, pyqtSlot
+
+    class MotionCore(QObject):
+        """Ejecuta los comandos de la GUI sobre el HardwareController y publica su estado."""
+
+        def __init__(self, worker, state, commands, events, urgent=None):
+            super().__init__()
+            self.worker = worker
+            self.state = state
+            self.commands = commands
+            self.events = events
+            self.urgent = urgent
+            # Las señales se emiten desde el ciclo de eventos y desde el hilo urgente:
+            # el anillo admite un solo productor
+            self._events_lock = threading.Lock()
+
+            for name in CORE_SIGNALS:
+                getattr(worker, name).connect(lambda *args, name=name: self._put_event(name, args))
+
+            self.command_timer = QTimer(self)
+            self.command_timer.setInterval(COMMAND_POLL_MS)
+            self.command_timer.timeout.connect(self._drain_commands)
+
+            self.publish_timer = QTimer(self)
+            self.publish_timer.setInterval(STATE_PUBLISH_MS)
+            self.publish_timer.timeout.connect(self.publish)
+
+        def start(self):
+            self.worker.initialize_gpio()
+            self.publish()
+            self.command_timer.start()
+            self.publish_timer.start()
+            if self.urgent is not None:
+                threading.Thread(target=self._urgent_loop, name="motion-core-urgente", daemon=True).start()
+            print("[Núcleo] Proceso de movimiento listo.")
+
+        def _put_event(self, name, args):
+            with self._events_lock:
+                self.events.put((name, args))
+
+        def _urgent_loop(self):
+            """Paro y soltar jog en cuanto llegan, aunque el ciclo de eventos esté ocupado."""
+            while True:
+                try:
+                    name, args, kwargs = self.urgent.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    getattr(self.worker, name)(*args, **kwargs)
+                except Exception as e:
+                    print(f"[Núcleo] Error ejecutando {name}{args}: {e}")
+
+        @pyqtSlot()
+        def publish(self):
+            inputs = 0
+            if self.worker.pi:
+                try:
+                    inputs = self.worker.pi.read_bank_1()
+                except Exception:
+                    pass
+            self.state.publish(self.worker, inputs)
+
+        @pyqtSlot()
+        def _drain_commands(self):
+            handled = False
+            while True:
+                message = self.commands.get()
+                if message is None:
+                    break
+                name, args, kwargs = message
+                if name == "_shutdown":
+                    self.command_timer.stop()
+                    self.publish_timer.stop()
+                    self.worker.cleanup()
+                    if self.events.dropped:
+                        print(f"[Núcleo] Señales descartadas por cola llena: {self.events.dropped}")
+                    QCoreApplication.quit()
+                    return
+                try:
+                    getattr(self.worker, name)(*args, **kwargs)
+                except Exception as e:
+                    print(f"[Núcleo] Error ejecutando {name}{args}: {e}")
+                handled = True
+            if handled:
+                self.publish()
+
+    class MotionProcessProxy(QObject):
+        """
+        Sustituto de HardwareController en la GUI: mismas señales, mismos slots
+        y mismos atributos de posición, pero el trabajo ocurre en otro proceso.
+        """
+        progress_updated = pyqtSignal(int)
+        calibration_finished = pyqtSignal(bool, str)
+        physical_estop_activated = pyqtSignal(bool)
+        movement_finished = pyqtSignal(bool)
+        position_updated = pyqtSignal(str, int)
+        limit_status_updated = pyqtSignal(bool, bool)
+        halt_latency_measured = pyqtSignal(str, int)
+        watchdog_tripped = pyqtSignal(str)
+        session_progress = pyqtSignal(int)
+        session_finished = pyqtSignal(bool)
+        motion_paused = pyqtSignal(bool)
+        position_verified = pyqtSignal(str, bool, int)
+        trajectory_recorded = pyqtSignal(int, int, int)
+        jog_latency_measured = pyqtSignal(str, int)
+        calibration_axis_homed = pyqtSignal(str)
+        drift_measured = pyqtSignal(str, int, bool)
+        stall_detected = pyqtSignal(str, int)
+
+        def __init__(self):
+            super().__init__()
+            self.state = SharedAxisState()
+            self.commands = SpscRing(None, COMMAND_SLOTS)
+            self.events = SpscRing(None, EVENT_SLOTS)
+            self.process = None
+            self.core_lost = False
+            self._urgent_rx, self._urgent_tx = multiprocessing.get_context("spawn").Pipe(duplex=False)
+
+            # Latencias de paro vistas desde la GUI (la medición real ocurre en el núcleo)
+            self.halt_latency = LatencyStats("Paro de emergencia")
+            self.jog_latency = jog_latency_stats()
+
+            self.event_timer = QTimer(self)
+            self.event_timer.setInterval(EVENT_POLL_MS)
+            self.event_timer.timeout.connect(self._drain_events)
+
+        def start(self):
+            ctx = multiprocessing.get_context("spawn")
+            self.process = ctx.Process(target=_core_main, name="ortesis-motion-core", daemon=True,
+                                       args=(self.state.name, self.commands.name, self.events.name,
+                                             self._urgent_rx))
+            self.process.start()
+            self._urgent_rx.close()
+            self.event_timer.start()
+            print(f"[Worker] Núcleo de movimiento en proceso {self.process.pid}.")
+
+        def _send(self, name, args=(), kwargs=None):
+            if not self.commands.put((name, args, kwargs or {})):
+                print(f"[Worker] Cola de comandos llena. Se descartó '{name}'.")
+
+        def _send_urgent(self, name, args=(), kwargs=None):
+            try:
+                self._urgent_tx.send((name, args, kwargs or {}))
+            except (OSError, ValueError):
+                # Núcleo caído: el watchdog de pigpiod ya corta los motores
+                print(f"[Worker] No se pudo enviar '{name}' al núcleo.")
+
+        @pyqtSlot()
+        def _drain_events(self):
+            while True:
+                message = self.events.get()
+                if message is None:
+                    break
+                name, args = message
+                if name == "halt_latency_measured":
+                    self.halt_latency.record(args[1])
+                elif name == "jog_latency_measured":
+                    self.jog_latency[args[0]].record(args[1])
+                getattr(self, name).emit(*args)
+
+            # Si el núcleo muere, pigpiod corta los motores (watchdog); avisar a la interfaz
+            if not self.core_lost and self.process and not self.process.is_alive():
+                self.core_lost = True
+                print(f"[Worker] ¡El proceso de movimiento terminó (código {self.process.exitcode})!")
+                self.watchdog_tripped.emit("worker")
+
+        # --- Estado de ejes (memoria compartida) ---
+
+        @property
+        def posicion_lineal(self):
+            return self.state.read()[0]
+
+        @property
+        def posicion_rotacional(self):
+            return self.state.read()[1]
+
+        @property
+        def cero_terapia_lineal(self):
+            return self.state.read()[2]
+
+        @property
+        def cero_terapia_rotacional(self):
+            return self.state.read()[3]
+
+        @property
+        def is_halted(self):
+            return bool(self.state.read()[4] & FLAG_HALTED)
+
+        @property
+        def is_jogging(self):
+            return bool(self.state.read()[4] & FLAG_JOGGING)
+
+        @property
+        def jog_direction(self):
+            return self.state.read()[5]
+
+        @property
+        def jog_motor(self):
+            return MOTORES[self.state.read()[6]]
+
+        def read_input(self, gpio):
+            return (self.state.read()[7] >> gpio) & 1
+
+        def cleanup(self):
+            self.event_timer.stop()
+            if self.process and self.process.is_alive():
+                self._send("_shutdown")
+                self.process.join(2.0)
+                if self.process.is_alive():
+                    print("[Worker] Forzando cierre del proceso de movimiento...")
+                    self.process.terminate()
+            self._urgent_tx.close()
+            self.state.close(unlink=True)
+            self.commands.close(unlink=True)
+            self.events.close(unlink=True)
+
+    def _remote(name):
+        def command(self, *args, **kwargs):
+            self._send(name, args, kwargs)
+        command.__name__ = name
+        return command
+
+    def _remote_urgent(name):
+        def command(self, *args, **kwargs):
+            self._send_urgent(name, args, kwargs)
+        command.__name__ = name
+        return command
+
+    for _name in CORE_COMMANDS:
+        setattr(MotionProcessProxy, _name, _remote(_name))
+    for _name in URGENT_COMMANDS:
+        setattr(MotionProcessProxy, _name, _remote_urgent(_name))
+
+except ImportError:
+    MotionCore = None
+    MotionProcessProxy = None
@@ -0,0 +1,155 @@
+# =================================================================================
+# Archivo: motion_watchdog.py
+# Supervisión de vida entre GUI, hilo de hardware y el daemon pigpiod.
+# =================================================================================
+#
+# El hilo de hardware envía latidos al daemon actualizando el parámetro p0 de
+# un script que corre DENTRO de pigpiod. Si p0 deja de cambiar durante más de
+# 'timeout_ms' (hilo bloqueado, proceso colgado o conexión perdida), el propio
+# daemon apaga el PWM de ambos PUL y deshabilita los drivers. Como el corte no
+# depende de Python, un bloqueo nunca deja un PWM libre corriendo.
+#
+# Parámetros del script:
+#   p0 = contador de latidos (lo escribe Python)
+#   p1 = periodo de revisión (ms)
+#   p2 = tiempo máximo sin latidos (ms)
+#   p3 = número de cortes realizados (lo escribe el script)
+
+import time
+
+# Estados de script de pigpio
+PI_SCRIPT_INITING = 0
+PI_SCRIPT_HALTED = 1
+PI_SCRIPT_RUNNING = 2
+PI_SCRIPT_WAITING = 3
+PI_SCRIPT_FAILED = 4
+
+
+def build_watchdog_script(pul_pins, en_pins, enable_inactive):
+    """Genera el script de pigpiod que corta PUL y ENABLE si no hay latidos."""
+    cut = [f"hp {pin} 0 0" for pin in pul_pins]
+    cut += [f"w {pin} {enable_inactive}" for pin in en_pins]
+    lines = [
+        "ld v0 p0",          # Último latido visto
+        "ld v1 0",           # ms acumulados sin latido
+        "tag 1",
+        "mils p1",
+        "lda p0",
+        "cmp v0",
+        "jnz 2",             # Latido nuevo
+        "lda v1",
+        "add p1",
+        "sta v1",
+        "cmp p2",
+        "jm 1",              # Aún dentro del plazo
+    ] + cut + [
+        "inr p3",
+        "ld v1 0",
+        "jmp 1",
+        "tag 2",
+        "sta v0",
+        "ld v1 0",
+        "jmp 1",
+    ]
+    return " ".join(lines)
+
+
+class Heartbeat:
+    """Métricas de vida de una fuente de latidos (intervalos, máximo, atrasos)."""
+
+    def __init__(self, name, expected_ms):
+        self.name = name
+        self.expected_ms = expected_ms
+        self.count = 0
+        self.late = 0
+        self.max_gap_ms = 0.0
+        self.last = None
+
+    def beat(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.last is not None:
+            gap_ms = (now - self.last) * 1000.0
+            if gap_ms > self.max_gap_ms:
+                self.max_gap_ms = gap_ms
+            if gap_ms > 2 * self.expected_ms:
+                self.late += 1
+        self.last = now
+        self.count += 1
+
+    def age_ms(self, now=None):
+        if self.last is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return (now - self.last) * 1000.0
+
+    def summary(self):
+        return {"name": self.name, "beats": self.count, "late": self.late,
+                "max_gap_ms": round(self.max_gap_ms, 1)}
+
+
+class PigpioWatchdog:
+    """Administra el script de watchdog en pigpiod y sus latidos."""
+
+    def __init__(self, pi, pul_pins, en_pins, enable_inactive, timeout_ms=1000, check_ms=20, beat_ms=100):
+        self.pi = pi
+        self.timeout_ms = timeout_ms
+        self.check_ms = check_ms
+        self.script = build_watchdog_script(pul_pins, en_pins, enable_inactive)
+        self.script_id = None
+        self.counter = 0
+        self.trips = 0
+        self.heartbeat = Heartbeat("worker -> pigpiod", beat_ms)
+
+    def start(self):
+        """Carga y arranca el script. Devuelve False si el daemon lo rechaza."""
+        try:
+            self.script_id = self.pi.store_script(self.script)
+            deadline = time.monotonic() + 2.0
+            while self.pi.script_status(self.script_id)[0] == PI_SCRIPT_INITING:
+                if time.monotonic() > deadline:
+                    raise IOError("script de watchdog sin inicializar")
+                time.sleep(0.01)
+            self.pi.run_script(self.script_id, [0, self.check_ms, self.timeout_ms, 0])
+        except Exception as e:
+            print(f"[Watchdog] No se pudo iniciar el watchdog de pigpiod: {e}")
+            self.script_id = None
+            return False
+        print(f"[Watchdog] Activo en pigpiod (corte tras {self.timeout_ms} ms sin latidos).")
+        return True
+
+    @property
+    def active(self):
+        return self.script_id is not None
+
+    def beat(self):
+        """Envía un latido (incrementa p0 del script)."""
+        if not self.active:
+            return
+        self.counter = (self.counter + 1) & 0x7FFFFFFF
+        self.pi.update_script(self.script_id, [self.counter])
+        self.heartbeat.beat()
+
+    def poll_trips(self):
+        """Lee el contador de cortes del daemon. Devuelve cuántos cortes nuevos hubo."""
+        if not self.active:
+            return 0
+        status, params = self.pi.script_status(self.script_id)
+        trips = params[3] if len(params) > 3 else 0
+        new = trips - self.trips
+        self.trips = trips
+        return max(0, new)
+
+    def stop(self):
+        if not self.active:
+            return
+        try:
+            self.pi.stop_script(self.script_id)
+            self.pi.delete_script(self.script_id)
+        except Exception:
+            pass
+        self.script_id = None
+
+    def summary(self):
+        data = self.heartbeat.summary()
+        data.update({"timeout_ms": self.timeout_ms, "trips": self.trips})
+        return data
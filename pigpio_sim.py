@@ -0,0 +1,674 @@
+# =================================================================================
+# Archivo: pigpio_sim.py
+# Sustituto simulado de 'pigpio' para pruebas y benchmarks sin Raspberry Pi.
+# =================================================================================
+#
+# Expone la misma interfaz que usa app_fisioterapia.py (pi(), read, write,
+# hardware_PWM, callback, wave_chain, ...) y modela la mecánica de la órtesis:
+# cada canal PUL integra pasos en el tiempo según la frecuencia de PWM (o de
+# la cadena de ondas en curso), la dirección y el ENABLE del driver, y los
+# sensores de límite cambian de nivel en los extremos de carrera; los canales
+# A/B del encoder siguen la posición física. Se selecciona con la variable de entorno ORTESIS_GPIO=sim.
+
+import threading
+import time
+from collections import deque
+
+# --- Constantes compatibles con pigpio ---
+INPUT = 0
+OUTPUT = 1
+ALT0 = 4
+ALT5 = 2
+
+PUD_OFF = 0
+PUD_DOWN = 1
+PUD_UP = 2
+
+RISING_EDGE = 0
+FALLING_EDGE = 1
+EITHER_EDGE = 2
+TIMEOUT = 2
+
+# --- Cableado simulado (coincide con las constantes de app_fisioterapia.py) ---
+ENABLE_ACTIVO = 0
+E_STOP_PIN = 16
+
+# Cada eje: pines, nivel de DIR que avanza en sentido positivo, sensores en
+# los extremos (bajo / alto), carrera física en pasos y límites del motor:
+# pull_in_hz es el mayor salto de frecuencia que sigue sin perder el paso y
+# pull_out_hz la mayor frecuencia sostenida (None = motor ideal). El encoder
+# de cuadratura (enc_a/enc_b) mide la posición física real, también cuando el
+# motor cala o choca con un tope.
+DEFAULT_AXES = {
+    'rotacional': dict(pul=13, dir=19, en=26, dir_positive=1,
+                       switch_low=7, switch_high=12,
+                       travel_steps=11000, start_steps=3000,
+                       pull_in_hz=2000, pull_out_hz=3200,
+                       enc_a=20, enc_b=21, enc_counts_per_step=0.625),
+    'lineal': dict(pul=18, dir=27, en=22, dir_positive=0,
+                   switch_low=25, switch_high=8,
+                   travel_steps=130000, start_steps=20000,
+                   pull_in_hz=16000, pull_out_hz=25600,
+                   enc_a=5, enc_b=6, enc_counts_per_step=0.625),
+}
+
+# Niveles (A, B) del encoder según la cuenta módulo 4 (A adelantado a B en sentido positivo)
+ENCODER_GRAY = ((0, 0), (1, 0), (1, 1), (0, 1))
+
+# Rebote mecánico de los sensores de límite (µs); un filtro de glitch igual o
+# mayor lo oculta, como en pigpiod
+SWITCH_BOUNCE_US = 300
+
+# Eventos que conserva el registro (los más viejos se descartan en corridas largas)
+EVENTOS_MAX = 100000
+
+# Latencia por llamada (s) para emular el viaje de ida y vuelta al socket de pigpiod
+CALL_LATENCY_S = 0.0
+
+# Periodo del hilo que modela la mecánica y dispara los callbacks
+SIM_PERIOD_S = 0.0005
+
+
+# Ondas (wave_*)
+WAVE_NOT_FOUND = 9998
+NO_TX_WAVE = 9999
+
+# Estados de script
+PI_SCRIPT_INITING = 0
+PI_SCRIPT_HALTED = 1
+PI_SCRIPT_RUNNING = 2
+PI_SCRIPT_WAITING = 3
+PI_SCRIPT_FAILED = 4
+
+
+def tickDiff(t1, t2):
+    """Diferencia entre dos ticks de 32 bits (igual que pigpio.tickDiff)."""
+    return (t2 - t1) & 0xFFFFFFFF
+
+
+def _now_tick():
+    return int(time.perf_counter() * 1e6) & 0xFFFFFFFF
+
+
+class _SimAxis:
+    """Estado físico de un eje simulado."""
+
+    def __init__(self, name, pul, dir, en, dir_positive, switch_low, switch_high,
+                 travel_steps, start_steps, pull_in_hz=None, pull_out_hz=None,
+                 enc_a=None, enc_b=None, enc_counts_per_step=1.0):
+        self.name = name
+        self.pul = pul
+        self.dir = dir
+        self.en = en
+        self.dir_positive = dir_positive
+        self.switch_low = switch_low
+        self.switch_high = switch_high
+        self.travel_steps = travel_steps
+        self.pull_in_hz = pull_in_hz
+        self.pull_out_hz = pull_out_hz
+        self.enc_a = enc_a
+        self.enc_b = enc_b
+        self.enc_counts_per_step = enc_counts_per_step
+
+        self.position = float(start_steps)   # Posición física real (pasos)
+        self.pulses_emitted = 0.0            # Pulsos generados en PUL (con o sin ENABLE)
+        self.freq = 0
+        self.stalled = False                 # Motor calado: recibe pulsos pero no avanza
+        self.encoder_count = self.encoder_target()
+        self.last_update = time.perf_counter()
+
+    def encoder_target(self):
+        """Cuenta del encoder que corresponde a la posición física actual."""
+        return int(self.position * self.enc_counts_per_step // 1)
+
+    def set_freq(self, freq):
+        """Cambia la frecuencia de PUL; un salto o una velocidad excesiva cala el motor hasta que se detiene."""
+        if freq <= 0:
+            self.stalled = False
+        elif ((self.pull_in_hz is not None and freq - self.freq > self.pull_in_hz)
+              or (self.pull_out_hz is not None and freq > self.pull_out_hz)):
+            self.stalled = True
+        self.freq = max(0, freq)
+
+
+class pulse:
+    """Pulso de onda (igual que pigpio.pulse)."""
+
+    def __init__(self, gpio_on, gpio_off, delay):
+        self.gpio_on = gpio_on
+        self.gpio_off = gpio_off
+        self.delay = delay
+
+
+class _SimWave:
+    """Onda creada: duración, flancos de subida por GPIO y niveles finales."""
+
+    def __init__(self, pulses):
+        self.duration_us = sum(p.delay for p in pulses)
+        self.rising = {}
+        self.levels = {}
+        for p in pulses:
+            for g in range(32):
+                if p.gpio_on & (1 << g):
+                    if self.levels.get(g) != 1:
+                        self.rising[g] = self.rising.get(g, 0) + 1
+                    self.levels[g] = 1
+                elif p.gpio_off & (1 << g):
+                    self.levels[g] = 0
+
+
+class _Callback:
+    def __init__(self, owner, gpio, edge, func):
+        self.owner = owner
+        self.gpio = gpio
+        self.edge = edge
+        self.func = func
+
+    def cancel(self):
+        with self.owner._lock:
+            if self in self.owner._callbacks:
+                self.owner._callbacks.remove(self)
+
+
+class _SimScript:
+    """
+    Intérprete mínimo del lenguaje de scripts de pigpiod (subconjunto usado
+    por la aplicación: ld, lda, sta, cmp, add, inr, saltos, tag, mils, hp, w).
+    """
+
+    def __init__(self, owner, text):
+        self.owner = owner
+        self.tokens = text.split()
+        self.params = [0] * 10
+        self.vars = [0] * 150
+        self.status = PI_SCRIPT_HALTED
+        self.thread = None
+        self.program = []
+        self.tags = {}
+        i = 0
+        arity = {'ld': 2, 'lda': 1, 'sta': 1, 'cmp': 1, 'add': 1, 'inr': 1, 'jz': 1,
+                 'jnz': 1, 'jm': 1, 'jp': 1, 'jmp': 1, 'mils': 1, 'hp': 3, 'w': 2, 'halt': 0}
+        while i < len(self.tokens):
+            op = self.tokens[i].lower()
+            if op == 'tag':
+                self.tags[int(self.tokens[i + 1])] = len(self.program)
+                i += 2
+                continue
+            n = arity[op]
+            self.program.append((op, self.tokens[i + 1:i + 1 + n]))
+            i += 1 + n
+
+    def _get(self, arg):
+        if arg[0] == 'v':
+            return self.vars[int(arg[1:])]
+        if arg[0] == 'p':
+            return self.params[int(arg[1:])]
+        return int(arg)
+
+    def _set(self, arg, value):
+        if arg[0] == 'v':
+            self.vars[int(arg[1:])] = value
+        else:
+            self.params[int(arg[1:])] = value
+
+    def run(self):
+        a = f = pc = 0
+        while self.status == PI_SCRIPT_RUNNING and pc < len(self.program):
+            op, args = self.program[pc]
+            pc += 1
+            if op == 'ld':
+                self._set(args[0], self._get(args[1]))
+            elif op == 'lda':
+                a = self._get(args[0])
+            elif op == 'sta':
+                self._set(args[0], a)
+            elif op == 'cmp':
+                f = a - self._get(args[0])
+            elif op == 'add':
+                a += self._get(args[0])
+                f = a
+            elif op == 'inr':
+                self._set(args[0], self._get(args[0]) + 1)
+            elif op in ('jz', 'jnz', 'jm', 'jp', 'jmp'):
+                jump = {'jz': f == 0, 'jnz': f != 0, 'jm': f < 0, 'jp': f >= 0, 'jmp': True}[op]
+                if jump:
+                    pc = self.tags[self._get(args[0])]
+            elif op == 'mils':
+                time.sleep(self._get(args[0]) / 1000.0)
+            elif op == 'hp':
+                self.owner._hardware_pwm(self._get(args[0]), self._get(args[1]), self._get(args[2]))
+            elif op == 'w':
+                self.owner._write(self._get(args[0]), self._get(args[1]))
+            elif op == 'halt':
+                break
+        if self.status == PI_SCRIPT_RUNNING:
+            self.status = PI_SCRIPT_HALTED
+
+
+class pi:
+    """Conexión simulada con pigpiod."""
+
+    def __init__(self, host=None, port=None, axes=None):
+        self.connected = True
+        self._lock = threading.RLock()
+        self._levels = {}
+        self._modes = {}
+        self._glitch = {}
+        self._callbacks = []
+        self._pending_edges = []
+        self._forced_inputs = {}
+        self._scripts = []
+        self.call_count = 0
+        
+        # Ondas: pulsos pendientes, ondas creadas y cadena en transmisión
+        self._wave_pulses = []
+        self._waves = {}
+        self._next_wave_id = 0
+        self._chain = []            # Tramos: [inicio, fin, wave_id, niveles, frecuencias, iniciado]
+
+        # Registro de eventos acotado: (perf_counter, nombre, gpio, valor)
+        self.events = deque(maxlen=EVENTOS_MAX)
+
+        self.axes = {}
+        for name, cfg in (axes or DEFAULT_AXES).items():
+            axis = _SimAxis(name, **cfg)
+            self.axes[name] = axis
+            self._levels[axis.en] = 1 - ENABLE_ACTIVO
+            if axis.enc_a is not None:
+                self._levels[axis.enc_a], self._levels[axis.enc_b] = ENCODER_GRAY[axis.encoder_count % 4]
+
+        self._levels[E_STOP_PIN] = 0
+        self._update_switches(fire=False)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="pigpio-sim", daemon=True)
+        self._thread.start()
+
+    # --- Modelo físico ---
+
+    def _call(self):
+        self.call_count += 1
+        if CALL_LATENCY_S > 0:
+            time.sleep(CALL_LATENCY_S)
+
+    def _integrate(self, now=None):
+        now = now or time.perf_counter()
+        if self._chain:
+            self._run_chain(now)
+        self._integrate_axes(now)
+
+    def _integrate_axes(self, now):
+        for axis in self.axes.values():
+            dt = now - axis.last_update
+            axis.last_update = now
+            if axis.freq <= 0 or dt <= 0:
+                continue
+            self._apply_pulses(axis, axis.freq * dt)
+
+    def _apply_pulses(self, axis, pulses):
+        axis.pulses_emitted += pulses
+        if self._levels.get(axis.en, 1) != ENABLE_ACTIVO or axis.stalled:
+            return
+        sign = 1 if self._levels.get(axis.dir, 0) == axis.dir_positive else -1
+        # Los topes mecánicos detienen el eje (pasos perdidos)
+        axis.position = min(max(axis.position + sign * pulses, -50.0), axis.travel_steps + 50.0)
+
+    def _run_chain(self, now):
+        """Avanza la cadena de ondas hasta 'now', integrando cada tramo por separado."""
+        while self._chain:
+            seg = self._chain[0]
+            start, end, wave_id, levels, freqs, started = seg
+            if not started:
+                self._integrate_axes(start)
+                self._levels.update(levels)
+                for axis in self.axes.values():
+                    if axis.pul in freqs:
+                        axis.set_freq(freqs[axis.pul])
+                        self.events.append((start, 'wave', axis.pul, freqs[axis.pul]))
+                seg[5] = True
+            if end > now:
+                return
+            self._integrate_axes(end)
+            for axis in self.axes.values():
+                if axis.pul in freqs:
+                    axis.set_freq(0)
+            self._chain.pop(0)
+
+    def _expand_chain(self, data, i=0):
+        """Convierte los bytes de wave_chain en [(wave_id|None, veces, delay_us)]."""
+        items = []
+        while i < len(data):
+            if data[i] != 255:
+                items.append((data[i], 1, 0))
+                i += 1
+                continue
+            cmd = data[i + 1]
+            if cmd == 0:
+                body, i = self._expand_chain(data, i + 2)
+                count = data[i + 2] + 256 * data[i + 3]
+                i += 4
+                if len(body) == 1 and body[0][0] is not None:
+                    items.append((body[0][0], body[0][1] * count, 0))
+                else:
+                    items.extend(body * count)
+            elif cmd == 1:
+                return items, i
+            elif cmd == 2:
+                items.append((None, 0, data[i + 2] + 256 * data[i + 3]))
+                i += 4
+            else:
+                raise ValueError(f"Comando de cadena no soportado: 255 {cmd}")
+        return items, i
+
+    def _update_switches(self, fire=True):
+        self._update_encoders(fire)
+        for axis in self.axes.values():
+            self._set_input(axis.switch_low, 1 if axis.position <= 0 else 0, fire, bounce=True)
+            self._set_input(axis.switch_high, 1 if axis.position >= axis.travel_steps else 0, fire, bounce=True)
+
+    def _update_encoders(self, fire):
+        """
+        Genera los flancos A/B hasta la cuenta de la posición física. Solo se
+        encolan (y no van al registro de eventos) si hay callbacks en el encoder:
+        a velocidad de jog son miles por segundo.
+        """
+        watched = {cb.gpio for cb in self._callbacks} if fire else ()
+        for axis in self.axes.values():
+            if axis.enc_a is None:
+                continue
+            target = axis.encoder_target()
+            if target == axis.encoder_count:
+                continue
+            notify = axis.enc_a in watched or axis.enc_b in watched
+            tick = _now_tick()
+            step = 1 if target > axis.encoder_count else -1
+            while axis.encoder_count != target:
+                axis.encoder_count += step
+                a, b = ENCODER_GRAY[axis.encoder_count % 4]
+                gpio, level = (axis.enc_a, a) if a != self._levels[axis.enc_a] else (axis.enc_b, b)
+                self._levels[gpio] = level
+                if notify:
+                    self._pending_edges.append((gpio, level, tick))
+
+    def _set_input(self, gpio, level, fire=True, bounce=False):
+        old = self._levels.get(gpio, 0)
+        self._levels[gpio] = level
+        if fire and old != level:
+            # Los callbacks se despachan desde el hilo de la simulación, fuera del lock
+            tick = _now_tick()
+            self._pending_edges.append((gpio, level, tick))
+            self.events.append((time.perf_counter(), 'edge', gpio, level))
+            if bounce and SWITCH_BOUNCE_US > self._glitch.get(gpio, 0):
+                # Rebote: un pulso espurio dentro de la ventana, el nivel final no cambia
+                self._pending_edges.append((gpio, 1 - level, (tick + SWITCH_BOUNCE_US // 2) & 0xFFFFFFFF))
+                self._pending_edges.append((gpio, level, (tick + SWITCH_BOUNCE_US) & 0xFFFFFFFF))
+
+    def _dispatch_edges(self):
+        with self._lock:
+            edges, self._pending_edges = self._pending_edges, []
+            callbacks = list(self._callbacks)
+        for gpio, level, tick in edges:
+            for cb in callbacks:
+                if cb.gpio != gpio:
+                    continue
+                if (cb.edge == EITHER_EDGE or (cb.edge == RISING_EDGE and level == 1)
+                        or (cb.edge == FALLING_EDGE and level == 0)):
+                    cb.func(gpio, level, tick)
+
+    def _run(self):
+        while self._running:
+            with self._lock:
+                self._integrate()
+                for gpio, level in self._forced_inputs.items():
+                    self._set_input(gpio, level)
+                self._forced_inputs.clear()
+                self._update_switches()
+            self._dispatch_edges()
+            time.sleep(SIM_PERIOD_S)
+
+    # --- API compatible con pigpio ---
+
+    def set_mode(self, gpio, mode):
+        self._call()
+        self._modes[gpio] = mode
+
+    def get_mode(self, gpio):
+        self._call()
+        return self._modes.get(gpio, INPUT)
+
+    def set_pull_up_down(self, gpio, pud):
+        self._call()
+
+    def set_glitch_filter(self, gpio, steady):
+        self._call()
+        self._glitch[gpio] = steady
+
+    def read(self, gpio):
+        self._call()
+        with self._lock:
+            self._integrate()
+            self._update_switches()
+            return self._levels.get(gpio, 0)
+
+    def write(self, gpio, level):
+        self._call()
+        self._write(gpio, level)
+
+    def _write(self, gpio, level):
+        with self._lock:
+            self._integrate()
+            self._levels[gpio] = level
+            self.events.append((time.perf_counter(), 'write', gpio, level))
+
+    def read_bank_1(self):
+        self._call()
+        with self._lock:
+            self._integrate()
+            self._update_switches()
+            return sum(1 << g for g, v in self._levels.items() if v and g < 32)
+
+    def set_bank_1(self, bits):
+        self._call()
+        with self._lock:
+            self._integrate()
+            stamp = time.perf_counter()
+            for g in range(32):
+                if bits & (1 << g):
+                    self._levels[g] = 1
+                    self.events.append((stamp, 'write', g, 1))
+
+    def clear_bank_1(self, bits):
+        self._call()
+        with self._lock:
+            self._integrate()
+            stamp = time.perf_counter()
+            for g in range(32):
+                if bits & (1 << g):
+                    self._levels[g] = 0
+                    self.events.append((stamp, 'write', g, 0))
+
+    def hardware_PWM(self, gpio, frequency, dutycycle):
+        self._call()
+        return self._hardware_pwm(gpio, frequency, dutycycle)
+
+    def _hardware_pwm(self, gpio, frequency, dutycycle):
+        with self._lock:
+            self._integrate()
+            for axis in self.axes.values():
+                if axis.pul == gpio:
+                    axis.set_freq(frequency if dutycycle > 0 else 0)
+            self._modes[gpio] = ALT0 if frequency else OUTPUT
+            self.events.append((time.perf_counter(), 'pwm', gpio, frequency if dutycycle > 0 else 0))
+        return 0
+
+    def wave_clear(self):
+        self._call()
+        with self._lock:
+            self._wave_pulses = []
+            self._waves = {}
+        return 0
+
+    def wave_add_new(self):
+        self._call()
+        self._wave_pulses = []
+        return 0
+
+    def wave_add_generic(self, pulses):
+        self._call()
+        self._wave_pulses.extend(pulses)
+        return len(self._wave_pulses)
+
+    def wave_create(self):
+        self._call()
+        with self._lock:
+            wave_id = self._next_wave_id
+            self._next_wave_id += 1
+            self._waves[wave_id] = _SimWave(self._wave_pulses)
+            self._wave_pulses = []
+            return wave_id
+
+    def wave_delete(self, wave_id):
+        self._call()
+        with self._lock:
+            self._waves.pop(wave_id, None)
+        return 0
+
+    def wave_chain(self, data):
+        self._call()
+        items, _ = self._expand_chain(list(data))
+        pul_pins = {axis.pul for axis in self.axes.values()}
+        with self._lock:
+            self._integrate()
+            t = time.perf_counter()
+            chain = []
+            for wave_id, count, delay_us in items:
+                if wave_id is None:
+                    chain.append([t, t + delay_us / 1e6, None, {}, {}, False])
+                    t += delay_us / 1e6
+                    continue
+                wave = self._waves[wave_id]
+                duration = wave.duration_us * count / 1e6
+                freqs = {g: n * count / duration for g, n in wave.rising.items()
+                         if g in pul_pins} if duration else {}
+                levels = {g: v for g, v in wave.levels.items() if g not in pul_pins}
+                chain.append([t, t + duration, wave_id, levels, freqs, False])
+                t += duration
+            self._chain = chain
+        return 0
+
+    def wave_tx_busy(self):
+        self._call()
+        with self._lock:
+            self._integrate()
+            return 1 if self._chain else 0
+
+    def wave_tx_at(self):
+        self._call()
+        with self._lock:
+            self._integrate()
+            if not self._chain:
+                return NO_TX_WAVE
+            wave_id = self._chain[0][2]
+            return wave_id if wave_id in self._waves else WAVE_NOT_FOUND
+
+    def wave_tx_stop(self):
+        self._call()
+        with self._lock:
+            self._integrate()
+            stamp = time.perf_counter()
+            for seg in self._chain[:1]:
+                for axis in self.axes.values():
+                    if axis.pul in seg[4]:
+                        axis.set_freq(0)
+                        self.events.append((stamp, 'wave', axis.pul, 0))
+            self._chain = []
+        return 0
+
+    def callback(self, user_gpio, edge=RISING_EDGE, func=None):
+        cb = _Callback(self, user_gpio, edge, func)
+        with self._lock:
+            self._callbacks.append(cb)
+        return cb
+
+    def get_current_tick(self):
+        self._call()
+        return _now_tick()
+
+    def store_script(self, script):
+        self._call()
+        with self._lock:
+            self._scripts.append(_SimScript(self, script))
+            return len(self._scripts) - 1
+
+    def run_script(self, script_id, params=None):
+        self._call()
+        script = self._scripts[script_id]
+        for i, value in enumerate(params or []):
+            script.params[i] = value
+        script.status = PI_SCRIPT_RUNNING
+        script.thread = threading.Thread(target=script.run, name=f"pigpio-script-{script_id}", daemon=True)
+        script.thread.start()
+        return 0
+
+    def update_script(self, script_id, params=None):
+        self._call()
+        script = self._scripts[script_id]
+        for i, value in enumerate(params or []):
+            script.params[i] = value
+        return 0
+
+    def script_status(self, script_id):
+        self._call()
+        script = self._scripts[script_id]
+        return script.status, list(script.params)
+
+    def stop_script(self, script_id):
+        self._call()
+        self._scripts[script_id].status = PI_SCRIPT_HALTED
+        return 0
+
+    def delete_script(self, script_id):
+        self._call()
+        self._scripts[script_id].status = PI_SCRIPT_HALTED
+        return 0
+
+    def stop(self):
+        self._running = False
+        self.connected = False
+
+    # --- Utilidades de la simulación (no existen en pigpio) ---
+
+    def set_input(self, gpio, level):
+        """Fuerza el nivel de una entrada; el flanco se notifica en el siguiente ciclo."""
+        with self._lock:
+            self._forced_inputs[gpio] = level
+
+    def press_estop(self):
+        """Simula presionar el botón físico de paro. Devuelve el instante (perf_counter)."""
+        stamp = time.perf_counter()
+        self.set_input(E_STOP_PIN, 1)
+        return stamp
+
+    def release_estop(self):
+        self.set_input(E_STOP_PIN, 0)
+
+    def step_axis(self, name, pulses):
+        """Aplica 'pulses' pulsos exactos en PUL (generados fuera, p. ej. por mcu_sim.py)."""
+        with self._lock:
+            self._integrate()
+            self._apply_pulses(self.axes[name], pulses)
+            self._update_switches()
+
+    def axis_state(self, name):
+        """Posición física y pulsos generados por un eje, actualizados al instante."""
+        with self._lock:
+            self._integrate()
+            axis = self.axes[name]
+            return axis.position, axis.pulses_emitted
+
+    def last_event_time(self, kind, gpio, value, since=0.0):
+        """Instante del primer evento (kind, gpio, value) posterior a 'since'."""
+        for stamp, k, g, v in self.events:
+            if stamp >= since and k == kind and g == gpio and v == value:
+                return stamp
+        return None
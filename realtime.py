@@ -0,0 +1,119 @@
+# =================================================================================
+# Archivo: realtime.py
+# Modo de tiempo real para el ciclo de control (prioridad, afinidad, memoria, GC).
+# =================================================================================
+#
+# Se activa con ORTESIS_TIEMPO_REAL=1. Cada paso es opcional: si el sistema no
+# lo permite (sin CAP_SYS_NICE, límite de memlock, etc.) se avisa y se sigue.
+#
+#   - SCHED_FIFO y afinidad de CPU para el hilo que llama a enter()
+#   - mlockall() para evitar fallos de página durante los movimientos
+#   - gc.freeze() tras el arranque y GC pausado mientras haya movimiento
+#
+# LoopJitter mide la desviación de cada tick de un QTimer respecto a su
+# periodo nominal, para comparar corridas con y sin el modo activo.
+
+import os
+import gc
+import ctypes
+import ctypes.util
+import time
+
+from latency import LatencyStats
+
+RT_PRIORIDAD = 50
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+JITTER_BUCKETS_US = (50, 100, 250, 500, 1000, 2000, 5000, 10000, 20000)
+
+
+class RealtimeMode:
+    """Ajustes de tiempo real del hilo de control y control del recolector de basura."""
+
+    def __init__(self, priority=RT_PRIORIDAD, cpus=None, lock_memory=True):
+        self.priority = priority
+        self.cpus = cpus
+        self.lock_memory = lock_memory
+        self.status = {}
+        self.gc_paused = False
+        self.gc_pauses = 0
+
+    def enter(self):
+        """Aplica los ajustes al hilo actual. Devuelve un dict con el resultado de cada paso."""
+        self.status["sched_fifo"] = self._set_fifo()
+        self.status["affinity"] = self._set_affinity()
+        self.status["mlockall"] = self._lock_memory() if self.lock_memory else False
+        print(f"[TiempoReal] {self.status}")
+        return self.status
+
+    def freeze_heap(self):
+        """Recolecta una vez y congela los objetos del arranque (el GC ya no los recorre)."""
+        gc.collect()
+        gc.freeze()
+        self.status["gc_frozen"] = gc.get_freeze_count()
+
+    def set_motion_active(self, active):
+        """Pausa el GC mientras haya movimiento y lo reanuda al terminar."""
+        if active and not self.gc_paused:
+            gc.disable()
+            self.gc_paused = True
+            self.gc_pauses += 1
+        elif not active and self.gc_paused:
+            gc.enable()
+            self.gc_paused = False
+
+    def summary(self):
+        return dict(self.status, gc_pauses=self.gc_pauses)
+
+    def _set_fifo(self):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.priority))
+            return True
+        except (OSError, AttributeError) as e:
+            print(f"[TiempoReal] No se pudo fijar SCHED_FIFO ({e}).")
+            return False
+
+    def _set_affinity(self):
+        if not self.cpus:
+            return False
+        try:
+            cpus = set(self.cpus) & os.sched_getaffinity(0)
+            if not cpus:
+                print(f"[TiempoReal] CPUs {sorted(self.cpus)} no disponibles.")
+                return False
+            os.sched_setaffinity(0, cpus)
+            return sorted(cpus)
+        except (OSError, AttributeError) as e:
+            print(f"[TiempoReal] No se pudo fijar la afinidad ({e}).")
+            return False
+
+    def _lock_memory(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+                print(f"[TiempoReal] mlockall falló ({os.strerror(ctypes.get_errno())}).")
+                return False
+            return True
+        except (OSError, AttributeError) as e:
+            print(f"[TiempoReal] mlockall no disponible ({e}).")
+            return False
+
+
+class LoopJitter:
+    """Desviación (µs) entre ticks consecutivos de un ciclo periódico y su periodo nominal."""
+
+    def __init__(self, name, interval_ms):
+        self.interval_us = interval_ms * 1000
+        self.stats = LatencyStats(name, JITTER_BUCKETS_US)
+        self._last = 0.0
+
+    def tick(self):
+        now = time.perf_counter()
+        if self._last:
+            self.stats.record(abs((now - self._last) * 1e6 - self.interval_us))
+        self._last = now
+
+    def restart(self):
+        """Llamar al detener el timer: el siguiente tick no se compara con el anterior."""
+        self._last = 0.0
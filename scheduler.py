@@ -0,0 +1,113 @@
+# =================================================================================
+# Archivo: scheduler.py
+# Registro de acciones diferidas cancelables (sustituye a QTimer.singleShot).
+# =================================================================================
+#
+# Cada acción pertenece a un grupo ("terapia", "calibracion", "ui", ...). Al
+# detener una terapia o activar el paro se cancela el grupo completo, de modo
+# que ninguna espera pendiente vuelva a disparar movimientos. Además cada grupo
+# tiene un número de generación: una acción programada en una generación
+# anterior se descarta al dispararse aunque su timer se haya escapado.
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class _Action:
+    __slots__ = ("token", "group", "generation", "key", "callback", "timer")
+
+    def __init__(self, token, group, generation, key, callback, timer):
+        self.token = token
+        self.group = group
+        self.generation = generation
+        self.key = key
+        self.callback = callback
+        self.timer = timer
+
+
+class ActionScheduler(QObject):
+    """Dueño de todas las acciones diferidas de la interfaz."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._actions = {}
+        self._keys = {}
+        self._generations = {}
+        self._next_token = 1
+
+        # Contadores
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.stale = 0
+
+    def schedule(self, delay_ms, callback, group="general", key=None):
+        """
+        Programa 'callback' dentro de 'delay_ms'. Si se indica 'key', una acción
+        pendiente con la misma clave se reemplaza. Devuelve el token de la acción.
+        """
+        if key is not None and key in self._keys:
+            self.cancel(self._keys[key])
+
+        token = self._next_token
+        self._next_token += 1
+
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        action = _Action(token, group, self._generations.get(group, 0), key, callback, timer)
+        timer.timeout.connect(lambda: self._fire(token))
+
+        self._actions[token] = action
+        if key is not None:
+            self._keys[key] = token
+        self.scheduled += 1
+        timer.start(int(delay_ms))
+        return token
+
+    def cancel(self, token):
+        action = self._actions.pop(token, None)
+        if action is None:
+            return False
+        self._release(action)
+        self.cancelled += 1
+        return True
+
+    def cancel_group(self, group):
+        """Cancela todo lo pendiente del grupo y abre una generación nueva. Devuelve cuántas se cancelaron."""
+        self._generations[group] = self._generations.get(group, 0) + 1
+        tokens = [t for t, a in self._actions.items() if a.group == group]
+        for token in tokens:
+            self.cancel(token)
+        return len(tokens)
+
+    def cancel_all(self):
+        return sum(self.cancel_group(group) for group in {a.group for a in self._actions.values()})
+
+    def pending(self, group=None):
+        if group is None:
+            return len(self._actions)
+        return sum(1 for a in self._actions.values() if a.group == group)
+
+    def summary(self):
+        by_group = {}
+        for action in self._actions.values():
+            by_group[action.group] = by_group.get(action.group, 0) + 1
+        return {"pending": len(self._actions), "pending_by_group": by_group,
+                "scheduled": self.scheduled, "fired": self.fired,
+                "cancelled": self.cancelled, "stale": self.stale}
+
+    def _release(self, action):
+        action.timer.stop()
+        action.timer.deleteLater()
+        if action.key is not None and self._keys.get(action.key) == action.token:
+            del self._keys[action.key]
+
+    def _fire(self, token):
+        action = self._actions.pop(token, None)
+        if action is None:
+            return
+        self._release(action)
+        if action.generation != self._generations.get(action.group, 0):
+            self.stale += 1
+            return
+        self.fired += 1
+        action.callback()
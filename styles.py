@@ -6,7 +6,7 @@ STYLESHEET = """
    ========================================================================== */
 
     #MainWindow, #WelcomePage, #LoadingPage, #CalibratedPage, #RehabSelectionPage, 
-    #FlexExtPage, #AbdAddPage, #TherapySummaryPage, #LegPositioningPage { 
+    #ExercisePage, #TherapySummaryPage, #LegPositioningPage { 
         background-color: #f0f2f5; 
     }
     
@@ -0,0 +1,99 @@
+# =================================================================================
+# Archivo: trajectory.py
+# Trayectorias enseñadas: grabación del jog, compresión (RDP) y reproducción.
+# =================================================================================
+#
+# El fisioterapeuta mueve la órtesis con los botones de jog mientras el worker
+# muestrea la posición de ambos ejes cada pocos ms. Al terminar, la serie se
+# comprime con Ramer-Douglas-Peucker usando distancia sincronizada en el
+# tiempo (el error de cada muestra se mide contra el punto interpolado en su
+# mismo instante), así los waypoints conservan también la velocidad.
+#
+# Un waypoint es (t_s, pasos_lineal, pasos_rotacional). Para reproducir, cada
+# par de waypoints consecutivos es un tramo interpolado (joint_path.py) con
+# duración escalada por el multiplicador de velocidad.
+
+import json
+
+
+class Trajectory:
+    """Lista de waypoints (t_s, lineal, rotacional) y cuántas muestras los originaron."""
+
+    def __init__(self, waypoints, samples=0):
+        self.waypoints = [(float(t), int(lin), int(rot)) for t, lin, rot in waypoints]
+        self.samples = samples
+
+    @property
+    def duration_s(self):
+        return self.waypoints[-1][0] - self.waypoints[0][0] if self.waypoints else 0.0
+
+    def segments(self, speed=1.0):
+        """Tramos (duracion_s, lineal_destino, rotacional_destino) a la velocidad dada."""
+        out = []
+        for (t0, _, _), (t1, lin, rot) in zip(self.waypoints, self.waypoints[1:]):
+            out.append(((t1 - t0) / speed, lin, rot))
+        return out
+
+    def to_json(self):
+        return json.dumps({"samples": self.samples, "waypoints": self.waypoints})
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(data["waypoints"], data.get("samples", 0))
+
+
+class TrajectoryRecorder:
+    """
+    Acumula muestras (t, lineal, rotacional). Las posiciones repetidas se
+    reducen a la primera y la última de cada tramo quieto (las pausas del
+    fisioterapeuta se conservan como tiempo, no como muestras).
+    """
+
+    def __init__(self):
+        self.points = []
+        self.count = 0
+        self._t0 = None
+
+    def add(self, t, lin, rot):
+        if self._t0 is None:
+            self._t0 = t
+        point = (t - self._t0, int(lin), int(rot))
+        self.count += 1
+        if len(self.points) >= 2 and self.points[-1][1:] == point[1:] == self.points[-2][1:]:
+            self.points[-1] = point
+        else:
+            self.points.append(point)
+
+    def finish(self, tolerances):
+        return Trajectory(simplify(self.points, tolerances), self.count)
+
+
+def simplify(points, tolerances):
+    """
+    Ramer-Douglas-Peucker con distancia sincronizada. points: [(t, p1, p2, ...)];
+    tolerances: error máximo por eje (mismas unidades que las posiciones).
+    """
+    n = len(points)
+    if n <= 2:
+        return list(points)
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        ta, tb = points[a][0], points[b][0]
+        span = tb - ta
+        worst, index = 1.0, None
+        for i in range(a + 1, b):
+            f = (points[i][0] - ta) / span if span > 0 else 0.0
+            err = max(abs(points[i][k + 1] - (points[a][k + 1] + (points[b][k + 1] - points[a][k + 1]) * f)) / tol
+                      for k, tol in enumerate(tolerances))
+            if err > worst:
+                worst, index = err, i
+        if index is not None:
+            keep[index] = True
+            stack.append((a, index))
+            stack.append((index, b))
+    return [p for p, k in zip(points, keep) if k]
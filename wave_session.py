@@ -0,0 +1,243 @@
+# =================================================================================
+# Archivo: wave_session.py
+# Compilador de sesiones de terapia a una cadena de ondas DMA de pigpio.
+# =================================================================================
+#
+# Una sesión de N repeticiones (ir a un extremo, pausa, ir al otro, pausa, ...,
+# volver al cero) se traduce a UNA llamada wave_chain(): los pulsos de PUL, los
+# cambios de DIR y las pausas viajan codificados en la cadena y los ejecuta el
+# DMA de pigpiod. Python solo vigila el avance (por tiempo transcurrido, que
+# es determinista) y el paro de emergencia.
+#
+# Comandos de wave_chain usados:
+#   255 0            inicio de ciclo
+#   255 1 x y        repetir ciclo x + 256*y veces
+#   255 2 x y        pausa de x + 256*y microsegundos
+#
+# Las ondas se comparten: un periodo de PUL por eje/frecuencia (repetido con
+# ciclos) y una onda de preparación de DIR por sentido.
+
+import bisect
+
+WAVE_CHAIN_MAX_BYTES = 600      # Límite de pigpiod para una cadena
+CHAIN_MAX_COUNT = 65535         # Máximo de repeticiones / µs por comando
+DELAY_UNIT_US = 50000           # Pausa base de los ciclos de espera
+DIR_SETUP_US = 1000             # Tiempo de asentamiento de DIR antes del primer pulso
+
+
+class SessionProgram:
+    """
+    Resultado de compilar una sesión: operaciones de la cadena (con ondas por
+    nombre), definición de las ondas y la línea de tiempo para seguir el avance.
+    """
+
+    def __init__(self, pul_pin, dir_pin):
+        self.pul_pin = pul_pin
+        self.dir_pin = dir_pin
+        self.waves = {}         # nombre -> lista de (on_mask, off_mask, delay_us)
+        self.ops = []           # ('wave', nombre, veces) | ('delay', us) | ('loop', veces, [ops])
+        self.timeline = []      # (t_inicio_us, t_fin_us, pos_inicio, pos_fin, repeticiones_al_terminar)
+        self.phases = []        # Fase de cada tramo: 'first', 'second' o 'final' (para reanudar)
+        self.total_us = 0
+        self.final_position = 0
+        self.reps = 0
+        self._ends = []
+
+    # --- Seguimiento del avance ---
+
+    def state_at(self, elapsed_us):
+        """Posición estimada (pasos) y repeticiones completadas tras 'elapsed_us'."""
+        if not self.timeline:
+            return self.final_position, self.reps
+        i = bisect.bisect_right(self._ends, elapsed_us)
+        if i >= len(self.timeline):
+            return self.final_position, self.reps
+        t0, t1, p0, p1, _ = self.timeline[i]
+        reps_done = self.timeline[i - 1][4] if i > 0 else 0
+        if elapsed_us <= t0 or t1 == t0:
+            return p0, reps_done
+        return p0 + (p1 - p0) * (elapsed_us - t0) // (t1 - t0), reps_done
+
+    def phase_at(self, elapsed_us):
+        """
+        Fase en curso tras 'elapsed_us': 'first' (yendo o esperando en el primer
+        extremo), 'second' (ídem en el segundo), 'final' (regreso al cero) o 'done'.
+        """
+        i = bisect.bisect_right(self._ends, elapsed_us)
+        if i >= len(self.phases):
+            return 'done'
+        return self.phases[i]
+
+    def chain_bytes(self, wave_ids):
+        """Codifica las operaciones como lista de bytes para wave_chain()."""
+        out = []
+        for op in self.ops:
+            _encode(op, wave_ids, out)
+        if len(out) > WAVE_CHAIN_MAX_BYTES:
+            raise ValueError(f"Cadena de {len(out)} bytes excede {WAVE_CHAIN_MAX_BYTES}")
+        assert all(0 <= byte <= 255 for byte in out), "Byte fuera de rango en la cadena"
+        return out
+
+
+def _encode(op, wave_ids, out):
+    kind = op[0]
+    if kind == 'wave':
+        _, name, count = op
+        wid = wave_ids[name]
+        while count > 0:
+            block = min(count, CHAIN_MAX_COUNT)
+            if block == 1:
+                out.append(wid)
+            else:
+                out += [255, 0, wid, 255, 1, block & 0xFF, block >> 8]
+            count -= block
+    elif kind == 'delay':
+        # Pausas largas: un ciclo sobre una pausa fija para no agotar los 600 bytes
+        # (cada pausa suelta admite como mucho CHAIN_MAX_COUNT µs)
+        loops, rest = divmod(op[1], DELAY_UNIT_US)
+        if loops == 1:
+            out += [255, 2, DELAY_UNIT_US & 0xFF, DELAY_UNIT_US >> 8]
+        elif loops > 1:
+            out += [255, 0, 255, 2, DELAY_UNIT_US & 0xFF, DELAY_UNIT_US >> 8,
+                    255, 1, loops & 0xFF, loops >> 8]
+        if rest:
+            out += [255, 2, rest & 0xFF, rest >> 8]
+    elif kind == 'loop':
+        _, count, body = op
+        out += [255, 0]
+        for inner in body:
+            _encode(inner, wave_ids, out)
+        out += [255, 1, count & 0xFF, count >> 8]
+
+
+def compile_session(pul_pin, dir_pin, dir_positive, freq_hz, start_pos, first_target,
+                    second_target, home_pos, reps, dwell_ms, final_dwell_ms, first_leg=True):
+    """
+    Compila: [start -> first, pausa, first -> second, pausa] x reps, pausa final,
+    second -> home. Las posiciones son absolutas en pasos; dir_positive es el
+    nivel de DIR que avanza en sentido positivo.
+
+    Para reanudar una sesión pausada: first_leg=False hace que la primera
+    repetición empiece yendo al segundo extremo, y reps=0 deja solo la pausa
+    final y el regreso al cero.
+    """
+    if reps < 0:
+        raise ValueError("reps no puede ser negativo")
+    if reps - 1 > CHAIN_MAX_COUNT:
+        raise ValueError(f"reps no puede exceder {CHAIN_MAX_COUNT + 1}")
+
+    program = SessionProgram(pul_pin, dir_pin)
+    program.reps = reps
+
+    half_us = max(1, int(round(500000.0 / freq_hz)))
+    program.waves['step'] = [(1 << pul_pin, 0, half_us), (0, 1 << pul_pin, half_us)]
+    program.waves['dir+'] = [(1 << dir_pin, 0, DIR_SETUP_US) if dir_positive else (0, 1 << dir_pin, DIR_SETUP_US)]
+    program.waves['dir-'] = [(0, 1 << dir_pin, DIR_SETUP_US) if dir_positive else (1 << dir_pin, 0, DIR_SETUP_US)]
+    period_us = 2 * half_us
+
+    clock = [0]
+    timeline = program.timeline
+    phases = program.phases
+    phase = ['first']
+
+    def segment(entry):
+        timeline.append(entry)
+        phases.append(phase[0])
+
+    def move(ops, src, dst):
+        steps = dst - src
+        if steps == 0:
+            return
+        ops.append(('wave', 'dir+' if steps > 0 else 'dir-', 1))
+        segment((clock[0], clock[0] + DIR_SETUP_US, src, src, None))
+        clock[0] += DIR_SETUP_US
+        ops.append(('wave', 'step', abs(steps)))
+        segment((clock[0], clock[0] + abs(steps) * period_us, src, dst, None))
+        clock[0] += abs(steps) * period_us
+
+    def dwell(ops, pos, ms):
+        if ms <= 0:
+            return
+        ops.append(('delay', ms * 1000))
+        segment((clock[0], clock[0] + ms * 1000, pos, pos, None))
+        clock[0] += ms * 1000
+
+    def repetition(ops, src, rep_number, with_first=True):
+        if with_first:
+            phase[0] = 'first'
+            move(ops, src, first_target)
+            dwell(ops, first_target, dwell_ms)
+            src = first_target
+        phase[0] = 'second'
+        move(ops, src, second_target)
+        dwell(ops, second_target, dwell_ms)
+        # La repetición cuenta al terminar la pausa en el segundo extremo
+        segment((clock[0], clock[0], second_target, second_target, rep_number))
+
+    # Primera repetición fuera del ciclo: parte de la posición actual
+    last_pos = start_pos
+    if reps >= 1:
+        repetition(program.ops, start_pos, 1, first_leg)
+        last_pos = second_target
+
+    # Repeticiones restantes: un solo ciclo en la cadena; la línea de tiempo se desenrolla
+    if reps > 1:
+        body = []
+        mark = len(timeline)
+        repetition(body, second_target, 2)
+        block = timeline[mark:]
+        block_phases = phases[mark:]
+        duration = clock[0] - block[0][0]
+        for n in range(3, reps + 1):
+            shift = duration * (n - 2)
+            timeline.extend((t0 + shift, t1 + shift, p0, p1, n if r is not None else None)
+                            for t0, t1, p0, p1, r in block)
+            phases.extend(block_phases)
+        clock[0] += duration * (reps - 2)
+        program.ops.append(('loop', reps - 1, body))
+
+    phase[0] = 'final'
+    dwell(program.ops, last_pos, final_dwell_ms)
+    move(program.ops, last_pos, home_pos)
+
+    # Propagar el contador de repeticiones a cada tramo
+    done = 0
+    for i, (t0, t1, p0, p1, r) in enumerate(timeline):
+        done = r if r is not None else done
+        timeline[i] = (t0, t1, p0, p1, done)
+
+    program.total_us = clock[0]
+    program.final_position = home_pos
+    program._ends = [t1 for _, t1, _, _, _ in timeline]
+    return program
+
+
+class WaveSession:
+    """Carga un SessionProgram en pigpiod, lo ejecuta y libera las ondas."""
+
+    def __init__(self, pi, program, pigpio_module):
+        self.pi = pi
+        self.program = program
+        self.gpio = pigpio_module
+        self.wave_ids = {}
+
+    def start(self):
+        pi = self.pi
+        pi.set_mode(self.program.pul_pin, self.gpio.OUTPUT)     # Sale del modo PWM por hardware
+        pi.write(self.program.pul_pin, 0)
+        for name, pulses in self.program.waves.items():
+            pi.wave_add_new()
+            pi.wave_add_generic([self.gpio.pulse(on, off, delay) for on, off, delay in pulses])
+            self.wave_ids[name] = pi.wave_create()
+        pi.wave_chain(self.program.chain_bytes(self.wave_ids))
+
+    def busy(self):
+        return bool(self.pi.wave_tx_busy())
+
+    def stop(self):
+        """Detiene la transmisión (si sigue activa) y borra las ondas."""
+        self.pi.wave_tx_stop()
+        self.pi.write(self.program.pul_pin, 0)
+        for wid in self.wave_ids.values():
+            self.pi.wave_delete(wid)
+        self.wave_ids = {}